@@ -0,0 +1,104 @@
+'''
+Measures how many bytes each cached ExternalSecret costs in memory.
+
+ExternalSecrets are generated the way the API server returns them, with managedFields, annotations and a full status,
+and decoded from JSON one at a time so no strings are shared between them up front. The memory held is then measured
+with tracemalloc for the raw objects, for those objects compacted into plain dicts, and for the ExternalSecretRecords
+the ESOIndex keeps.
+
+Usage:
+    uv run python benchmarks/index_memory_benchmark.py [--external-secrets 20000] [--namespaces 50] [--keys-per-secret 3]
+'''
+
+from external_secrets_reloader.cache.eso_index import ESOIndex, compact_object
+from external_secrets_reloader.reloader.eso_aws_provider_reloader import ESOAWSProviderReloader
+
+import argparse
+import gc
+import json
+import tracemalloc
+
+
+def external_secret_json(i: int, namespace_count: int, keys_per_secret: int) -> str:
+    namespace = f"team-{i % namespace_count}"
+    return json.dumps({
+        "apiVersion": "external-secrets.io/v1",
+        "kind": "ExternalSecret",
+        "metadata": {
+            "name": f"app-{i}-secrets",
+            "namespace": namespace,
+            "uid": f"4f6c1c3e-0000-4000-8000-{i:012d}",
+            "resourceVersion": str(100000 + i),
+            "generation": 3,
+            "creationTimestamp": "2024-01-01T00:00:00Z",
+            "labels": { "app.kubernetes.io/name": f"app-{i}", "app.kubernetes.io/managed-by": "Helm" },
+            "annotations": {
+                "meta.helm.sh/release-name": f"app-{i}",
+                "meta.helm.sh/release-namespace": namespace,
+                "reconcile.external-secrets.io/force-sync": "1700000000",
+            },
+            "managedFields": [
+                { "manager": "helm", "operation": "Update", "apiVersion": "external-secrets.io/v1", "time": "2024-01-01T00:00:00Z", "fieldsType": "FieldsV1", "fieldsV1": { "f:spec": { "f:data": {}, "f:refreshInterval": {}, "f:secretStoreRef": {}, "f:target": {} } } },
+                { "manager": "external-secrets", "operation": "Update", "apiVersion": "external-secrets.io/v1", "time": "2024-01-01T00:00:00Z", "fieldsType": "FieldsV1", "fieldsV1": { "f:status": { "f:binding": {}, "f:conditions": {}, "f:refreshTime": {}, "f:syncedResourceVersion": {} } }, "subresource": "status" },
+            ],
+        },
+        "spec": {
+            "refreshInterval": "1h",
+            "secretStoreRef": { "name": "parameter-store", "kind": "SecretStore" },
+            "target": { "name": f"app-{i}-secrets", "creationPolicy": "Owner", "deletionPolicy": "Retain" },
+            "data": [
+                { "secretKey": f"value-{k}", "remoteRef": { "key": f"/{namespace}/app-{i % 500}/value-{k}", "conversionStrategy": "Default", "decodingStrategy": "None", "metadataPolicy": "None" } }
+                for k in range(keys_per_secret)
+            ],
+        },
+        "status": {
+            "binding": { "name": f"app-{i}-secrets" },
+            "conditions": [ { "type": "Ready", "status": "True", "reason": "SecretSynced", "message": "secret synced", "lastTransitionTime": "2024-01-01T00:00:00Z" } ],
+            "refreshTime": "2024-01-01T00:00:00Z",
+            "syncedResourceVersion": f"1-{i:032x}",
+        },
+    })
+
+
+def measure(build) -> tuple[object, int]:
+    '''
+    Bytes still allocated by build() once it returns, along with what it built so it stays alive while measured
+    '''
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--external-secrets", type=int, default=20000)
+    parser.add_argument("--namespaces", type=int, default=50)
+    parser.add_argument("--keys-per-secret", type=int, default=3)
+    args = parser.parse_args()
+
+    count = args.external_secrets
+    payloads = [ external_secret_json(i, args.namespaces, args.keys_per_secret) for i in range(count) ]
+
+    raw, raw_bytes = measure(lambda: [ json.loads(payload) for payload in payloads ])
+
+    # Each representation is built from freshly decoded objects, which are discarded, so only what is kept is measured
+    _, compact_bytes = measure(lambda: [ compact_object(json.loads(payload)) for payload in payloads ])
+
+    def build_index():
+        index = ESOIndex(ESOAWSProviderReloader.PLURALS)
+        index.replace(ESOAWSProviderReloader.EXTERNAL_SECRET_PLURAL, [ json.loads(payload) for payload in payloads ], "1")
+        return index
+    _, record_bytes = measure(build_index)
+
+    print(f"{count} ExternalSecrets, {args.namespaces} namespaces, {args.keys_per_secret} keys each")
+    print(f"{'representation':>16} {'total MB':>10} {'bytes/ES':>10}")
+    for name, total in [("raw objects", raw_bytes), ("compacted dicts", compact_bytes), ("records", record_bytes)]:
+        print(f"{name:>16} {total / 1024 / 1024:>10.1f} {total / count:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+'''
+Measures how event throughput scales with the number of worker processes.
+
+Each worker runs the real EventBridgeProcessor, ESOEventHandler and ESOAWSProviderReloader pipeline, fed from an in
+memory queue of EventBridge events and backed by an in memory Kubernetes client, so the numbers reflect the CPU cost
+of parsing, matching and logging rather than network latency. Throughput is read from the aggregated
+esr_events_processed_total counter the WorkerSupervisor serves on /metrics.
+
+Usage:
+    uv run python benchmarks/multi_process_benchmark.py [--workers 1 2 4] [--seconds 10] [--external-secrets 2000]
+'''
+
+from external_secrets_reloader.entries.sqsentry import SQSEntry
+from external_secrets_reloader.event_handler.eso_event_handler import ESOEventHandler
+from external_secrets_reloader.health_check.health_status import HealthStatus
+from external_secrets_reloader.processors.eventbridge_processor import EventBridgeProcessor
+from external_secrets_reloader.processors.processor import Processor
+from external_secrets_reloader.reloader.eso_aws_provider_reloader import ESOAWSProviderReloader, ProviderType
+from external_secrets_reloader.supervisor.worker_status_reporter import WorkerStatusReporter
+from external_secrets_reloader.supervisor.worker_supervisor import WorkerSupervisor
+
+import argparse
+import json
+import logging
+import os
+import time
+
+KEY_COUNT = 500
+
+
+class InMemorySQSProcessor(Processor[SQSEntry]):
+    '''
+    Endlessly hands out Parameter Store change events, cycling through KEY_COUNT keys
+    '''
+
+    def __init__(self):
+        self._bodies = [
+            json.dumps({
+                "source": "aws.ssm",
+                "detail-type": "Parameter Store Change",
+                "time": "2024-01-01T00:00:00Z",
+                "resources": [f"arn:aws:ssm:us-east-1:123456789012:parameter/benchmark/key-{i}"],
+                "detail": { "name": f"/benchmark/key-{i}", "operation": "Update" },
+            })
+            for i in range(KEY_COUNT)
+        ]
+        self._position = 0
+        self._entry = None
+
+    def load_next_entry(self) -> bool:
+        self._entry = SQSEntry({ "Body": self._bodies[self._position % KEY_COUNT] })
+        self._position += 1
+        return True
+
+    def get_entry(self) -> SQSEntry:
+        return self._entry
+
+    def mark_entry_resolved(self):
+        self._entry = None
+
+
+class InMemoryK8sClient():
+    '''
+    Stands in for CustomObjectsApi with a fixed set of stores and ExternalSecrets
+    '''
+
+    def __init__(self, external_secret_count: int):
+        self._objects = {
+            ESOAWSProviderReloader.SECRET_STORE_PLURAL: [
+                { "metadata": { "name": "parameter-store", "namespace": "default" }, "spec": { "provider": { "aws": { "service": "ParameterStore" } } } },
+            ],
+            ESOAWSProviderReloader.CLUSTER_SECRET_STORE_PLURAL: [],
+            ESOAWSProviderReloader.EXTERNAL_SECRET_PLURAL: [
+                {
+                    "metadata": { "name": f"es-{i}", "namespace": "default" },
+                    "spec": {
+                        "secretStoreRef": { "name": "parameter-store" },
+                        "data": [ { "remoteRef": { "key": f"/benchmark/key-{i % KEY_COUNT}" } } ],
+                    },
+                }
+                for i in range(external_secret_count)
+            ],
+        }
+
+    def list_cluster_custom_object(self, group, version, plural, **kwargs):
+        return { "items": self._objects[plural] }
+
+    def patch_namespaced_custom_object(self, group, version, plural, name, namespace, body, **kwargs):
+        return body
+
+
+def benchmark_worker(worker_id, status_queue, stop_event):
+    logging.basicConfig(level=logging.WARNING)
+
+    health_status = HealthStatus()
+    reporter = WorkerStatusReporter(worker_id, health_status, status_queue, interval_seconds=0.5)
+    reporter.start()
+
+    external_secret_count = int(os.environ.get("ESR_BENCHMARK_EXTERNAL_SECRETS", "2000"))
+    reloader = ESOAWSProviderReloader(ProviderType.PARAMETER_STORE, k8s_client=InMemoryK8sClient(external_secret_count))
+    event_handler = ESOEventHandler(EventBridgeProcessor(InMemorySQSProcessor()), reloader)
+
+    while not stop_event.is_set():
+        event_handler.poll_for_events()
+
+    reporter.stop()
+
+
+def events_processed(supervisor: WorkerSupervisor) -> float:
+    for line in supervisor.render_metrics().splitlines():
+        if line.startswith("esr_events_processed_total "):
+            return float(line.split()[1])
+    return 0
+
+
+def run(worker_count: int, seconds: float) -> float:
+    supervisor = WorkerSupervisor(worker_count, benchmark_worker, HealthStatus())
+    supervisor.start()
+
+    # Let every worker start up and report once before measuring
+    deadline = time.monotonic() + 60
+    while not supervisor.health_status.is_ready() and time.monotonic() < deadline:
+        supervisor.poll(0.1)
+    supervisor.poll(1)
+
+    start_count = events_processed(supervisor)
+    start_time = time.monotonic()
+    while time.monotonic() - start_time < seconds:
+        supervisor.poll(0.1)
+    # Wait for a report taken after the measurement window ends
+    supervisor.poll(1)
+    elapsed = time.monotonic() - start_time
+    end_count = events_processed(supervisor)
+
+    supervisor.stop()
+    return (end_count - start_count) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--external-secrets", type=int, default=2000)
+    args = parser.parse_args()
+
+    # Read by the spawned workers
+    os.environ["ESR_BENCHMARK_EXTERNAL_SECRETS"] = str(args.external_secrets)
+
+    baseline = None
+    print(f"{'workers':>8} {'events/sec':>12} {'speedup':>8}")
+    for worker_count in args.workers:
+        rate = run(worker_count, args.seconds)
+        baseline = baseline or rate
+        print(f"{worker_count:>8} {rate:>12.1f} {rate / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
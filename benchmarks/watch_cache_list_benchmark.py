@@ -0,0 +1,152 @@
+'''
+Measures reload latency when the reloader's lists are quorum reads, and when they are served from the watch cache.
+
+A local HTTP server stands in for the API server, and the real ESOAWSProviderReloader talks to it through the real
+kubernetes client. Like the API server, the stand-in answers a list without a resourceVersion with a quorum read: a
+round trip to "etcd" (--etcd-latency-ms) and decoding every stored object before encoding the response. A list with
+resourceVersion=0, or with resourceVersionMatch=NotOlderThan a resourceVersion it already has, is answered from
+objects it keeps decoded in memory. Absolute numbers depend on the stand-in, only the difference between the two is
+meaningful.
+
+Usage:
+    uv run python benchmarks/watch_cache_list_benchmark.py [--reloads 200] [--external-secrets 2000] [--etcd-latency-ms 5]
+'''
+
+from external_secrets_reloader.reloader.eso_aws_provider_reloader import ESOAWSProviderReloader, ProviderType
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from kubernetes import client
+from threading import Thread
+from urllib.parse import parse_qs, urlparse
+import argparse
+import json
+import logging
+import statistics
+import time
+
+RESOURCE_VERSION = "1000"
+
+
+def stored_objects(external_secret_count: int) -> dict[str, list[bytes]]:
+    # Kept encoded, the way etcd holds them
+    store = {
+        "metadata": { "name": "secrets-manager", "namespace": "default", "resourceVersion": "1" },
+        "spec": { "provider": { "aws": { "service": "SecretsManager", "region": "us-east-1" } } },
+    }
+    external_secrets = [
+        {
+            "metadata": {
+                "name": f"es-{i}",
+                "namespace": "default",
+                "resourceVersion": str(2 + i),
+                "managedFields": [ { "manager": "external-secrets", "operation": "Update", "fieldsV1": { "f:status": {} } } ],
+            },
+            "spec": {
+                "secretStoreRef": { "name": "secrets-manager" },
+                "data": [ { "secretKey": "value", "remoteRef": { "key": f"benchmark/key-{i}" } } ],
+            },
+            "status": { "refreshTime": "2024-01-01T00:00:00Z", "conditions": [ { "type": "Ready", "status": "True" } ] },
+        }
+        for i in range(external_secret_count)
+    ]
+    return {
+        ESOAWSProviderReloader.SECRET_STORE_PLURAL: [ json.dumps(store).encode() ],
+        ESOAWSProviderReloader.CLUSTER_SECRET_STORE_PLURAL: [],
+        ESOAWSProviderReloader.EXTERNAL_SECRET_PLURAL: [ json.dumps(es).encode() for es in external_secrets ],
+    }
+
+
+class StandInAPIServer(ThreadingHTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, objects: dict[str, list[bytes]], etcd_latency_seconds: float):
+        super().__init__(("127.0.0.1", 0), StandInRequestHandler)
+        self.etcd = objects
+        self.watch_cache = { plural: [ json.loads(item) for item in items ] for plural, items in objects.items() }
+        self.etcd_latency_seconds = etcd_latency_seconds
+        self.requests = { "etcd": 0, "watch_cache": 0 }
+
+
+class StandInRequestHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, body: dict):
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        plural = url.path.rstrip("/").rsplit("/", 1)[-1]
+        query = { name: values[0] for name, values in parse_qs(url.query).items() }
+
+        resource_version = query.get("resourceVersion", "")
+        from_cache = resource_version == "0" or (
+            query.get("resourceVersionMatch") == "NotOlderThan" and resource_version.isdigit() and int(resource_version) <= int(RESOURCE_VERSION)
+        )
+
+        if from_cache:
+            self.server.requests["watch_cache"] += 1
+            items = self.server.watch_cache[plural]
+        else:
+            self.server.requests["etcd"] += 1
+            time.sleep(self.server.etcd_latency_seconds)
+            items = [ json.loads(item) for item in self.server.etcd[plural] ]
+
+        self._send_json({ "apiVersion": "external-secrets.io/v1", "kind": "List", "metadata": { "resourceVersion": RESOURCE_VERSION }, "items": items })
+
+    def do_PATCH(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._send_json({})
+
+
+def run(server: StandInAPIServer, watch_cache_lists: bool, reloads: int) -> list[float]:
+    configuration = client.Configuration()
+    configuration.host = f"http://127.0.0.1:{server.server_address[1]}"
+    k8s_client = client.CustomObjectsApi(client.ApiClient(configuration))
+    reloader = ESOAWSProviderReloader(ProviderType.SECRETS_MANAGER, k8s_client=k8s_client, watch_cache_lists=watch_cache_lists)
+
+    # One reload to warm up connections before measuring
+    reloader.reload("benchmark/key-0")
+
+    durations = []
+    for i in range(reloads):
+        start = time.perf_counter()
+        reloader.reload(f"benchmark/key-{i}")
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reloads", type=int, default=200)
+    parser.add_argument("--external-secrets", type=int, default=2000)
+    parser.add_argument("--etcd-latency-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    server = StandInAPIServer(stored_objects(args.external_secrets), args.etcd_latency_ms / 1000)
+    Thread(target=server.serve_forever, daemon=True).start()
+
+    print(f"{'lists':>12} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8} {'etcd reads':>11} {'cache reads':>12}")
+    try:
+        for name, watch_cache_lists in (("quorum", False), ("watch cache", True)):
+            server.requests = { "etcd": 0, "watch_cache": 0 }
+            durations = sorted(run(server, watch_cache_lists, args.reloads))
+            p50 = durations[len(durations) // 2] * 1000
+            p95 = durations[int(len(durations) * 0.95)] * 1000
+            mean = statistics.mean(durations) * 1000
+            print(f"{name:>12} {p50:>8.1f} {p95:>8.1f} {mean:>8.1f} {server.requests['etcd']:>11} {server.requests['watch_cache']:>12}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+
+
+from external_secrets_reloader.cache.eso_index_listener import ESOIndexListener
+from external_secrets_reloader.cache.external_secret_record import FORCE_SYNC_ANNOTATION, ExternalSecretRecord
+
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Optional, Union
+import logging
+import marshal
+import mmap
+import os
+import sys
+import time
+
+# Keys are (namespace, name). ClusterSecretStores are cluster scoped so always have an empty namespace
+ObjectKey = tuple[str, str]
+
+# Stores are kept as compacted dicts, as there are only ever a handful. ExternalSecrets, of which there can be tens
+# of thousands, are kept as ExternalSecretRecords
+IndexedObject = Union[dict, ExternalSecretRecord]
+
+
+def compact_object(obj: dict) -> dict:
+    '''
+    Strip a SecretStore, ClusterSecretStore or ExternalSecret down to only the fields the reloader needs. Everything
+    else (managedFields, labels, most of status, etc.) is dropped so the index and its snapshots stay small
+    '''
+    metadata = obj.get("metadata", {})
+    spec = obj.get("spec", {})
+
+    compacted_metadata = {
+        "name": metadata.get("name"),
+        "namespace": metadata.get("namespace", ""),
+        "resourceVersion": metadata.get("resourceVersion", ""),
+    }
+
+    force_sync = metadata.get("annotations", {}).get(FORCE_SYNC_ANNOTATION)
+    if force_sync is not None:
+        compacted_metadata["annotations"] = { FORCE_SYNC_ANNOTATION: force_sync }
+
+    compacted = { "metadata": compacted_metadata, "spec": {} }
+
+    # SecretStores and ClusterSecretStores only need their provider
+    if "provider" in spec:
+        compacted["spec"]["provider"] = spec["provider"]
+
+    # ExternalSecrets need what they reference and when they last synced
+    for field in ("secretStoreRef", "data", "dataFrom"):
+        if field in spec:
+            compacted["spec"][field] = spec[field]
+
+    refresh_time = obj.get("status", {}).get("refreshTime")
+    if refresh_time is not None:
+        compacted["status"] = { "refreshTime": refresh_time }
+
+    return compacted
+
+
+class ESOIndex():
+    '''
+    In memory index of the SecretStores, ClusterSecretStores and ExternalSecrets in the cluster, kept up to date by
+    an ESOInformer. Each plural is tracked along with the resourceVersion it was last synced at so that watches can
+    resume from where the index left off, including across restarts by way of a snapshot on local disk
+    '''
+
+    SNAPSHOT_FORMAT_VERSION = 2
+
+    EXTERNAL_SECRET_PLURAL = "externalsecrets"
+
+    def __init__(self, plurals: list[str]):
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self._lock = Lock()
+
+        self.plurals = list(plurals)
+        self._objects: dict[str, dict[ObjectKey, IndexedObject]] = { plural: dict() for plural in self.plurals }
+        self._resource_versions: dict[str, Optional[str]] = { plural: None for plural in self.plurals }
+        # Wall times each plural was last fully listed (or loaded from a snapshot), and last changed by a watch event
+        self._listed_at: dict[str, Optional[float]] = { plural: None for plural in self.plurals }
+        self._changed_at: dict[str, Optional[float]] = { plural: None for plural in self.plurals }
+
+        # Incremented on every change, so the snapshot writer can tell if there is anything new to write
+        self.generation = 0
+
+        self._listeners: list[ESOIndexListener] = []
+
+    def add_listener(self, listener: ESOIndexListener):
+        '''
+        Send every future change to the listener. It is first given everything currently in the index
+        '''
+        with self._lock:
+            self._listeners.append(listener)
+            for plural in self.plurals:
+                listener.on_replace(plural, list(self._objects[plural].values()))
+
+    @staticmethod
+    def _object_key(obj: dict) -> ObjectKey:
+        metadata = obj.get("metadata", {})
+        return (metadata.get("namespace") or "", metadata["name"])
+
+    @staticmethod
+    def _record_key(record: IndexedObject) -> ObjectKey:
+        if isinstance(record, ExternalSecretRecord):
+            return (record.namespace, record.name)
+        return ESOIndex._object_key(record)
+
+    def compact(self, plural: str, obj: dict) -> IndexedObject:
+        '''
+        The form an object of the plural is kept in, ie. for replace_compacted
+        '''
+        if plural == self.EXTERNAL_SECRET_PLURAL:
+            return ExternalSecretRecord.from_object(obj)
+        return compact_object(obj)
+
+    @staticmethod
+    def _resource_version_of(record: IndexedObject) -> str:
+        if isinstance(record, ExternalSecretRecord):
+            return record.resource_version
+        return record["metadata"]["resourceVersion"]
+
+    def replace(self, plural: str, items: list[dict], resource_version: Optional[str]):
+        '''
+        Replace everything known about a plural with the results of a full list
+        '''
+        self.replace_compacted(plural, [ self.compact(plural, item) for item in items ], resource_version)
+
+    def replace_compacted(self, plural: str, records: list[IndexedObject], resource_version: Optional[str]):
+        '''
+        replace for the results of a list that were already compacted as they were listed
+        '''
+        objects = { self._record_key(record): record for record in records }
+
+        with self._lock:
+            self._objects[plural] = objects
+            self._resource_versions[plural] = resource_version
+            self._listed_at[plural] = time.time()
+            self.generation += 1
+            for listener in self._listeners:
+                listener.on_replace(plural, list(objects.values()))
+
+    def upsert(self, plural: str, obj: dict):
+        compacted = self.compact(plural, obj)
+        with self._lock:
+            self._objects[plural][self._object_key(obj)] = compacted
+            self._set_resource_version(plural, self._resource_version_of(compacted))
+            self._changed_at[plural] = time.time()
+            self.generation += 1
+            for listener in self._listeners:
+                listener.on_upsert(plural, compacted)
+
+    def delete(self, plural: str, obj: dict):
+        key = self._object_key(obj)
+        with self._lock:
+            self._objects[plural].pop(key, None)
+            self._set_resource_version(plural, obj.get("metadata", {}).get("resourceVersion"))
+            self._changed_at[plural] = time.time()
+            self.generation += 1
+            for listener in self._listeners:
+                listener.on_delete(plural, key)
+
+    def set_resource_version(self, plural: str, resource_version: Optional[str]):
+        with self._lock:
+            self._set_resource_version(plural, resource_version)
+            self.generation += 1
+
+    def _set_resource_version(self, plural: str, resource_version: Optional[str]):
+        # Caller must hold the lock
+        if resource_version:
+            self._resource_versions[plural] = resource_version
+
+    def get_resource_version(self, plural: str) -> Optional[str]:
+        with self._lock:
+            return self._resource_versions[plural]
+
+    def has_synced(self) -> bool:
+        '''
+        Whether every plural has been populated from either a list or a snapshot
+        '''
+        with self._lock:
+            return all(rv is not None for rv in self._resource_versions.values())
+
+    def list(self, plural: str) -> list[IndexedObject]:
+        with self._lock:
+            return list(self._objects[plural].values())
+
+    def size(self, plural: str) -> int:
+        with self._lock:
+            return len(self._objects[plural])
+
+    def status(self) -> dict:
+        '''
+        Size, resourceVersion and when each plural was last listed and last changed
+        '''
+        def timestamp(wall_time: Optional[float]) -> Optional[str]:
+            return datetime.fromtimestamp(wall_time, timezone.utc).isoformat() if wall_time is not None else None
+
+        with self._lock:
+            return {
+                plural: {
+                    "size": len(self._objects[plural]),
+                    "resource_version": self._resource_versions[plural],
+                    "last_listed_at": timestamp(self._listed_at[plural]),
+                    "last_changed_at": timestamp(self._changed_at[plural]),
+                }
+                for plural in self.plurals
+            }
+
+    @staticmethod
+    def _to_snapshot_item(record: IndexedObject):
+        return record.to_tuple() if isinstance(record, ExternalSecretRecord) else record
+
+    def _from_snapshot_item(self, plural: str, item) -> IndexedObject:
+        return ExternalSecretRecord.from_tuple(item) if plural == self.EXTERNAL_SECRET_PLURAL else item
+
+    def save_snapshot(self, path: str):
+        '''
+        Atomically write the index to disk. The snapshot is written to a temporary file first and then moved into
+        place so a crash part way through never leaves a corrupt snapshot behind
+        '''
+        with self._lock:
+            snapshot = {
+                "format_version": self.SNAPSHOT_FORMAT_VERSION,
+                "python_version": list(sys.version_info[:2]),
+                "plurals": {
+                    plural: {
+                        "resource_version": self._resource_versions[plural],
+                        "items": [ self._to_snapshot_item(item) for item in self._objects[plural].values() ],
+                    }
+                    for plural in self.plurals
+                },
+            }
+            payload = marshal.dumps(snapshot)
+
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as snapshot_file:
+            snapshot_file.write(payload)
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(temp_path, path)
+
+        self._logger.debug(f"Wrote Index Snapshot Of {len(payload)} Bytes To {path}")
+
+    def load_snapshot(self, path: str) -> bool:
+        '''
+        Populate the index from a snapshot previously written by save_snapshot. The file is memory mapped and decoded
+        directly from the mapping, so it is never copied into a separate read buffer first
+
+        @return bool: True if the snapshot was loaded. False if there was no usable snapshot, in which case the index
+            is left untouched
+        '''
+        if not os.path.exists(path):
+            self._logger.info(f"No Index Snapshot Found At {path}")
+            return False
+
+        try:
+            with open(path, "rb") as snapshot_file:
+                with mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    snapshot = marshal.loads(mapped)
+        except (OSError, ValueError, EOFError, TypeError) as e:
+            self._logger.warning(f"Unable To Read Index Snapshot At {path}. Ignoring It", exc_info=e)
+            return False
+
+        # marshal's format is only guaranteed between the same Python versions
+        if not isinstance(snapshot, dict) or snapshot.get("format_version") != self.SNAPSHOT_FORMAT_VERSION or snapshot.get("python_version") != list(sys.version_info[:2]):
+            self._logger.warning(f"Index Snapshot At {path} Was Written By An Incompatible Version. Ignoring It")
+            return False
+
+        plurals = snapshot.get("plurals", {})
+        if any(plural not in plurals for plural in self.plurals):
+            self._logger.warning(f"Index Snapshot At {path} Is Missing Resource Types. Ignoring It")
+            return False
+
+        with self._lock:
+            for plural in self.plurals:
+                records = [ self._from_snapshot_item(plural, item) for item in plurals[plural]["items"] ]
+                self._objects[plural] = { self._record_key(record): record for record in records }
+                self._resource_versions[plural] = plurals[plural]["resource_version"]
+                self._listed_at[plural] = time.time()
+                for listener in self._listeners:
+                    listener.on_replace(plural, list(self._objects[plural].values()))
+            self.generation += 1
+
+        self._logger.info(f"Loaded Index Snapshot From {path}")
+        return True
@@ -0,0 +1,29 @@
+
+
+from abc import ABC, abstractmethod
+
+
+class ESOIndexListener(ABC):
+    '''
+    Receives every change made to an ESOIndex, so derived views of the index can be kept up to date incrementally rather
+    than rebuilt from the whole index. Called while the index holds its lock, so implementations should be quick and
+    must not call back into the index
+    '''
+
+    @abstractmethod
+    def on_replace(self, plural: str, items: list[dict]):
+        '''
+        Everything known about the plural has been replaced, ie. by a full list or loading a snapshot
+        '''
+        ...
+
+    @abstractmethod
+    def on_upsert(self, plural: str, obj: dict):
+        ...
+
+    @abstractmethod
+    def on_delete(self, plural: str, key: tuple[str, str]):
+        '''
+        @param key: (namespace, name) of the deleted object. Cluster scoped objects have an empty namespace
+        '''
+        ...
@@ -0,0 +1,162 @@
+
+
+from external_secrets_reloader.cache.eso_index import ESOIndex
+from external_secrets_reloader.cache.streaming_list_decoder import stream_list
+from external_secrets_reloader.metrics.metrics import METRICS
+
+from concurrent.futures import ThreadPoolExecutor
+from kubernetes import watch
+from kubernetes.client.rest import ApiException
+from threading import Event, Thread
+from typing import Optional
+import logging
+import time
+
+
+class ESOInformer():
+    '''
+    Keeps an ESOIndex in sync with the cluster. Each plural is listed once to populate the index and then watched
+    from the listed resourceVersion so that only changes have to be transferred from then on. If the index has
+    already been populated (ie. from a snapshot) the initial list is skipped and the watch resumes from the
+    resourceVersion stored in the index instead.
+
+    With streaming_lists, full lists are decoded and compacted one object at a time as the response is read, instead of
+    the whole response being decoded by the kubernetes client first
+    '''
+
+    HTTP_GONE = 410
+
+    SYNC_DURATION = METRICS.gauge(
+        "esr_index_sync_duration_seconds",
+        "Time the last sync of the index took to list every resource type it was missing"
+    )
+
+    def __init__(self, k8s_client, index: ESOIndex, group: str, version: str, watch_timeout_seconds: int = 300, streaming_lists: bool = False):
+        self._logger = logging.getLogger(self.__class__.__name__)
+
+        self.k8s_client = k8s_client
+        self.index = index
+        self.group = group
+        self.version = version
+        self.watch_timeout_seconds = watch_timeout_seconds
+        self.streaming_lists = streaming_lists
+
+        self._stop_event = Event()
+        self._threads: list[Thread] = []
+        self._watches: dict[str, watch.Watch] = dict()
+
+    def list_plural(self, plural: str):
+        '''
+        Do a full list of a plural and replace its contents in the index
+        '''
+        self._logger.debug(f"Listing All {plural} To Populate The Index")
+        if self.streaming_lists:
+            records, resource_version = stream_list(
+                self.k8s_client,
+                self.group,
+                self.version,
+                plural,
+                lambda item: self.index.compact(plural, item)
+            )
+            self.index.replace_compacted(plural, records, resource_version)
+            self._logger.info(f"Indexed {len(records)} {plural} At resourceVersion {resource_version}")
+            return
+
+        results = self.k8s_client.list_cluster_custom_object(
+            group=self.group,
+            version=self.version,
+            plural=plural
+        )
+        items = results.get('items', [])
+        resource_version = results.get('metadata', {}).get('resourceVersion')
+        self.index.replace(plural, items, resource_version)
+        self._logger.info(f"Indexed {len(items)} {plural} At resourceVersion {resource_version}")
+
+    def sync(self):
+        '''
+        Populate any plurals the index doesn't already know about. Each plural is a separate list, so they are all
+        listed at the same time rather than one after another. Raises the first exception any of the lists failed with
+        '''
+        plurals = [ plural for plural in self.index.plurals if self.index.get_resource_version(plural) is None ]
+        if not plurals:
+            return
+
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=len(plurals), thread_name_prefix="ESOInformer-sync") as executor:
+            futures = [ executor.submit(self.list_plural, plural) for plural in plurals ]
+        for future in futures:
+            future.result()
+
+        duration = time.monotonic() - start
+        self.SYNC_DURATION.set(duration)
+        self._logger.info("Synced %s In %.2f Seconds", ", ".join(plurals), duration)
+
+    def start(self):
+        '''
+        Sync the index and start a background watch per plural to keep it up to date
+        '''
+        self.sync()
+
+        for plural in self.index.plurals:
+            thread = Thread(target=self._watch_loop, args=(plural,), name=f"ESOInformer-{plural}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        for plural_watch in list(self._watches.values()):
+            plural_watch.stop()
+
+    def _apply_event(self, plural: str, event: dict):
+        event_type = event.get('type')
+        obj = event.get('object') or event.get('raw_object')
+
+        if event_type in ("ADDED", "MODIFIED"):
+            self.index.upsert(plural, obj)
+        elif event_type == "DELETED":
+            self.index.delete(plural, obj)
+        elif event_type == "BOOKMARK":
+            self.index.set_resource_version(plural, obj.get('metadata', {}).get('resourceVersion'))
+
+    def _watch_loop(self, plural: str):
+        while not self._stop_event.is_set():
+            resource_version: Optional[str] = self.index.get_resource_version(plural)
+            try:
+                plural_watch = watch.Watch()
+                self._watches[plural] = plural_watch
+
+                self._logger.debug("Watching %s From resourceVersion %s", plural, resource_version)
+                for event in plural_watch.stream(
+                    self.k8s_client.list_cluster_custom_object,
+                    group=self.group,
+                    version=self.version,
+                    plural=plural,
+                    resource_version=resource_version,
+                    allow_watch_bookmarks=True,
+                    timeout_seconds=self.watch_timeout_seconds
+                ):
+                    self._apply_event(plural, event)
+                    if self._stop_event.is_set():
+                        break
+
+            except ApiException as apie:
+                if apie.status == self.HTTP_GONE:
+                    # The resourceVersion we are resuming from is older than what the API server still has history for.
+                    # The only way to recover is to relist
+                    self._logger.info(f"resourceVersion {resource_version} For {plural} Has Expired. Relisting")
+                    self._relist(plural)
+                else:
+                    self._logger.error(f"Kubernetes API Exception Thrown Watching {plural}", exc_info=apie)
+                    self._stop_event.wait(5)
+
+            except Exception as e:
+                self._logger.error(f"Exception Thrown Watching {plural}", exc_info=e)
+                self._stop_event.wait(5)
+
+    def _relist(self, plural: str):
+        try:
+            self.list_plural(plural)
+        except Exception as e:
+            self._logger.error(f"Exception Thrown Relisting {plural}", exc_info=e)
+            self._stop_event.wait(5)
+
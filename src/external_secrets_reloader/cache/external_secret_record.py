@@ -0,0 +1,124 @@
+
+
+from external_secrets_reloader.cache.store_resolver import SECRET_STORE_KIND, external_secret_references
+
+from datetime import datetime, timezone
+from typing import Optional
+import sys
+
+FORCE_SYNC_ANNOTATION = "reconcile.external-secrets.io/force-sync"
+
+# (key, store kind, store name, version) for each key an ExternalSecret fetches
+Reference = tuple[str, str, str, Optional[str]]
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def parse_timestamp(value) -> Optional[float]:
+    '''
+    A Kubernetes RFC 3339 time (ie. status.refreshTime) as a unix timestamp, or None if it is missing or can't be parsed
+    '''
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def last_sync_timestamp(external_secret: dict) -> Optional[float]:
+    '''
+    The latest time the ExternalSecret is known to have been synced by ESO, or forced to sync by us, as a unix
+    timestamp. This is the newer of the force-sync annotation and the status.refreshTime. Values that can't be parsed
+    (ie. the annotation set by hand) are ignored
+
+    @return Optional[float]: The last sync time, or None if the ExternalSecret has never recorded one
+    '''
+    sync_times = []
+
+    force_sync = (external_secret.get("metadata", {}).get("annotations") or {}).get(FORCE_SYNC_ANNOTATION)
+    if force_sync:
+        try:
+            sync_times.append(float(int(force_sync)))
+        except (TypeError, ValueError):
+            pass
+
+    refresh_time = parse_timestamp((external_secret.get("status") or {}).get("refreshTime"))
+    if refresh_time is not None:
+        sync_times.append(refresh_time)
+
+    return max(sync_times, default=None)
+
+
+class ExternalSecretRecord():
+    '''
+    Only what matching a changed key against an ExternalSecret needs, kept instead of the ExternalSecret itself. Built
+    once when an ExternalSecret is listed or watched, so status, managedFields, annotations and the rest of the
+    object are never held on to.
+
+    Records have no __dict__, and the namespace, name, store names and keys are interned. Those are repeated across
+    many ExternalSecrets (ie. every ExternalSecret in a namespace, or referencing the same store), so each distinct
+    value is only stored once
+    '''
+
+    __slots__ = ("namespace", "name", "resource_version", "references", "last_sync")
+
+    def __init__(self, namespace: str, name: str, resource_version: str, references: tuple[Reference, ...], last_sync: Optional[float]):
+        self.namespace = namespace
+        self.name = name
+        self.resource_version = resource_version
+        self.references = references
+        self.last_sync = last_sync
+
+    @classmethod
+    def from_object(cls, external_secret: dict) -> "ExternalSecretRecord":
+        metadata = external_secret.get("metadata", {})
+
+        references = tuple(
+            (
+                sys.intern(key),
+                sys.intern(store_ref.get("kind") or SECRET_STORE_KIND),
+                _intern(store_ref.get("name")),
+                _intern(version),
+            )
+            for key, store_ref, version in external_secret_references(external_secret)
+        )
+
+        return cls(
+            sys.intern(metadata.get("namespace") or ""),
+            sys.intern(metadata["name"]),
+            metadata.get("resourceVersion", ""),
+            references,
+            last_sync_timestamp(external_secret)
+        )
+
+    def is_synced_since(self, event_time: datetime) -> bool:
+        # Both the annotation and refreshTime only have second precision, so a sync within the same second as the
+        # change may have happened before it. Only a strictly newer sync is proof the change has been picked up
+        return self.last_sync is not None and self.last_sync > event_time.timestamp()
+
+    def to_tuple(self) -> tuple:
+        '''
+        Plain tuple form of the record, which marshal can write to snapshots
+        '''
+        return (self.namespace, self.name, self.resource_version, self.references, self.last_sync)
+
+    @classmethod
+    def from_tuple(cls, values: tuple) -> "ExternalSecretRecord":
+        namespace, name, resource_version, references, last_sync = values
+        references = tuple(
+            (sys.intern(key), sys.intern(kind), _intern(store_name), _intern(version))
+            for key, kind, store_name, version in references
+        )
+        return cls(sys.intern(namespace), sys.intern(name), resource_version, references, last_sync)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, ExternalSecretRecord) and self.to_tuple() == other.to_tuple()
+
+    def __repr__(self) -> str:
+        return f"ExternalSecretRecord({self.namespace}/{self.name}, references={self.references})"
@@ -0,0 +1,69 @@
+
+
+from external_secrets_reloader.cache.eso_index import ESOIndex
+
+from threading import Event, Thread
+from typing import Optional
+import hashlib
+import logging
+import re
+
+
+class IndexSnapshotWriter():
+    '''
+    Periodically writes the ESOIndex to disk so that it can be loaded on the next start instead of relisting
+    everything from the cluster. Snapshots are only written when the index has changed since the last one
+    '''
+
+    def __init__(self, index: ESOIndex, path: str, interval_seconds: int):
+        self._logger = logging.getLogger(self.__class__.__name__)
+
+        self.index = index
+        self.path = path
+        self.interval_seconds = interval_seconds
+
+        self._stop_event = Event()
+        self._thread: Optional[Thread] = None
+        self._written_generation: Optional[int] = None
+
+    @staticmethod
+    def path_for(path: str, name: str) -> str:
+        '''
+        Path of the snapshot for one of several indexes sharing a snapshot path, ie. one per cluster. Names like EKS
+        context ARNs (arn:aws:eks:...:cluster/name) aren't safe in a filename, so anything other than letters, digits,
+        dots, dashes and underscores is replaced. A hash of the original name is then added so two names can't end up
+        with the same file
+
+        @param path: The shared snapshot path
+        @param name: What the index is for. ie: its cluster's kubeconfig context
+        '''
+        safe_name = re.sub(r"[^A-Za-z0-9._-]", "_", name)
+        if safe_name != name:
+            safe_name = f"{safe_name}-{hashlib.sha256(name.encode()).hexdigest()[:8]}"
+        return f"{path}.{safe_name}"
+
+    def write_if_changed(self):
+        generation = self.index.generation
+        if generation == self._written_generation or not self.index.has_synced():
+            return
+
+        try:
+            self.index.save_snapshot(self.path)
+            self._written_generation = generation
+        except OSError as e:
+            self._logger.error(f"Unable To Write Index Snapshot To {self.path}", exc_info=e)
+
+    def start(self):
+        def run():
+            while not self._stop_event.wait(self.interval_seconds):
+                self.write_if_changed()
+
+        self._thread = Thread(target=run, name="IndexSnapshotWriter", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        '''
+        Stop the periodic writes and write one final snapshot so the next start has the freshest state possible
+        '''
+        self._stop_event.set()
+        self.write_if_changed()
@@ -0,0 +1,200 @@
+
+
+from external_secrets_reloader.cache.eso_index_listener import ESOIndexListener
+from external_secrets_reloader.decoders.event_decoder_registry import secrets_manager_arn_to_name, secrets_manager_full_arn_to_name
+
+from threading import Lock
+from typing import Iterator, Optional
+
+SECRET_STORE_KIND = "SecretStore"
+CLUSTER_SECRET_STORE_KIND = "ClusterSecretStore"
+
+# (kind, namespace, name). ClusterSecretStores are cluster scoped so always have an empty namespace
+StoreKey = tuple[str, str, str]
+
+# (spec.provider.aws, region, account). Region and account are None when the store doesn't say
+StoreEntry = tuple[dict, Optional[str], Optional[str]]
+
+
+def role_account(role_arn) -> Optional[str]:
+    '''
+    Account ID from an IAM role ARN. ie: arn:aws:iam::123456789012:role/my-role -> 123456789012
+    '''
+    if not isinstance(role_arn, str):
+        return None
+    parts = role_arn.split(":", 5)
+    if len(parts) == 6 and parts[0] == "arn" and parts[4]:
+        return parts[4]
+    return None
+
+
+def reference_keys(key: str) -> tuple[str, ...]:
+    '''
+    Keys a remoteRef key is matched against. Secrets Manager events are keyed by the secret's name, so a secret
+    referenced by its ARN is matched by name. A full ARN can't be told apart from a partial one by looking at it, so
+    both the name with the random suffix removed and the name as is are matched. Anything else is matched as is
+    '''
+    name = secrets_manager_arn_to_name(key)
+    if name == key:
+        return (key,)
+    full_name = secrets_manager_full_arn_to_name(key)
+    return (full_name, name) if full_name != name else (name,)
+
+
+def external_secret_references(external_secret: dict) -> Iterator[tuple[str, dict, Optional[str]]]:
+    '''
+    Every key an ExternalSecret fetches, along with the store it fetches it from and the version it is pinned to.
+    Entries in data and dataFrom can each override the ExternalSecret's secretStoreRef with their own
+    sourceRef.storeRef. dataFrom find entries don't name a key so can't be matched against one, and generatorRefs don't
+    use a store, so neither are included. Secrets Manager ARNs are converted to the names they could be, as events are
+    keyed by name (see reference_keys)
+
+    @return Iterator[tuple[str, dict, Optional[str]]]: (key, storeRef, version) for each reference
+    '''
+    spec = external_secret.get("spec", {})
+    default_store_ref = spec.get("secretStoreRef") or {}
+
+    for data in spec.get("data") or []:
+        remote_ref = data.get("remoteRef", {})
+        key = remote_ref.get("key")
+        if key:
+            store_ref = data.get("sourceRef", {}).get("storeRef") or default_store_ref
+            for reference_key in reference_keys(key):
+                yield reference_key, store_ref, remote_ref.get("version")
+
+    for data_from in spec.get("dataFrom") or []:
+        extract = data_from.get("extract") or {}
+        key = extract.get("key")
+        if key:
+            store_ref = data_from.get("sourceRef", {}).get("storeRef") or default_store_ref
+            for reference_key in reference_keys(key):
+                yield reference_key, store_ref, extract.get("version")
+
+
+class StoreResolver(ESOIndexListener):
+    '''
+    Index of the SecretStores and ClusterSecretStores that use the given AWS provider service, keyed by
+    (kind, namespace, name). Store references from ExternalSecrets are resolved the way ESO does: kind defaults to
+    SecretStore, and a SecretStore must be in the same namespace as the ExternalSecret referencing it.
+
+    Each store's region, and its account when it assumes a role, are worked out once as it is added, so checking whether
+    a store can see a changed resource is only a comparison.
+
+    Registered as a listener on an ESOIndex, it is updated one store at a time as stores change. Without an index it
+    can be populated from a list with on_replace.
+
+    Lookups read the current table without locking. Changes swap in an updated copy instead of modifying it in place,
+    which is cheap as there are only ever a handful of stores
+    '''
+
+    PLURAL_KINDS = {
+        "secretstores": SECRET_STORE_KIND,
+        "clustersecretstores": CLUSTER_SECRET_STORE_KIND,
+    }
+
+    def __init__(self, provider_type: str):
+        self.provider_type = provider_type
+
+        self._write_lock = Lock()
+        # Stores that use the provider service
+        self._stores: dict[StoreKey, StoreEntry] = dict()
+
+    def _entry(self, store: dict) -> Optional[StoreEntry]:
+        aws = store.get("spec", {}).get("provider", {}).get("aws")
+        if isinstance(aws, dict) and aws.get("service") == self.provider_type:
+            # Without a role the store uses the credentials ESO runs with, so could be in any account
+            return (aws, aws.get("region") or None, role_account(aws.get("role")))
+        return None
+
+    @staticmethod
+    def _store_key(kind: str, store: dict) -> StoreKey:
+        metadata = store.get("metadata", {})
+        namespace = "" if kind == CLUSTER_SECRET_STORE_KIND else (metadata.get("namespace") or "")
+        return (kind, namespace, metadata.get("name"))
+
+    def on_replace(self, plural: str, items: list[dict]):
+        kind = self.PLURAL_KINDS.get(plural)
+        if kind is None:
+            return
+
+        with self._write_lock:
+            stores = { key: entry for key, entry in self._stores.items() if key[0] != kind }
+            for item in items:
+                entry = self._entry(item)
+                if entry is not None:
+                    stores[self._store_key(kind, item)] = entry
+            self._stores = stores
+
+    def on_upsert(self, plural: str, obj: dict):
+        kind = self.PLURAL_KINDS.get(plural)
+        if kind is None:
+            return
+
+        key = self._store_key(kind, obj)
+        entry = self._entry(obj)
+        with self._write_lock:
+            stores = dict(self._stores)
+            # A store can be changed to a different provider, in which case it no longer counts
+            if entry is not None:
+                stores[key] = entry
+            else:
+                stores.pop(key, None)
+            self._stores = stores
+
+    def on_delete(self, plural: str, key: tuple[str, str]):
+        kind = self.PLURAL_KINDS.get(plural)
+        if kind is None:
+            return
+
+        namespace, name = key
+        with self._write_lock:
+            stores = dict(self._stores)
+            stores.pop((kind, "" if kind == CLUSTER_SECRET_STORE_KIND else namespace, name), None)
+            self._stores = stores
+
+    def _lookup(self, store_ref: dict, namespace: str) -> Optional[StoreEntry]:
+        return self._lookup_store(store_ref.get("kind") or SECRET_STORE_KIND, store_ref.get("name"), namespace)
+
+    def _lookup_store(self, kind: str, name: str, namespace: str) -> Optional[StoreEntry]:
+        if kind == CLUSTER_SECRET_STORE_KIND:
+            namespace = ""
+        return self._stores.get((kind, namespace, name))
+
+    def resolve(self, store_ref: dict, namespace: str) -> Optional[dict]:
+        '''
+        Find the store an ExternalSecret's storeRef points to
+
+        @param store_ref: The secretStoreRef or sourceRef.storeRef
+        @param namespace: Namespace of the ExternalSecret
+        @return Optional[dict]: The store's spec.provider.aws, or None if it doesn't exist or uses another provider
+        '''
+        entry = self._lookup(store_ref, namespace)
+        return entry[0] if entry is not None else None
+
+    def can_see(self, store_ref: dict, namespace: str, region: Optional[str] = None, account: Optional[str] = None) -> bool:
+        '''
+        Whether the store an ExternalSecret's storeRef points to exists, uses the provider, and reads from the given
+        region and account. A region or account that isn't known on either side can't rule the store out
+        '''
+        return self._can_see_entry(self._lookup(store_ref, namespace), region, account)
+
+    def can_see_store(self, kind: str, name: str, namespace: str, region: Optional[str] = None, account: Optional[str] = None) -> bool:
+        '''
+        can_see for a store reference already split into its kind and name, ie. from an ExternalSecretRecord
+        '''
+        return self._can_see_entry(self._lookup_store(kind, name, namespace), region, account)
+
+    @staticmethod
+    def _can_see_entry(entry: Optional[StoreEntry], region: Optional[str], account: Optional[str]) -> bool:
+        if entry is None:
+            return False
+
+        _, store_region, store_account = entry
+        if region is not None and store_region is not None and region != store_region:
+            return False
+        if account is not None and store_account is not None and account != store_account:
+            return False
+        return True
+
+    def size(self) -> int:
+        return len(self._stores)
@@ -0,0 +1,227 @@
+
+
+from codecs import getincrementaldecoder
+from typing import Any, Callable, Iterable, Iterator, Optional
+import json
+import re
+
+# Large enough that a typical ExternalSecret arrives in one read, small enough that the buffer stays small
+STREAM_CHUNK_SIZE = 65536
+
+
+def stream_list(k8s_client, group: str, version: str, plural: str, transform: Callable[[dict], Any], **list_options) -> tuple[list, Optional[str]]:
+    '''
+    List every object of a custom resource plural, decoding the response with a StreamingListDecoder as it is read
+    instead of letting the kubernetes client decode all of it at once
+
+    @param k8s_client: A CustomObjectsApi
+    @param transform: Called with each listed object. Only what it returns is kept
+    @param list_options: Passed on to list_cluster_custom_object. ie: resource_version
+    @return tuple[list, Optional[str]]: The transformed objects and the list's resourceVersion
+    '''
+    # Without preloading, the client hands back the raw urllib3 response. Error statuses still raise an ApiException
+    response = k8s_client.list_cluster_custom_object(
+        group=group,
+        version=version,
+        plural=plural,
+        _preload_content=False,
+        **list_options
+    )
+    try:
+        decoder = StreamingListDecoder(transform)
+        items = list(decoder.decode(response.stream(STREAM_CHUNK_SIZE)))
+    finally:
+        response.release_conn()
+
+    return items, decoder.resource_version
+
+
+class StreamingListDecoder():
+    '''
+    Decodes a Kubernetes list response ({"metadata": {...}, "items": [...]}) one item at a time as its body streams in,
+    rather than reading the whole body and decoding it into one large nested dict first. Each item is handed to the
+    transform as soon as it has been decoded, and only what the transform returns is kept, so the memory used while
+    listing is the current read buffer and a single item on top of whatever is kept.
+
+    The top level keys can be in any order. The list's metadata.resourceVersion is available from resource_version
+    once decode has finished.
+
+    @param transform: Called with each decoded item. ie: compact_object
+    '''
+
+    WHITESPACE = " \t\n\r"
+    # What changes how deeply nested a value is, outside of strings, and what can end a string, inside of them
+    STRUCTURE = re.compile(r'[{}\[\]"]')
+    STRING_END = re.compile(r'["\\]')
+
+    def __init__(self, transform: Callable[[dict], Any]):
+        self.transform = transform
+        self.resource_version: Optional[str] = None
+
+        self._decoder = json.JSONDecoder()
+        self._chunks: Iterator[bytes] = iter(())
+        self._text_decoder = getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._position = 0
+        self._exhausted = False
+
+    def decode(self, chunks: Iterable[bytes]) -> Iterator[Any]:
+        '''
+        Decode a list response body
+
+        @param chunks: The body, in chunks of any size. ie: urllib3's HTTPResponse.stream()
+        @return Iterator[Any]: The transformed items, in the order they appear in the list
+        @raise ValueError: The body isn't a JSON object, or ends part way through
+        '''
+        self._chunks = iter(chunks)
+        self._text_decoder.reset()
+        self._buffer = ""
+        self._position = 0
+        self._exhausted = False
+        self.resource_version = None
+
+        self._expect("{")
+        while True:
+            if self._peek() == "}":
+                self._position += 1
+                return
+
+            key = self._next_value()
+            self._expect(":")
+            if key == "items" and self._peek() == "[":
+                yield from self._decode_items()
+            else:
+                value = self._next_value()
+                if key == "metadata" and isinstance(value, dict):
+                    self.resource_version = value.get("resourceVersion")
+
+            self._separator("}")
+
+    def _decode_items(self) -> Iterator[Any]:
+        self._expect("[")
+        while True:
+            if self._peek() == "]":
+                self._position += 1
+                return
+
+            yield self.transform(self._next_value())
+
+            self._separator("]")
+
+    def _read(self) -> bool:
+        # Drop everything already decoded and append the next chunk. False once the body has all been read
+        if self._exhausted:
+            return False
+
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self._exhausted = True
+            text = self._text_decoder.decode(b"", final=True)
+        else:
+            text = self._text_decoder.decode(chunk)
+
+        self._buffer = self._buffer[self._position:] + text
+        self._position = 0
+        return True
+
+    def _peek(self) -> str:
+        # Next character that isn't whitespace, without consuming it
+        while True:
+            while self._position < len(self._buffer) and self._buffer[self._position] in self.WHITESPACE:
+                self._position += 1
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+            if not self._read():
+                raise ValueError("List Response Ended Unexpectedly")
+
+    def _expect(self, character: str):
+        found = self._peek()
+        if found != character:
+            raise ValueError(f"Expected '{character}' In List Response But Found '{found}'")
+        self._position += 1
+
+    def _separator(self, closing: str):
+        # Values are followed by either a comma or the end of what they are in, which is left for the caller
+        found = self._peek()
+        if found == ",":
+            self._position += 1
+        elif found != closing:
+            raise ValueError(f"Expected ',' Or '{closing}' In List Response But Found '{found}'")
+
+    def _next_value(self) -> Any:
+        # A value that fails to decode may just not have been fully read yet, so read until it has been, then decode it
+        # again. A value is only complete once something follows it, otherwise a number like 12 could be the start of 123
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._position)
+            except json.JSONDecodeError:
+                if not self._read_value():
+                    raise
+                continue
+
+            while end < len(self._buffer) and self._buffer[end] in self.WHITESPACE:
+                end += 1
+            if end < len(self._buffer) or self._exhausted:
+                self._position = end
+                return value
+            if not self._read():
+                self._position = end
+                return value
+
+    def _read_value(self) -> bool:
+        '''
+        Read until the object, array or string at the current position has been read to its end, or the body ends.
+        Scanning picks up from where it got to after each read, so a value spread over many chunks is scanned once
+        and decoded once, rather than decoded from its start again after every chunk
+
+        @return bool: Whether anything more was read. False means the value failed to decode for some other reason
+        '''
+        if self._buffer[self._position] not in '{["':
+            # Numbers, true, false and null are short, so just read on and decode again
+            return self._read()
+
+        scan = self._position
+        depth = 0
+        in_string = False
+        read_any = False
+        while True:
+            while True:
+                if in_string:
+                    match = self.STRING_END.search(self._buffer, scan)
+                    if match is None:
+                        scan = len(self._buffer)
+                        break
+                    if match.group() == "\\":
+                        if match.end() >= len(self._buffer):
+                            # What it escapes hasn't been read yet, so scan from the backslash again after the next read
+                            scan = match.start()
+                            break
+                        scan = match.end() + 1
+                        continue
+                    in_string = False
+                    scan = match.end()
+                    if depth == 0:
+                        return read_any
+                else:
+                    match = self.STRUCTURE.search(self._buffer, scan)
+                    if match is None:
+                        scan = len(self._buffer)
+                        break
+                    scan = match.end()
+                    character = match.group()
+                    if character == '"':
+                        in_string = True
+                    elif character in "{[":
+                        depth += 1
+                    else:
+                        depth -= 1
+                        if depth == 0:
+                            return read_any
+
+            # Reading drops what has already been decoded from the buffer, moving where the value starts
+            offset = scan - self._position
+            if not self._read():
+                return read_any
+            read_any = True
+            scan = self._position + offset
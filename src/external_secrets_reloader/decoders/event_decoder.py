@@ -0,0 +1,57 @@
+
+
+from typing import Callable, Optional, Union
+
+
+class EventDecoder():
+    '''
+    Pulls the changed key out of one type of EventBridge event. Field paths are split up front, so decoding is only a
+    walk down the already parsed event
+
+    @param source: The EventBridge source the decoder handles. ie: aws.ssm
+    @param detail_type: The EventBridge detail-type the decoder handles. ie: Parameter Store Change
+    @param key_paths: Dotted paths to the key within the event. The first one present is used. A path can be given as
+        (path, normalize) to convert values found there with its own function instead of normalize
+    @param normalize: Optional function to convert the extracted value into the key ExternalSecrets reference
+    @param operation_path: Optional dotted path to the operation that changed the key. ie: Update
+    '''
+
+    def __init__(self, source: str, detail_type: str, key_paths: list[Union[str, tuple[str, Callable[[str], str]]]], normalize: Optional[Callable[[str], str]] = None, operation_path: Optional[str] = None):
+        self.source = source
+        self.detail_type = detail_type
+        self.normalize = normalize
+        # (path, normalize) for each key path
+        self.key_paths = [
+            (tuple(path[0].split(".")), path[1]) if isinstance(path, tuple) else (tuple(path.split(".")), normalize)
+            for path in key_paths
+        ]
+        self.operation_path = tuple(operation_path.split(".")) if operation_path else None
+
+    @staticmethod
+    def _extract(entry: dict, path: tuple[str, ...]) -> Optional[str]:
+        value = entry
+        for field in path:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(field)
+
+        return value if isinstance(value, str) and value else None
+
+    def decode(self, entry: dict) -> Optional[str]:
+        '''
+        @return Optional[str]: The key, or None if the event contains none of the key paths
+        '''
+        for path, normalize in self.key_paths:
+            value = self._extract(entry, path)
+            if value is not None:
+                return normalize(value) if normalize is not None else value
+
+        return None
+
+    def decode_operation(self, entry: dict) -> Optional[str]:
+        '''
+        @return Optional[str]: The operation, or None if the decoder has no operation path or the event doesn't have it
+        '''
+        if self.operation_path is None:
+            return None
+        return self._extract(entry, self.operation_path)
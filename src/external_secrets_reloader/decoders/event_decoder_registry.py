@@ -0,0 +1,112 @@
+
+
+from external_secrets_reloader.decoders.event_decoder import EventDecoder
+from external_secrets_reloader.metrics.metrics import METRICS
+
+from typing import Optional
+import logging
+import re
+
+# ie: arn:aws:secretsmanager:us-east-1:123456789012:secret:my/secret-AbCdEf
+_SECRETS_MANAGER_ARN = re.compile(r"^arn:aws[a-z-]*:secretsmanager:[^:]*:[^:]*:secret:(.+)$")
+# Secrets Manager appends a dash and 6 random characters to the name in a secret's full ARN, which ExternalSecrets
+# don't include when referencing the secret by name
+_RANDOM_SUFFIX = re.compile(r"-[A-Za-z0-9]{6}$")
+
+
+def secrets_manager_arn_to_name(secret_id: str) -> str:
+    '''
+    Convert a Secrets Manager secret ID into the secret's name. The ID may be a name, which is returned as is, or a
+    partial ARN, which is the name with an ARN prefix. A partial ARN can't be told apart from a full one by looking
+    at it, as names may end in a dash and 6 characters themselves, so the random suffix is left alone. Use
+    secrets_manager_full_arn_to_name for ARNs known to be full
+    '''
+    match = _SECRETS_MANAGER_ARN.match(secret_id)
+    return match.group(1) if match else secret_id
+
+
+def secrets_manager_full_arn_to_name(arn: str) -> str:
+    '''
+    Convert a full Secrets Manager secret ARN, as AWS reports it, into the secret's name by also removing the random
+    suffix. Anything that isn't an ARN is returned as is
+    '''
+    match = _SECRETS_MANAGER_ARN.match(arn)
+    return _RANDOM_SUFFIX.sub("", match.group(1)) if match else arn
+
+
+class EventDecoderRegistry():
+    '''
+    Finds the EventDecoder for an EventBridge event by its source and detail-type, with a single dict lookup. Events
+    without a registered decoder are not something we can reload from, and are dropped
+    '''
+
+    EVENTS_DROPPED = METRICS.counter(
+        "esr_events_dropped_total",
+        "Events dropped without reloading anything, by reason"
+    )
+
+    def __init__(self):
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self._decoders: dict[tuple[str, str], EventDecoder] = dict()
+
+    def register(self, decoder: EventDecoder):
+        self._decoders[(decoder.source, decoder.detail_type)] = decoder
+
+    def get_decoder(self, source: Optional[str], detail_type: Optional[str]) -> Optional[EventDecoder]:
+        return self._decoders.get((source, detail_type))
+
+    def decode(self, entry: dict) -> Optional[str]:
+        '''
+        Find the key changed by the event
+
+        @param entry: The parsed EventBridge event
+        @return Optional[str]: The key, or None if the event is of an unknown type or has no key
+        '''
+        decoder = self._decoders.get((entry.get("source"), entry.get("detail-type")))
+        if decoder is None:
+            self._logger.debug("No Decoder Registered For Source %s And Detail Type %s. Dropping Event", entry.get("source"), entry.get("detail-type"))
+            self.EVENTS_DROPPED.inc(reason="unknown_event_type")
+            return None
+
+        key = decoder.decode(entry)
+        if key is None:
+            self._logger.warning("Event From Source %s And Detail Type %s Has No Key. Dropping Event", decoder.source, decoder.detail_type)
+            self.EVENTS_DROPPED.inc(reason="missing_key")
+        return key
+
+    def decode_operation(self, entry: dict) -> Optional[str]:
+        '''
+        Find the operation that changed the key. ie: Update for Parameter Store or PutSecretValue for Secrets Manager
+
+        @param entry: The parsed EventBridge event
+        @return Optional[str]: The operation, or None if the event is of an unknown type or doesn't say
+        '''
+        decoder = self._decoders.get((entry.get("source"), entry.get("detail-type")))
+        return decoder.decode_operation(entry) if decoder is not None else None
+
+
+def create_default_registry() -> EventDecoderRegistry:
+    '''
+    Registry of the AWS events ESR understands out of the box
+    '''
+    registry = EventDecoderRegistry()
+
+    # Parameter Store publishes its own change events, with the parameter name as detail.name
+    registry.register(EventDecoder("aws.ssm", "Parameter Store Change", ["detail.name"], operation_path="detail.operation"))
+
+    # Secrets Manager changes only arrive as CloudTrail API call events. The response of a successful call has the
+    # secret's full ARN. Otherwise most calls identify the secret by secretId, which may be a name or a partial or
+    # full ARN. CreateSecret has no secretId yet, only the name
+    registry.register(EventDecoder(
+        "aws.secretsmanager",
+        "AWS API Call via CloudTrail",
+        [("detail.responseElements.arn", secrets_manager_full_arn_to_name), "detail.requestParameters.secretId", "detail.requestParameters.name"],
+        secrets_manager_arn_to_name,
+        operation_path="detail.eventName"
+    ))
+
+    return registry
+
+
+# Shared registry used by EventBridgeEntry unless another is given
+DECODERS = create_default_registry()
@@ -1,17 +1,21 @@
 
 
+from datetime import datetime
 import json
 import logging
 
+from external_secrets_reloader.decoders.event_decoder_registry import DECODERS, EventDecoderRegistry
 from external_secrets_reloader.parsers.eso_key_parser import ESOKeyParser
 
 class EventBridgeEntry(ESOKeyParser):
 
-    def __init__(self, event_bridge_entry:str):
+    def __init__(self, event_bridge_entry: str | dict, decoders: EventDecoderRegistry = DECODERS):
         self._logger = logging.getLogger(self.__class__.__name__)
 
         self.raw_entry = event_bridge_entry
-        self.entry = json.loads(event_bridge_entry)
+        # Events that arrive already parsed (ie. the JSON body of a push) are used as is
+        self.entry = event_bridge_entry if isinstance(event_bridge_entry, dict) else json.loads(event_bridge_entry)
+        self.decoders = decoders
 
     def get_resources(self) -> list:
         return self.entry["resources"]
@@ -22,5 +26,66 @@ class EventBridgeEntry(ESOKeyParser):
     def get_operation(self) -> str:
         return self.entry["detail"]["operation"]
     
-    def get_key(self):
-        return self.entry["detail"]["name"]
\ No newline at end of file
+    def get_source(self) -> str:
+        return self.entry["source"]
+
+    def get_detail_type(self) -> str:
+        return self.entry["detail-type"]
+
+    def get_key(self) -> str | None:
+        # Where the key is depends on the type of event. ie: Parameter Store change events vs Secrets Manager CloudTrail events
+        return self.decoders.decode(self.entry)
+
+    def get_event_operation(self) -> str | None:
+        return self.decoders.decode_operation(self.entry)
+
+    def get_version_stages(self) -> list[str]:
+        # Only Secrets Manager CloudTrail events have stages. PutSecretValue lists them in versionStages, while
+        # UpdateSecretVersionStage moves a single versionStage onto moveToVersionId
+        detail = self.entry.get("detail")
+        request_parameters = detail.get("requestParameters") if isinstance(detail, dict) else None
+        if not isinstance(request_parameters, dict):
+            return []
+
+        stages = request_parameters.get("versionStages")
+        if isinstance(stages, list):
+            return [ stage for stage in stages if isinstance(stage, str) ]
+
+        stage = request_parameters.get("versionStage")
+        if isinstance(stage, str) and request_parameters.get("moveToVersionId"):
+            return [stage]
+        return []
+
+    def get_time(self) -> datetime:
+        # EventBridge times are RFC3339 UTC timestamps. ie: 2023-11-23T18:00:00Z
+        return datetime.fromisoformat(self.entry["time"])
+
+    def _get_resource_arn(self) -> list[str] | None:
+        # ie: arn:aws:ssm:us-east-1:123456789012:parameter/my/param -> [arn, aws, ssm, us-east-1, 123456789012, parameter/my/param]
+        for resource in self.entry.get("resources") or []:
+            if isinstance(resource, str):
+                parts = resource.split(":", 5)
+                if len(parts) == 6 and parts[0] == "arn":
+                    return parts
+        return None
+
+    def get_region(self) -> str | None:
+        # The changed resource's ARN is the most accurate. CloudTrail events often have no resources, but are always
+        # delivered in the region the call was made in
+        arn = self._get_resource_arn()
+        if arn is not None and arn[3]:
+            return arn[3]
+        return self.entry.get("region")
+
+    def get_account(self) -> str | None:
+        arn = self._get_resource_arn()
+        if arn is not None and arn[4]:
+            return arn[4]
+        return self.entry.get("account")
+
+    def get_event_time(self) -> datetime | None:
+        try:
+            return self.get_time()
+        except (KeyError, TypeError, ValueError):
+            self._logger.debug("EventBridge Entry Has No Valid Time Field")
+            return None
\ No newline at end of file
@@ -1,3 +1,4 @@
+from typing import Optional
 import logging
 
 class SQSEntry():
@@ -8,4 +9,8 @@ class SQSEntry():
         self.entry = sqs_entry
 
     def get_message_body(self) -> str:
-        return self.entry['Body']
\ No newline at end of file
+        return self.entry['Body']
+
+    def get_message_group_id(self) -> Optional[str]:
+        # Only set for messages from FIFO queues, and only when requested in the receive
+        return self.entry.get('Attributes', {}).get('MessageGroupId')
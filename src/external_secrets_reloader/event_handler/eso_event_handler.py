@@ -1,54 +1,409 @@
 
 
+from external_secrets_reloader.filters.operation_filter import OperationFilter
+from external_secrets_reloader.health_check.freshness_monitor import FreshnessMonitor
+from external_secrets_reloader.filters.rotation_tracker import RotationTracker
+from external_secrets_reloader.metrics.metrics import METRICS
 from external_secrets_reloader.parsers.eso_key_parser import ESOKeyParser
 from external_secrets_reloader.processors.processor import Processor
+from datetime import datetime
 import logging
 import time
 import random
 
+from external_secrets_reloader.reloader.circuit_breaker import CircuitBreaker
 from external_secrets_reloader.reloader.reloader import Reloader
+from external_secrets_reloader.scaling.lane_scheduler import LaneScheduler
+from external_secrets_reloader.status.pipeline_status import PIPELINE_STATUS
+from external_secrets_reloader.tracing.tracer import TRACER
+from contextvars import Context
+from typing import Callable, Optional
+
+
+class ReceivedEvent():
+    '''
+    An event received along with others, waiting for them all to be reloaded together
+    '''
+
+    __slots__ = ("key", "event_time", "region", "account", "operation", "resolve", "redeliver", "context", "token")
+
+    def __init__(self, key: str, event_time: Optional[datetime], region: Optional[str], account: Optional[str], operation: Optional[str], resolve: Callable[[], None], redeliver: Callable[[], None], context: Context, token: int):
+        self.key = key
+        self.event_time = event_time
+        self.region = region
+        self.account = account
+        self.operation = operation
+        self.resolve = resolve
+        self.redeliver = redeliver
+        # Holds the event's trace
+        self.context = context
+        # PIPELINE_STATUS in flight token
+        self.token = token
+
 
 class ESOEventHandler():
 
-    def __init__(self, processor: Processor[ESOKeyParser], reloader: Reloader):
+    EVENTS_PROCESSED = METRICS.counter(
+        "esr_events_processed_total",
+        "Events received and handled, whether the reload succeeded or not"
+    )
+    RELOADS_FAILED = METRICS.counter(
+        "esr_reloads_failed_total",
+        "Events whose reload still failed after all retry attempts"
+    )
+    RELOADS_DEFERRED = METRICS.counter(
+        "esr_reloads_deferred_total",
+        "Events left unresolved for redelivery because their reload failed while the circuit breaker was open"
+    )
+
+    RECEIVE_LAG = METRICS.histogram(
+        "esr_event_receive_lag_seconds",
+        "Time from a change happening in AWS (the event's time) until its event was received",
+        buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 900.0)
+    )
+    RELOAD_LAG = METRICS.histogram(
+        "esr_event_reload_lag_seconds",
+        "Time from a change happening in AWS (the event's time) until the ExternalSecrets using it were patched",
+        buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 900.0)
+    )
+
+    # How much longer than the rotation hold a held event is kept from being redelivered, to allow for reloading it
+    HOLD_VISIBILITY_MARGIN_SECONDS = 60
+
+    # How long to wait before checking the circuit breaker again while it is open
+    CIRCUIT_OPEN_WAIT_SECONDS = 1
+
+    def __init__(self, processor: Processor[ESOKeyParser], reloader: Reloader, operation_filter: Optional[OperationFilter] = None, rotation_tracker: Optional[RotationTracker] = None, lane_scheduler: Optional[LaneScheduler] = None, circuit_breaker: Optional[CircuitBreaker] = None, freshness_monitor: Optional[FreshnessMonitor] = None):
         self.processor = processor
         self.reloader = reloader
+        self.operation_filter = operation_filter
+        self.rotation_tracker = rotation_tracker
+        self.lane_scheduler = lane_scheduler
+        self.circuit_breaker = circuit_breaker
+        self.freshness_monitor = freshness_monitor
         self._logger = logging.getLogger(self.__class__.__name__)
 
+        # When the reloader sends patches after reload returns (ie. coalescing), a reload succeeding only means they
+        # were scheduled. The circuit breaker and reload lag are then fed by the patches as they go out instead.
+        # Handlers sharing a reloader share its circuit breaker and freshness monitor, so any of them can record them
+        self._patches_deferred = reloader.report_patch_results(self._record_patch_result)
+
     def poll_for_events(self):
         '''
         Check for new events. If there are any, process them. If not return
         '''
 
-        if self.processor.load_next_entry():
-            
-            entry = self.processor.get_entry()
-            key = entry.get_key()
+        if self.circuit_breaker is not None and not self.circuit_breaker.allow_request():
+            # The API server is unreachable, so events are left on the queue until it is back rather than received
+            # only to fail
+            time.sleep(self.CIRCUIT_OPEN_WAIT_SECONDS)
+            return
+
+        self._handle_next_entry()
+
+        if self.rotation_tracker is not None:
+            for pending in self.rotation_tracker.pop_expired():
+                self._reload_held(pending)
+            self._resolve_held(self.rotation_tracker.pop_completed())
+
+    def _reload_held(self, pending):
+        '''
+        Reload a held rotation, then resolve the events held for it
+        '''
+        held = self.rotation_tracker.take_held(pending.key)
+        if not self._reload_with_backoff(pending.key, pending.event_time, pending.region, pending.account) and self._is_deferring():
+            # Left unresolved, so they are delivered again once their hold runs out
+            return
+        self._resolve_held(held)
+
+    def _resolve_held(self, resolvers):
+        for resolve in resolvers:
+            try:
+                resolve()
+            except Exception as e:
+                self._logger.error("Exception Thrown Resolving A Held Event", exc_info=e)
+
+    def _handle_next_entry(self) -> bool:
+        '''
+        @return bool: Whether there was an entry to handle
+        '''
+        if not self.processor.load_next_entry():
+            return False
+
+        if self.lane_scheduler is None and self.processor.received_count() > 0:
+            # Received along with more entries. Lanes reload each on its own, otherwise they are all reloaded together
+            self._handle_batch()
+            return True
+
+        handed_to_lane = False
+        try:
+            handed_to_lane = self._handle_entry()
+        finally:
+            # The processor started a trace for this entry when it was loaded. It is complete once handled, unless
+            # a lane is now handling it, which ends the trace itself
+            if not handed_to_lane:
+                TRACER.end_trace()
+        return True
+
+    def stop(self):
+        '''
+        Stop receiving events, then handle those already received, finish those handed to lanes and reload anything
+        still being held, so no changes are lost on shutdown
+        '''
+        self.processor.stop()
+        while self._handle_next_entry():
+            pass
+
+        if self.lane_scheduler is not None:
+            self.lane_scheduler.stop()
+
+        if self.rotation_tracker is not None:
+            for pending in self.rotation_tracker.pop_all():
+                self._reload_held(pending)
+            self._resolve_held(self.rotation_tracker.pop_completed())
+
+    def _reload(self, key: str, event_time, region, account, operation, attempt: int) -> bool:
+        with TRACER.span("reloader.reload", key=key, attempt=attempt):
+            return self.reloader.reload(key, event_time=event_time, region=region, account=account, operation=operation)
+
+    def _accept_entry(self) -> Optional[tuple]:
+        '''
+        Drop, or hold, the current entry if it doesn't need reloading yet
+
+        @return Optional[tuple]: (key, event_time, region, account, operation) to reload, or None if already handled
+        '''
+        entry = self.processor.get_entry()
+        key = entry.get_key()
+        if key is None:
+            # Not an event we can reload from. Acknowledge it so it isn't delivered again
+            self._logger.debug("Event Has No Key To Reload. Dropping It")
+            self.processor.mark_entry_resolved()
+            return None
+
+        if self.operation_filter is not None and not self.operation_filter.allows(entry):
+            self.processor.mark_entry_resolved()
+            return None
+
+        event_time = entry.get_event_time()
+        if event_time is not None:
+            self.RECEIVE_LAG.observe(self._lag_since(event_time))
+        region = entry.get_region()
+        account = entry.get_account()
+        operation = entry.get_event_operation()
+
+        # Events part of an in progress Secrets Manager rotation are held, and reloaded once when it completes
+        if self.rotation_tracker is not None and not self.rotation_tracker.observe(key, operation, entry.get_version_stages(), event_time, region, account):
+            # Left unresolved until the rotation is reloaded, so the change isn't lost if we stop before then
+            resolve = self.processor.hold_entry(self.rotation_tracker.timeout_seconds + self.HOLD_VISIBILITY_MARGIN_SECONDS)
+            if resolve is None:
+                self.processor.mark_entry_resolved()
+            else:
+                self.rotation_tracker.hold(key, resolve)
+            return None
 
-            # This key can now be searched for in kubernetes ExternalSecrets
-            self._logger.info(f"{key} Key Changed. Searching For Matching ExternalSecrets")
-            
-            # Backoff Retry A Bit if the reload fails
-            count = 0
-            backoff_factor = 2.0
-            initial_delay = 1
-            max_attempts = 3
-            while not self.reloader.reload(key):
-                count += 1
-                self._logger.error(f"Reloading Appears To Have Failed. This Is BackOff Attempt {count}/{max_attempts}. We Will Abort After {max_attempts} Attempts")
+        return key, event_time, region, account, operation
 
-                base_delay = initial_delay * (backoff_factor ** count)
-                jitter = random.uniform(0, base_delay)
-                sleep_time = base_delay + jitter
+    def _handle_entry(self) -> bool:
+        '''
+        @return bool: True if the entry was handed to a lane to reload and resolve
+        '''
+        accepted = self._accept_entry()
+        if accepted is None:
+            return False
+        key, event_time, region, account, operation = accepted
 
-                self._logger.info(f"Will ReAttempt Reload In {sleep_time:.2f} Seconds")
-                time.sleep(sleep_time)
+        if self.lane_scheduler is not None:
+            # Events for the same FIFO message group, or otherwise the same key, are reloaded one at a time in the
+            # order they were received. The lane resolves the entry once done, as this processor will have moved on
+            lane_key = self.processor.get_entry_group() or key
+            resolve = self.processor.detach_entry_resolver()
+            redeliver = self.processor.detach_entry_redeliverer()
+            context = TRACER.detach_trace()
+            # In flight from now, including the time spent waiting for its lane
+            token = PIPELINE_STATUS.begin(key, event_time)
+            self.lane_scheduler.submit(lane_key, lambda: context.run(self._reload_detached, key, event_time, region, account, operation, resolve, redeliver, token))
+            return True
 
-                if count >= max_attempts:
-                    self._logger.error(f"Reloading Key {key} Failed. Aborting And Moving On")
-                    break
+        token = PIPELINE_STATUS.begin(key, event_time)
+        try:
+            if not self._reload_with_backoff(key, event_time, region, account, operation) and self._is_deferring():
+                self.processor.detach_entry_redeliverer()()
+                return False
 
             # If successful OR backoff retries runout, mark the entry resolved so that it is removed from being attempted
             self.processor.mark_entry_resolved()
+            self.EVENTS_PROCESSED.inc()
+            return False
+        finally:
+            PIPELINE_STATUS.end(token)
+
+    def _handle_batch(self):
+        '''
+        Reload the current entry along with every entry received with it, from a single reload_many. Each entry is
+        resolved once its own key has reloaded. Keys that failed are then retried one at a time, with the usual backoff
+        '''
+        batch = []
+        while True:
+            accepted = None
+            try:
+                accepted = self._accept_entry()
+            finally:
+                if accepted is None:
+                    TRACER.end_trace()
+
+            if accepted is not None:
+                key, event_time, region, account, operation = accepted
+                resolve = self.processor.detach_entry_resolver()
+                redeliver = self.processor.detach_entry_redeliverer()
+                # In flight from now, including the time spent waiting for the rest of the batch
+                token = PIPELINE_STATUS.begin(key, event_time)
+                batch.append(ReceivedEvent(key, event_time, region, account, operation, resolve, redeliver, TRACER.detach_trace(), token))
+
+            if self.processor.received_count() == 0 or not self.processor.load_next_entry():
+                break
+
+        if batch:
+            self._reload_batch(batch)
+
+    def _reload_batch(self, batch: list[ReceivedEvent]):
+        # Events for the same key in the same place share its reload. Those for the same key elsewhere (ie. a
+        # same-named parameter in another region) are reloaded on their own
+        event_times, locations, operations = dict(), dict(), dict()
+        batched, alone = [], []
+        for event in batch:
+            if event.key not in locations:
+                event_times[event.key] = event.event_time
+                locations[event.key] = (event.region, event.account)
+                operations[event.key] = event.operation
+            elif locations[event.key] != (event.region, event.account):
+                alone.append(event)
+                continue
+            else:
+                # Only redundant once synced since the newest change. Changes without a time always need a reload
+                previous = event_times[event.key]
+                event_times[event.key] = None if previous is None or event.event_time is None else max(previous, event.event_time)
+                if operations[event.key] != event.operation:
+                    operations[event.key] = None
+            batched.append(event)
+
+        self._logger.info("%d Keys Changed. Searching For Matching ExternalSecrets", len(locations))
+        start = time.monotonic()
+        # Traced as part of the first event's trace
+        outcomes = batch[0].context.run(self._reload_many, event_times, locations, operations)
+        duration = time.monotonic() - start
+
+        for event in batched:
+            if outcomes.get(event.key, False):
+                event.context.run(self._resolve_detached, event, duration)
+            else:
+                alone.append(event)
+
+        for event in alone:
+            event.context.run(self._reload_detached, event.key, event.event_time, event.region, event.account, event.operation, event.resolve, event.redeliver, event.token)
+
+    def _reload_many(self, event_times, locations, operations) -> dict[str, bool]:
+        with TRACER.span("reloader.reload_many", keys=len(locations)):
+            try:
+                return self.reloader.reload_many(list(locations), event_times, locations, operations)
+            except Exception as e:
+                # Each key is then retried on its own
+                self._logger.error("Exception Thrown Reloading %d Keys Together", len(locations), exc_info=e)
+                return { key: False for key in locations }
+
+    def _resolve_detached(self, event: ReceivedEvent, duration_seconds: float):
+        try:
+            if not self._patches_deferred:
+                self._record_patch_result(True, event.event_time)
+            PIPELINE_STATUS.record_reload(event.key, "succeeded", duration_seconds, 1)
+            event.resolve()
+            self.EVENTS_PROCESSED.inc()
+        finally:
+            PIPELINE_STATUS.end(event.token)
+            TRACER.end_trace()
 
+    def _reload_detached(self, key: str, event_time, region, account, operation, resolve, redeliver, token: int):
+        try:
+            if not self._reload_with_backoff(key, event_time, region, account, operation) and self._is_deferring():
+                redeliver()
+                return
+            resolve()
+            self.EVENTS_PROCESSED.inc()
+        finally:
+            PIPELINE_STATUS.end(token)
+            TRACER.end_trace()
+
+    def _is_deferring(self) -> bool:
+        # A reload that failed because the API server is down is left unresolved, and handed back to the processor
+        # to deliver again, so it is reloaded once the API server is back instead of being lost
+        if self.circuit_breaker is None or not self.circuit_breaker.is_open():
+            return False
+
+        self._logger.warning("Circuit Breaker Is Open. Leaving Event To Be Redelivered")
+        self.RELOADS_DEFERRED.inc()
+        return True
+
+    @staticmethod
+    def _lag_since(event_time: datetime) -> float:
+        # Event times are only to the second, and clocks can be a little apart, which shouldn't show as negative lag
+        return max(time.time() - event_time.timestamp(), 0)
+
+    def _reload_with_backoff(self, key: str, event_time, region, account, operation=None) -> bool:
+        '''
+        @return bool: Whether the reload succeeded
+        '''
+        # This key can now be searched for in kubernetes ExternalSecrets
+        self._logger.info("%s Key Changed. Searching For Matching ExternalSecrets", key)
+        
+        start = time.monotonic()
+
+        # Backoff Retry A Bit if the reload fails
+        count = 0
+        backoff_factor = 2.0
+        initial_delay = 1
+        max_attempts = 3
+        while not self._reload(key, event_time, region, account, operation, count + 1):
+            count += 1
+
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.record_failure()
+                if self.circuit_breaker.is_open():
+                    # No point waiting to retry until the API server is reachable again
+                    self._logger.error("Reloading Key %s Failed And The Circuit Breaker Is Open. Not Retrying", key)
+                    PIPELINE_STATUS.record_reload(key, "circuit_open", time.monotonic() - start, count)
+                    return False
+
+            self._logger.error("Reloading Appears To Have Failed. This Is BackOff Attempt %d/%d. We Will Abort After %d Attempts", count, max_attempts, max_attempts)
+
+            base_delay = initial_delay * (backoff_factor ** count)
+            jitter = random.uniform(0, base_delay)
+            sleep_time = base_delay + jitter
+
+            self._logger.info("Will ReAttempt Reload In %.2f Seconds", sleep_time)
+            time.sleep(sleep_time)
+
+            if count >= max_attempts:
+                self._logger.error("Reloading Key %s Failed. Aborting And Moving On", key)
+                self.RELOADS_FAILED.inc()
+                PIPELINE_STATUS.record_reload(key, "failed", time.monotonic() - start, count)
+                return False
+
+        if not self._patches_deferred:
+            self._record_patch_result(True, event_time)
+        PIPELINE_STATUS.record_reload(key, "succeeded", time.monotonic() - start, count + 1)
+        return True
+
+    def _record_patch_result(self, patched: bool, event_time: Optional[datetime]):
+        '''
+        Record whether the ExternalSecrets for a change were patched, and how long after the change that was
+        '''
+        if self.circuit_breaker is not None:
+            if patched:
+                self.circuit_breaker.record_success()
+            else:
+                self.circuit_breaker.record_failure()
+        if patched and event_time is not None:
+            lag = self._lag_since(event_time)
+            self.RELOAD_LAG.observe(lag)
+            if self.freshness_monitor is not None:
+                self.freshness_monitor.observe(lag)
 
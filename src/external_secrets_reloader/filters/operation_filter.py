@@ -0,0 +1,42 @@
+
+
+from external_secrets_reloader.metrics.metrics import METRICS
+from external_secrets_reloader.parsers.eso_key_parser import ESOKeyParser
+
+from typing import Iterable
+import logging
+
+
+class OperationFilter():
+    '''
+    Drops events for operations that don't change the value an ExternalSecret sees, before any Kubernetes calls are made
+    for them. ie: deleting a parameter, or labelling an existing version of it. Events that don't say what operation
+    they are for are always let through
+
+    @param allowed_operations: Operations worth reloading for. ie: Update for Parameter Store or PutSecretValue for
+        Secrets Manager
+    '''
+
+    # Used when no operations are configured, by EVENT_SERVICE
+    DEFAULT_OPERATIONS = {
+        "ParameterStore": ("Create", "Update", "LabelParameterVersion"),
+        "SecretsManager": ("CreateSecret", "PutSecretValue", "UpdateSecret", "UpdateSecretVersionStage", "RotateSecret", "RestoreSecret"),
+    }
+
+    EVENTS_DROPPED = METRICS.counter(
+        "esr_events_dropped_total",
+        "Events dropped without reloading anything, by reason"
+    )
+
+    def __init__(self, allowed_operations: Iterable[str]):
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self.allowed_operations = frozenset(allowed_operations)
+
+    def allows(self, entry: ESOKeyParser) -> bool:
+        operation = entry.get_event_operation()
+        if operation is None or operation in self.allowed_operations:
+            return True
+
+        self._logger.debug("Dropping Event For Operation %s. Only %s Cause A Reload", operation, sorted(self.allowed_operations))
+        self.EVENTS_DROPPED.inc(reason="operation_not_allowed")
+        return False
@@ -0,0 +1,189 @@
+
+
+from external_secrets_reloader.metrics.metrics import METRICS
+
+from datetime import datetime
+from threading import Lock
+from typing import Callable, MutableMapping, Optional
+import logging
+import os
+import time
+
+
+class PendingRotation():
+    '''
+    A Secrets Manager rotation that has started but not yet moved AWSCURRENT to the new version
+    '''
+
+    __slots__ = ("key", "deadline", "event_time", "region", "account", "owner")
+
+    def __init__(self, key: str, deadline: float, event_time: Optional[datetime], region: Optional[str], account: Optional[str], owner: int):
+        self.key = key
+        self.deadline = deadline
+        self.event_time = event_time
+        self.region = region
+        self.account = account
+        # PID of the process the rotation started in
+        self.owner = owner
+
+
+class RotationTracker():
+    '''
+    Collapses the series of CloudTrail events a Secrets Manager rotation makes into a single reload. A rotation starts
+    with RotateSecret and puts the new value under the AWSPENDING stage, which ExternalSecrets don't read. Only once
+    UpdateSecretVersionStage moves AWSCURRENT to the new version has the value they see changed. Events for a secret are
+    held from the start of its rotation until then, and a single reload is made at that point.
+
+    If AWSCURRENT doesn't move within timeout_seconds (ie. the rotation Lambda failed), the held rotation is reloaded
+    anyway so no change is ever missed.
+
+    Held events can be left unresolved with hold, so they are redelivered if we stop before their rotation is
+    reloaded. They are handed back by take_held once the rotation is reloaded here, or by pop_completed once it has
+    completed somewhere else.
+
+    In multi-process mode every worker receives from the same queue, so a secret's events can reach any of them.
+    Workers then share one set of pending rotations (ie. a multiprocessing Manager dict and lock), so each secret is
+    tracked in one place whichever worker its events land on. Held events stay with the worker that received them
+
+    @param timeout_seconds: How long to hold a rotation waiting for AWSCURRENT to move
+    @param pending: Pending rotations by secret, if shared with other processes. Defaults to one for this process
+    @param lock: Lock guarding a shared pending. Required with it
+    '''
+
+    CURRENT_STAGE = "AWSCURRENT"
+    PENDING_STAGE = "AWSPENDING"
+
+    EVENTS_COLLAPSED = METRICS.counter(
+        "esr_rotation_events_collapsed_total",
+        "Secrets Manager rotation events held rather than reloaded, as they are part of an in progress rotation"
+    )
+    ROTATIONS_TIMED_OUT = METRICS.counter(
+        "esr_rotations_timed_out_total",
+        "Secrets Manager rotations reloaded because AWSCURRENT didn't move before the timeout"
+    )
+    ROTATIONS_PENDING = METRICS.gauge(
+        "esr_rotations_pending",
+        "Secrets Manager rotations in progress, waiting for AWSCURRENT to move"
+    )
+
+    def __init__(self, timeout_seconds: float, pending: Optional[MutableMapping[str, PendingRotation]] = None, lock = None):
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self.timeout_seconds = timeout_seconds
+
+        self._lock = lock if lock is not None else Lock()
+        self._pending: MutableMapping[str, PendingRotation] = pending if pending is not None else dict()
+
+        self._held_lock = Lock()
+        # Resolvers of the events held by this process, by secret
+        self._held: dict[str, list[Callable[[], None]]] = dict()
+
+    def _starts_rotation(self, operation: Optional[str], stages: list[str]) -> bool:
+        return operation == "RotateSecret" or (operation == "PutSecretValue" and self.PENDING_STAGE in stages)
+
+    def _moves_current(self, operation: Optional[str], stages: list[str]) -> bool:
+        return operation == "UpdateSecretVersionStage" and self.CURRENT_STAGE in stages
+
+    def observe(self, key: str, operation: Optional[str], stages: list[str], event_time: Optional[datetime] = None, region: Optional[str] = None, account: Optional[str] = None) -> bool:
+        '''
+        Record an event for a secret
+
+        @param key: The secret the event is for
+        @param operation: The CloudTrail eventName
+        @param stages: The version stages the event applies to
+        @return bool: True if the key should be reloaded now. False if it is held until its rotation completes
+        '''
+        with self._lock:
+            pending = self._pending.get(key)
+
+            if self._moves_current(operation, stages):
+                if pending is not None:
+                    del self._pending[key]
+                    self.ROTATIONS_PENDING.set(len(self._pending))
+                    self._logger.debug("Rotation Of %s Completed. Reloading Once", key)
+                return True
+
+            if pending is None and not self._starts_rotation(operation, stages):
+                # Not part of a rotation
+                return True
+
+            if pending is None:
+                self._logger.debug("Rotation Of %s Started. Holding Its Events Until %s Moves", key, self.CURRENT_STAGE)
+                self._pending[key] = PendingRotation(key, time.monotonic() + self.timeout_seconds, event_time, region, account, os.getpid())
+                self.ROTATIONS_PENDING.set(len(self._pending))
+            elif event_time is not None:
+                pending.event_time = event_time
+                # A shared pending hands out copies, so the change has to be written back
+                self._pending[key] = pending
+
+        self.EVENTS_COLLAPSED.inc()
+        return False
+
+    def hold(self, key: str, resolve: Callable[[], None]):
+        '''
+        Keep an event observe held unresolved until its rotation has been reloaded
+
+        @param resolve: Resolves the event
+        '''
+        with self._held_lock:
+            self._held.setdefault(key, []).append(resolve)
+
+    def take_held(self, key: str) -> list[Callable[[], None]]:
+        '''
+        Remove and return the resolvers of the events held for a secret, to call once its rotation has been reloaded
+        '''
+        with self._held_lock:
+            return self._held.pop(key, [])
+
+    def pop_completed(self) -> list[Callable[[], None]]:
+        '''
+        Remove and return the resolvers of held events whose rotation is no longer pending. ie: AWSCURRENT moved, and the
+        event saying so is being reloaded, here or by another worker
+        '''
+        with self._held_lock:
+            keys = list(self._held.keys())
+        if not keys:
+            return []
+
+        with self._lock:
+            completed = [ key for key in keys if key not in self._pending ]
+
+        resolvers = []
+        with self._held_lock:
+            for key in completed:
+                resolvers.extend(self._held.pop(key, []))
+        return resolvers
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def pop_expired(self) -> list[PendingRotation]:
+        '''
+        Remove and return the rotations that have been held for longer than the timeout
+        '''
+        now = time.monotonic()
+        with self._lock:
+            if not self._pending:
+                return []
+
+            # Including ones started by other workers, so a rotation isn't lost if the worker it started in has exited
+            expired = [ pending for pending in self._pending.values() if pending.deadline <= now ]
+            for pending in expired:
+                del self._pending[pending.key]
+                self._logger.warning("Rotation Of %s Did Not Move %s Within %s Seconds. Reloading Anyway", pending.key, self.CURRENT_STAGE, self.timeout_seconds)
+            self.ROTATIONS_PENDING.set(len(self._pending))
+
+        self.ROTATIONS_TIMED_OUT.inc(len(expired))
+        return expired
+
+    def pop_all(self) -> list[PendingRotation]:
+        '''
+        Remove and return every held rotation started in this process. Used on shutdown so held changes are reloaded
+        rather than lost. Other workers' rotations are left to them
+        '''
+        with self._lock:
+            pending = [ rotation for rotation in self._pending.values() if rotation.owner == os.getpid() ]
+            for rotation in pending:
+                del self._pending[rotation.key]
+            self.ROTATIONS_PENDING.set(len(self._pending))
+        return pending
@@ -0,0 +1,104 @@
+from external_secrets_reloader.health_check.health_status import HealthStatus
+from external_secrets_reloader.metrics.metrics import METRICS
+from external_secrets_reloader.status.pipeline_status import PIPELINE_STATUS, PipelineStatus
+
+from collections import deque
+from threading import Lock
+from typing import Optional
+import logging
+import statistics
+import time
+
+
+class FreshnessMonitor():
+    '''
+    Compares how long changes take to be reloaded, from when they happened in AWS, against a freshness SLO. The SLO is
+    breached while the median over the most recent WINDOW reloads, within the last WINDOW_SECONDS, is over it, or while
+    the oldest change still being reloaded has already waited longer than it. The median keeps a single slow event
+    (ie. one held for a rotation) from flipping the status on its own, while the oldest change in flight catches a
+    pipeline that has stalled and isn't completing any reloads to measure.
+
+    Evaluated against the clock whenever the health status or metrics are read, so a breach is reported without
+    waiting for the next reload, and clears once recent reloads age out of the window.
+
+    @param slo_seconds: Longest a change should take to be reloaded
+    @param health_status: Health status to mark degraded while the SLO is breached
+    @param pipeline_status: Where the changes in flight are tracked
+    '''
+
+    WINDOW = 20
+    WINDOW_SECONDS = 300
+
+    SLO_BREACHED = METRICS.gauge(
+        "esr_freshness_slo_breached",
+        "1 while changes are taking longer than the freshness SLO to reload, otherwise 0"
+    )
+
+    def __init__(self, slo_seconds: float, health_status: HealthStatus, pipeline_status: PipelineStatus = PIPELINE_STATUS):
+        self._logger = logging.getLogger(self.__class__.__name__)
+
+        self.slo_seconds = slo_seconds
+        self.pipeline_status = pipeline_status
+
+        self._lock = Lock()
+        # (monotonic time observed, lag seconds)
+        self._lags: deque = deque(maxlen=self.WINDOW)
+        self._breached = False
+
+        health_status.add_degraded_check(self.evaluate)
+
+    def observe(self, lag_seconds: float):
+        '''
+        Record the time from a change until its reload completed
+        '''
+        with self._lock:
+            self._lags.append((time.monotonic(), lag_seconds))
+        self.evaluate()
+
+    def _recent_median(self) -> Optional[float]:
+        # Called holding the lock
+        cutoff = time.monotonic() - self.WINDOW_SECONDS
+        while self._lags and self._lags[0][0] < cutoff:
+            self._lags.popleft()
+        return statistics.median(lag for _, lag in self._lags) if self._lags else None
+
+    def evaluate(self) -> Optional[str]:
+        '''
+        Check the SLO as of now, updating esr_freshness_slo_breached
+
+        @return Optional[str]: Why the SLO is breached, or None if it isn't
+        '''
+        oldest = self.pipeline_status.oldest_change_age()
+        with self._lock:
+            median = self._recent_median()
+            if oldest is not None and oldest > self.slo_seconds:
+                reason = f"Oldest change still being reloaded happened {oldest:.1f}s ago, over the {self.slo_seconds}s freshness SLO"
+            elif median is not None and median > self.slo_seconds:
+                reason = f"Median time from change to reload is {median:.1f}s, over the {self.slo_seconds}s freshness SLO"
+            else:
+                reason = None
+
+            breached = reason is not None
+            if breached == self._breached:
+                return reason
+            self._breached = breached
+            self.SLO_BREACHED.set(1 if breached else 0)
+
+        if breached:
+            self._logger.warning("Changes Are Taking Longer To Reload Than The %s Second Freshness SLO. %s", self.slo_seconds, reason)
+        else:
+            self._logger.info("Changes Are Reloading Within The %s Second Freshness SLO Again", self.slo_seconds)
+        return reason
+
+    def status(self) -> dict:
+        self.evaluate()
+        with self._lock:
+            median = self._recent_median()
+            breached = self._breached
+        oldest = self.pipeline_status.oldest_change_age()
+        return {
+            "slo_seconds": self.slo_seconds,
+            "median_lag_seconds": round(median, 3) if median is not None else None,
+            "oldest_in_flight_seconds": round(oldest, 3) if oldest is not None else None,
+            "breached": breached,
+        }
@@ -1,4 +1,5 @@
 from threading import Lock
+from typing import Callable, Optional
 
 class HealthStatus:
     
@@ -7,6 +8,8 @@ class HealthStatus:
         self._healthy = True
         self._ready = True
         self._error_message = None
+        self._degraded_reason = None
+        self._degraded_checks: list[Callable[[], Optional[str]]] = []
     
     def set_healthy(self, healthy: bool, error_message: str = None):
         """Set the health status."""
@@ -19,6 +22,16 @@ class HealthStatus:
         with self._lock:
             self._ready = ready
     
+    def set_degraded(self, reason: str = None):
+        """Mark the application as working but degraded, ie. falling behind. None clears it."""
+        with self._lock:
+            self._degraded_reason = reason
+
+    def add_degraded_check(self, check: Callable[[], Optional[str]]):
+        """Add a check run each time the degraded reason is read, returning why the application is degraded or None."""
+        with self._lock:
+            self._degraded_checks.append(check)
+
     def is_healthy(self) -> bool:
         """Check if application is healthy."""
         with self._lock:
@@ -32,4 +45,14 @@ class HealthStatus:
     def get_error_message(self) -> str:
         """Get the current error message."""
         with self._lock:
-            return self._error_message
\ No newline at end of file
+            return self._error_message
+
+    def get_degraded_reason(self) -> str:
+        """Get why the application is degraded, or None if it isn't."""
+        with self._lock:
+            reason = self._degraded_reason
+            checks = list(self._degraded_checks)
+        # Run outside the lock, as checks may take locks of their own
+        reasons = [ reason ] if reason is not None else []
+        reasons += [ check_reason for check_reason in (check() for check in checks) if check_reason is not None ]
+        return "; ".join(reasons) if reasons else None
@@ -1,20 +1,32 @@
 
 
 from external_secrets_reloader.health_check.health_status import HealthStatus
+from external_secrets_reloader.health_check.profiler import Profiler, ProfilerBusyError
+from external_secrets_reloader.metrics.metrics import METRICS
+from external_secrets_reloader.status.pipeline_status import PIPELINE_STATUS
 
 import logging
 from threading import Thread, Lock
-from flask import Flask, jsonify
-from typing import Optional
+from flask import Flask, Response, jsonify, request
+from typing import Callable, Optional
 
 class HealthStatusThread():
 
-    def __init__(self):
+    def __init__(self, profiling_enabled: bool = False, metrics_renderer: Optional[Callable[[], str]] = None, status_renderer: Optional[Callable[[], dict]] = None):
         self.health_status = HealthStatus()
         self.logger = logging.getLogger(self.__class__.__name__)
         self.thread: Optional[Thread] = None
         self.app: Optional[Flask] = None
 
+        # Profiling endpoints expose internals of the process, so are only served when explicitly enabled
+        self.profiling_enabled = profiling_enabled
+        self.profiler = Profiler()
+
+        # Renders the /metrics response. Replaced by the WorkerSupervisor to serve metrics from all workers
+        self.metrics_renderer = metrics_renderer or METRICS.render
+        # Renders the /status response. Likewise replaced by the WorkerSupervisor
+        self.status_renderer = status_renderer or PIPELINE_STATUS.snapshot
+
     def get_health_status(self) -> HealthStatus:
         return self.health_status
 
@@ -46,6 +58,10 @@ class HealthStatusThread():
         def health():
             """Liveness probe endpoint."""
             if self.health_status.is_healthy():
+                # Degraded still passes, as restarting wouldn't help us catch up
+                degraded_reason = self.health_status.get_degraded_reason()
+                if degraded_reason is not None:
+                    return jsonify({"status": "degraded", "reason": degraded_reason}), 200
                 return jsonify({"status": "healthy"}), 200
             else:
                 error_msg = self.health_status.get_error_message()
@@ -58,8 +74,69 @@ class HealthStatusThread():
                 return jsonify({"status": "ready"}), 200
             else:
                 return jsonify({"status": "not_ready"}), 503
+
+        @app.route('/metrics', methods=['GET'])
+        def metrics():
+            """Prometheus metrics endpoint."""
+            return Response(self.metrics_renderer(), mimetype="text/plain; version=0.0.4")
+
+        @app.route('/status', methods=['GET'])
+        def status():
+            """What the event pipeline is doing right now."""
+            return jsonify(self.status_renderer()), 200
+
+        if self.profiling_enabled:
+            self.register_profiling_routes(app)
         
         return app
+
+    def register_profiling_routes(self, app: Flask):
+        """
+        Add the on demand profiling endpoints. The health server handles each request on its own thread, so
+        these never block event processing
+        """
+
+        @app.route('/debug/profile/cpu', methods=['GET'])
+        def cpu_profile():
+            """Sample the stacks of all threads for ?seconds=N and return the busiest stacks and functions."""
+            try:
+                seconds = float(request.args.get('seconds', 10))
+                interval = float(request.args.get('interval', Profiler.DEFAULT_SAMPLE_INTERVAL_SECONDS))
+                limit = int(request.args.get('limit', 50))
+            except ValueError:
+                return jsonify({"error": "seconds, interval and limit must be numbers"}), 400
+
+            if interval <= 0:
+                return jsonify({"error": "interval must be greater than 0"}), 400
+
+            try:
+                return jsonify(self.profiler.cpu_profile(seconds, interval, limit)), 200
+            except ProfilerBusyError as e:
+                return jsonify({"error": str(e)}), 409
+
+        @app.route('/debug/profile/memory', methods=['GET'])
+        def memory_profile():
+            """Return the top tracemalloc allocators, starting tracemalloc if it isn't already running."""
+            key_type = request.args.get('key_type', 'lineno')
+            if key_type not in ("lineno", "filename", "traceback"):
+                return jsonify({"error": "key_type must be one of lineno, filename or traceback"}), 400
+
+            try:
+                limit = int(request.args.get('limit', 25))
+            except ValueError:
+                return jsonify({"error": "limit must be a number"}), 400
+
+            return jsonify(self.profiler.memory_snapshot(limit, key_type)), 200
+
+        @app.route('/debug/profile/memory', methods=['DELETE'])
+        def stop_memory_profile():
+            """Stop tracemalloc."""
+            return jsonify(self.profiler.stop_memory_tracing()), 200
+
+        @app.route('/debug/threads', methods=['GET'])
+        def thread_dump():
+            """Dump the stack of every thread."""
+            return jsonify(self.profiler.thread_dump()), 200
         
         
 
@@ -0,0 +1,147 @@
+
+
+from collections import Counter
+from threading import Lock, get_ident
+import logging
+import sys
+import threading
+import time
+import traceback
+import tracemalloc
+
+
+class ProfilerBusyError(Exception):
+    pass
+
+
+class Profiler():
+    '''
+    On demand diagnostics for a live process. Everything here runs on the calling thread (ie. a health server request
+    thread) and only ever reads the state of other threads, so the event loop keeps running while it is being profiled
+    '''
+
+    MAX_CPU_PROFILE_SECONDS = 60
+    DEFAULT_SAMPLE_INTERVAL_SECONDS = 0.005
+
+    def __init__(self):
+        self._logger = logging.getLogger(self.__class__.__name__)
+        # Only one CPU profile at a time, as concurrent samplers would just skew each other
+        self._cpu_profile_lock = Lock()
+
+    @staticmethod
+    def _frame_name(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({code.co_filename}:{frame.f_lineno})"
+
+    def _collapse_stack(self, frame) -> str:
+        stack = []
+        while frame is not None:
+            stack.append(self._frame_name(frame))
+            frame = frame.f_back
+        # Root first, so the output is in the collapsed stack format used by flamegraph tools
+        return ";".join(reversed(stack))
+
+    def cpu_profile(self, duration_seconds: float, interval_seconds: float = DEFAULT_SAMPLE_INTERVAL_SECONDS, limit: int = 50) -> dict:
+        '''
+        Statistically profile all other threads by sampling their stacks every interval for the given duration
+
+        @param duration_seconds: How long to sample for. Capped at MAX_CPU_PROFILE_SECONDS
+        @param interval_seconds: Time between samples
+        @param limit: Max number of stacks and functions to return
+        @return dict: Sample counts per collapsed stack and per function (self time), busiest first
+        @raises ProfilerBusyError: If another CPU profile is already running
+        '''
+        duration_seconds = min(max(duration_seconds, 0), self.MAX_CPU_PROFILE_SECONDS)
+
+        if not self._cpu_profile_lock.acquire(blocking=False):
+            raise ProfilerBusyError("A CPU Profile Is Already Running")
+
+        try:
+            self._logger.info(f"Starting CPU Profile For {duration_seconds} Seconds")
+            own_thread_id = get_ident()
+            thread_names = { thread.ident: thread.name for thread in threading.enumerate() }
+
+            stacks = Counter()
+            functions = Counter()
+            sample_count = 0
+
+            end_time = time.monotonic() + duration_seconds
+            while time.monotonic() < end_time:
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_thread_id:
+                        continue
+                    thread_name = thread_names.get(thread_id, str(thread_id))
+                    stacks[f"{thread_name};{self._collapse_stack(frame)}"] += 1
+                    functions[self._frame_name(frame)] += 1
+                sample_count += 1
+                time.sleep(interval_seconds)
+
+            return {
+                "duration_seconds": duration_seconds,
+                "interval_seconds": interval_seconds,
+                "samples": sample_count,
+                "stacks": [ {"stack": stack, "count": count} for stack, count in stacks.most_common(limit) ],
+                "functions": [ {"function": function, "count": count} for function, count in functions.most_common(limit) ],
+            }
+        finally:
+            self._cpu_profile_lock.release()
+
+    def memory_snapshot(self, limit: int = 25, key_type: str = "lineno") -> dict:
+        '''
+        Take a tracemalloc snapshot of the largest allocators. Tracing is started on the first call, so only memory
+        allocated after that is tracked. Call stop_memory_tracing once done, as tracing has a cost on every allocation
+
+        @param limit: Max number of allocators to return
+        @param key_type: How to group allocations. One of "lineno", "filename" or "traceback"
+        @return dict: Current and peak traced memory along with the top allocators
+        '''
+        if not tracemalloc.is_tracing():
+            self._logger.info("Starting tracemalloc")
+            tracemalloc.start()
+            return {
+                "tracing": True,
+                "message": "tracemalloc was not running and has now been started. Call again to see allocations made since",
+                "allocators": [],
+            }
+
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+
+        return {
+            "tracing": True,
+            "current_bytes": current,
+            "peak_bytes": peak,
+            "allocators": [
+                {
+                    "location": str(stat.traceback),
+                    "size_bytes": stat.size,
+                    "count": stat.count,
+                }
+                for stat in snapshot.statistics(key_type)[:limit]
+            ],
+        }
+
+    def stop_memory_tracing(self) -> dict:
+        was_tracing = tracemalloc.is_tracing()
+        if was_tracing:
+            self._logger.info("Stopping tracemalloc")
+            tracemalloc.stop()
+        return { "tracing": False, "was_tracing": was_tracing }
+
+    def thread_dump(self) -> dict:
+        '''
+        Dump the current stack of every thread in the process
+        '''
+        threads = { thread.ident: thread for thread in threading.enumerate() }
+
+        dump = []
+        for thread_id, frame in sys._current_frames().items():
+            thread = threads.get(thread_id)
+            dump.append({
+                "id": thread_id,
+                "name": thread.name if thread else str(thread_id),
+                "daemon": thread.daemon if thread else None,
+                "stack": traceback.format_stack(frame),
+            })
+
+        return { "threads": dump }
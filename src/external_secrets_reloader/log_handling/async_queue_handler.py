@@ -0,0 +1,34 @@
+
+
+from external_secrets_reloader.metrics.metrics import METRICS
+
+from logging.handlers import QueueHandler
+from queue import Full
+import logging
+
+
+class AsyncQueueHandler(QueueHandler):
+    '''
+    Hands log records off to a queue that a QueueListener drains on a background thread, so slow writes to stdout never
+    block the thread doing the logging.
+
+    Unlike the standard QueueHandler, records are queued as is rather than being formatted first. All of the
+    formatting (message interpolation, JSON encoding and tracebacks) happens on the listener thread instead. This is
+    safe as everything is in the same process, as long as arguments passed to log calls are not mutated after the call.
+
+    If the queue is full the record is dropped and counted rather than blocking the caller.
+    '''
+
+    RECORDS_DROPPED = METRICS.counter(
+        "esr_log_records_dropped_total",
+        "Log records dropped because the log queue was full"
+    )
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except Full:
+            self.RECORDS_DROPPED.inc()
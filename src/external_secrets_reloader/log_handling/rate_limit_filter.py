@@ -0,0 +1,74 @@
+
+
+from external_secrets_reloader.metrics.metrics import METRICS
+
+from threading import Lock
+import logging
+import time
+
+
+class RateLimitFilter(logging.Filter):
+    '''
+    Rate limits repetitive log lines. Records are grouped by their logger and unformatted message template, so every
+    "Reloading ExternalSecret %s/%s" line counts towards the same limit no matter which ExternalSecret it is for. Each
+    group may log up to max_records per interval_seconds. Anything over is dropped, and the number dropped is attached
+    to the next record let through for that group as `suppressed`.
+
+    Only records below min_unlimited_level are limited, so warnings and errors are always logged.
+    '''
+
+    # Messages that are already formatted (ie. f-strings) make a new group every time. Expired groups are pruned once
+    # there are this many so they can't grow without bound
+    MAX_GROUPS = 1000
+
+    RECORDS_SUPPRESSED = METRICS.counter(
+        "esr_log_records_suppressed_total",
+        "Log records dropped by rate limiting"
+    )
+
+    def __init__(self, max_records: int, interval_seconds: float = 60, min_unlimited_level: int = logging.WARNING):
+        super().__init__()
+        self.max_records = max_records
+        self.interval_seconds = interval_seconds
+        self.min_unlimited_level = min_unlimited_level
+
+        self._lock = Lock()
+        # (logger name, message template) -> [window start, records in window, records suppressed]
+        self._windows: dict[tuple[str, str], list] = dict()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= self.min_unlimited_level:
+            return True
+
+        now = time.monotonic()
+        group = (record.name, str(record.msg))
+
+        with self._lock:
+            window = self._windows.get(group)
+            if window is None or now - window[0] >= self.interval_seconds:
+                suppressed = window[2] if window is not None else 0
+                if window is None and len(self._windows) >= self.MAX_GROUPS:
+                    self._prune(now)
+                self._windows[group] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+
+            if window[1] < self.max_records:
+                window[1] += 1
+                return True
+
+            window[2] += 1
+
+        self.RECORDS_SUPPRESSED.inc()
+        return False
+
+    def _prune(self, now: float):
+        # Caller must hold the lock
+        expired = [ group for group, window in self._windows.items() if now - window[0] >= self.interval_seconds ]
+        for group in expired:
+            del self._windows[group]
+
+        # Everything is still active, so start over rather than grow
+        if len(self._windows) >= self.MAX_GROUPS:
+            self._windows.clear()
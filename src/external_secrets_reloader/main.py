@@ -1,16 +1,51 @@
 
 
+import gc
 import logging
+import multiprocessing
 import signal
+import time
+from logging.handlers import QueueListener
+from queue import Queue
 from sys import exit, stdout
+from typing import Optional
+from kubernetes import client, config
 from pythonjsonlogger import jsonlogger
 
+from external_secrets_reloader.cache.eso_index import ESOIndex
+from external_secrets_reloader.cache.eso_informer import ESOInformer
+from external_secrets_reloader.cache.index_snapshot_writer import IndexSnapshotWriter
 from external_secrets_reloader.event_handler.eso_event_handler import ESOEventHandler
+from external_secrets_reloader.filters.operation_filter import OperationFilter
+from external_secrets_reloader.filters.rotation_tracker import RotationTracker
+from external_secrets_reloader.health_check.freshness_monitor import FreshnessMonitor
+from external_secrets_reloader.health_check.health_status import HealthStatus
 from external_secrets_reloader.health_check.health_status_thread import HealthStatusThread
+from external_secrets_reloader.log_handling.async_queue_handler import AsyncQueueHandler
+from external_secrets_reloader.log_handling.rate_limit_filter import RateLimitFilter
+from external_secrets_reloader.metrics.metrics import METRICS
 from external_secrets_reloader.processors.eventbridge_processor import EventBridgeProcessor
+from external_secrets_reloader.processors.http_push_processor import HTTPPushProcessor
 from external_secrets_reloader.processors.sqs_processor import SQSProcessor
+from external_secrets_reloader.reloader.circuit_breaker import CircuitBreaker
 from external_secrets_reloader.reloader.eso_aws_provider_reloader import ESOAWSProviderReloader, ProviderType
+from external_secrets_reloader.reloader.multi_cluster_reloader import MultiClusterReloader
+from external_secrets_reloader.scaling.consumer_pool import ConsumerPool
+from external_secrets_reloader.scaling.lane_scheduler import LaneScheduler
 from external_secrets_reloader.settings import Settings
+from external_secrets_reloader.status.pipeline_status import PIPELINE_STATUS
+from external_secrets_reloader.supervisor.worker_status_reporter import WorkerStatusReporter
+from external_secrets_reloader.supervisor.worker_supervisor import WorkerSupervisor, available_cpu_count
+from external_secrets_reloader.tracing.span_exporters import FileSpanExporter, OTLPHttpSpanExporter
+from external_secrets_reloader.tracing.tracer import TRACER
+
+# Start of the process, for measuring how long it takes to become ready
+PROCESS_STARTED = time.monotonic()
+
+TIME_TO_READY = METRICS.gauge(
+    "esr_time_to_ready_seconds",
+    "Seconds from the process starting to it being ready to process events, including syncing the index"
+)
 
 print("==== Starting Application ====")
 
@@ -48,8 +83,20 @@ formatter = jsonlogger.JsonFormatter(
     timestamp=True
 )
 
-handler = logging.StreamHandler(stdout)
-handler.setFormatter(formatter)
+# Writing to stdout can block when the node is busy. So log calls only put the record on a queue, and a
+# background listener thread does the formatting and writing. Calls below the log level never create a record
+# in the first place, so log lines should pass their arguments separately rather than pre-formatting them
+stream_handler = logging.StreamHandler(stdout)
+stream_handler.setFormatter(formatter)
+
+log_queue = Queue(maxsize=settings.LOG_QUEUE_SIZE)
+handler = AsyncQueueHandler(log_queue)
+if settings.LOG_RATE_LIMIT > 0:
+    # Keeps repetitive per ExternalSecret lines from flooding the logs during large bursts of changes
+    handler.addFilter(RateLimitFilter(settings.LOG_RATE_LIMIT, settings.LOG_RATE_LIMIT_INTERVAL))
+
+log_listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+log_listener.start()
 
 if rootLogger.hasHandlers():
     rootLogger.handlers.clear()
@@ -95,6 +142,260 @@ signal.signal(signal.SIGTERM, signal_handler)
 
 print("==== SIG Handlers Registered ====")
 
+def init_cluster(context: Optional[str], snapshot_path: Optional[str]):
+    """
+    Build the reloader for a single cluster, along with its index, informer and snapshot writer when caching is
+    enabled. The cluster is the one we are running in when context is None, otherwise the kubeconfig context. Blocks
+    until the cluster's index has synced
+    """
+    k8s_client = None
+    if context is not None:
+        k8s_client = client.CustomObjectsApi(config.new_client_from_config(context=context))
+
+    index = None
+    informer = None
+    snapshot_writer = None
+
+    if settings.CACHE_ENABLED:
+        index = ESOIndex(ESOAWSProviderReloader.PLURALS)
+        if snapshot_path is not None:
+            index.load_snapshot(snapshot_path)
+
+    reloader = ESOAWSProviderReloader(
+        ProviderType(settings.EVENT_SERVICE),
+        index=index,
+        k8s_client=k8s_client,
+        coalesce_interval_seconds=settings.RELOAD_COALESCE_INTERVAL,
+        streaming_lists=settings.STREAMING_LIST_ENABLED,
+        watch_cache_lists=settings.LIST_FROM_WATCH_CACHE,
+        confirm_deadline_seconds=settings.RELOAD_CONFIRM_DEADLINE,
+        confirm_poll_interval_seconds=settings.RELOAD_CONFIRM_POLL_INTERVAL
+    )
+
+    if index is not None:
+        # Lists anything not restored from the snapshot, then keeps the index up to date from watches. This blocks
+        # until the index has synced, so readiness is never reported with a cold index
+        logger.info("Syncing ExternalSecrets Index%s", f" For Cluster {context}" if context is not None else "")
+        informer = ESOInformer(reloader.k8s_client, index, ESOAWSProviderReloader.GROUP, ESOAWSProviderReloader.VERSION, streaming_lists=settings.STREAMING_LIST_ENABLED)
+        informer.start()
+
+        if snapshot_path is not None:
+            snapshot_writer = IndexSnapshotWriter(index, snapshot_path, settings.CACHE_SNAPSHOT_INTERVAL)
+            snapshot_writer.start()
+
+    return reloader, index, informer, snapshot_writer
+
+
+def init_components(health_status, worker_id: Optional[int] = None, rotation_state: Optional[tuple] = None):
+    """
+    Build the event pipeline for this process. Returns the event handler along with any background components
+    that need stopping on shutdown, or None if initialization failed. Workers in multi-process mode pass their
+    worker_id, so each snapshots its own index rather than racing on the same file, and the rotation_state
+    (pending rotations and their lock) shared between workers
+    """
+    snapshot_path = settings.CACHE_SNAPSHOT_PATH
+    if snapshot_path is not None and worker_id is not None:
+        snapshot_path = f"{snapshot_path}.worker-{worker_id}"
+
+    # Tracing stays a no-op unless an exporter is configured
+    if settings.TRACING_EXPORTER == "file":
+        TRACER.configure(FileSpanExporter(settings.TRACING_FILE_PATH), settings.TRACING_SAMPLE_RATE)
+    elif settings.TRACING_EXPORTER == "otlp":
+        TRACER.configure(OTLPHttpSpanExporter(settings.TRACING_OTLP_ENDPOINT), settings.TRACING_SAMPLE_RATE)
+
+    processor = None
+    sqs_processor = None
+    reloader = None
+    # Per cluster, keyed by kubeconfig context. A single in cluster deployment has one, keyed by None
+    clusters: dict = dict()
+    indexes: dict = dict()
+    informers = []
+    snapshot_writers = []
+    consumer_pool = None
+
+    try:
+        logger.info("Initializing processors, reloaders and event handlers")
+
+        if settings.EVENT_SOURCE == "AWS":
+            if settings.EVENT_TRANSPORT == "HTTP":
+                # Events are pushed to us, ie. by an EventBridge API destination, rather than polled for
+                processor = HTTPPushProcessor(settings.PUSH_SHARED_SECRET, settings.PUSH_QUEUE_SIZE, settings.PUSH_AUTH_HEADER)
+                processor.start(port=settings.PUSH_PORT)
+            else:
+                sqs_processor = SQSProcessor(settings.SQS_QUEUE_URL, settings.SQS_QUEUE_WAIT_TIME, batch_size=settings.SQS_RECEIVE_BATCH_SIZE)
+                processor = EventBridgeProcessor(sqs_processor)
+
+            if settings.KUBE_CONTEXTS is None:
+                reloader, index, informer, snapshot_writer = init_cluster(None, snapshot_path)
+                clusters = { None: (reloader, index, informer, snapshot_writer) }
+            else:
+                # One consumer fans each event out to every cluster, each with its own client, index and informer
+                for context in [ context.strip() for context in settings.KUBE_CONTEXTS.split(",") if context.strip() ]:
+                    clusters[context] = init_cluster(context, IndexSnapshotWriter.path_for(snapshot_path, context) if snapshot_path is not None else None)
+                reloader = MultiClusterReloader({ context: cluster[0] for context, cluster in clusters.items() })
+                reloader.start()
+
+            for context, (_, index, informer, snapshot_writer) in clusters.items():
+                if index is not None:
+                    indexes[context] = index
+                if informer is not None:
+                    informers.append(informer)
+                if snapshot_writer is not None:
+                    snapshot_writers.append(snapshot_writer)
+
+            if indexes:
+                # Everything allocated so far, the synced indexes included, lives for the life of the process. Freezing
+                # it keeps the garbage collector from scanning it over and over again on every collection
+                gc.collect()
+                gc.freeze()
+        
+        # Events for operations that don't change any values are dropped before they reach the reloader
+        if settings.RELOAD_OPERATIONS is not None:
+            allowed_operations = [ operation.strip() for operation in settings.RELOAD_OPERATIONS.split(",") if operation.strip() ]
+        else:
+            allowed_operations = OperationFilter.DEFAULT_OPERATIONS[settings.EVENT_SERVICE]
+        operation_filter = OperationFilter(allowed_operations)
+        
+        # A Secrets Manager rotation makes several changes in a row. Holding them until AWSCURRENT moves means one reload
+        rotation_tracker = None
+        if settings.EVENT_SERVICE == "SecretsManager" and settings.ROTATION_HOLD_TIMEOUT > 0:
+            rotation_tracker = RotationTracker(settings.ROTATION_HOLD_TIMEOUT, *(rotation_state or ()))
+
+        # Reloads run on lanes keyed by message group or key, so they run in parallel without reordering a key's events
+        lane_scheduler = None
+        if settings.EVENT_LANES > 0:
+            lane_scheduler = LaneScheduler(settings.EVENT_LANES)
+            lane_scheduler.start()
+
+        # While the API server is unreachable, events are left queued rather than received, failed and acknowledged
+        circuit_breaker = None
+        if settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD > 0:
+            circuit_breaker = CircuitBreaker(settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD, reloader.is_available, settings.CIRCUIT_BREAKER_PROBE_INTERVAL)
+
+        # Reported on /health while changes are taking longer than the SLO to reload
+        freshness_monitor = None
+        if settings.FRESHNESS_SLO > 0:
+            freshness_monitor = FreshnessMonitor(settings.FRESHNESS_SLO, health_status)
+            # Checked against the clock whenever metrics are read, as well as health
+            METRICS.add_collector(freshness_monitor.evaluate)
+
+        event_handler = ESOEventHandler(processor, reloader, operation_filter, rotation_tracker, lane_scheduler, circuit_breaker, freshness_monitor)
+
+        if sqs_processor is not None and settings.SQS_DEPTH_SAMPLE_INTERVAL > 0:
+            # Extra consumers share the reloader, filters and SQS client, but each receive their own messages
+            def new_consumer():
+                consumer_processor = SQSProcessor(settings.SQS_QUEUE_URL, settings.SQS_QUEUE_WAIT_TIME, sqs_client=sqs_processor.sqs_client, batch_size=settings.SQS_RECEIVE_BATCH_SIZE)
+                return ESOEventHandler(EventBridgeProcessor(consumer_processor), reloader, operation_filter, rotation_tracker, lane_scheduler, circuit_breaker, freshness_monitor)
+
+            consumer_pool = ConsumerPool(
+                sqs_processor,
+                new_consumer,
+                settings.SQS_MIN_CONSUMERS,
+                settings.SQS_MAX_CONSUMERS,
+                settings.SQS_MESSAGES_PER_CONSUMER,
+                settings.SQS_DEPTH_SAMPLE_INTERVAL
+            )
+            consumer_pool.start()
+
+        # Sections of /status. Each is only collected when /status is requested
+        PIPELINE_STATUS.configure(settings.STATUS_RELOAD_HISTORY)
+        if sqs_processor is not None:
+            PIPELINE_STATUS.register("sqs", sqs_processor.status)
+        if indexes:
+            if settings.KUBE_CONTEXTS is None:
+                PIPELINE_STATUS.register("index", indexes[None].status)
+            else:
+                PIPELINE_STATUS.register("index", lambda: { context: index.status() for context, index in indexes.items() })
+
+        if freshness_monitor is not None:
+            PIPELINE_STATUS.register("freshness", freshness_monitor.status)
+
+        def queues() -> dict:
+            depths = dict()
+            if isinstance(processor, HTTPPushProcessor):
+                depths["push_events_queued"] = processor.queued_count()
+            if lane_scheduler is not None:
+                depths["lane_events_pending"] = lane_scheduler.pending_count()
+            if rotation_tracker is not None:
+                depths["rotations_held"] = rotation_tracker.pending_count()
+            coalescers = [ cluster[0].coalescer for cluster in clusters.values() if cluster[0].coalescer is not None ]
+            if coalescers:
+                depths["patches_pending"] = sum(coalescer.pending_count() for coalescer in coalescers)
+                depths["patches_retrying"] = sum(coalescer.retrying_count() for coalescer in coalescers)
+            confirmers = [ cluster[0].confirmer for cluster in clusters.values() if cluster[0].confirmer is not None ]
+            if confirmers:
+                depths["reloads_unconfirmed"] = sum(confirmer.unconfirmed_count() for confirmer in confirmers)
+            if isinstance(reloader, MultiClusterReloader):
+                depths["cluster_reloads_pending_retry"] = reloader.pending_retry_count()
+            if consumer_pool is not None:
+                depths["consumers"] = consumer_pool.consumer_count()
+            if circuit_breaker is not None:
+                depths["circuit_breaker"] = circuit_breaker.state.value
+            return depths
+        PIPELINE_STATUS.register("queues", queues)
+
+        logger.debug("All components initialized successfully")
+        time_to_ready = time.monotonic() - PROCESS_STARTED
+        TIME_TO_READY.set(time_to_ready)
+        logger.info("Ready To Process Events After %.2f Seconds", time_to_ready)
+        health_status.set_healthy(True)
+        health_status.set_ready(True)
+
+        return event_handler, reloader, informers, snapshot_writers, consumer_pool
+        
+    except Exception as e:
+        error_msg = f"Failed to initialize components: {str(e)}"
+        logger.error(error_msg, exc_info=e)
+        health_status.set_healthy(False, error_msg)
+        health_status.set_ready(False)
+        return None
+
+
+def shutdown_components(event_handler, reloader, informers, snapshot_writers, consumer_pool):
+    # Lets the extra consumers finish the events they are handling
+    if consumer_pool is not None:
+        consumer_pool.stop()
+    # Finishes events handed to lanes and reloads any rotations still being held, then sends any patches the reloader is still holding on to
+    event_handler.stop()
+    reloader.stop()
+    for informer in informers:
+        informer.stop()
+    for snapshot_writer in snapshot_writers:
+        snapshot_writer.stop()
+    TRACER.shutdown()
+
+
+def run_worker(worker_id: int, status_queue, stop_event, rotation_state: Optional[tuple] = None) -> None:
+    """
+    Entrypoint of each worker process in multi-process mode. Workers are spawned fresh, so settings, logging and
+    signal handling above have already been set up again by importing this module. Each runs its own processor and
+    reloader, and reports its health and metrics back to the supervisor rather than serving them itself
+    """
+    health_status = HealthStatus()
+    health_status.set_ready(False)
+
+    reporter = WorkerStatusReporter(worker_id, health_status, status_queue)
+    reporter.start()
+
+    components = init_components(health_status, worker_id, rotation_state)
+    if components is None:
+        reporter.stop()
+        log_listener.stop()
+        exit(1)
+
+    event_handler, reloader, informers, snapshot_writers, consumer_pool = components
+    logger.info(f"Worker {worker_id} Started Processing")
+
+    while CONTINUE_PROCESSING and not stop_event.is_set():
+        event_handler.poll_for_events()
+
+    shutdown_components(event_handler, reloader, informers, snapshot_writers, consumer_pool)
+    reporter.stop()
+
+    logger.info(f"Worker {worker_id} Has Stopped")
+    log_listener.stop()
+
+
 def main() -> None:
     global CONTINUE_PROCESSING
 
@@ -112,42 +413,77 @@ def main() -> None:
 
     print(startup_message + "\n\n")
 
+    worker_count = settings.WORKER_PROCESSES
+    if worker_count is None:
+        # Every worker keeps its own index, with its own watches on the API server. Unless asked for, one index is
+        # kept rather than one per CPU
+        worker_count = 1 if settings.CACHE_ENABLED else available_cpu_count()
+    if settings.EVENT_TRANSPORT == "HTTP":
+        # Pushed events arrive on a single port, so there is only ever one process to receive them
+        worker_count = 1
+    supervisor = None
+
+    if settings.EVENT_LANES > 0 and worker_count > 1 and settings.EVENT_TRANSPORT == "SQS" and not settings.SQS_QUEUE_URL.endswith(".fifo"):
+        # Each worker orders only the events it receives. A FIFO queue keeps the rest of a message group from being
+        # received by another worker until the lane has reloaded and deleted the one in flight
+        logger.warning("EVENT_LANES Only Keep Events For The Same Key In Order Within A Worker Process. With %d Worker Processes On A Standard Queue They Can Still Be Reloaded Out Of Order. Use A FIFO Queue Or Set WORKER_PROCESSES To 1 To Keep Them In Order", worker_count)
+
+    profiling_enabled = settings.PROFILING_ENDPOINTS_ENABLED
+    if profiling_enabled and worker_count > 1:
+        # The health check server runs in the supervising process, which only waits on the workers, so its profiles
+        # would never show any event processing
+        logger.warning("PROFILING_ENDPOINTS_ENABLED Is Ignored With %d Worker Processes. Set WORKER_PROCESSES To 1 To Profile", worker_count)
+        profiling_enabled = False
+
     # Start health check server for Kubernetes probes
     logger.info("Starting Health Check Endpoints")
-    hst = HealthStatusThread()
-    hst.start(port=settings.HEALTH_CHECK_PORT, debug=(logging_level_int == logging.DEBUG))
+    hst = HealthStatusThread(profiling_enabled=profiling_enabled)
     # Get the health status object to update during initialization
     health_status = hst.get_health_status()
     health_status.set_ready(False)  # Mark as not ready during initialization
+
+    rotation_manager = None
+    if worker_count > 1:
+        worker_args = ()
+        if settings.EVENT_SERVICE == "SecretsManager" and settings.ROTATION_HOLD_TIMEOUT > 0:
+            # A rotation's events can land on any worker, so they all track rotations in one place
+            rotation_manager = multiprocessing.get_context("spawn").Manager()
+            worker_args = ((rotation_manager.dict(), rotation_manager.Lock()),)
+
+        # Workers report back to the supervisor, which serves the combined health and metrics of all of them
+        supervisor = WorkerSupervisor(worker_count, run_worker, health_status, worker_args)
+        hst.metrics_renderer = supervisor.render_metrics
+        hst.status_renderer = supervisor.render_status
+
+    hst.start(port=settings.HEALTH_CHECK_PORT, debug=(logging_level_int == logging.DEBUG))
     logger.debug("Health Check Endpoints Started")
 
-    
-    processor = None
-    reloader = None
-    event_handler = None
+    if supervisor is not None:
+        supervisor.start()
 
-    try:
-        logger.info("Initializing processors, reloaders and event handlers")
+        while CONTINUE_PROCESSING:
+            supervisor.poll()
 
-        if settings.EVENT_SOURCE == "AWS":
-            sqs_processor = SQSProcessor(settings.SQS_QUEUE_URL, settings.SQS_QUEUE_WAIT_TIME)
-            processor = EventBridgeProcessor(sqs_processor)
-            reloader = ESOAWSProviderReloader(ProviderType(settings.EVENT_SERVICE))
-        
-        event_handler = ESOEventHandler(processor, reloader)
+        supervisor.stop()
+        if rotation_manager is not None:
+            rotation_manager.shutdown()
+        logger.info("All Workers Have Stopped As We Are Shutting Down. Goodbye!")
+        log_listener.stop()
+        return
 
-        logger.debug("All components initialized successfully")
-        health_status.set_healthy(True)
-        health_status.set_ready(True)
-        
-    except Exception as e:
-        error_msg = f"Failed to initialize components: {str(e)}"
-        logger.error(error_msg, exc_info=e)
-        health_status.set_healthy(False, error_msg)
-        health_status.set_ready(False)
+    components = init_components(health_status)
+    if components is None:
+        log_listener.stop()
         return
 
+    event_handler, reloader, informers, snapshot_writers, consumer_pool = components
+
     while CONTINUE_PROCESSING:
         event_handler.poll_for_events()
 
-    logger.info("Processing Has Stopped As We Are Shutting Down. Goodbye!")
\ No newline at end of file
+    shutdown_components(event_handler, reloader, informers, snapshot_writers, consumer_pool)
+
+    logger.info("Processing Has Stopped As We Are Shutting Down. Goodbye!")
+
+    # Flush everything still queued to stdout
+    log_listener.stop()
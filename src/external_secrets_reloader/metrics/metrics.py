@@ -0,0 +1,287 @@
+
+
+from threading import Lock
+from typing import Callable, Optional
+import math
+
+# Label values are stored as a sorted tuple of (name, value) pairs so that the same label set always
+# maps to the same series no matter what order the keyword arguments were passed in
+LabelSet = tuple[tuple[str, str], ...]
+
+
+def _label_set(labels: dict) -> LabelSet:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _render_labels(label_set: LabelSet) -> str:
+    if not label_set:
+        return ""
+    rendered = ",".join(f'{k}="{v}"' for k, v in label_set)
+    return "{" + rendered + "}"
+
+
+def _render_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter():
+    '''
+    Monotonically increasing value, optionally split into series by labels
+    '''
+
+    TYPE = "counter"
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._lock = Lock()
+        self._values: dict[LabelSet, float] = dict()
+
+    def inc(self, amount: float = 1, **labels):
+        label_set = _label_set(labels)
+        with self._lock:
+            self._values[label_set] = self._values.get(label_set, 0) + amount
+
+    def get(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_label_set(labels), 0)
+
+    def samples(self) -> list[tuple[str, LabelSet, float]]:
+        with self._lock:
+            return [ (self.name, label_set, value) for label_set, value in self._values.items() ]
+
+    def dump(self) -> dict[LabelSet, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def merge(self, values: dict[LabelSet, float], extra_labels: LabelSet = ()):
+        # Counts from other processes add to ours
+        with self._lock:
+            for label_set, value in values.items():
+                self._values[label_set] = self._values.get(label_set, 0) + value
+
+
+class Gauge():
+    '''
+    Value that can go up and down, optionally split into series by labels
+    '''
+
+    TYPE = "gauge"
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._lock = Lock()
+        self._values: dict[LabelSet, float] = dict()
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_label_set(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        label_set = _label_set(labels)
+        with self._lock:
+            self._values[label_set] = self._values.get(label_set, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def get(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_label_set(labels), 0)
+
+    def samples(self) -> list[tuple[str, LabelSet, float]]:
+        with self._lock:
+            return [ (self.name, label_set, value) for label_set, value in self._values.items() ]
+
+    def dump(self) -> dict[LabelSet, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def merge(self, values: dict[LabelSet, float], extra_labels: LabelSet = ()):
+        # Point in time values from other processes can't be meaningfully added together, so are kept as separate
+        # series distinguished by the extra labels
+        with self._lock:
+            for label_set, value in values.items():
+                self._values[tuple(sorted(label_set + extra_labels))] = value
+
+
+class Histogram():
+    '''
+    Cumulative bucketed distribution of observed values, optionally split into series by labels
+    '''
+
+    TYPE = "histogram"
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+    def __init__(self, name: str, description: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._lock = Lock()
+        # Per label set: [bucket counts..., sum, count]
+        self._values: dict[LabelSet, list[float]] = dict()
+
+    def observe(self, value: float, **labels):
+        label_set = _label_set(labels)
+        with self._lock:
+            series = self._values.get(label_set)
+            if series is None:
+                series = [0] * (len(self.buckets) + 2)
+                self._values[label_set] = series
+
+            for index, upper_bound in enumerate(self.buckets):
+                if value <= upper_bound:
+                    series[index] += 1
+                    break
+
+            series[-2] += value
+            series[-1] += 1
+
+    def get_count(self, **labels) -> float:
+        with self._lock:
+            series = self._values.get(_label_set(labels))
+            return series[-1] if series else 0
+
+    def get_sum(self, **labels) -> float:
+        with self._lock:
+            series = self._values.get(_label_set(labels))
+            return series[-2] if series else 0
+
+    def dump(self) -> dict[LabelSet, list[float]]:
+        with self._lock:
+            return { label_set: list(series) for label_set, series in self._values.items() }
+
+    def merge(self, values: dict[LabelSet, list[float]], extra_labels: LabelSet = ()):
+        # Bucket counts, sums and counts from other processes add to ours
+        with self._lock:
+            for label_set, series in values.items():
+                existing = self._values.get(label_set)
+                if existing is None:
+                    self._values[label_set] = list(series)
+                else:
+                    self._values[label_set] = [ a + b for a, b in zip(existing, series) ]
+
+    def samples(self) -> list[tuple[str, LabelSet, float]]:
+        samples = []
+        with self._lock:
+            for label_set, series in self._values.items():
+                cumulative = 0
+                for index, upper_bound in enumerate(self.buckets):
+                    cumulative += series[index]
+                    samples.append((f"{self.name}_bucket", label_set + (("le", _render_value(upper_bound)),), cumulative))
+                samples.append((f"{self.name}_sum", label_set, series[-2]))
+                samples.append((f"{self.name}_count", label_set, series[-1]))
+        return samples
+
+
+class MetricsRegistry():
+    '''
+    Process wide collection of metrics. Metrics are created (or fetched if they already exist) through the registry
+    and rendered together in the Prometheus text exposition format
+    '''
+
+    def __init__(self):
+        self._lock = Lock()
+        self._metrics: dict[str, Counter | Gauge | Histogram] = dict()
+        self._collectors: list[Callable[[], None]] = []
+
+    def add_collector(self, collector: Callable[[], None]):
+        '''
+        Have collector called whenever the metrics are rendered or snapshotted, to bring gauges that depend on the
+        time they are read (ie. how long something has been waiting) up to date
+        '''
+        with self._lock:
+            self._collectors.append(collector)
+
+    def _collect(self) -> list:
+        with self._lock:
+            collectors = list(self._collectors)
+            metrics = list(self._metrics.values())
+        for collector in collectors:
+            collector()
+        return metrics
+
+    def _get_or_create(self, metric_type: type, name: str, *args):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = metric_type(name, *args)
+                self._metrics[name] = metric
+            elif not isinstance(metric, metric_type):
+                raise ValueError(f"Metric {name} Is Already Registered As A {metric.TYPE}")
+            return metric
+
+    def counter(self, name: str, description: str) -> Counter:
+        return self._get_or_create(Counter, name, description)
+
+    def gauge(self, name: str, description: str) -> Gauge:
+        return self._get_or_create(Gauge, name, description)
+
+    def histogram(self, name: str, description: str, buckets: tuple[float, ...] = Histogram.DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, description, buckets)
+
+    def snapshot(self) -> list[dict]:
+        '''
+        Copy every metric's current values into plain, picklable structures so they can be sent to another process
+
+        @return list[dict]: One entry per metric. Pass to merge() on another registry to combine
+        '''
+        metrics = self._collect()
+
+        snapshot = []
+        for metric in metrics:
+            entry = {
+                "type": metric.TYPE,
+                "name": metric.name,
+                "description": metric.description,
+                "values": metric.dump(),
+            }
+            if isinstance(metric, Histogram):
+                # Stored without the implicit +Inf bucket, which is added back on creation
+                entry["buckets"] = metric.buckets[:-1]
+            snapshot.append(entry)
+        return snapshot
+
+    def merge(self, snapshot: list[dict], gauge_labels: Optional[dict] = None):
+        '''
+        Combine a snapshot from another registry into this one. Counters and histograms are added together. Gauges are
+        kept as separate series with gauge_labels added to tell them apart
+
+        @param snapshot: Result of snapshot() on the other registry
+        @param gauge_labels: Labels added to every gauge series merged in. ie: {"worker": "1"}
+        '''
+        extra_labels = _label_set(gauge_labels or {})
+        for entry in snapshot:
+            if entry["type"] == Counter.TYPE:
+                metric = self.counter(entry["name"], entry["description"])
+            elif entry["type"] == Gauge.TYPE:
+                metric = self.gauge(entry["name"], entry["description"])
+            else:
+                metric = self.histogram(entry["name"], entry["description"], entry["buckets"])
+            metric.merge(entry["values"], extra_labels)
+
+    def render(self) -> str:
+        '''
+        Render all registered metrics in the Prometheus text exposition format
+
+        @return str: The metrics as text, ready to be served from a /metrics endpoint
+        '''
+        metrics = self._collect()
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.TYPE}")
+            for sample_name, label_set, value in metric.samples():
+                lines.append(f"{sample_name}{_render_labels(label_set)} {_render_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+# Shared registry used across the application
+METRICS = MetricsRegistry()
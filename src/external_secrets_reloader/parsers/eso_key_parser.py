@@ -1,6 +1,8 @@
 
 
 from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Optional
 
 class ESOKeyParser(ABC):
     '''
@@ -13,11 +15,54 @@ class ESOKeyParser(ABC):
     '''
 
     @abstractmethod
-    def get_key() -> str:
+    def get_key() -> Optional[str]:
         '''
         Fetch the key from the event, that the reloader can use to identify whether the ExternalSecret uses this key located
         in the external source
 
-        @return str: The string representation of the key
+        @return Optional[str]: The string representation of the key, or None if the event is not one that can be reloaded from
         '''
-        ...
\ No newline at end of file
+        ...
+
+    def get_event_time(self) -> Optional[datetime]:
+        '''
+        Fetch the time the change described by the event happened at. Reloaders use this to tell whether an ExternalSecret
+        has already been synced since the change, in which case reloading it again would be redundant
+
+        @return Optional[datetime]: Timezone aware time of the change, or None if the event does not carry one
+        '''
+        return None
+
+    def get_event_operation(self) -> Optional[str]:
+        '''
+        Fetch the operation that changed the key. Used to drop events for operations that don't change the value
+        ExternalSecrets see, ie. deleting a parameter
+
+        @return Optional[str]: The operation, or None if the event does not say
+        '''
+        return None
+
+    def get_version_stages(self) -> list[str]:
+        '''
+        Fetch the version stages the change applies to. ie: AWSPENDING while a Secrets Manager rotation is in progress
+
+        @return list[str]: The stages, or an empty list if the event does not say
+        '''
+        return []
+
+    def get_region(self) -> Optional[str]:
+        '''
+        Fetch the region of the changed resource. Reloaders use this to only reload ExternalSecrets whose store reads
+        from that region
+
+        @return Optional[str]: ie. us-east-1, or None if unknown
+        '''
+        return None
+
+    def get_account(self) -> Optional[str]:
+        '''
+        Fetch the account ID of the changed resource
+
+        @return Optional[str]: The account ID, or None if unknown
+        '''
+        return None
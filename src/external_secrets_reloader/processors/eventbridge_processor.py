@@ -3,7 +3,9 @@
 from external_secrets_reloader.entries.eventbridgeentry import EventBridgeEntry
 from external_secrets_reloader.entries.sqsentry import SQSEntry
 from external_secrets_reloader.processors.processor import Processor
+from external_secrets_reloader.tracing.tracer import TRACER
 
+from typing import Callable, Optional
 import logging
 
 class EventBridgeProcessor(Processor[EventBridgeEntry]):
@@ -33,7 +35,26 @@ class EventBridgeProcessor(Processor[EventBridgeEntry]):
     def mark_entry_resolved(self):
         self.source.mark_entry_resolved()
 
+    def stop(self):
+        self.source.stop()
+
+    def received_count(self) -> int:
+        return self.source.received_count()
+
+    def get_entry_group(self) -> Optional[str]:
+        return self.source.get_entry_group()
+
+    def detach_entry_resolver(self) -> Callable[[], None]:
+        return self.source.detach_entry_resolver()
+
+    def detach_entry_redeliverer(self) -> Callable[[], None]:
+        return self.source.detach_entry_redeliverer()
+
+    def hold_entry(self, seconds: float) -> Optional[Callable[[], None]]:
+        return self.source.hold_entry(seconds)
+
     def get_entry(self) -> EventBridgeEntry:
         # Implementation for retrieving the message from the EventBridge entry
-        return EventBridgeEntry(self.raw_content)
+        with TRACER.span("eventbridge.parse", body_bytes=len(self.raw_content)):
+            return EventBridgeEntry(self.raw_content)
     
\ No newline at end of file
@@ -0,0 +1,183 @@
+from external_secrets_reloader.entries.eventbridgeentry import EventBridgeEntry
+from external_secrets_reloader.metrics.metrics import METRICS
+from external_secrets_reloader.processors.processor import Processor
+from external_secrets_reloader.tracing.tracer import TRACER
+
+from flask import Flask, jsonify, request
+from collections import deque
+from queue import Empty, Queue
+from threading import Lock, Thread
+from typing import Callable, Optional
+from werkzeug.serving import BaseWSGIServer, make_server
+import hmac
+import logging
+import uuid
+
+
+class HTTPPushProcessor(Processor[EventBridgeEntry]):
+    '''
+    Receives EventBridge events pushed over HTTP, ie. by an EventBridge API destination, instead of polling SQS for
+    them. Events are picked up as soon as they are pushed, and nothing is paid for while there are no changes.
+
+    POST /events accepts a single event, or a JSON array of events as a batch. Requests must carry the shared secret
+    in the auth_header header, which is what an API destination connection with API key authorization sends.
+    Accepted events are held in a bounded in memory queue until handled. When it can't fit a whole request the request
+    is rejected with a 429 so the sender backs off and retries, rather than memory growing without limit.
+
+    Events are only held in memory, so are acknowledged once queued rather than once reloaded. Nothing else will
+    deliver them again, so events left unresolved to be retried later (ie. while the circuit breaker is open) are
+    queued again by their redeliverer, ahead of newer events. Anything still queued on shutdown is handled before
+    exiting, after the server stops accepting new events.
+
+    @param shared_secret: Secret every request must present
+    @param queue_size: Most events held waiting to be handled
+    @param auth_header: Header the shared secret is sent in
+    '''
+
+    WAIT_SECONDS = 1
+
+    EVENTS_RECEIVED = METRICS.counter(
+        "esr_push_events_received_total",
+        "Events accepted from HTTP pushes"
+    )
+    REQUESTS_REJECTED = METRICS.counter(
+        "esr_push_requests_rejected_total",
+        "HTTP push requests rejected, by reason"
+    )
+    QUEUE_DEPTH = METRICS.gauge(
+        "esr_push_queue_depth",
+        "Pushed events waiting to be handled"
+    )
+
+    def __init__(self, shared_secret: str, queue_size: int, auth_header: str = "x-api-key"):
+        self._logger = logging.getLogger(self.__class__.__name__)
+
+        self.shared_secret = shared_secret.encode("utf-8")
+        self.queue_size = queue_size
+        self.auth_header = auth_header
+
+        self._queue: Queue = Queue(maxsize=queue_size)
+        # Events handed back to be delivered again, which are loaded before anything newer
+        self._redeliveries: deque = deque()
+        # Makes checking there is room for a whole batch and queueing it one step
+        self._enqueue_lock = Lock()
+        self._stopping = False
+
+        self._server: Optional[BaseWSGIServer] = None
+        self._thread: Optional[Thread] = None
+
+        self.event_id = None
+        self.event: Optional[dict] = None
+
+    def _is_authorized(self) -> bool:
+        presented = request.headers.get(self.auth_header, "").encode("utf-8")
+        return hmac.compare_digest(presented, self.shared_secret)
+
+    def _reject(self, reason: str, message: str, status: int):
+        self.REQUESTS_REJECTED.inc(reason=reason)
+        return jsonify({"error": message}), status
+
+    def enqueue(self, events: list[dict]) -> bool:
+        '''
+        Queue all of the events, or none of them if there isn't room for them all
+
+        @return bool: Whether they were queued
+        '''
+        with self._enqueue_lock:
+            if self._stopping or self.queued_count() + len(events) > self.queue_size:
+                return False
+
+            for event in events:
+                # Queued as parsed from the request body, so it is never serialized or parsed again
+                self._queue.put_nowait((event.get("id"), event))
+            self.QUEUE_DEPTH.set(self.queued_count())
+
+        self.EVENTS_RECEIVED.inc(len(events))
+        return True
+
+    def create_app(self) -> Flask:
+        app = Flask('HTTPPushServer')
+
+        @app.route('/events', methods=['POST'])
+        def events():
+            """Accept a single EventBridge event, or a JSON array of them."""
+            if not self._is_authorized():
+                return self._reject("unauthorized", "Missing or invalid shared secret", 401)
+
+            body = request.get_json(silent=True)
+            events = body if isinstance(body, list) else [body]
+            if not events or not all(isinstance(event, dict) for event in events):
+                return self._reject("invalid", "Body must be an EventBridge event or a list of them", 400)
+
+            if self._stopping:
+                return self._reject("stopping", "Shutting down", 503)
+
+            if len(events) > self.queue_size:
+                return self._reject("invalid", f"Batches can have at most {self.queue_size} events", 413)
+
+            if not self.enqueue(events):
+                response, status = self._reject("queue_full", "Too many events waiting to be handled", 429)
+                response.headers["Retry-After"] = str(self.WAIT_SECONDS)
+                return response, status
+
+            return jsonify({"accepted": len(events)}), 202
+
+        return app
+
+    def start(self, host: str = "0.0.0.0", port: int = 8081):
+        self._server = make_server(host, port, self.create_app(), threaded=True)
+
+        self._thread = Thread(target=self._server.serve_forever, name="HTTPPushServer", daemon=True)
+        self._thread.start()
+        self._logger.info(f"Accepting Pushed Events On Port {port}")
+
+    def stop(self):
+        with self._enqueue_lock:
+            self._stopping = True
+
+        if self._server is not None:
+            self._server.shutdown()
+
+    def queued_count(self) -> int:
+        return self._queue.qsize() + len(self._redeliveries)
+
+    def load_next_entry(self) -> bool:
+        try:
+            self.event_id, self.event = self._redeliveries.popleft()
+        except IndexError:
+            try:
+                if self._stopping:
+                    self.event_id, self.event = self._queue.get_nowait()
+                else:
+                    self.event_id, self.event = self._queue.get(timeout=self.WAIT_SECONDS)
+            except Empty:
+                return False
+
+        self.QUEUE_DEPTH.set(self.queued_count())
+        event_id = self.event_id
+
+        # Each event is its own trace, identified by the EventBridge event ID
+        TRACER.start_trace(str(event_id or uuid.uuid4()))
+        return True
+
+    def get_entry(self) -> EventBridgeEntry:
+        return EventBridgeEntry(self.event)
+
+    def mark_entry_resolved(self):
+        # Events were acknowledged to the sender when they were queued, so there is nothing left to resolve
+        self.event = None
+
+    def detach_entry_resolver(self) -> Callable[[], None]:
+        return lambda: None
+
+    def detach_entry_redeliverer(self) -> Callable[[], None]:
+        queued = (self.event_id, self.event)
+        return lambda: self._redeliver(queued)
+
+    def _redeliver(self, queued: tuple):
+        if self._stopping:
+            # Handling what's left before exiting, so it would only fail again. Nothing else will deliver it
+            self._logger.error("Dropping Event %s Left Unresolved On Shutdown", queued[0])
+            return
+        self._redeliveries.append(queued)
+        self.QUEUE_DEPTH.set(self.queued_count())
@@ -1,7 +1,7 @@
 
 
 from abc import ABC, abstractmethod
-from typing import TypeVar, Generic
+from typing import Callable, Generic, Optional, TypeVar
 
 T = TypeVar("T")
 
@@ -18,4 +18,57 @@ class Processor(ABC, Generic[T]):
 
     @abstractmethod
     def mark_entry_resolved(self):
-        ...
\ No newline at end of file
+        ...
+
+    def received_count(self) -> int:
+        '''
+        Entries already received that load_next_entry will load without waiting on the source. ie: the rest of a batch
+        of SQS messages. Entries received together can be handled together
+
+        @return int: How many entries are waiting to be loaded
+        '''
+        return 0
+
+    def get_entry_group(self) -> Optional[str]:
+        '''
+        Group the current entry must be handled in order within. ie: the MessageGroupId of a FIFO SQS message
+
+        @return Optional[str]: The group, or None if the source has no ordering groups
+        '''
+        return None
+
+    def detach_entry_resolver(self) -> Callable[[], None]:
+        '''
+        Hand over resolving the current entry, so it can be resolved later from another thread after further entries
+        have been loaded. Processors that can only resolve their current entry raise NotImplementedError
+
+        @return Callable[[], None]: Resolves the entry that was current when this was called
+        '''
+        raise NotImplementedError(f"{self.__class__.__name__} Can Only Resolve Its Current Entry")
+
+    def detach_entry_redeliverer(self) -> Callable[[], None]:
+        '''
+        Hand over redelivering the current entry, for when it is left unresolved to be handled again later (ie. while
+        the circuit breaker is open). Sources that redeliver unresolved entries themselves, like SQS once the visibility
+        timeout ends, have nothing to do, which is the default
+
+        @return Callable[[], None]: Has the entry that was current when this was called delivered again
+        '''
+        return lambda: None
+
+    def hold_entry(self, seconds: float) -> Optional[Callable[[], None]]:
+        '''
+        Keep the current entry from being delivered again for the given time without resolving it, so it is only
+        redelivered if it still hasn't been resolved after that. Processors that can't hold entries return None, and
+        the entry should be resolved straight away instead
+
+        @return Optional[Callable[[], None]]: Resolves the entry that was current when this was called
+        '''
+        return None
+
+    def stop(self):
+        '''
+        Stop receiving new entries. Entries already received can still be loaded, after which load_next_entry
+        returns False straight away
+        '''
+        pass
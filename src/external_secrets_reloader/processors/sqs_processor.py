@@ -1,24 +1,63 @@
 
 
-from typing import Optional
+from collections import deque
+from typing import Callable, Optional
 import boto3
 import logging
+import time
+import uuid
+
+from botocore.exceptions import BotoCoreError, ClientError
 
 from external_secrets_reloader.entries.sqsentry import SQSEntry
+from external_secrets_reloader.metrics.metrics import METRICS
 from external_secrets_reloader.processors.processor import Processor
+from external_secrets_reloader.tracing.tracer import TRACER
 
 class SQSProcessor(Processor[SQSEntry]):
     MAX_SQS_WAIT_TIME = 20
-
-    def __init__(self, queue_url: str, min_wait_time:int):
-        self.sqs_client = boto3.client('sqs')
+    # Longest SQS allows a message to stay hidden for
+    MAX_VISIBILITY_TIMEOUT = 43200
+
+    # Requested on every receive, so we can tell how long messages sat in the queue and whether they are redeliveries
+    MESSAGE_ATTRIBUTES = ['SentTimestamp', 'ApproximateReceiveCount']
+
+    QUEUE_MESSAGES_VISIBLE = METRICS.gauge(
+        "esr_sqs_queue_messages_visible",
+        "Approximate number of messages waiting in the SQS queue, as of the last sample"
+    )
+    QUEUE_MESSAGES_IN_FLIGHT = METRICS.gauge(
+        "esr_sqs_queue_messages_in_flight",
+        "Approximate number of messages received from the SQS queue but not yet deleted, as of the last sample"
+    )
+    QUEUE_LAG = METRICS.histogram(
+        "esr_sqs_message_queue_lag_seconds",
+        "Time from a message being sent to the SQS queue until it was received",
+        buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)
+    )
+    MESSAGES_REDELIVERED = METRICS.counter(
+        "esr_sqs_messages_redelivered_total",
+        "Messages received again after an earlier receive of them wasn't deleted (ApproximateReceiveCount above 1)"
+    )
+
+    def __init__(self, queue_url: str, min_wait_time:int, sqs_client=None, batch_size: int = 1):
+        # boto3 clients are thread safe, so consumers of the same queue can share one
+        self.sqs_client = sqs_client if sqs_client is not None else boto3.client('sqs')
         self._logger = logging.getLogger(self.__class__.__name__)
 
         self.queue_url = queue_url
         self.min_wait_time = min_wait_time
+        # Most messages received at once. Those received together wait here to be loaded one at a time, each as
+        # (message, when the receive started, when it ended, wait time)
+        self.batch_size = batch_size
+        self._received: deque = deque()
+        
+        # FIFO queue names always end in .fifo
+        self.is_fifo = queue_url.endswith(".fifo")
         
         self._logger.debug(f"QUEUE URL: {self.queue_url}")
         self._logger.debug(f"QUEUE_MIN_WAIT_TIME: {self.min_wait_time}")
+        self._logger.debug(f"QUEUE_IS_FIFO: {self.is_fifo}")
 
         # When it comes out the sqs_client it returns already as a dict
         self.current_message = dict()
@@ -29,37 +68,70 @@ class SQSProcessor(Processor[SQSEntry]):
         self.empty_poll_count = 0
         self.current_wait_time = min_wait_time
 
+        self.stopped = False
+
+        # FIFO queues return the same messages to a receive retried with the same attempt ID, rather than hiding them
+        # until their visibility timeout ends. A new ID is only used once a receive has succeeded
+        self.receive_request_attempt_id: Optional[str] = str(uuid.uuid4()) if self.is_fifo else None
+
     def load_next_entry(self) -> bool:
+        if not self._received and not self.stopped:
+            self._receive()
+
+        if not self._received:
+            # Nothing was received, or we have stopped and everything already received has been loaded
+            self.current_message = None
+            return False
+
+        self.current_message, receive_start_time_ns, receive_end_time_ns, wait_time_seconds = self._received.popleft()
+        self.receipt_handle = self.current_message['ReceiptHandle']
+        self.message_id = self.current_message['MessageId']
+        self._observe_delivery(self.current_message)
+
+        # Each message is its own trace. Receiving it happened before we knew the ID, so is recorded after the fact
+        if TRACER.start_trace(self.message_id, receive_start_time_ns):
+            TRACER.record_span("sqs.receive_message", receive_start_time_ns, receive_end_time_ns, wait_time_seconds=wait_time_seconds)
+
+        self._logger.debug("Processing of Message ID: %s Complete. Returning True", self.message_id)
+        return True
 
+    def received_count(self) -> int:
+        return len(self._received)
+
+    def _receive(self):
         current_poll_wait_time = min(
             self.current_wait_time,
             self.MAX_SQS_WAIT_TIME
         )
         
-        self._logger.debug(f"Hanging {current_poll_wait_time} Seconds To Receive Next Message")
-        response = self.sqs_client.receive_message(
+        self._logger.debug("Hanging %s Seconds To Receive Next Message", current_poll_wait_time)
+        receive_start_time_ns = time.time_ns()
+        receive_parameters = dict(
             QueueUrl=self.queue_url,
-            MaxNumberOfMessages=1,
-            WaitTimeSeconds=current_poll_wait_time
-        ) 
+            MaxNumberOfMessages=self.batch_size,
+            WaitTimeSeconds=current_poll_wait_time,
+            AttributeNames=list(self.MESSAGE_ATTRIBUTES)
+        )
+        if self.is_fifo:
+            receive_parameters["AttributeNames"].append('MessageGroupId')
+            receive_parameters["ReceiveRequestAttemptId"] = self.receive_request_attempt_id
+        response = self.sqs_client.receive_message(**receive_parameters)
+
+        if self.is_fifo:
+            self.receive_request_attempt_id = str(uuid.uuid4())
 
         self._logger.debug("Message Received Or Timeout Reached")
+        receive_end_time_ns = time.time_ns()
         messages = response.get('Messages', [])
         if messages:
-            self._logger.debug("Message Found. Loading...")
-            self.current_message = messages[0]
-            self.receipt_handle = self.current_message['ReceiptHandle']
-            self.message_id = self.current_message['MessageId']
-            self._logger.debug(f"Processing of Message ID: {self.message_id} Complete. Returning True")
+            self._logger.debug("%d Messages Found. Loading...", len(messages))
+            self._received.extend((message, receive_start_time_ns, receive_end_time_ns, current_poll_wait_time) for message in messages)
 
             # Reset the backoff timer and go back to our minimum wait time
             self.empty_poll_count = 0
             self.current_wait_time = self.min_wait_time
-
-            return True
         else:
-            self._logger.debug("No Message Found. Returning False")
-            self.current_message = None
+            self._logger.debug("No Message Found")
 
             # Because there was no entry, lets hang longer as that costs cheaper
             self.empty_poll_count += 1
@@ -67,21 +139,99 @@ class SQSProcessor(Processor[SQSEntry]):
                 self.min_wait_time * (2 ** self.empty_poll_count),
                 self.MAX_SQS_WAIT_TIME
             )
-
-
-            return False
     
-    def mark_entry_resolved(self):
+    def _observe_delivery(self, message: dict):
+        attributes = message.get('Attributes', {})
+
+        try:
+            # Epoch milliseconds. Clocks on either side can be a little apart, which shouldn't show as negative lag
+            self.QUEUE_LAG.observe(max(time.time() - int(attributes['SentTimestamp']) / 1000, 0))
+        except (KeyError, TypeError, ValueError):
+            pass
+
+        try:
+            # This receive included, so anything above 1 is a redelivery
+            receive_count = int(attributes['ApproximateReceiveCount'])
+        except (KeyError, TypeError, ValueError):
+            receive_count = None
+        if receive_count is not None and receive_count > 1:
+            self.MESSAGES_REDELIVERED.inc()
+            self._logger.debug("Message ID: %s Has Been Received %d Times", self.message_id, receive_count)
+
+    def sample_queue_depth(self) -> Optional[tuple[int, int]]:
+        '''
+        Fetch how many messages are waiting in the queue and how many are in flight, and publish them as metrics. This
+        is a single GetQueueAttributes call, so is cheap enough to make every few seconds
+
+        @return Optional[tuple[int, int]]: (visible, in flight), or None if the attributes couldn't be fetched
+        '''
+        try:
+            response = self.sqs_client.get_queue_attributes(
+                QueueUrl=self.queue_url,
+                AttributeNames=['ApproximateNumberOfMessages', 'ApproximateNumberOfMessagesNotVisible']
+            )
+            attributes = response.get('Attributes', {})
+            visible = int(attributes.get('ApproximateNumberOfMessages', 0))
+            in_flight = int(attributes.get('ApproximateNumberOfMessagesNotVisible', 0))
+        except (BotoCoreError, ClientError, ValueError) as e:
+            self._logger.warning("Unable To Sample SQS Queue Depth", exc_info=e)
+            return None
+
+        self.QUEUE_MESSAGES_VISIBLE.set(visible)
+        self.QUEUE_MESSAGES_IN_FLIGHT.set(in_flight)
+        return visible, in_flight
+
+    def status(self) -> dict:
+        '''
+        How long the next receive will wait for, and how many receives in a row have come back empty
+        '''
+        return {
+            "fifo": self.is_fifo,
+            "wait_time_seconds": min(self.current_wait_time, self.MAX_SQS_WAIT_TIME),
+            "empty_poll_streak": self.empty_poll_count,
+        }
+
+    def _delete_message(self, message_id: Optional[str], receipt_handle: Optional[str]):
+        self._logger.debug("Deleting Message ID: %s From SQS Queue", message_id)
+        with TRACER.span("sqs.delete_message"):
+            self.sqs_client.delete_message(
+                QueueUrl=self.queue_url,
+                ReceiptHandle=receipt_handle
+            )
 
-        self._logger.debug(f"Deleting Message ID: {self.message_id} From SQS Queue")
-        self.sqs_client.delete_message(
-            QueueUrl=self.queue_url,
-            ReceiptHandle=self.receipt_handle
-        )
+    def mark_entry_resolved(self):
+        self._delete_message(self.message_id, self.receipt_handle)
+
+    def stop(self):
+        self.stopped = True
+
+    def get_entry_group(self) -> Optional[str]:
+        if not self.current_message:
+            return None
+        return SQSEntry(self.current_message).get_message_group_id()
+
+    def detach_entry_resolver(self) -> Callable[[], None]:
+        message_id = self.message_id
+        receipt_handle = self.receipt_handle
+        return lambda: self._delete_message(message_id, receipt_handle)
+
+    def hold_entry(self, seconds: float) -> Optional[Callable[[], None]]:
+        if self.is_fifo:
+            # Nothing more from a FIFO message group is received while one of its messages is in flight, so holding it
+            # would also hold back whatever it is waiting for
+            return None
+
+        try:
+            self.sqs_client.change_message_visibility(
+                QueueUrl=self.queue_url,
+                ReceiptHandle=self.receipt_handle,
+                VisibilityTimeout=int(min(seconds, self.MAX_VISIBILITY_TIMEOUT))
+            )
+        except (BotoCoreError, ClientError) as e:
+            # Still held. It may just be redelivered, and held again, before it is resolved
+            self._logger.warning("Unable To Extend Visibility Of Message ID: %s", self.message_id, exc_info=e)
+        return self.detach_entry_resolver()
         
 
-    # Further optimisation here would be to allow this method to return a list of SQSEntry, thus allowing
-    # us to bulk grab results from the SQS Queue
-
     def get_entry(self) -> SQSEntry:
         return SQSEntry(self.current_message)
\ No newline at end of file
@@ -0,0 +1,119 @@
+
+
+from external_secrets_reloader.metrics.metrics import METRICS
+
+from enum import Enum
+from threading import Lock
+from typing import Callable
+import logging
+import time
+
+
+class CircuitState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker():
+    '''
+    Stops events being received while the Kubernetes API server is unreachable, so they stay queued instead of
+    being received, failed and acknowledged. The breaker opens after failure_threshold reloads in a row have failed.
+    While it is open, the API server is probed with the given probe function every probe_interval_seconds. Once a
+    probe succeeds it closes, and events are received as normal again.
+
+    Shared between every consumer in the process. Only one of them probes at a time
+
+    @param failure_threshold: Reload attempts in a row that have to fail before the breaker opens
+    @param probe: Called as probe() while open. Returns whether the API server is reachable again
+    @param probe_interval_seconds: How long to wait between probes while open
+    '''
+
+    CIRCUIT_OPENED = METRICS.counter(
+        "esr_circuit_breaker_opened_total",
+        "Times the circuit breaker opened after too many reloads in a row failed"
+    )
+    PROBES_FAILED = METRICS.counter(
+        "esr_circuit_breaker_probes_failed_total",
+        "Probes of the Kubernetes API server that failed while the circuit breaker was open"
+    )
+    CIRCUIT_OPEN = METRICS.gauge(
+        "esr_circuit_breaker_open",
+        "1 while the circuit breaker is open and events are not being received, otherwise 0"
+    )
+
+    def __init__(self, failure_threshold: int, probe: Callable[[], bool], probe_interval_seconds: float):
+        self._logger = logging.getLogger(self.__class__.__name__)
+
+        self.failure_threshold = failure_threshold
+        self.probe = probe
+        self.probe_interval_seconds = probe_interval_seconds
+
+        self._lock = Lock()
+        self._state = CircuitState.CLOSED
+        self._consecutive_failures = 0
+        # Monotonic time the next probe is due while open
+        self._next_probe = 0.0
+
+    @property
+    def state(self) -> CircuitState:
+        with self._lock:
+            return self._state
+
+    def is_open(self) -> bool:
+        '''
+        Whether events should currently be left queued. True while open and while probing
+        '''
+        return self.state != CircuitState.CLOSED
+
+    def record_success(self):
+        with self._lock:
+            self._consecutive_failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            if self._state != CircuitState.CLOSED:
+                return
+
+            self._consecutive_failures += 1
+            if self._consecutive_failures >= self.failure_threshold:
+                self._state = CircuitState.OPEN
+                self._next_probe = time.monotonic() + self.probe_interval_seconds
+                self.CIRCUIT_OPENED.inc()
+                self.CIRCUIT_OPEN.set(1)
+                self._logger.error("%d Reloads In A Row Have Failed. Opening Circuit Breaker And Pausing Event Consumption", self._consecutive_failures)
+
+    def allow_request(self) -> bool:
+        '''
+        Whether events can be received. While open, this probes the API server once the probe interval has passed,
+        and closes the breaker if the probe succeeds
+
+        @return bool: True if closed, or if a probe just succeeded
+        '''
+        with self._lock:
+            if self._state == CircuitState.CLOSED:
+                return True
+            # Another consumer is already probing, or it isn't time to yet
+            if self._state == CircuitState.HALF_OPEN or time.monotonic() < self._next_probe:
+                return False
+            self._state = CircuitState.HALF_OPEN
+
+        try:
+            reachable = self.probe()
+        except Exception as e:
+            self._logger.debug("Exception Thrown Probing Kubernetes API Server", exc_info=e)
+            reachable = False
+
+        with self._lock:
+            if reachable:
+                self._state = CircuitState.CLOSED
+                self._consecutive_failures = 0
+                self.CIRCUIT_OPEN.set(0)
+                self._logger.info("Kubernetes API Server Is Reachable Again. Closing Circuit Breaker And Resuming Event Consumption")
+            else:
+                self._state = CircuitState.OPEN
+                self._next_probe = time.monotonic() + self.probe_interval_seconds
+                self.PROBES_FAILED.inc()
+                self._logger.warning("Kubernetes API Server Is Still Unreachable. Probing Again In %s Seconds", self.probe_interval_seconds)
+
+        return reachable
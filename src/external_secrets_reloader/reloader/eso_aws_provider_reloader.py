@@ -1,10 +1,20 @@
 
 
-from typing import Literal
+from datetime import datetime
+from typing import Callable, Literal, Optional
+from external_secrets_reloader.cache.eso_index import ESOIndex, FORCE_SYNC_ANNOTATION, compact_object
+from external_secrets_reloader.cache.external_secret_record import ExternalSecretRecord
+from external_secrets_reloader.cache.store_resolver import StoreResolver
+from external_secrets_reloader.cache.streaming_list_decoder import stream_list
+from external_secrets_reloader.metrics.metrics import METRICS
+from external_secrets_reloader.reloader.patch_coalescer import PatchCoalescer
+from external_secrets_reloader.reloader.reload_confirmer import ReloadConfirmer
 from external_secrets_reloader.reloader.reloader import Reloader
+from external_secrets_reloader.tracing.tracer import TRACER
 
 from kubernetes import client, config
 from kubernetes.client.rest import ApiException
+from threading import Lock
 import logging
 import time
 from enum import Enum
@@ -20,11 +30,64 @@ class ESOAWSProviderReloader(Reloader):
     EXTERNAL_SECRET_PLURAL = "externalsecrets"
     SECRET_STORE_PLURAL = "secretstores"
     CLUSTER_SECRET_STORE_PLURAL = "clustersecretstores"
+    FORCE_SYNC_ANNOTATION = FORCE_SYNC_ANNOTATION
+    # Parameter Store's operation for moving a label to another version, which changes nothing else
+    LABEL_OPERATION = "LabelParameterVersion"
 
-    def __init__(self, provider_type: ProviderType):
+    PATCHES_SKIPPED = METRICS.counter(
+        "esr_reloader_patches_skipped_total",
+        "ExternalSecret force-sync patches skipped because the ExternalSecret already synced after the change"
+    )
+
+    REFERENCES_PINNED = METRICS.counter(
+        "esr_reloader_pinned_references_skipped_total",
+        "References to a changed key skipped because they are pinned to, or read, a version the change can't affect"
+    )
+
+    LIST_DURATION = METRICS.histogram(
+        "esr_reloader_list_duration_seconds",
+        "Time taken to list objects from the API server, by plural and whether the list was served from its watch cache",
+        buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    )
+
+    PLURALS = [SECRET_STORE_PLURAL, CLUSTER_SECRET_STORE_PLURAL, EXTERNAL_SECRET_PLURAL]
+
+    def __init__(self, provider_type: ProviderType, index: Optional[ESOIndex] = None, k8s_client: Optional[client.CustomObjectsApi] = None, coalesce_interval_seconds: float = 0, streaming_lists: bool = False, watch_cache_lists: bool = False, confirm_deadline_seconds: float = 0, confirm_poll_interval_seconds: float = 5):
         self._logger = logging.getLogger(self.__class__.__name__)
         self.provider_type: Literal["ParameterStore", "SecretsManager"] = provider_type.value
 
+        # When an index is provided and synced, objects are read from it instead of listing them on every reload
+        self.index = index
+        self.store_resolver = StoreResolver(self.provider_type)
+        if index is not None:
+            index.add_listener(self.store_resolver)
+
+        # When set, lists from the API server are decoded and compacted one object at a time as they are read
+        self.streaming_lists = streaming_lists
+
+        # When set, lists are answered from the API server's watch cache rather than read from etcd. The newest
+        # resourceVersion seen per plural is kept so that a list never returns an older state than one before it
+        self.watch_cache_lists = watch_cache_lists
+        self._resource_version_lock = Lock()
+        self._observed_resource_versions: dict[str, str] = dict()
+
+        # When set, patches are debounced per ExternalSecret rather than sent straight away
+        self.coalescer: Optional[PatchCoalescer] = None
+        if coalesce_interval_seconds > 0:
+            self.coalescer = PatchCoalescer(coalesce_interval_seconds, self._patch)
+            self.coalescer.start()
+
+        # When set, patched ExternalSecrets are followed up on until ESO confirms it has reconciled them
+        self.confirmer: Optional[ReloadConfirmer] = None
+        if confirm_deadline_seconds > 0:
+            self.confirmer = ReloadConfirmer(self._get_external_secret, self._send_patch, confirm_deadline_seconds, confirm_poll_interval_seconds)
+            self.confirmer.start()
+
+        # An already configured client can be passed in. Otherwise one is created from the in cluster configuration
+        if k8s_client is not None:
+            self.k8s_client = k8s_client
+            return
+
         try:
             config.load_incluster_config()
             self._logger.debug("Loading K8s Configuration Successful")
@@ -36,99 +99,262 @@ class ESOAWSProviderReloader(Reloader):
         self.k8s_client = client.CustomObjectsApi()
         
 
+    def _list_objects(self, plural: str) -> list[dict]:
+        if self.index is not None and self.index.has_synced():
+            with TRACER.span("index.list", plural=plural):
+                return self.index.list(plural)
+
+        list_options = self._list_options(plural)
+        source = "watch_cache" if self.watch_cache_lists else "etcd"
+        start = time.monotonic()
+
+        if self.streaming_lists:
+            transform = ExternalSecretRecord.from_object if plural == self.EXTERNAL_SECRET_PLURAL else compact_object
+            with TRACER.span("k8s.list_cluster_custom_object", plural=plural, streaming=True, source=source):
+                items, resource_version = stream_list(self.k8s_client, self.GROUP, self.VERSION, plural, transform, **list_options)
+        else:
+            with TRACER.span("k8s.list_cluster_custom_object", plural=plural, source=source):
+                results = self.k8s_client.list_cluster_custom_object(
+                    group = self.GROUP,
+                    version = self.VERSION,
+                    plural = plural,
+                    **list_options
+                )
+            items = results.get('items', [])
+            resource_version = results.get('metadata', {}).get('resourceVersion')
+
+        self.LIST_DURATION.observe(time.monotonic() - start, plural=plural, source=source)
+        self._observe_resource_version(plural, resource_version)
+        return items
+
+    def _list_options(self, plural: str) -> dict:
+        if not self.watch_cache_lists:
+            # A quorum read, straight from etcd
+            return {}
+
+        with self._resource_version_lock:
+            resource_version = self._observed_resource_versions.get(plural)
+
+        # The first list takes whatever the watch cache has. After that it has to be at least as new as the last one,
+        # which the API server waits for its watch cache to catch up to if it has to
+        if resource_version is None:
+            return { "resource_version": "0" }
+        return { "resource_version": resource_version, "resource_version_match": "NotOlderThan" }
+
+    def _observe_resource_version(self, plural: str, resource_version: Optional[str]):
+        if not self.watch_cache_lists or not resource_version:
+            return
+
+        with self._resource_version_lock:
+            current = self._observed_resource_versions.get(plural)
+            # resourceVersions are meant to be opaque, but are etcd revisions in practice. Comparing them keeps a slow
+            # list that finishes after a newer one from moving us backwards. Ones that aren't numbers are just taken
+            if current is not None and current.isdigit() and resource_version.isdigit() and int(resource_version) < int(current):
+                return
+            self._observed_resource_versions[plural] = resource_version
+
+    def _list_external_secrets(self) -> list[ExternalSecretRecord]:
+        # The index converts ExternalSecrets to records as they are indexed. Ones listed from the API server are
+        # converted here, so matching only ever deals with records
+        return [
+            es if isinstance(es, ExternalSecretRecord) else ExternalSecretRecord.from_object(es)
+            for es in self._list_objects(self.EXTERNAL_SECRET_PLURAL)
+        ]
+
+    def _is_pinned(self, version: Optional[str], operation: Optional[str] = None) -> bool:
+        '''
+        Whether a reference's remoteRef.version always resolves to the same value. Parameter Store versions are version
+        numbers, which a change never alters as it always creates a new version, or labels, which can be moved to
+        another version. Secrets Manager versions are staging labels (ie. AWSCURRENT) that move with changes, unless
+        pinned to a specific version ID with the uuid/ prefix
+
+        Labelling a parameter only moves the label, so for a LabelParameterVersion change every reference that isn't
+        to a label, including those to the latest version, resolves to the same value
+        '''
+        if self.provider_type == ProviderType.PARAMETER_STORE.value and operation == self.LABEL_OPERATION:
+            return not version or version.isdigit()
+        if not version:
+            return False
+        if self.provider_type == ProviderType.SECRETS_MANAGER.value:
+            return version.startswith("uuid/")
+        return version.isdigit()
+
+    def _get_store_resolver(self) -> StoreResolver:
+        # A synced index keeps the store resolver up to date as stores change. Otherwise it is built from a fresh list
+        if self.index is not None and self.index.has_synced():
+            return self.store_resolver
+
+        resolver = StoreResolver(self.provider_type)
+        self._logger.debug("Finding All AWS %s Configured SecretStores", self.provider_type)
+        resolver.on_replace(self.SECRET_STORE_PLURAL, self._list_objects(self.SECRET_STORE_PLURAL))
+        self._logger.debug("Finding All AWS %s Configured ClusterSecretStores", self.provider_type)
+        resolver.on_replace(self.CLUSTER_SECRET_STORE_PLURAL, self._list_objects(self.CLUSTER_SECRET_STORE_PLURAL))
+        return resolver
+
     def _generate_patch_payload(self) -> dict:
         current_timestamp = str(int(time.time()))
 
         return {
             "metadata": {
                 "annotations": {
-                    "reconcile.external-secrets.io/force-sync": current_timestamp
+                    self.FORCE_SYNC_ANNOTATION: current_timestamp
                 }
             }
         }
 
-    def reload(self, key) -> bool:
+    def reload(self, key, event_time: Optional[datetime] = None, region: Optional[str] = None, account: Optional[str] = None, operation: Optional[str] = None) -> bool:
+        return self.reload_many([key], { key: event_time }, { key: (region, account) }, { key: operation })[key]
 
+    def _patch(self, es_namespace: str, es_name: str) -> bool:
+        patched_at = time.time()
+        if not self._send_patch(es_namespace, es_name):
+            return False
+
+        if self.confirmer is not None:
+            self.confirmer.track(es_namespace, es_name, patched_at)
+        return True
+
+    def _send_patch(self, es_namespace: str, es_name: str) -> bool:
+        patch_payload = self._generate_patch_payload()
+
+        self._logger.info("Reloading AWS %s External Secret: %s/%s", self.provider_type, es_namespace, es_name)
         try:
+            with TRACER.span("k8s.patch_namespaced_custom_object", namespace=es_namespace, name=es_name):
+                self.k8s_client.patch_namespaced_custom_object(
+                    group = self.GROUP,
+                    version = self.VERSION,
+                    plural = self.EXTERNAL_SECRET_PLURAL,
+                    name = es_name,
+                    namespace = es_namespace,
+                    body = patch_payload
+                )
+        except ApiException as apie:
+            self._logger.error("Kubernetes API Exception Thrown!", exc_info=apie)
 
-            self._logger.debug(f"Finding All AWS {self.provider_type} Configured SecretStores")
-            # Get the names of all the secret stores that use ParameterStore
-            secret_store_results = self.k8s_client.list_cluster_custom_object(
-                group = self.GROUP,
-                version = self.VERSION,
-                plural= self.SECRET_STORE_PLURAL
-            )
-            secret_stores = secret_store_results.get('items', [])
-            parameter_store_ss_names = [ ss["metadata"]["name"] for ss in secret_stores if ss.get('spec', {}).get('provider', {}).get('aws', {}).get('service') == self.provider_type ]
-
-            self._logger.debug(f"Finding All AWS {self.provider_type} Configured ClusterSecretStores")
-            # Get the names of all the Cluster Secret Stores that use ParameterStore
-            cluster_secret_store_results = self.k8s_client.list_cluster_custom_object(
-                group=self.GROUP,
-                version=self.VERSION,
-                plural=self.CLUSTER_SECRET_STORE_PLURAL
-            )
-            cluster_secret_stores = cluster_secret_store_results.get('items', [])
-            parameter_store_css_names = [ css["metadata"]["name"] for css in cluster_secret_stores if css.get('spec', {}).get('provider', {}).get('aws', {}).get('service') == self.provider_type ]
+            if apie.status == 404:
+                self._logger.error("\n**HINT:** A 404 error usually means the CRD ('externalsecrets.external-secrets.io') is not installed in the cluster.")
 
-            all_parameter_store_names = parameter_store_ss_names + parameter_store_css_names
+            return False
+        except Exception as e:
+            # ie. the API server can't be reached. Reported as a failed patch so it is retried and counted by the
+            # circuit breaker rather than escaping the reload
+            self._logger.error("Exception Thrown Patching AWS %s External Secret: %s/%s", self.provider_type, es_namespace, es_name, exc_info=e)
+            return False
 
+        self._logger.debug("Applying Annotation To AWS %s External Secret: %s/%s Successful!", self.provider_type, es_namespace, es_name)
+        return True
 
-            self._logger.debug(f"Finding All ExternalSecrets that use the AWS {self.provider_type} SecretStores or ClusterSecretStores")
-            # Get all of the ExternalSecret entries within the cluster
-            external_secrets_result = self.k8s_client.list_cluster_custom_object(
+    def _get_external_secret(self, es_namespace: str, es_name: str) -> Optional[dict]:
+        try:
+            return self.k8s_client.get_namespaced_custom_object(
                 group = self.GROUP,
                 version = self.VERSION,
-                plural = self.EXTERNAL_SECRET_PLURAL
+                plural = self.EXTERNAL_SECRET_PLURAL,
+                name = es_name,
+                namespace = es_namespace
             )
-            external_secrets = external_secrets_result.get('items', [])
-            
-            # Filter to only the ExternalSecret that are part of the parameter store names
-            parameter_store_es = [ es for es in external_secrets if es.get('spec', {}).get('secretStoreRef', {}).get('name') in all_parameter_store_names ]
-
-
-            for ps_es in parameter_store_es:
-
-                # Check if this ExternalSecret references the ParameterStore Key
-                data = ps_es.get("spec", {}).get("data", [])
-                key_matching_es = [ x for x in data if x.get("remoteRef", {}).get("key") == key]
-
-                # Means there is more then 0 references to our Key
-                if key_matching_es:
-
-                    # So now we can update this ExternalSecret so that it will be reloaded by ESO
-                    es_name = ps_es['metadata']['name']
-                    es_namespace = ps_es['metadata']['namespace']
+        except ApiException as apie:
+            if apie.status == 404:
+                return None
+            raise
+
+    def reload_many(self, keys, event_times: Optional[dict[str, Optional[datetime]]] = None, locations: Optional[dict[str, tuple[Optional[str], Optional[str]]]] = None, operations: Optional[dict[str, Optional[str]]] = None) -> dict[str, bool]:
+        '''
+        Reload all ExternalSecrets referencing any of the keys, from a single listing of the stores and ExternalSecrets.
+        An ExternalSecret referencing several of the keys is only patched once. A key's reload fails if patching any
+        ExternalSecret referencing it fails. When coalescing, patches are only scheduled, so always count as succeeded.
+        Their results are passed to whatever report_patch_results was given instead
+        '''
+        event_times = event_times or {}
+        locations = locations or {}
+        operations = operations or {}
+        changed_keys = set(keys)
+        outcomes = { key: True for key in changed_keys }
 
-                    patch_payload = self._generate_patch_payload()
+        try:
 
-                    self._logger.info(f"Reloading AWS {self.provider_type} External Secret: {es_namespace}/{es_name}")
-                    self.k8s_client.patch_namespaced_custom_object(
-                        group = self.GROUP,
-                        version = self.VERSION,
-                        plural = self.EXTERNAL_SECRET_PLURAL,
-                        name = es_name,
-                        namespace = es_namespace,
-                        body = patch_payload
-                    )
+            resolver = self._get_store_resolver()
 
-                    self._logger.debug(f"Applying Annotation To AWS {self.provider_type} External Secret: {es_namespace}/{es_name} Successful!")
-                    return True
+            self._logger.debug("Finding All ExternalSecrets that use the AWS %s SecretStores or ClusterSecretStores", self.provider_type)
+            # Get all of the ExternalSecret entries within the cluster
+            external_secrets = self._list_external_secrets()
             
-            # If we made it to here, that means we never found any matching entries, but we did so successfully, so still return True
-            return True
-
-        except ApiException as apie:
-            self._logger.error("Kubernetes API Exception Thrown!", exc_info=apie)
-
-            if apie.status == 404:
-                self._logger.error("\n**HINT:** A 404 error usually means the CRD ('externalsecrets.external-secrets.io') is not installed in the cluster.")
-
-            return False
+            # Filter to only the ExternalSecrets that fetch a changed key from one of the provider's stores that can see
+            # where the key changed (ie. not a same-named parameter in another region), along with which of the changed
+            # keys each references
+            with TRACER.span("reloader.match", external_secrets=len(external_secrets), keys=len(changed_keys)):
+                targets = []
+                pinned = 0
+                for es in external_secrets:
+                    referenced_keys = set()
+                    for key, store_kind, store_name, version in es.references:
+                        if key not in changed_keys or not resolver.can_see_store(store_kind, store_name, es.namespace, *locations.get(key, (None, None))):
+                            continue
+                        if self._is_pinned(version, operations.get(key)):
+                            pinned += 1
+                            continue
+                        referenced_keys.add(key)
+
+                    if referenced_keys:
+                        targets.append((es, referenced_keys))
+
+            if pinned:
+                self._logger.debug("Skipped %d References Pinned To A Version", pinned)
+                self.REFERENCES_PINNED.inc(pinned)
 
         except Exception as e:
             self._logger.error("Kubernetes API Exception", exc_info=e)
 
+            return { key: False for key in changed_keys }
+
+        for es, referenced_keys in targets:
+            es_name = es.name
+            es_namespace = es.namespace
+
+            # Only redundant if it has synced since the latest of the changes it references. Changes without a time
+            # could have happened at any point, so always need a reload
+            referenced_times = [ event_times.get(key) for key in referenced_keys ]
+            if None not in referenced_times and es.is_synced_since(max(referenced_times)):
+                self._logger.info("Skipping AWS %s External Secret: %s/%s. It Has Already Synced Since The Change At %s", self.provider_type, es_namespace, es_name, max(referenced_times))
+                self.PATCHES_SKIPPED.inc()
+                continue
+
+            if self.coalescer is not None:
+                # The oldest change is the one that has waited longest for this patch
+                known_times = [ referenced_time for referenced_time in referenced_times if referenced_time is not None ]
+                self.coalescer.submit(es_namespace, es_name, min(known_times) if known_times else None)
+            elif not self._patch(es_namespace, es_name):
+                for key in referenced_keys:
+                    outcomes[key] = False
+
+        # Keys with no matching ExternalSecrets were still resolved successfully, so stay True
+        return outcomes
+
+    def report_patch_results(self, on_result: Callable[[bool, Optional[datetime]], None]) -> bool:
+        if self.coalescer is None:
             return False
+        self.coalescer.on_result = on_result
+        return True
 
-
+    def is_available(self) -> bool:
+        # A single SecretStore from the watch cache is about the cheapest call that still checks we can list what
+        # reloading needs
+        try:
+            self.k8s_client.list_cluster_custom_object(
+                group = self.GROUP,
+                version = self.VERSION,
+                plural = self.SECRET_STORE_PLURAL,
+                limit = 1,
+                resource_version = "0"
+            )
+        except Exception as e:
+            self._logger.debug("Kubernetes API Server Is Unavailable", exc_info=e)
+            return False
+        return True
+
+    def stop(self):
+        # Pending patches are sent first, which the confirmer then no longer needs to wait on
+        if self.coalescer is not None:
+            self.coalescer.stop()
+        if self.confirmer is not None:
+            self.confirmer.stop()
@@ -0,0 +1,214 @@
+
+
+from external_secrets_reloader.metrics.metrics import METRICS
+from external_secrets_reloader.reloader.reloader import Reloader
+
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from datetime import datetime
+from threading import Condition, Thread
+from typing import Callable, Iterable, Optional
+import logging
+import time
+
+
+class MultiClusterReloader(Reloader):
+    '''
+    Fans each reload out to a reloader per cluster, so one consumer can keep ExternalSecrets in several clusters in
+    sync with the same event source. The clusters are reloaded concurrently, so a reload takes as long as the slowest
+    cluster rather than all of them added together.
+
+    Clusters fail independently. A key counts as reloaded once any cluster has reloaded it, and each cluster that
+    failed is retried on its own from a background thread, every RETRY_INTERVAL_SECONDS doubling up to
+    MAX_RETRY_INTERVAL_SECONDS, until it succeeds. So one unreachable cluster doesn't drop the change, hold up the
+    rest, get the healthy clusters patched again, or open the circuit breaker. A key only fails, and is retried
+    or redelivered like any other failed reload, when no cluster reloaded it. Failures are counted per cluster in
+    esr_cluster_reloads_failed_total
+
+    @param reloaders: Reloader for each cluster, keyed by the cluster's name. ie: its kubeconfig context
+    '''
+
+    RETRY_INTERVAL_SECONDS = 5
+    MAX_RETRY_INTERVAL_SECONDS = 300
+
+    CLUSTER_RELOADS_FAILED = METRICS.counter(
+        "esr_cluster_reloads_failed_total",
+        "Reloads that failed in one cluster, by cluster"
+    )
+    CLUSTER_RELOAD_DURATION = METRICS.histogram(
+        "esr_cluster_reload_duration_seconds",
+        "Time taken to reload changed keys in one cluster, by cluster",
+        buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    )
+    CLUSTER_RELOADS_PENDING_RETRY = METRICS.gauge(
+        "esr_cluster_reloads_pending_retry",
+        "Keys that failed to reload in one cluster while reloading in another, waiting to be retried, by cluster"
+    )
+
+    def __init__(self, reloaders: dict[str, Reloader]):
+        self._logger = logging.getLogger(self.__class__.__name__)
+
+        self.reloaders = reloaders
+        self._executor = ThreadPoolExecutor(max_workers=max(len(reloaders), 1), thread_name_prefix="MultiClusterReloader")
+
+        self._condition = Condition()
+        # cluster -> key -> [monotonic time the retry is due, retry interval, event time, (region, account), operation]
+        self._retries: dict[str, dict[str, list]] = { cluster: dict() for cluster in reloaders }
+        self._stopping = False
+        self._thread: Optional[Thread] = None
+
+    def reload(self, key: str, event_time: Optional[datetime] = None, region: Optional[str] = None, account: Optional[str] = None, operation: Optional[str] = None) -> bool:
+        return self.reload_many([key], { key: event_time }, { key: (region, account) }, { key: operation })[key]
+
+    def reload_many(self, keys: Iterable[str], event_times: Optional[dict[str, Optional[datetime]]] = None, locations: Optional[dict[str, tuple[Optional[str], Optional[str]]]] = None, operations: Optional[dict[str, Optional[str]]] = None) -> dict[str, bool]:
+        keys = list(keys)
+        event_times = event_times or {}
+        locations = locations or {}
+        operations = operations or {}
+
+        # Each cluster runs in a copy of the calling context, so its spans are part of the event's trace
+        futures = {
+            cluster: self._executor.submit(copy_context().run, self._reload_cluster, cluster, reloader, keys, event_times, locations, operations)
+            for cluster, reloader in self.reloaders.items()
+        }
+        results = { cluster: future.result() for cluster, future in futures.items() }
+
+        outcomes = dict()
+        for key in keys:
+            failed = [ cluster for cluster, cluster_outcomes in results.items() if not cluster_outcomes.get(key, False) ]
+            outcomes[key] = len(failed) < len(results)
+
+            with self._condition:
+                for cluster in results:
+                    if cluster not in failed:
+                        # Reloaded with this change, which covers any older one still waiting to be retried
+                        self._retries[cluster].pop(key, None)
+                    elif outcomes[key]:
+                        self._schedule_retry(cluster, key, event_times.get(key), locations.get(key, (None, None)), operations.get(key))
+                self._update_pending()
+        return outcomes
+
+    def _schedule_retry(self, cluster: str, key: str, event_time: Optional[datetime], location: tuple[Optional[str], Optional[str]], operation: Optional[str]):
+        retry = self._retries[cluster].get(key)
+        if retry is not None:
+            # Already waiting. The retry reloads whichever change is newest, and covers every reference either change
+            # could affect. Replaced rather than updated, so a retry already running for the older change doesn't count
+            # as covering this one
+            newest_time = retry[2] if event_time is not None and retry[2] is not None and event_time < retry[2] else event_time
+            self._retries[cluster][key] = [retry[0], retry[1], newest_time, location, operation if operation == retry[4] else None]
+            return
+
+        self._retries[cluster][key] = [time.monotonic() + self.RETRY_INTERVAL_SECONDS, self.RETRY_INTERVAL_SECONDS, event_time, location, operation]
+        self._condition.notify()
+
+    def _update_pending(self):
+        for cluster, retries in self._retries.items():
+            self.CLUSTER_RELOADS_PENDING_RETRY.set(len(retries), cluster=cluster)
+
+    def pending_retry_count(self) -> int:
+        with self._condition:
+            return sum(len(retries) for retries in self._retries.values())
+
+    def _reload_cluster(self, cluster: str, reloader: Reloader, keys: list[str], event_times, locations, operations) -> dict[str, bool]:
+        start = time.monotonic()
+        try:
+            outcomes = reloader.reload_many(keys, event_times, locations, operations)
+        except Exception as e:
+            self._logger.error("Exception Thrown Reloading Cluster %s", cluster, exc_info=e)
+            outcomes = { key: False for key in keys }
+        self.CLUSTER_RELOAD_DURATION.observe(time.monotonic() - start, cluster=cluster)
+
+        failed = [ key for key in keys if not outcomes.get(key, False) ]
+        if failed:
+            self.CLUSTER_RELOADS_FAILED.inc(len(failed), cluster=cluster)
+            self._logger.warning("Reload Failed In Cluster %s For %d Keys", cluster, len(failed))
+        return outcomes
+
+    def _take_due_retries(self) -> tuple[dict[str, dict[str, list]], bool]:
+        # Blocks until at least one retry is due or we are stopping
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                due = {
+                    cluster: { key: retry for key, retry in retries.items() if self._stopping or retry[0] <= now }
+                    for cluster, retries in self._retries.items()
+                }
+                due = { cluster: retries for cluster, retries in due.items() if retries }
+                if due or self._stopping:
+                    return due, self._stopping
+
+                waiting = [ retry[0] for retries in self._retries.values() for retry in retries.values() ]
+                self._condition.wait(min(waiting) - now if waiting else None)
+
+    def retry_due(self) -> bool:
+        '''
+        Retry every cluster's failed keys that are due. Keys that fail again wait twice as long before the next retry
+
+        @return bool: Whether we are stopping
+        '''
+        due, stopping = self._take_due_retries()
+
+        for cluster, retries in due.items():
+            keys = list(retries)
+            outcomes = self._reload_cluster(cluster, self.reloaders[cluster], keys, { key: retries[key][2] for key in keys }, { key: retries[key][3] for key in keys }, { key: retries[key][4] for key in keys })
+
+            with self._condition:
+                for key in keys:
+                    # A newer change may have been reloaded or scheduled since, which takes its place
+                    if self._retries[cluster].get(key) is not retries[key]:
+                        continue
+                    if outcomes.get(key, False):
+                        del self._retries[cluster][key]
+                        continue
+                    retry = retries[key]
+                    retry[1] = min(retry[1] * 2, self.MAX_RETRY_INTERVAL_SECONDS)
+                    retry[0] = time.monotonic() + retry[1]
+                self._update_pending()
+
+        return stopping
+
+    def _run_retries(self):
+        while not self.retry_due():
+            pass
+
+    def start(self):
+        self._thread = Thread(target=self._run_retries, name="MultiClusterReloaderRetries", daemon=True)
+        self._thread.start()
+
+    def report_patch_results(self, on_result: Callable[[bool, Optional[datetime]], None]) -> bool:
+        # Every cluster is told, not just up to the first that defers its patches
+        deferred = [ reloader.report_patch_results(on_result) for reloader in self.reloaders.values() ]
+        return any(deferred)
+
+    def is_available(self) -> bool:
+        '''
+        True once any cluster can be reached, matching how reloads count as succeeded. Clusters that can't be reached
+        are caught up by their retries
+        '''
+        for cluster, reloader in self.reloaders.items():
+            try:
+                if reloader.is_available():
+                    return True
+            except Exception as e:
+                self._logger.debug("Exception Thrown Checking Cluster %s Is Available", cluster, exc_info=e)
+        return False
+
+    def stop(self):
+        # Retries still waiting get one last attempt before the clusters stop
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(30)
+
+        with self._condition:
+            abandoned = { cluster: len(retries) for cluster, retries in self._retries.items() if retries }
+        for cluster, count in abandoned.items():
+            self._logger.error("Reload Of %d Keys Still Failing In Cluster %s On Shutdown. They Will Sync On Their Next refreshInterval", count, cluster)
+
+        for cluster, reloader in self.reloaders.items():
+            try:
+                reloader.stop()
+            except Exception as e:
+                self._logger.error("Exception Thrown Stopping Reloader For Cluster %s", cluster, exc_info=e)
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,153 @@
+
+
+from external_secrets_reloader.metrics.metrics import METRICS
+
+from datetime import datetime
+from threading import Condition, Thread
+from typing import Callable, Optional
+import logging
+import time
+
+
+class PatchCoalescer():
+    '''
+    Debounces force-sync patches per ExternalSecret. The first change to reach an ExternalSecret schedules a patch for
+    interval_seconds later, and any further changes to it in the meantime are folded into that same patch. A burst of
+    related key changes (ie. a whole Parameter Store path being rotated) then causes one ESO reconcile per
+    ExternalSecret rather than one per key.
+
+    Patches are sent from a background thread using the given patch function. Ones that fail are retried after another
+    interval, up to MAX_ATTEMPTS. Anything still pending when stopped is patched straight away.
+
+    As patches go out after the change was handled, the result of every attempt is passed to on_result, if set, along
+    with the time of the oldest change folded into the patch.
+
+    @param interval_seconds: How long to wait for more changes before patching an ExternalSecret
+    @param patch: Called as patch(namespace, name) to patch an ExternalSecret. Returns whether it succeeded
+    @param on_result: Called as on_result(patched, event_time) after each attempt to patch an ExternalSecret
+    '''
+
+    MAX_ATTEMPTS = 3
+
+    PATCHES_COALESCED = METRICS.counter(
+        "esr_reloader_patches_coalesced_total",
+        "Force-sync patches folded into one already scheduled for the same ExternalSecret"
+    )
+    PATCHES_PENDING = METRICS.gauge(
+        "esr_reloader_patches_pending",
+        "Force-sync patches waiting for their coalesce interval to end"
+    )
+
+    def __init__(self, interval_seconds: float, patch: Callable[[str, str], bool], on_result: Optional[Callable[[bool, Optional[datetime]], None]] = None):
+        self._logger = logging.getLogger(self.__class__.__name__)
+
+        self.interval_seconds = interval_seconds
+        self.patch = patch
+        self.on_result = on_result
+
+        self._condition = Condition()
+        # (namespace, name) -> [monotonic time the patch is due, attempts so far, time of the oldest change folded in]
+        self._pending: dict[tuple[str, str], list] = dict()
+        self._stopping = False
+        self._thread: Optional[Thread] = None
+
+    def submit(self, namespace: str, name: str, event_time: Optional[datetime] = None):
+        '''
+        Schedule a patch of the ExternalSecret, unless one is already scheduled
+
+        @param event_time: When the change being patched for happened, if known
+        '''
+        key = (namespace, name)
+        with self._condition:
+            pending = self._pending.get(key)
+            if pending is not None:
+                if event_time is not None and (pending[2] is None or event_time < pending[2]):
+                    pending[2] = event_time
+                self.PATCHES_COALESCED.inc()
+                return
+
+            self._pending[key] = [time.monotonic() + self.interval_seconds, 0, event_time]
+            self.PATCHES_PENDING.set(len(self._pending))
+            self._condition.notify()
+
+    def pending_count(self) -> int:
+        with self._condition:
+            return len(self._pending)
+
+    def retrying_count(self) -> int:
+        '''
+        Pending patches that are retries of ones that failed
+        '''
+        with self._condition:
+            return sum(1 for _, attempts, _ in self._pending.values() if attempts > 0)
+
+    def _take_due(self) -> tuple[list, bool]:
+        # Blocks until at least one patch is due or we are stopping
+        with self._condition:
+            while True:
+                if self._stopping:
+                    due = list(self._pending.items())
+                    self._pending.clear()
+                    break
+
+                now = time.monotonic()
+                due = [ (key, pending) for key, pending in self._pending.items() if pending[0] <= now ]
+                if due:
+                    for key, _ in due:
+                        del self._pending[key]
+                    break
+
+                timeout = min(pending[0] for pending in self._pending.values()) - now if self._pending else None
+                self._condition.wait(timeout)
+
+            self.PATCHES_PENDING.set(len(self._pending))
+            return due, self._stopping
+
+    def _run(self):
+        while True:
+            due, stopping = self._take_due()
+
+            for (namespace, name), (_, attempts, event_time) in due:
+                try:
+                    patched = self.patch(namespace, name)
+                except Exception as e:
+                    self._logger.error("Exception Thrown Patching External Secret %s/%s", namespace, name, exc_info=e)
+                    patched = False
+
+                if self.on_result is not None:
+                    try:
+                        self.on_result(patched, event_time)
+                    except Exception as e:
+                        self._logger.error("Exception Thrown Reporting Patch Result For External Secret %s/%s", namespace, name, exc_info=e)
+
+                if patched or stopping:
+                    continue
+
+                attempts += 1
+                if attempts >= self.MAX_ATTEMPTS:
+                    self._logger.error("Patching External Secret %s/%s Failed %d Times. Giving Up", namespace, name, attempts)
+                    continue
+
+                with self._condition:
+                    # A new change may have scheduled it again already, which covers this retry
+                    if (namespace, name) not in self._pending:
+                        self._pending[(namespace, name)] = [time.monotonic() + self.interval_seconds, attempts, event_time]
+                        self.PATCHES_PENDING.set(len(self._pending))
+
+            if stopping:
+                return
+
+    def start(self):
+        self._thread = Thread(target=self._run, name="PatchCoalescer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout_seconds: float = 30):
+        '''
+        Patch everything still pending, then stop the background thread
+        '''
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+
+        if self._thread is not None:
+            self._thread.join(timeout_seconds)
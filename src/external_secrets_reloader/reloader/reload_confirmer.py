@@ -0,0 +1,186 @@
+
+
+from external_secrets_reloader.cache.external_secret_record import parse_timestamp
+from external_secrets_reloader.metrics.metrics import METRICS
+
+from threading import Condition, Thread
+from typing import Callable, Optional
+import logging
+import time
+
+
+class ReloadConfirmer():
+    '''
+    Follows up on force-sync patches to confirm ESO actually reconciled the ExternalSecret, rather than assuming it
+    did. Each patched ExternalSecret is fetched every poll_interval_seconds until its status.refreshTime reaches the
+    time it was patched, which ESO only updates once the Kubernetes Secret has been synced. The time that took is
+    observed in esr_reload_completion_seconds.
+
+    An ExternalSecret whose Ready condition turns False after the patch failed to reconcile, and is flagged straight
+    away. One that hasn't reconciled within deadline_seconds is patched again, up to MAX_REPATCHES times, in case the
+    patch was missed, and then flagged as timed out. Outcomes are counted in esr_reload_confirmations_total.
+
+    @param fetch: Called as fetch(namespace, name) to get an ExternalSecret. Returns None if it no longer exists
+    @param patch: Called as patch(namespace, name) to force-sync an ExternalSecret again. Returns whether it succeeded
+    @param deadline_seconds: How long ESO has to reconcile a patched ExternalSecret
+    @param poll_interval_seconds: How often unconfirmed ExternalSecrets are checked
+    '''
+
+    MAX_REPATCHES = 2
+
+    COMPLETION_DURATION = METRICS.histogram(
+        "esr_reload_completion_seconds",
+        "Time from force-sync patching an ExternalSecret until ESO reported it synced (status.refreshTime, to the second)",
+        buckets=(1.0, 2.5, 5.0, 10.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+    )
+    CONFIRMATIONS = METRICS.counter(
+        "esr_reload_confirmations_total",
+        "Patched ExternalSecrets by whether ESO confirmed, failed or timed out reconciling them"
+    )
+    REPATCHES = METRICS.counter(
+        "esr_reload_repatches_total",
+        "ExternalSecrets patched again after not reconciling within the confirmation deadline"
+    )
+    UNCONFIRMED = METRICS.gauge(
+        "esr_reloads_unconfirmed",
+        "Patched ExternalSecrets that ESO has not yet confirmed reconciling"
+    )
+
+    def __init__(self, fetch: Callable[[str, str], Optional[dict]], patch: Callable[[str, str], bool], deadline_seconds: float, poll_interval_seconds: float):
+        self._logger = logging.getLogger(self.__class__.__name__)
+
+        self.fetch = fetch
+        self.patch = patch
+        self.deadline_seconds = deadline_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+
+        self._condition = Condition()
+        # (namespace, name) -> [wall time it was patched, monotonic deadline, re-patches so far]
+        self._pending: dict[tuple[str, str], list] = dict()
+        self._stopping = False
+        self._thread: Optional[Thread] = None
+
+    def track(self, namespace: str, name: str, patched_at: float):
+        '''
+        Start waiting for ESO to reconcile a patched ExternalSecret. A newer patch replaces one still being waited on
+
+        @param patched_at: Wall time just before the patch was sent
+        '''
+        with self._condition:
+            self._pending[(namespace, name)] = [patched_at, time.monotonic() + self.deadline_seconds, 0]
+            self.UNCONFIRMED.set(len(self._pending))
+
+    def unconfirmed_count(self) -> int:
+        with self._condition:
+            return len(self._pending)
+
+    @staticmethod
+    def reconcile_outcome(external_secret: dict, patched_at: float) -> tuple[Optional[str], Optional[float]]:
+        '''
+        Whether ESO has reconciled the ExternalSecret since it was patched. refreshTime and lastTransitionTime only
+        have second precision, so anything within the second of the patch counts as after it
+
+        @return tuple[Optional[str], Optional[float]]: ("confirmed", refreshTime), ("failed", None) if the Ready
+            condition turned False since the patch, or (None, None) if it hasn't reconciled yet
+        '''
+        patched_second = float(int(patched_at))
+        status = external_secret.get("status") or {}
+
+        refresh_time = parse_timestamp(status.get("refreshTime"))
+        if refresh_time is not None and refresh_time >= patched_second:
+            return "confirmed", refresh_time
+
+        for condition in status.get("conditions") or []:
+            if condition.get("type") != "Ready" or condition.get("status") != "False":
+                continue
+            transitioned = parse_timestamp(condition.get("lastTransitionTime"))
+            if transitioned is not None and transitioned >= patched_second:
+                return "failed", None
+
+        return None, None
+
+    def _resolve(self, key: tuple[str, str], entry: list, outcome: Optional[str]):
+        with self._condition:
+            # Patched again while being checked, which is waited on in its place
+            if self._pending.get(key) is not entry:
+                return
+            del self._pending[key]
+            self.UNCONFIRMED.set(len(self._pending))
+        if outcome is not None:
+            self.CONFIRMATIONS.inc(outcome=outcome)
+
+    def _check(self, key: tuple[str, str], entry: list):
+        namespace, name = key
+        patched_at, deadline, repatches = entry
+
+        try:
+            external_secret = self.fetch(namespace, name)
+        except Exception as e:
+            # Can't tell either way. Checked again on the next poll, unless the deadline has passed
+            self._logger.debug("Exception Thrown Fetching External Secret %s/%s", namespace, name, exc_info=e)
+        else:
+            if external_secret is None:
+                self._logger.debug("External Secret %s/%s Was Deleted Before Being Reconciled", namespace, name)
+                self._resolve(key, entry, None)
+                return
+
+            outcome, refresh_time = self.reconcile_outcome(external_secret, patched_at)
+            if outcome == "confirmed":
+                self.COMPLETION_DURATION.observe(max(refresh_time - patched_at, 0))
+                self._logger.debug("External Secret %s/%s Reconciled After Being Patched", namespace, name)
+                self._resolve(key, entry, outcome)
+                return
+            if outcome == "failed":
+                self._logger.error("External Secret %s/%s Failed To Reconcile After Being Patched", namespace, name)
+                self._resolve(key, entry, outcome)
+                return
+
+        if time.monotonic() < deadline:
+            return
+
+        if repatches >= self.MAX_REPATCHES:
+            self._logger.error("External Secret %s/%s Was Not Reconciled Within %s Seconds After %d Patches. Giving Up", namespace, name, self.deadline_seconds, repatches + 1)
+            self._resolve(key, entry, "timed_out")
+            return
+
+        self._logger.warning("External Secret %s/%s Was Not Reconciled Within %s Seconds. Patching Again", namespace, name, self.deadline_seconds)
+        try:
+            patched = self.patch(namespace, name)
+        except Exception as e:
+            self._logger.error("Exception Thrown Patching External Secret %s/%s", namespace, name, exc_info=e)
+            patched = False
+        if patched:
+            self.REPATCHES.inc()
+
+        # Still waiting on a sync since the original patch, which the new one only nudges along
+        with self._condition:
+            if self._pending.get(key) is entry:
+                entry[1] = time.monotonic() + self.deadline_seconds
+                entry[2] = repatches + 1
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._stopping:
+                    self._condition.wait(self.poll_interval_seconds)
+                if self._stopping:
+                    return
+                pending = list(self._pending.items())
+
+            for key, entry in pending:
+                self._check(key, entry)
+
+    def start(self):
+        self._thread = Thread(target=self._run, name="ReloadConfirmer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout_seconds: float = 30):
+        '''
+        Stop checking. ExternalSecrets still unconfirmed are left to ESO
+        '''
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+
+        if self._thread is not None:
+            self._thread.join(timeout_seconds)
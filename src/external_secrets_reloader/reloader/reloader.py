@@ -1,8 +1,72 @@
 
 from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Callable, Iterable, Optional
 
 class Reloader(ABC):
 
     @abstractmethod
-    def reload(key:str) -> bool:
-        ...
\ No newline at end of file
+    def reload(self, key:str, event_time: Optional[datetime] = None, region: Optional[str] = None, account: Optional[str] = None, operation: Optional[str] = None) -> bool:
+        '''
+        Reload all ExternalSecrets that reference the given key
+
+        @param key: The key in the external source that has changed
+        @param event_time: When the change happened. If provided, ExternalSecrets that have already synced since
+            this time can be skipped
+        @param region: Region of the changed key. If provided, ExternalSecrets whose store reads from another region
+            can be skipped
+        @param account: Account of the changed key. If provided, ExternalSecrets whose store reads from another
+            account can be skipped
+        @param operation: The operation that changed the key, if known. ie: LabelParameterVersion. If provided,
+            references to versions the operation can't affect can be skipped
+        @return bool: True if the reload completed (even if nothing needed reloading), False if it failed
+        '''
+        ...
+
+    def reload_many(self, keys: Iterable[str], event_times: Optional[dict[str, Optional[datetime]]] = None, locations: Optional[dict[str, tuple[Optional[str], Optional[str]]]] = None, operations: Optional[dict[str, Optional[str]]] = None) -> dict[str, bool]:
+        '''
+        Reload all ExternalSecrets that reference any of the given keys. Reloaders that can resolve several keys at once
+        should override this. By default each key is reloaded on its own.
+
+        The event handler reloads events received together (see SQS_RECEIVE_BATCH_SIZE) through this, and acknowledges
+        each by its own key's outcome
+
+        @param keys: The keys in the external source that have changed
+        @param event_times: When each key changed, if known. See reload
+        @param locations: The (region, account) each key changed in, if known. See reload
+        @param operations: The operation that changed each key, if known. See reload
+        @return dict[str, bool]: Whether the reload completed for each key
+        '''
+        event_times = event_times or {}
+        locations = locations or {}
+        operations = operations or {}
+        outcomes = dict()
+        for key in keys:
+            region, account = locations.get(key, (None, None))
+            outcomes[key] = self.reload(key, event_time=event_times.get(key), region=region, account=account, operation=operations.get(key))
+        return outcomes
+
+    def report_patch_results(self, on_result: Callable[[bool, Optional[datetime]], None]) -> bool:
+        '''
+        Have the results of patches sent after reload has already returned (ie. when coalescing) passed to on_result,
+        as on_result(patched, event_time), where event_time is when the oldest change in the patch happened, if known.
+        Reloaders that patch before reload returns have nothing to report, as reload's result already covers it
+
+        @return bool: True if patches are sent after reload returns, so reload succeeding only means they were scheduled
+        '''
+        return False
+
+    def is_available(self) -> bool:
+        '''
+        Cheaply check whether whatever the reloader reloads through (ie. the Kubernetes API server) can be reached.
+        Used to probe for recovery while the circuit breaker is open
+
+        @return bool: True if reloads could succeed right now
+        '''
+        return True
+
+    def stop(self):
+        '''
+        Finish any work the reloader has deferred and stop anything it runs in the background. Called on shutdown
+        '''
+        pass
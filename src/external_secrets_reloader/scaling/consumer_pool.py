@@ -0,0 +1,136 @@
+
+
+from external_secrets_reloader.event_handler.eso_event_handler import ESOEventHandler
+from external_secrets_reloader.metrics.metrics import METRICS
+from external_secrets_reloader.processors.sqs_processor import SQSProcessor
+
+from threading import Event, Lock, Thread
+from typing import Callable, Optional
+import logging
+import math
+
+
+class ConsumerPool():
+    '''
+    Scales the number of consumers of the SQS queue with how many messages are waiting in it. Every interval_seconds
+    the queue depth is sampled and the pool is resized to one consumer per messages_per_consumer waiting messages,
+    within min_consumers and max_consumers. Each consumer receives and reloads its own events, so both receiving and
+    reloading scale together.
+
+    The process's main loop always runs one consumer of its own, which counts towards the bounds. The pool runs the
+    rest, each on its own thread with its own event handler from consumer_factory. Scaling up happens straight away
+    so backlogs start draining sooner, while scaling down removes one consumer per sample so a briefly empty queue
+    doesn't undo it. A removed consumer finishes handling its current event before exiting.
+
+    Every sample is also published as metrics, so with max_consumers of 1 the pool only reports the queue depth for
+    pod level autoscaling.
+
+    @param sqs_processor: Used to sample the queue depth
+    @param consumer_factory: Creates the event handler of a new consumer
+    @param interval_seconds: Seconds between queue depth samples
+    '''
+
+    CONSUMERS_ACTIVE = METRICS.gauge(
+        "esr_sqs_consumers_active",
+        "Consumers receiving and reloading events from the SQS queue, including the main loop"
+    )
+
+    def __init__(self, sqs_processor: SQSProcessor, consumer_factory: Callable[[], ESOEventHandler], min_consumers: int, max_consumers: int, messages_per_consumer: int, interval_seconds: float):
+        self._logger = logging.getLogger(self.__class__.__name__)
+
+        self.sqs_processor = sqs_processor
+        self.consumer_factory = consumer_factory
+        self.min_consumers = min_consumers
+        self.max_consumers = max_consumers
+        self.messages_per_consumer = messages_per_consumer
+        self.interval_seconds = interval_seconds
+
+        self._lock = Lock()
+        # Threads of the consumers run by the pool, newest last, along with the event that stops each one
+        self._consumers: list[tuple[Thread, Event]] = list()
+        self._stop_event = Event()
+        self._thread: Optional[Thread] = None
+        self._next_consumer_id = 1
+
+    def consumer_count(self) -> int:
+        '''
+        Number of consumers, including the main loop's
+        '''
+        with self._lock:
+            return len(self._consumers) + 1
+
+    def desired_consumers(self, visible: int) -> int:
+        wanted = math.ceil(visible / self.messages_per_consumer)
+        return max(self.min_consumers, min(self.max_consumers, wanted))
+
+    def _run_consumer(self, event_handler: ESOEventHandler, stop_event: Event):
+        while not stop_event.is_set():
+            try:
+                event_handler.poll_for_events()
+            except Exception as e:
+                self._logger.error("Exception Thrown Handling Event In Consumer. Continuing", exc_info=e)
+                stop_event.wait(1)
+
+    def _add_consumer(self):
+        event_handler = self.consumer_factory()
+        stop_event = Event()
+        thread = Thread(target=self._run_consumer, args=(event_handler, stop_event), name=f"SQSConsumer-{self._next_consumer_id}", daemon=True)
+        self._next_consumer_id += 1
+
+        thread.start()
+        self._consumers.append((thread, stop_event))
+
+    def scale(self, visible: int):
+        '''
+        Resize the pool for the given number of waiting messages
+        '''
+        desired = self.desired_consumers(visible)
+
+        with self._lock:
+            current = len(self._consumers) + 1
+            if desired > current:
+                self._logger.info("%s Messages Waiting. Scaling Up From %s To %s Consumers", visible, current, desired)
+                for _ in range(desired - current):
+                    self._add_consumer()
+            elif desired < current:
+                self._logger.info("%s Messages Waiting. Scaling Down From %s To %s Consumers", visible, current, current - 1)
+                _, stop_event = self._consumers.pop()
+                stop_event.set()
+
+            self.CONSUMERS_ACTIVE.set(len(self._consumers) + 1)
+
+    def sample(self):
+        depth = self.sqs_processor.sample_queue_depth()
+        if depth is not None:
+            visible, _ = depth
+            self.scale(visible)
+
+    def start(self):
+        def run():
+            self.sample()
+            while not self._stop_event.wait(self.interval_seconds):
+                self.sample()
+
+        self.CONSUMERS_ACTIVE.set(1)
+        self._thread = Thread(target=run, name="ConsumerPool", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout_seconds: float = 30):
+        '''
+        Stop sampling and stop every consumer, waiting for them to finish the event they are handling
+        '''
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout_seconds)
+
+        with self._lock:
+            consumers = self._consumers
+            self._consumers = list()
+
+        for _, stop_event in consumers:
+            stop_event.set()
+        for thread, _ in consumers:
+            # A consumer may be part way through a long poll of the queue
+            thread.join(timeout_seconds)
+
+        self.CONSUMERS_ACTIVE.set(1)
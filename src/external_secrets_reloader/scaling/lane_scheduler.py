@@ -0,0 +1,90 @@
+
+
+from external_secrets_reloader.metrics.metrics import METRICS
+
+from queue import Queue
+from threading import Lock, Thread
+from typing import Callable, Optional
+import logging
+import time
+import zlib
+
+
+class LaneScheduler():
+    '''
+    Runs work across a fixed number of lanes, each a thread working through its own queue in order. Work is assigned
+    to a lane by hashing its lane key, so all work for the same key (ie. a secret, or a FIFO message group) runs one at
+    a time in the order it was submitted, while work for different keys runs in parallel.
+
+    Each lane's queue is bounded, so once a lane falls behind submitting to it blocks rather than buffering without
+    limit.
+
+    @param lane_count: Number of lanes, and so the most work that runs at once
+    @param lane_queue_size: Most work waiting in each lane before submit blocks
+    '''
+
+    EVENTS_PENDING = METRICS.gauge(
+        "esr_lane_events_pending",
+        "Events handed to a lane that haven't finished being handled"
+    )
+
+    def __init__(self, lane_count: int, lane_queue_size: int = 100):
+        self._logger = logging.getLogger(self.__class__.__name__)
+
+        self.lane_count = lane_count
+        self._lanes: list[Queue] = [ Queue(maxsize=lane_queue_size) for _ in range(lane_count) ]
+        self._threads: list[Thread] = list()
+
+        self._pending_lock = Lock()
+        self._pending = 0
+
+    def lane_for(self, lane_key: str) -> int:
+        # crc32 rather than hash() so a key maps to the same lane in every process
+        return zlib.crc32(lane_key.encode("utf-8")) % self.lane_count
+
+    def _set_pending(self, change: int):
+        with self._pending_lock:
+            self._pending += change
+            self.EVENTS_PENDING.set(self._pending)
+
+    def pending_count(self) -> int:
+        with self._pending_lock:
+            return self._pending
+
+    def submit(self, lane_key: str, work: Callable[[], None]):
+        '''
+        Queue work on the lane for the key. Blocks while that lane's queue is full
+        '''
+        self._set_pending(1)
+        self._lanes[self.lane_for(lane_key)].put(work)
+
+    def _run_lane(self, lane: Queue):
+        while True:
+            work: Optional[Callable[[], None]] = lane.get()
+            if work is None:
+                return
+
+            try:
+                work()
+            except Exception as e:
+                self._logger.error("Exception Thrown Handling Event In Lane. Continuing", exc_info=e)
+            finally:
+                self._set_pending(-1)
+
+    def start(self):
+        for lane_id, lane in enumerate(self._lanes):
+            thread = Thread(target=self._run_lane, args=(lane,), name=f"Lane-{lane_id}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout_seconds: float = 60):
+        '''
+        Finish the work already queued on every lane, then stop them
+        '''
+        for lane in self._lanes:
+            lane.put(None)
+
+        deadline = time.monotonic() + timeout_seconds
+        for thread in self._threads:
+            thread.join(max(0, deadline - time.monotonic()))
+        self._threads.clear()
@@ -21,14 +21,56 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
+    EVENT_TRANSPORT: Literal["SQS", "HTTP"] = Field(default="SQS", description="How events are received. SQS polls SQS_QUEUE_URL, HTTP accepts events pushed to PUSH_PORT")
     SQS_QUEUE_URL: str | None = None
     SQS_QUEUE_WAIT_TIME: int | None = Field(gt=0, le=20, default=10, description="Amount of Time SQS Client Will Wait For Events Before Timeout. App will check whether to continue between timeouts")
+    SQS_RECEIVE_BATCH_SIZE: int = Field(ge=1, le=10, default=1, description="Most messages received from SQS at once. Messages received together are reloaded together, and each is only deleted once its own key has reloaded")
+    SQS_DEPTH_SAMPLE_INTERVAL: int = Field(ge=0, default=0, description="Seconds between samples of the SQS queue depth, which is published as a metric and used to scale consumers. Requires sqs:GetQueueAttributes. 0 disables sampling")
+    SQS_MIN_CONSUMERS: int = Field(ge=1, default=1, description="Fewest consumers of the SQS queue per process")
+    SQS_MAX_CONSUMERS: int = Field(ge=1, default=1, description="Most consumers of the SQS queue per process. 1 disables scaling")
+    SQS_MESSAGES_PER_CONSUMER: int = Field(ge=1, default=10, description="Waiting messages per consumer when scaling consumers with the queue depth")
+    EVENT_LANES: int = Field(ge=0, default=0, description="Lanes reloads are run on in parallel. Events for the same FIFO message group, or otherwise the same key, always run on the same lane in order. 0 reloads on the consumer that received the event")
+    PUSH_PORT: int = Field(ge=1024, lt=65535, default=8081, description="Port pushed events are accepted on when EVENT_TRANSPORT is HTTP")
+    PUSH_SHARED_SECRET: str | None = Field(default=None, description="Secret pushed events must present in PUSH_AUTH_HEADER")
+    PUSH_AUTH_HEADER: str = Field(default="x-api-key", description="Header pushed events present PUSH_SHARED_SECRET in")
+    PUSH_QUEUE_SIZE: int = Field(ge=1, default=1000, description="Most pushed events held in memory waiting to be handled. Pushes are rejected with a 429 once full")
 
     EVENT_SOURCE: Literal["AWS"]
     EVENT_SERVICE: Literal["ParameterStore", "SecretsManager"]
 
     HEALTH_CHECK_PORT: int = Field(ge=1024, lt=65535, default=8080, description="Port the Health Check Endpoints Are Served Over")
     LOG_LEVEL: Literal["DEBUG", "INFO", "WARN", "ERROR"] = "INFO"
+    LOG_QUEUE_SIZE: int = Field(ge=100, default=10000, description="Max log records waiting to be written. Records are dropped once full rather than blocking")
+    LOG_RATE_LIMIT: int = Field(ge=0, default=0, description="Max times the same INFO or DEBUG log line may be logged per LOG_RATE_LIMIT_INTERVAL. 0 disables rate limiting")
+    LOG_RATE_LIMIT_INTERVAL: int = Field(gt=0, default=60, description="Window in seconds LOG_RATE_LIMIT applies to")
+    WORKER_PROCESSES: int | None = Field(ge=1, default=None, description="Number of worker processes consuming events. Defaults to the number of CPUs available, or 1 with CACHE_ENABLED. 1 runs everything in a single process")
+    PROFILING_ENDPOINTS_ENABLED: bool = Field(default=False, description="Serve on demand CPU, memory and thread dump endpoints from the health check server")
+
+    TRACING_EXPORTER: Literal["none", "file", "otlp"] = Field(default="none", description="Where per event traces are exported to")
+    TRACING_FILE_PATH: str | None = Field(default=None, description="File traces are appended to as OTLP/JSON lines when TRACING_EXPORTER is file")
+    TRACING_OTLP_ENDPOINT: str | None = Field(default=None, description="Base URL of an OTLP/HTTP collector when TRACING_EXPORTER is otlp. ie: http://otel-collector:4318")
+    TRACING_SAMPLE_RATE: float = Field(ge=0, le=1, default=1.0, description="Fraction of events that are traced")
+
+    RELOAD_OPERATIONS: str | None = Field(default=None, description="Comma separated operations that cause a reload. ie: Create,Update for ParameterStore. Events for other operations are dropped. Defaults to the operations that change a value for the EVENT_SERVICE")
+    ROTATION_HOLD_TIMEOUT: int = Field(ge=0, default=300, description="Seconds to hold the events of an in progress Secrets Manager rotation waiting for AWSCURRENT to move, before reloading anyway. 0 reloads on every event")
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = Field(ge=0, default=5, description="Reload attempts in a row that have to fail before event consumption is paused until the Kubernetes API server is reachable again. 0 disables the circuit breaker")
+    CIRCUIT_BREAKER_PROBE_INTERVAL: float = Field(gt=0, default=10, description="Seconds between probes of the Kubernetes API server while the circuit breaker is open")
+    RELOAD_COALESCE_INTERVAL: float = Field(ge=0, default=0, description="Seconds to wait for more changes to an ExternalSecret's keys before patching it, so a burst of changes causes one reconcile. 0 patches straight away")
+
+    KUBE_CONTEXTS: str | None = Field(default=None, description="Comma separated kubeconfig contexts of the clusters to reload ExternalSecrets in. Unset reloads the cluster ESR runs in")
+
+    RELOAD_CONFIRM_DEADLINE: float = Field(ge=0, default=0, description="Seconds ESO has to reconcile a patched ExternalSecret (status.refreshTime reaching the patch) before it is patched again, then flagged. 0 doesn't follow up on patches")
+    RELOAD_CONFIRM_POLL_INTERVAL: float = Field(gt=0, default=5, description="Seconds between checks of ExternalSecrets that have been patched but not yet reconciled")
+
+    FRESHNESS_SLO: float = Field(ge=0, default=0, description="Seconds a change should take from happening in AWS to being reloaded. /health reports degraded while the median of recent reloads is over it. 0 disables")
+
+    STATUS_RELOAD_HISTORY: int = Field(ge=1, default=100, description="How many of the most recent reload outcomes /status shows")
+
+    CACHE_ENABLED: bool = Field(default=False, description="Keep a watch driven index of SecretStores, ClusterSecretStores and ExternalSecrets instead of listing them on every event")
+    CACHE_SNAPSHOT_PATH: str | None = Field(default=None, description="File the index is periodically snapshotted to, and loaded from on startup. Should be on an emptyDir so it survives container restarts")
+    CACHE_SNAPSHOT_INTERVAL: int = Field(ge=5, default=60, description="Seconds between index snapshots. Snapshots are only written if the index has changed")
+    LIST_FROM_WATCH_CACHE: bool = Field(default=False, description="Serve the lists made on every event from the API server's watch cache (resourceVersion=0, then NotOlderThan the last list) instead of quorum reads from etcd")
+    STREAMING_LIST_ENABLED: bool = Field(default=False, description="Decode list responses from the API server one object at a time as they are read, keeping only the fields the reloader needs, instead of decoding the whole response at once")
 
 
     @model_validator(mode='after')
@@ -44,8 +86,31 @@ class Settings(BaseSettings):
                     f"Must be one of: {valid_aws_services}"
                 )
             
-            # 2. Required Fields Check: SQS settings are mandatory for AWS
-            if self.SQS_QUEUE_URL is None:
+            # 2. Required Fields Check: SQS settings are mandatory for AWS, unless events are pushed to us
+            if self.EVENT_TRANSPORT == "SQS" and self.SQS_QUEUE_URL is None:
                 raise ValueError("SQS_QUEUE_URL is required when EVENT_CLOUD='AWS'.")
+
+        if self.TRACING_EXPORTER == "file" and self.TRACING_FILE_PATH is None:
+            raise ValueError("TRACING_FILE_PATH is required when TRACING_EXPORTER='file'.")
+
+        if self.TRACING_EXPORTER == "otlp" and self.TRACING_OTLP_ENDPOINT is None:
+            raise ValueError("TRACING_OTLP_ENDPOINT is required when TRACING_EXPORTER='otlp'.")
+
+        if self.EVENT_TRANSPORT == "HTTP":
+            if self.PUSH_SHARED_SECRET is None:
+                raise ValueError("PUSH_SHARED_SECRET is required when EVENT_TRANSPORT='HTTP'.")
+            if self.PUSH_PORT == self.HEALTH_CHECK_PORT:
+                raise ValueError("PUSH_PORT must be different to HEALTH_CHECK_PORT.")
+            if self.WORKER_PROCESSES is not None and self.WORKER_PROCESSES > 1:
+                raise ValueError("WORKER_PROCESSES can't be more than 1 when EVENT_TRANSPORT='HTTP'.")
+
+        if self.SQS_MAX_CONSUMERS < self.SQS_MIN_CONSUMERS:
+            raise ValueError("SQS_MAX_CONSUMERS must be greater than or equal to SQS_MIN_CONSUMERS.")
+
+        if self.CACHE_SNAPSHOT_PATH is not None and not self.CACHE_ENABLED:
+            raise ValueError("CACHE_SNAPSHOT_PATH requires CACHE_ENABLED to be true.")
+
+        if self.KUBE_CONTEXTS is not None and not [ context for context in self.KUBE_CONTEXTS.split(",") if context.strip() ]:
+            raise ValueError("KUBE_CONTEXTS must name at least one kubeconfig context.")
         
         return self
\ No newline at end of file
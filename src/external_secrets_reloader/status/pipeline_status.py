@@ -0,0 +1,123 @@
+
+
+from collections import deque
+from datetime import datetime, timezone
+from itertools import count
+from threading import Lock
+from typing import Callable, Optional
+import logging
+import time
+
+
+class PipelineStatus():
+    '''
+    Point in time view of what the event pipeline is doing, served as JSON on /status. Shows the events currently
+    being reloaded and how long they have been in flight, the outcomes of the most recent reloads, and a section per
+    registered component (ie. the SQS processor's current wait time, or the index's sizes).
+
+    Recording is kept off the hot path's critical section. In flight events are a dict and recent reloads a
+    fixed size ring buffer, both updated without a lock (single dict and deque operations are atomic). Component
+    sections are only collected when the status is rendered.
+
+    @param history_size: How many of the most recent reload outcomes are kept
+    '''
+
+    def __init__(self, history_size: int = 100):
+        self._logger = logging.getLogger(self.__class__.__name__)
+
+        self._providers_lock = Lock()
+        self._providers: dict[str, Callable[[], dict]] = dict()
+
+        self._tokens = count()
+        # token -> (key, monotonic time it was received, epoch time the change happened, or it was received if unknown)
+        self._in_flight: dict[int, tuple[str, float, float]] = dict()
+        # (wall time it finished, key, outcome, duration seconds, attempts)
+        self._reloads: deque = deque(maxlen=history_size)
+
+    def configure(self, history_size: int):
+        '''
+        Change how many reload outcomes are kept. The most recent ones already recorded are carried over
+        '''
+        self._reloads = deque(self._reloads, maxlen=history_size)
+
+    def register(self, name: str, provider: Callable[[], dict]):
+        '''
+        Add a section to the status. The provider is called each time the status is rendered
+        '''
+        with self._providers_lock:
+            self._providers[name] = provider
+
+    def unregister(self, name: str):
+        with self._providers_lock:
+            self._providers.pop(name, None)
+
+    def begin(self, key: str, event_time: Optional[datetime] = None) -> int:
+        '''
+        Record an event for the key as in flight
+
+        @param event_time: When the change happened, if known
+        @return int: Token to pass to end once the event has been handled
+        '''
+        token = next(self._tokens)
+        self._in_flight[token] = (key, time.monotonic(), event_time.timestamp() if event_time is not None else time.time())
+        return token
+
+    def end(self, token: int):
+        self._in_flight.pop(token, None)
+
+    def oldest_change_age(self) -> Optional[float]:
+        '''
+        How long ago the oldest change still in flight happened, or was received if its event didn't say
+
+        @return Optional[float]: Seconds, or None if nothing is in flight
+        '''
+        changed = [ changed_at for _, _, changed_at in list(self._in_flight.values()) ]
+        if not changed:
+            return None
+        return max(time.time() - min(changed), 0)
+
+    def record_reload(self, key: str, outcome: str, duration_seconds: float, attempts: int):
+        '''
+        Add the outcome of a reload to the ring buffer, pushing out the oldest once full
+
+        @param outcome: ie. succeeded, failed or deferred
+        '''
+        self._reloads.append((time.time(), key, outcome, duration_seconds, attempts))
+
+    def snapshot(self) -> dict:
+        '''
+        Render the current status into plain, JSON serializable structures
+        '''
+        now = time.monotonic()
+        # Copied in one go, which can't be interrupted by another thread changing them
+        in_flight = sorted(list(self._in_flight.values()), key=lambda item: item[1])
+        reloads = list(self._reloads)
+
+        status = {
+            "in_flight": [ { "key": key, "age_seconds": round(now - received, 3) } for key, received, _ in in_flight ],
+            "recent_reloads": [
+                {
+                    "finished_at": datetime.fromtimestamp(finished, timezone.utc).isoformat(),
+                    "key": key,
+                    "outcome": outcome,
+                    "duration_seconds": round(duration, 3),
+                    "attempts": attempts,
+                }
+                for finished, key, outcome, duration, attempts in reversed(reloads)
+            ],
+        }
+
+        with self._providers_lock:
+            providers = list(self._providers.items())
+        for name, provider in providers:
+            try:
+                status[name] = provider()
+            except Exception as e:
+                self._logger.warning("Exception Thrown Collecting %s Status", name, exc_info=e)
+                status[name] = { "error": str(e) }
+
+        return status
+
+
+# Shared status used across the application
+PIPELINE_STATUS = PipelineStatus()
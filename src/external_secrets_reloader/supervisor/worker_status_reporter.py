@@ -0,0 +1,59 @@
+
+
+from external_secrets_reloader.health_check.health_status import HealthStatus
+from external_secrets_reloader.metrics.metrics import METRICS
+from external_secrets_reloader.status.pipeline_status import PIPELINE_STATUS
+
+from threading import Event, Thread
+from typing import Optional
+import logging
+
+
+class WorkerStatusReporter():
+    '''
+    Runs inside a worker process and periodically sends its health, readiness, metrics and pipeline status to the
+    WorkerSupervisor, so the supervisor can serve them from the one health and metrics endpoint for the whole pod
+    '''
+
+    def __init__(self, worker_id: int, health_status: HealthStatus, status_queue, interval_seconds: float = 2):
+        self._logger = logging.getLogger(self.__class__.__name__)
+
+        self.worker_id = worker_id
+        self.health_status = health_status
+        self.status_queue = status_queue
+        self.interval_seconds = interval_seconds
+
+        self._stop_event = Event()
+        self._thread: Optional[Thread] = None
+
+    def report(self):
+        try:
+            self.status_queue.put({
+                "worker_id": self.worker_id,
+                "healthy": self.health_status.is_healthy(),
+                "ready": self.health_status.is_ready(),
+                "error": self.health_status.get_error_message(),
+                "degraded": self.health_status.get_degraded_reason(),
+                "metrics": METRICS.snapshot(),
+                "status": PIPELINE_STATUS.snapshot(),
+            })
+        except Exception as e:
+            self._logger.error("Exception Thrown Reporting Worker Status To The Supervisor", exc_info=e)
+
+    def start(self):
+        def run():
+            self.report()
+            while not self._stop_event.wait(self.interval_seconds):
+                self.report()
+
+        self._thread = Thread(target=run, name="WorkerStatusReporter", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        '''
+        Stop the periodic reports and send a final one so the supervisor has the worker's last metrics
+        '''
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.report()
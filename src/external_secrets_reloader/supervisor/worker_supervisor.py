@@ -0,0 +1,210 @@
+
+
+from external_secrets_reloader.health_check.health_status import HealthStatus
+from external_secrets_reloader.metrics.metrics import METRICS, Gauge, MetricsRegistry
+
+from queue import Empty
+from threading import Lock
+from typing import Callable, Optional
+import logging
+import multiprocessing
+import os
+import time
+
+
+def available_cpu_count() -> int:
+    '''
+    Number of CPUs this process may actually use. Inside a container the cgroup CPU limit is usually much lower than
+    the number of CPUs on the node, so that is respected when there is one
+    '''
+    cpu_count = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+
+    try:
+        # cgroup v2. ie: "200000 100000" for a limit of 2 CPUs, or "max 100000" for no limit
+        with open("/sys/fs/cgroup/cpu.max") as cpu_max:
+            quota, period = cpu_max.read().split()
+        if quota != "max":
+            cpu_count = min(cpu_count, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+
+    return max(1, cpu_count)
+
+
+class WorkerSupervisor():
+    '''
+    Runs and watches over a set of worker processes, each running its own independent event pipeline. Workers report
+    their health, readiness and metrics back over a queue, which are aggregated here so the pod still has a single
+    health and metrics endpoint. Workers that exit are restarted. A worker that exited unhealthy keeps the pod
+    unhealthy until the worker restarted in its place is healthy and ready.
+
+    Workers are started with the spawn start method so that each one initializes settings, logging and signal
+    handling from scratch, rather than inheriting copies of the supervisor's threads and locks.
+
+    The worker target is called as worker_target(worker_id, status_queue, stop_event, *worker_args) and must be
+    importable at the module level. worker_args are passed to every worker, so must be picklable (ie. multiprocessing
+    Manager proxies to share state between them).
+    '''
+
+    RESTART_DELAY_SECONDS = 5
+
+    WORKER_RESTARTS = METRICS.counter(
+        "esr_worker_restarts_total",
+        "Worker processes restarted after exiting unexpectedly"
+    )
+    WORKERS_ALIVE = METRICS.gauge(
+        "esr_workers_alive",
+        "Worker processes currently running"
+    )
+
+    def __init__(self, worker_count: int, worker_target: Callable, health_status: HealthStatus, worker_args: tuple = ()):
+        self._logger = logging.getLogger(self.__class__.__name__)
+
+        self.worker_count = worker_count
+        self.worker_target = worker_target
+        self.health_status = health_status
+        self.worker_args = worker_args
+
+        self._context = multiprocessing.get_context("spawn")
+        self._status_queue = self._context.Queue()
+        self._stop_event = self._context.Event()
+
+        self._processes: dict[int, multiprocessing.Process] = dict()
+        self._exited_at: dict[int, float] = dict()
+
+        self._lock = Lock()
+        # Latest report from each worker
+        self._reports: dict[int, dict] = dict()
+        # Last failure of each worker that exited unhealthy, kept until the worker started in its place is healthy
+        self._failures: dict[int, dict] = dict()
+        # Counters and histograms from workers that have since exited, so restarts don't make totals go backwards
+        self._retired_metrics = MetricsRegistry()
+
+    def _start_worker(self, worker_id: int):
+        process = self._context.Process(
+            target=self.worker_target,
+            args=(worker_id, self._status_queue, self._stop_event, *self.worker_args),
+            name=f"esr-worker-{worker_id}",
+            daemon=False
+        )
+        process.start()
+        self._processes[worker_id] = process
+        self._exited_at.pop(worker_id, None)
+        self._logger.info(f"Started Worker {worker_id} With PID {process.pid}")
+
+    def start(self):
+        self._logger.info(f"Starting {self.worker_count} Worker Processes")
+        for worker_id in range(self.worker_count):
+            self._start_worker(worker_id)
+
+    def _drain_reports(self, timeout_seconds: float):
+        try:
+            report = self._status_queue.get(timeout=timeout_seconds)
+            while True:
+                with self._lock:
+                    self._reports[report["worker_id"]] = report
+                    # A worker reports healthy before it has initialized, so only once it is also ready has it
+                    # got past whatever the last one failed on
+                    if report["healthy"] and report["ready"]:
+                        self._failures.pop(report["worker_id"], None)
+                report = self._status_queue.get_nowait()
+        except Empty:
+            pass
+
+    def _retire(self, worker_id: int, exitcode: Optional[int]):
+        with self._lock:
+            report = self._reports.pop(worker_id, None)
+            if report is not None:
+                cumulative = [ entry for entry in report["metrics"] if entry["type"] != Gauge.TYPE ]
+                self._retired_metrics.merge(cumulative)
+
+            if report is not None and not report["healthy"]:
+                self._failures[worker_id] = report
+            elif exitcode and not self._stop_event.is_set():
+                self._failures[worker_id] = { "worker_id": worker_id, "healthy": False, "error": f"Exited With Code {exitcode}" }
+
+    def poll(self, timeout_seconds: float = 1):
+        '''
+        Collect worker reports, restart any workers that have exited and update the aggregated health status. Should
+        be called in a loop by the supervising process
+        '''
+        self._drain_reports(timeout_seconds)
+
+        alive = 0
+        for worker_id, process in list(self._processes.items()):
+            if process.is_alive():
+                alive += 1
+                continue
+
+            if worker_id not in self._exited_at:
+                self._logger.error(f"Worker {worker_id} Exited With Code {process.exitcode}. Restarting In {self.RESTART_DELAY_SECONDS} Seconds")
+                self._exited_at[worker_id] = time.monotonic()
+                # Pick up anything it reported on its way out before folding it into the retired totals
+                self._drain_reports(0)
+                self._retire(worker_id, process.exitcode)
+
+            if not self._stop_event.is_set() and time.monotonic() - self._exited_at[worker_id] >= self.RESTART_DELAY_SECONDS:
+                self.WORKER_RESTARTS.inc()
+                self._start_worker(worker_id)
+
+        self.WORKERS_ALIVE.set(alive)
+        self._update_health_status()
+
+    def _update_health_status(self):
+        with self._lock:
+            reports = dict(self._reports)
+            failures = dict(self._failures)
+
+        unhealthy = [ report for report in reports.values() if not report["healthy"] ]
+        # Workers stuck restarting never stay up long enough to report unhealthy themselves
+        unhealthy += [ failure for worker_id, failure in failures.items() if worker_id not in reports or reports[worker_id]["healthy"] ]
+        if unhealthy:
+            errors = "; ".join(f"Worker {report['worker_id']}: {report['error']}" for report in unhealthy)
+            self.health_status.set_healthy(False, errors)
+        else:
+            self.health_status.set_healthy(True)
+
+        degraded = [ report for report in reports.values() if report.get("degraded") is not None ]
+        self.health_status.set_degraded("; ".join(f"Worker {report['worker_id']}: {report['degraded']}" for report in degraded) if degraded else None)
+
+        # Only ready once every worker is up and has said it is ready
+        all_ready = len(reports) == self.worker_count and all(report["ready"] for report in reports.values())
+        self.health_status.set_ready(all_ready)
+
+    def render_metrics(self) -> str:
+        '''
+        Render the supervisor's own metrics combined with those reported by every worker
+        '''
+        combined = MetricsRegistry()
+        combined.merge(METRICS.snapshot())
+
+        with self._lock:
+            combined.merge(self._retired_metrics.snapshot())
+            for worker_id, report in self._reports.items():
+                combined.merge(report["metrics"], gauge_labels={ "worker": worker_id })
+
+        return combined.render()
+
+    def render_status(self) -> dict:
+        '''
+        The pipeline status each worker last reported, keyed by worker ID. Only as fresh as the workers' last reports
+        '''
+        with self._lock:
+            return { "workers": { str(worker_id): report.get("status", {}) for worker_id, report in sorted(self._reports.items()) } }
+
+    def stop(self, timeout_seconds: float = 60):
+        '''
+        Ask every worker to finish what it is doing and exit. Workers that don't exit within the timeout are terminated
+        '''
+        self._logger.info("Stopping Worker Processes")
+        self._stop_event.set()
+
+        deadline = time.monotonic() + timeout_seconds
+        for worker_id, process in self._processes.items():
+            process.join(max(0, deadline - time.monotonic()))
+            if process.is_alive():
+                self._logger.error(f"Worker {worker_id} Did Not Stop In Time. Terminating It")
+                process.terminate()
+                process.join()
+
+        self._drain_reports(0)
@@ -0,0 +1,109 @@
+
+
+from external_secrets_reloader.tracing.tracer import Span
+
+from abc import ABC, abstractmethod
+from threading import Lock
+import json
+import logging
+import urllib.request
+
+SERVICE_NAME = "external-secrets-reloader"
+
+# OTLP status codes
+STATUS_CODE_OK = 1
+STATUS_CODE_ERROR = 2
+
+
+def _otlp_attributes(attributes: dict) -> list[dict]:
+    otlp_attributes = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            otlp_value = { "boolValue": value }
+        elif isinstance(value, int):
+            otlp_value = { "intValue": str(value) }
+        elif isinstance(value, float):
+            otlp_value = { "doubleValue": value }
+        else:
+            otlp_value = { "stringValue": str(value) }
+        otlp_attributes.append({ "key": key, "value": otlp_value })
+    return otlp_attributes
+
+
+def to_otlp_span(span: Span) -> dict:
+    '''
+    Convert a span into its OTLP/JSON representation
+    '''
+    otlp_span = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": 1, # SPAN_KIND_INTERNAL
+        "startTimeUnixNano": str(span.start_time_ns),
+        "endTimeUnixNano": str(span.end_time_ns),
+        "attributes": _otlp_attributes(span.attributes),
+        "status": { "code": STATUS_CODE_OK } if span.error is None else { "code": STATUS_CODE_ERROR, "message": span.error },
+    }
+    if span.parent_span_id is not None:
+        otlp_span["parentSpanId"] = span.parent_span_id
+    return otlp_span
+
+
+def to_otlp_request(spans: list[Span]) -> dict:
+    '''
+    Wrap spans in an OTLP/JSON ExportTraceServiceRequest
+    '''
+    return {
+        "resourceSpans": [{
+            "resource": { "attributes": _otlp_attributes({ "service.name": SERVICE_NAME }) },
+            "scopeSpans": [{
+                "scope": { "name": SERVICE_NAME },
+                "spans": [ to_otlp_span(span) for span in spans ],
+            }],
+        }]
+    }
+
+
+class SpanExporter(ABC):
+
+    @abstractmethod
+    def export(self, spans: list[Span]):
+        ...
+
+
+class FileSpanExporter(SpanExporter):
+    '''
+    Appends each trace to a local file as a single line of OTLP/JSON, so the file can be tailed or replayed into any
+    OTLP compatible collector
+    '''
+
+    def __init__(self, path: str):
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self.path = path
+        self._lock = Lock()
+
+    def export(self, spans: list[Span]):
+        line = json.dumps(to_otlp_request(spans), separators=(",", ":"))
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as trace_file:
+                trace_file.write(line + "\n")
+
+
+class OTLPHttpSpanExporter(SpanExporter):
+    '''
+    Sends each trace to an OTLP/HTTP collector using the JSON encoding
+    '''
+
+    TRACES_PATH = "/v1/traces"
+
+    def __init__(self, endpoint: str, timeout_seconds: float = 5):
+        self._logger = logging.getLogger(self.__class__.__name__)
+        endpoint = endpoint.rstrip("/")
+        self.url = endpoint if endpoint.endswith(self.TRACES_PATH) else endpoint + self.TRACES_PATH
+        self.timeout_seconds = timeout_seconds
+
+    def export(self, spans: list[Span]):
+        body = json.dumps(to_otlp_request(spans), separators=(",", ":")).encode("utf-8")
+        request = urllib.request.Request(self.url, data=body, headers={ "Content-Type": "application/json" }, method="POST")
+        with urllib.request.urlopen(request, timeout=self.timeout_seconds) as response:
+            self._logger.debug(f"Exported {len(spans)} Spans To {self.url}. Status: {response.status}")
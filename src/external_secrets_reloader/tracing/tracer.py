@@ -0,0 +1,254 @@
+
+
+from contextvars import Context, ContextVar, copy_context
+from queue import Empty, Full, Queue
+from threading import Event, Thread
+from typing import Optional
+import hashlib
+import logging
+import os
+import time
+
+
+class Span():
+    '''
+    A single timed operation within a trace
+    '''
+
+    __slots__ = ("trace_id", "span_id", "parent_span_id", "name", "start_time_ns", "end_time_ns", "attributes", "error")
+
+    def __init__(self, trace_id: str, name: str, parent_span_id: Optional[str], start_time_ns: int, attributes: dict):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent_span_id
+        self.name = name
+        self.start_time_ns = start_time_ns
+        self.end_time_ns: Optional[int] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def duration_seconds(self) -> float:
+        return ((self.end_time_ns or time.time_ns()) - self.start_time_ns) / 1e9
+
+
+class _Trace():
+    '''
+    Spans collected for the event currently being processed. Spans are only exported once the whole trace ends so
+    that nothing is written out on the hot path
+    '''
+
+    __slots__ = ("trace_id", "spans")
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.spans: list[Span] = []
+
+
+class _NoopSpanContext():
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, exc_type, exc_value, tb):
+        return False
+
+
+_NOOP_SPAN_CONTEXT = _NoopSpanContext()
+
+
+class _SpanContext():
+
+    __slots__ = ("current_span", "span", "token")
+
+    def __init__(self, current_span: ContextVar, span: Span):
+        self.current_span = current_span
+        self.span = span
+        self.token = None
+
+    def __enter__(self) -> Span:
+        self.token = self.current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.span.end_time_ns = time.time_ns()
+        if exc_value is not None:
+            self.span.error = f"{exc_type.__name__}: {exc_value}"
+        self.current_span.reset(self.token)
+        return False
+
+
+class Tracer():
+    '''
+    Lightweight per event tracer. A trace is started when a message is received, using its message ID as the trace
+    ID, and ended once the message has been handled. Any spans opened in between are attached to it. Sampling is
+    decided once per trace, so unsampled events (or a tracer with no exporter) only pay for a context variable lookup
+    per span
+
+    Finished traces are handed to a background thread for exporting. If the exporter can't keep up, traces are dropped
+    rather than slowing down event processing
+    '''
+
+    ROOT_SPAN_NAME = "esr.event"
+    MAX_QUEUED_TRACES = 1000
+
+    def __init__(self):
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self._current_trace: ContextVar[Optional[_Trace]] = ContextVar("current_trace", default=None)
+        # Innermost open span, the parent of any new span. Kept per context rather than on the trace, so work for the
+        # same trace running in copies of the context on other threads (ie. a reload per cluster) nests its own spans
+        self._current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+        self.exporter = None
+        self.sample_rate = 0.0
+
+        self._queue: Queue = Queue(maxsize=self.MAX_QUEUED_TRACES)
+        self._stop_event = Event()
+        self._thread: Optional[Thread] = None
+
+    def configure(self, exporter, sample_rate: float = 1.0):
+        '''
+        Enable tracing, exporting sampled traces to the given exporter from a background thread
+
+        @param exporter: Object with an export(spans: list[Span]) method
+        @param sample_rate: Fraction of traces, between 0 and 1, to record and export
+        '''
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+
+        if self._thread is None:
+            self._thread = Thread(target=self._export_loop, name="TracerExporter", daemon=True)
+            self._thread.start()
+
+    def shutdown(self, timeout_seconds: float = 5):
+        '''
+        Export everything that is queued, then stop the export thread
+        '''
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout_seconds)
+            self._thread = None
+
+    @staticmethod
+    def to_trace_id(message_id: str) -> str:
+        '''
+        Convert a message ID into a 128 bit hex trace ID. SQS message IDs are UUIDs so map onto one directly. Anything
+        else is hashed
+        '''
+        candidate = message_id.replace("-", "").lower()
+        if len(candidate) == 32:
+            try:
+                int(candidate, 16)
+                return candidate
+            except ValueError:
+                pass
+        return hashlib.sha256(message_id.encode()).hexdigest()[:32]
+
+    def _is_sampled(self, trace_id: str) -> bool:
+        if self.exporter is None or self.sample_rate <= 0:
+            return False
+        if self.sample_rate >= 1:
+            return True
+        # Derived from the trace ID rather than random, so the decision is the same anywhere the ID is seen
+        return int(trace_id[-8:], 16) / 0xFFFFFFFF < self.sample_rate
+
+    def start_trace(self, message_id: str, start_time_ns: Optional[int] = None, /, **attributes) -> bool:
+        '''
+        Start a new trace for the given message, ending any trace that is still open
+
+        @param message_id: ID of the message being processed. Used to derive the trace ID
+        @param start_time_ns: When processing of the message began, if earlier than now
+        @return bool: Whether the trace is sampled
+        '''
+        self.end_trace()
+
+        trace_id = self.to_trace_id(message_id)
+        if not self._is_sampled(trace_id):
+            return False
+
+        trace = _Trace(trace_id)
+        attributes["messaging.message.id"] = message_id
+        root = Span(trace_id, self.ROOT_SPAN_NAME, None, start_time_ns or time.time_ns(), attributes)
+        trace.spans.append(root)
+        self._current_trace.set(trace)
+        self._current_span.set(root)
+        return True
+
+    def end_trace(self):
+        '''
+        End the current trace, if there is one, and queue it for export
+        '''
+        trace = self._current_trace.get()
+        if trace is None:
+            return
+        self._current_trace.set(None)
+        self._current_span.set(None)
+
+        end_time_ns = time.time_ns()
+        for span in trace.spans:
+            if span.end_time_ns is None:
+                span.end_time_ns = end_time_ns
+
+        try:
+            self._queue.put_nowait(trace.spans)
+        except Full:
+            self._logger.debug("Trace Export Queue Full. Dropping Trace %s", trace.trace_id)
+
+    def detach_trace(self) -> Context:
+        '''
+        Hand the current trace over to other work, ie. on another thread. Spans and end_trace run within the returned
+        context with Context.run continue the trace, while the calling context no longer has one
+
+        @return Context: A copy of the calling context, still holding the trace
+        '''
+        context = copy_context()
+        self._current_trace.set(None)
+        self._current_span.set(None)
+        return context
+
+    def get_trace_id(self) -> Optional[str]:
+        trace = self._current_trace.get()
+        return trace.trace_id if trace is not None else None
+
+    def span(self, name: str, /, **attributes):
+        '''
+        Context manager that times the wrapped block as a child of the currently open span. A no-op if there is no
+        sampled trace in progress
+        '''
+        trace = self._current_trace.get()
+        if trace is None:
+            return _NOOP_SPAN_CONTEXT
+
+        parent = self._current_span.get()
+        span = Span(trace.trace_id, name, parent.span_id if parent is not None else None, time.time_ns(), attributes)
+        trace.spans.append(span)
+        return _SpanContext(self._current_span, span)
+
+    def record_span(self, name: str, start_time_ns: int, end_time_ns: int, /, **attributes):
+        '''
+        Add an already completed span to the current trace. Used for work that finished before the trace could be
+        started, ie. receiving the message the trace ID comes from
+        '''
+        trace = self._current_trace.get()
+        if trace is None:
+            return
+
+        parent = self._current_span.get()
+        span = Span(trace.trace_id, name, parent.span_id if parent is not None else None, start_time_ns, attributes)
+        span.end_time_ns = end_time_ns
+        trace.spans.append(span)
+
+    def _export_loop(self):
+        while not (self._stop_event.is_set() and self._queue.empty()):
+            try:
+                spans = self._queue.get(timeout=0.5)
+            except Empty:
+                continue
+
+            try:
+                self.exporter.export(spans)
+            except Exception as e:
+                self._logger.error("Exception Thrown Exporting Trace", exc_info=e)
+
+
+# Shared tracer used across the application. Does nothing until configured
+TRACER = Tracer()
@@ -0,0 +1,73 @@
+import pytest
+import logging
+from logging.handlers import QueueListener
+from queue import Queue
+from unittest.mock import MagicMock
+
+from external_secrets_reloader.log_handling.async_queue_handler import AsyncQueueHandler
+
+# --- Fixtures ---
+
+@pytest.fixture
+def logger():
+    logger = logging.getLogger("test_async_queue_handler")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    yield logger
+    logger.handlers.clear()
+
+# --- Tests ---
+
+def test_records_are_queued_unformatted(logger):
+    """Tests records keep their message template and arguments so formatting happens on the listener thread."""
+    log_queue = Queue()
+    logger.addHandler(AsyncQueueHandler(log_queue))
+
+    logger.info("Reloading %s/%s", "ns-1", "es-1")
+
+    record = log_queue.get_nowait()
+    assert record.msg == "Reloading %s/%s"
+    assert record.args == ("ns-1", "es-1")
+    assert record.getMessage() == "Reloading ns-1/es-1"
+
+def test_disabled_levels_never_format(logger):
+    """Tests arguments are never formatted for log levels that are disabled."""
+    log_queue = Queue()
+    logger.addHandler(AsyncQueueHandler(log_queue))
+    expensive = MagicMock()
+
+    logger.debug("Expensive %s", expensive)
+
+    assert log_queue.empty()
+    expensive.__str__.assert_not_called()
+
+def test_full_queue_drops_and_counts(logger):
+    """Tests a full queue drops records instead of blocking the caller."""
+    log_queue = Queue(maxsize=1)
+    logger.addHandler(AsyncQueueHandler(log_queue))
+    dropped_before = AsyncQueueHandler.RECORDS_DROPPED.get()
+
+    logger.info("first")
+    logger.info("second")
+
+    assert log_queue.qsize() == 1
+    assert AsyncQueueHandler.RECORDS_DROPPED.get() == dropped_before + 1
+
+def test_listener_formats_and_writes(logger):
+    """Tests records are formatted and written by the listener's handler."""
+    log_queue = Queue()
+    logger.addHandler(AsyncQueueHandler(log_queue))
+
+    written = []
+    class CollectingHandler(logging.Handler):
+        def emit(self, record):
+            written.append(self.format(record))
+    target = CollectingHandler()
+    target.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+
+    listener = QueueListener(log_queue, target, respect_handler_level=True)
+    listener.start()
+    logger.info("Reloading %s", "es-1")
+    listener.stop()
+
+    assert written == ["INFO Reloading es-1"]
@@ -0,0 +1,106 @@
+import pytest
+from unittest.mock import MagicMock
+
+from external_secrets_reloader.reloader import circuit_breaker as circuit_breaker_module
+from external_secrets_reloader.reloader.circuit_breaker import CircuitBreaker, CircuitState
+
+# --- Fixtures ---
+
+@pytest.fixture
+def clock(mocker):
+    now = [1000.0]
+    mocker.patch.object(circuit_breaker_module.time, "monotonic", side_effect=lambda: now[0])
+    return now
+
+@pytest.fixture
+def probe():
+    return MagicMock(return_value=False)
+
+@pytest.fixture
+def breaker(probe, clock):
+    return CircuitBreaker(3, probe, 10)
+
+# --- Tests ---
+
+def test_opens_after_consecutive_failures(breaker):
+    """Tests the breaker only opens once the threshold of failures in a row is reached."""
+    opened_before = CircuitBreaker.CIRCUIT_OPENED.get()
+
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.allow_request() is True
+
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+    assert CircuitBreaker.CIRCUIT_OPENED.get() == opened_before + 1
+    assert CircuitBreaker.CIRCUIT_OPEN.get() == 1
+
+def test_success_resets_failure_count(breaker):
+    """Tests failures have to be in a row to open the breaker."""
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+
+    assert breaker.is_open() is False
+
+def test_probes_only_after_interval(breaker, probe, clock):
+    """Tests the API server isn't probed until the probe interval has passed since opening."""
+    for _ in range(3):
+        breaker.record_failure()
+
+    clock[0] += 5
+    assert breaker.allow_request() is False
+    probe.assert_not_called()
+
+    clock[0] += 5
+    assert breaker.allow_request() is False
+    probe.assert_called_once()
+
+    # A failed probe waits a whole interval again
+    clock[0] += 9
+    assert breaker.allow_request() is False
+    probe.assert_called_once()
+
+def test_successful_probe_closes_breaker(breaker, probe, clock):
+    """Tests a successful probe closes the breaker and events are allowed straight away."""
+    for _ in range(3):
+        breaker.record_failure()
+    probe.return_value = True
+
+    clock[0] += 10
+    assert breaker.allow_request() is True
+    assert breaker.state == CircuitState.CLOSED
+    assert CircuitBreaker.CIRCUIT_OPEN.get() == 0
+
+    # Back to needing the full threshold again
+    breaker.record_failure()
+    assert breaker.is_open() is False
+
+def test_probe_exception_counts_as_failure(breaker, probe, clock):
+    """Tests a probe that raises keeps the breaker open."""
+    for _ in range(3):
+        breaker.record_failure()
+    probe.side_effect = RuntimeError("connection refused")
+    failed_before = CircuitBreaker.PROBES_FAILED.get()
+
+    clock[0] += 10
+    assert breaker.allow_request() is False
+    assert breaker.state == CircuitState.OPEN
+    assert CircuitBreaker.PROBES_FAILED.get() == failed_before + 1
+
+def test_only_one_probe_at_a_time(breaker, probe, clock):
+    """Tests other consumers are held back while one of them is probing."""
+    for _ in range(3):
+        breaker.record_failure()
+    clock[0] += 10
+
+    def probe_while_another_asks():
+        # Another consumer checking mid probe isn't let through and doesn't probe again
+        assert breaker.allow_request() is False
+        return True
+    probe.side_effect = probe_while_another_asks
+
+    assert breaker.allow_request() is True
+    probe.assert_called_once()
@@ -0,0 +1,121 @@
+import pytest
+import threading
+import time
+from unittest.mock import MagicMock
+
+from external_secrets_reloader.processors.sqs_processor import SQSProcessor
+from external_secrets_reloader.scaling.consumer_pool import ConsumerPool
+
+# --- Fixtures ---
+
+@pytest.fixture
+def mock_sqs_processor():
+    processor = MagicMock(spec=SQSProcessor)
+    processor.sample_queue_depth.return_value = (0, 0)
+    return processor
+
+@pytest.fixture
+def consumers():
+    """Event handlers created by the pool. Each poll just waits briefly, as if long polling an empty queue."""
+    created = []
+
+    def factory():
+        handler = MagicMock()
+        handler.poll_for_events.side_effect = lambda: time.sleep(0.01)
+        created.append(handler)
+        return handler
+
+    factory.created = created
+    return factory
+
+@pytest.fixture
+def pool(mock_sqs_processor, consumers):
+    pool = ConsumerPool(mock_sqs_processor, consumers, min_consumers=1, max_consumers=4, messages_per_consumer=10, interval_seconds=3600)
+    yield pool
+    pool.stop(timeout_seconds=5)
+
+# --- Tests ---
+
+@pytest.mark.parametrize("visible, desired", [
+    (0, 1),
+    (5, 1),
+    (11, 2),
+    (40, 4),
+    (1000, 4),
+])
+def test_desired_consumers_is_bounded(pool, visible, desired):
+    """Tests one consumer is wanted per messages_per_consumer waiting, within the bounds."""
+    assert pool.desired_consumers(visible) == desired
+
+def test_scale_up_is_immediate(pool, consumers):
+    """Tests a growing backlog adds every consumer needed at once, each polling for events."""
+    pool.scale(35)
+
+    assert pool.consumer_count() == 4
+    assert ConsumerPool.CONSUMERS_ACTIVE.get() == 4
+    assert len(consumers.created) == 3
+
+    time.sleep(0.1)
+    for handler in consumers.created:
+        assert handler.poll_for_events.called
+
+def test_scale_down_is_gradual(pool, consumers):
+    """Tests a drained backlog removes one consumer per sample, and removed consumers stop polling."""
+    pool.scale(40)
+    pool.scale(0)
+    assert pool.consumer_count() == 3
+
+    pool.scale(0)
+    pool.scale(0)
+    pool.scale(0)
+    assert pool.consumer_count() == 1
+
+    time.sleep(0.1)
+    calls = [ handler.poll_for_events.call_count for handler in consumers.created ]
+    time.sleep(0.1)
+    assert [ handler.poll_for_events.call_count for handler in consumers.created ] == calls
+
+def test_consumer_survives_exception(pool):
+    """Tests an exception handling one event doesn't stop the consumer."""
+    polled_again = threading.Event()
+    calls = []
+
+    def factory():
+        handler = MagicMock()
+        def poll():
+            calls.append(1)
+            if len(calls) == 1:
+                raise RuntimeError("boom")
+            polled_again.set()
+            time.sleep(0.01)
+        handler.poll_for_events.side_effect = poll
+        return handler
+
+    pool.consumer_factory = factory
+    pool.scale(11)
+
+    assert polled_again.wait(5)
+
+def test_start_samples_and_stop_removes_consumers(mock_sqs_processor, consumers):
+    """Tests the pool samples the queue as soon as it starts, and stopping it stops every consumer."""
+    mock_sqs_processor.sample_queue_depth.return_value = (25, 0)
+    pool = ConsumerPool(mock_sqs_processor, consumers, min_consumers=1, max_consumers=4, messages_per_consumer=10, interval_seconds=3600)
+
+    pool.start()
+    deadline = time.monotonic() + 5
+    while pool.consumer_count() < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert pool.consumer_count() == 3
+
+    pool.stop(timeout_seconds=5)
+    assert pool.consumer_count() == 1
+    assert ConsumerPool.CONSUMERS_ACTIVE.get() == 1
+
+def test_failed_sample_keeps_current_size(pool, mock_sqs_processor):
+    """Tests the pool isn't resized when the queue depth couldn't be sampled."""
+    pool.scale(40)
+    mock_sqs_processor.sample_queue_depth.return_value = None
+
+    pool.sample()
+
+    assert pool.consumer_count() == 4
@@ -1,5 +1,7 @@
+import json
 import pytest
-from unittest.mock import MagicMock, patch
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, call, patch
 
 # Import the class and enums from the original file (assuming it's named 'your_module')
 # Replace 'your_module' with the actual name of your file (e.g., 'es_reloader')
@@ -8,6 +10,7 @@ from external_secrets_reloader.reloader.eso_aws_provider_reloader import (
     ESOAWSProviderReloader, 
     ProviderType
 )
+from external_secrets_reloader.cache.eso_index import ESOIndex
 from kubernetes.client.rest import ApiException
 
 
@@ -24,11 +27,11 @@ def ss_results():
     return {
         'items': [
             # Matching SecretStore (SecretsManager)
-            {"metadata": {"name": "aws-secrets-ss-match"}, "spec": {"provider": {"aws": {"service": "SecretsManager"}}}},
+            {"metadata": {"name": "aws-secrets-ss-match", "namespace": "ns-1"}, "spec": {"provider": {"aws": {"service": "SecretsManager"}}}},
             # Non-matching SecretStore (ParameterStore)
-            {"metadata": {"name": "aws-ssm-ss-no-match"}, "spec": {"provider": {"aws": {"service": "ParameterStore"}}}},
+            {"metadata": {"name": "aws-ssm-ss-no-match", "namespace": "ns-3"}, "spec": {"provider": {"aws": {"service": "ParameterStore"}}}},
             # Other/No provider specified
-            {"metadata": {"name": "other-ss"}, "spec": {"provider": {"gcp": {}}}},
+            {"metadata": {"name": "other-ss", "namespace": "ns-1"}, "spec": {"provider": {"gcp": {}}}},
         ]
     }
 
@@ -64,7 +67,7 @@ def es_results_matching_key():
             {
                 "metadata": {"name": "es-2", "namespace": "ns-2"},
                 "spec": {
-                    "secretStoreRef": {"name": "aws-secrets-css-match"},
+                    "secretStoreRef": {"name": "aws-secrets-css-match", "kind": "ClusterSecretStore"},
                     "data": [
                         {"remoteRef": {"key": "/aws/secretsmanager/another_key"}},
                     ],
@@ -142,6 +145,124 @@ def test_init_failure_raises_exception(mocker):
     with pytest.raises(Exception, match="No K8s Config Found"):
         ESOAWSProviderReloader(provider_type=ProviderType.SECRETS_MANAGER)
 
+def test_init_with_client_skips_config(mocker, mock_k8s_client):
+    """Test a provided client is used as is, without loading the in cluster configuration."""
+    mock_load_config = mocker.patch('external_secrets_reloader.reloader.eso_aws_provider_reloader.config.load_incluster_config')
+
+    reloader = ESOAWSProviderReloader(provider_type=ProviderType.SECRETS_MANAGER, k8s_client=mock_k8s_client)
+
+    assert reloader.k8s_client is mock_k8s_client
+    mock_load_config.assert_not_called()
+
+def test_reload_with_streaming_lists(mocker, mock_k8s_client, ss_results, css_results, es_results_matching_key):
+    """Test uncached lists are streamed and compacted as they are read, and still find the ExternalSecret to patch."""
+    responses = []
+    for results in (ss_results, css_results, es_results_matching_key):
+        response = mocker.MagicMock()
+        response.stream.return_value = iter([json.dumps(results).encode()])
+        responses.append(response)
+    mock_k8s_client.list_cluster_custom_object.side_effect = responses
+    reloader = ESOAWSProviderReloader(provider_type=ProviderType.SECRETS_MANAGER, k8s_client=mock_k8s_client, streaming_lists=True)
+
+    assert reloader.reload("/aws/secretsmanager/my_secret_key") is True
+
+    assert all(call.kwargs["_preload_content"] is False for call in mock_k8s_client.list_cluster_custom_object.call_args_list)
+    assert mock_k8s_client.patch_namespaced_custom_object.call_args.kwargs["name"] == "es-1"
+    for response in responses:
+        response.release_conn.assert_called_once()
+
+def test_watch_cache_lists_never_go_backwards(mock_k8s_client):
+    """Test the first list takes any watch cache state, and later ones must be no older than the newest seen."""
+    reloader = ESOAWSProviderReloader(provider_type=ProviderType.SECRETS_MANAGER, k8s_client=mock_k8s_client, watch_cache_lists=True)
+    mock_k8s_client.list_cluster_custom_object.side_effect = [
+        {"metadata": {"resourceVersion": "100"}, "items": []},
+        {"metadata": {"resourceVersion": "90"}, "items": []},
+        {"metadata": {"resourceVersion": "120"}, "items": []},
+    ]
+
+    reloader._list_objects("externalsecrets")
+    reloader._list_objects("externalsecrets")
+    reloader._list_objects("externalsecrets")
+
+    first, second, third = [ call.kwargs for call in mock_k8s_client.list_cluster_custom_object.call_args_list ]
+    assert first["resource_version"] == "0"
+    assert "resource_version_match" not in first
+    assert second["resource_version"] == "100"
+    assert second["resource_version_match"] == "NotOlderThan"
+    # A list that came back older than one already seen doesn't move the floor back
+    assert third["resource_version"] == "100"
+    assert reloader._observed_resource_versions["externalsecrets"] == "120"
+
+def test_watch_cache_lists_tracked_per_plural(mock_k8s_client):
+    """Test each plural has its own resourceVersion floor, and the duration is recorded against the watch cache."""
+    reloader = ESOAWSProviderReloader(provider_type=ProviderType.SECRETS_MANAGER, k8s_client=mock_k8s_client, watch_cache_lists=True)
+    mock_k8s_client.list_cluster_custom_object.return_value = {"metadata": {"resourceVersion": "50"}, "items": []}
+    count_before = ESOAWSProviderReloader.LIST_DURATION.get_count(plural="secretstores", source="watch_cache")
+
+    reloader._list_objects("externalsecrets")
+    reloader._list_objects("secretstores")
+
+    assert mock_k8s_client.list_cluster_custom_object.call_args.kwargs["resource_version"] == "0"
+    assert ESOAWSProviderReloader.LIST_DURATION.get_count(plural="secretstores", source="watch_cache") == count_before + 1
+
+def test_quorum_lists_by_default(mock_k8s_client):
+    """Test lists don't set a resourceVersion unless watch cache lists are enabled."""
+    reloader = ESOAWSProviderReloader(provider_type=ProviderType.SECRETS_MANAGER, k8s_client=mock_k8s_client)
+    mock_k8s_client.list_cluster_custom_object.return_value = {"metadata": {"resourceVersion": "50"}, "items": []}
+
+    reloader._list_objects("externalsecrets")
+    reloader._list_objects("externalsecrets")
+
+    mock_k8s_client.list_cluster_custom_object.assert_called_with(group="external-secrets.io", version="v1", plural="externalsecrets")
+
+def test_is_available_lists_one_store_from_watch_cache(mock_k8s_client):
+    """Test the availability probe is a single store listed from the watch cache, and is False when it fails."""
+    reloader = ESOAWSProviderReloader(provider_type=ProviderType.SECRETS_MANAGER, k8s_client=mock_k8s_client)
+    mock_k8s_client.list_cluster_custom_object.return_value = {"items": []}
+
+    assert reloader.is_available() is True
+    kwargs = mock_k8s_client.list_cluster_custom_object.call_args.kwargs
+    assert kwargs["limit"] == 1
+    assert kwargs["resource_version"] == "0"
+
+    mock_k8s_client.list_cluster_custom_object.side_effect = ApiException(status=503)
+    assert reloader.is_available() is False
+
+def test_successful_patches_are_confirmed(mocker, mock_k8s_client, ss_results, css_results, es_results_matching_key):
+    """Test successful patches are handed to the confirmer, and failed ones are not."""
+    mock_k8s_client.list_cluster_custom_object.side_effect = [ss_results, css_results, es_results_matching_key] * 2
+    reloader = ESOAWSProviderReloader(provider_type=ProviderType.SECRETS_MANAGER, k8s_client=mock_k8s_client, confirm_deadline_seconds=60)
+    track = mocker.patch.object(reloader.confirmer, "track")
+
+    try:
+        assert reloader.reload("/aws/secretsmanager/my_secret_key") is True
+        track.assert_called_once()
+        assert track.call_args.args[:2] == ("ns-1", "es-1")
+
+        mock_k8s_client.patch_namespaced_custom_object.side_effect = ApiException(status=500)
+        assert reloader.reload("/aws/secretsmanager/my_secret_key") is False
+        track.assert_called_once()
+    finally:
+        reloader.stop()
+
+    assert not reloader.confirmer._thread.is_alive()
+
+def test_get_external_secret_for_confirmation(mock_k8s_client):
+    """Test the confirmer fetches ExternalSecrets by name, with deleted ones as None."""
+    reloader = ESOAWSProviderReloader(provider_type=ProviderType.SECRETS_MANAGER, k8s_client=mock_k8s_client)
+    mock_k8s_client.get_namespaced_custom_object.return_value = {"metadata": {"name": "es-1"}}
+
+    assert reloader._get_external_secret("ns-1", "es-1") == {"metadata": {"name": "es-1"}}
+    kwargs = mock_k8s_client.get_namespaced_custom_object.call_args.kwargs
+    assert (kwargs["namespace"], kwargs["name"], kwargs["plural"]) == ("ns-1", "es-1", "externalsecrets")
+
+    mock_k8s_client.get_namespaced_custom_object.side_effect = ApiException(status=404)
+    assert reloader._get_external_secret("ns-1", "es-1") is None
+
+    mock_k8s_client.get_namespaced_custom_object.side_effect = ApiException(status=503)
+    with pytest.raises(ApiException):
+        reloader._get_external_secret("ns-1", "es-1")
+
 ## Test Patch Payload Generation
 
 def test_generate_patch_payload(reloader_instance, mocker):
@@ -197,6 +318,28 @@ def test_reload_success(reloader_instance, mock_k8s_client, ss_results, css_resu
     assert call_kwargs['group'] == 'external-secrets.io'
     assert call_kwargs['plural'] == 'externalsecrets'
 
+def test_reload_matches_arn_remote_ref_by_name(reloader_instance, mock_k8s_client, ss_results, css_results):
+    """Tests an ExternalSecret referencing a secret by its full ARN is reloaded by events for the secret's name."""
+    es_results = {
+        'items': [
+            {
+                "metadata": {"name": "es-arn", "namespace": "ns-1"},
+                "spec": {
+                    "secretStoreRef": {"name": "aws-secrets-ss-match"},
+                    "data": [
+                        {"remoteRef": {"key": "arn:aws:secretsmanager:us-east-1:123456789012:secret:my/secret-AbCdEf"}},
+                    ],
+                },
+            },
+        ]
+    }
+    mock_k8s_client.list_cluster_custom_object.side_effect = [ss_results, css_results, es_results]
+
+    assert reloader_instance.reload("my/secret") is True
+
+    mock_k8s_client.patch_namespaced_custom_object.assert_called_once()
+    assert mock_k8s_client.patch_namespaced_custom_object.call_args[1]['name'] == 'es-arn'
+
 ## Test Reload Failure (No Matching Key)
 
 def test_reload_no_matching_key(reloader_instance, mock_k8s_client, ss_results, css_results, es_results_non_matching_key):
@@ -262,6 +405,14 @@ def test_reload_api_exception_404(reloader_instance, mock_k8s_client, ss_results
 
 ## Test General Exception Handling
 
+def test_reload_connection_error_while_patching(reloader_instance, mock_k8s_client, ss_results, css_results, es_results_matching_key):
+    """Test an API server that can't be reached while patching fails the reload instead of raising."""
+    from urllib3.exceptions import MaxRetryError
+    mock_k8s_client.list_cluster_custom_object.side_effect = [ss_results, css_results, es_results_matching_key]
+    mock_k8s_client.patch_namespaced_custom_object.side_effect = MaxRetryError(None, "/apis", "Connection refused")
+
+    assert reloader_instance.reload("/aws/secretsmanager/my_secret_key") is False
+
 def test_reload_general_exception(reloader_instance, mock_k8s_client, ss_results, css_results):
     """Test handling of a non-API related exception (e.g., during list calls)."""
     # Configure a list call to raise a general exception
@@ -274,4 +425,357 @@ def test_reload_general_exception(reloader_instance, mock_k8s_client, ss_results
     
     result = reloader_instance.reload(key_to_find)
     
-    assert result is False
\ No newline at end of file
+    assert result is False
+
+## Test Skipping Redundant Patches
+
+def _with_sync_state(es_results, annotation=None, refresh_time=None):
+    """Adds a force-sync annotation and/or status.refreshTime to the first ExternalSecret."""
+    es = es_results['items'][0]
+    if annotation is not None:
+        es['metadata']['annotations'] = {"reconcile.external-secrets.io/force-sync": annotation}
+    if refresh_time is not None:
+        es['status'] = {"refreshTime": refresh_time}
+    return es_results
+
+EVENT_TIME = datetime(2023, 11, 23, 18, 0, 0, tzinfo=timezone.utc)
+
+@pytest.mark.parametrize("annotation, refresh_time", [
+    (str(int(EVENT_TIME.timestamp()) + 5), None),   # Force-synced after the change
+    (None, "2023-11-23T18:00:05Z"),                   # ESO refreshed after the change
+    ("1", "2023-11-23T18:00:05Z"),                    # Old annotation, but a newer refresh
+])
+def test_reload_skips_es_synced_after_event(reloader_instance, mock_k8s_client, ss_results, css_results, es_results_matching_key, annotation, refresh_time):
+    """Test that an ExternalSecret that already synced after the change is not patched again."""
+    mock_k8s_client.list_cluster_custom_object.side_effect = [
+        ss_results,
+        css_results,
+        _with_sync_state(es_results_matching_key, annotation, refresh_time)
+    ]
+    skipped_before = ESOAWSProviderReloader.PATCHES_SKIPPED.get()
+
+    result = reloader_instance.reload("/aws/secretsmanager/my_secret_key", event_time=EVENT_TIME)
+
+    assert result is True
+    mock_k8s_client.patch_namespaced_custom_object.assert_not_called()
+    assert ESOAWSProviderReloader.PATCHES_SKIPPED.get() == skipped_before + 1
+
+@pytest.mark.parametrize("annotation, refresh_time", [
+    (None, None),                                     # Never synced
+    (str(int(EVENT_TIME.timestamp())), None),         # Same second as the change is not proof of a newer sync
+    (None, "2023-11-23T17:59:00Z"),                   # Refreshed before the change
+    ("not-a-timestamp", None),                        # Hand set annotation that can't be compared
+])
+def test_reload_patches_es_not_synced_after_event(reloader_instance, mock_k8s_client, ss_results, css_results, es_results_matching_key, annotation, refresh_time):
+    """Test that an ExternalSecret without a sync newer than the change is patched."""
+    mock_k8s_client.list_cluster_custom_object.side_effect = [
+        ss_results,
+        css_results,
+        _with_sync_state(es_results_matching_key, annotation, refresh_time)
+    ]
+
+    result = reloader_instance.reload("/aws/secretsmanager/my_secret_key", event_time=EVENT_TIME)
+
+    assert result is True
+    mock_k8s_client.patch_namespaced_custom_object.assert_called_once()
+
+def test_reload_without_event_time_always_patches(reloader_instance, mock_k8s_client, ss_results, css_results, es_results_matching_key):
+    """Test that the sync state is ignored when the event carries no time."""
+    mock_k8s_client.list_cluster_custom_object.side_effect = [
+        ss_results,
+        css_results,
+        _with_sync_state(es_results_matching_key, "9999999999", "2999-01-01T00:00:00Z")
+    ]
+
+    assert reloader_instance.reload("/aws/secretsmanager/my_secret_key") is True
+    mock_k8s_client.patch_namespaced_custom_object.assert_called_once()
+
+
+## Test Reloading From The Index
+
+def test_reload_uses_synced_index(mocker, mock_k8s_client, ss_results, css_results, es_results_matching_key):
+    """Test that a synced index is used instead of listing from the API server."""
+    mocker.patch('external_secrets_reloader.reloader.eso_aws_provider_reloader.config.load_incluster_config')
+    mocker.patch('external_secrets_reloader.reloader.eso_aws_provider_reloader.client.CustomObjectsApi', return_value=mock_k8s_client)
+
+    index = ESOIndex(ESOAWSProviderReloader.PLURALS)
+    index.replace("secretstores", ss_results["items"], "1")
+    index.replace("clustersecretstores", css_results["items"], "1")
+    index.replace("externalsecrets", es_results_matching_key["items"], "1")
+
+    reloader = ESOAWSProviderReloader(provider_type=ProviderType.SECRETS_MANAGER, index=index)
+    result = reloader.reload("/aws/secretsmanager/my_secret_key")
+
+    assert result is True
+    mock_k8s_client.list_cluster_custom_object.assert_not_called()
+    assert mock_k8s_client.patch_namespaced_custom_object.call_args[1]['name'] == 'es-1'
+
+def test_reload_lists_when_index_not_synced(mocker, mock_k8s_client, ss_results, css_results, es_results_matching_key):
+    """Test that an index that has not synced yet falls back to listing."""
+    mocker.patch('external_secrets_reloader.reloader.eso_aws_provider_reloader.config.load_incluster_config')
+    mocker.patch('external_secrets_reloader.reloader.eso_aws_provider_reloader.client.CustomObjectsApi', return_value=mock_k8s_client)
+    mock_k8s_client.list_cluster_custom_object.side_effect = [ss_results, css_results, es_results_matching_key]
+
+    reloader = ESOAWSProviderReloader(provider_type=ProviderType.SECRETS_MANAGER, index=ESOIndex(ESOAWSProviderReloader.PLURALS))
+
+    assert reloader.reload("/aws/secretsmanager/my_secret_key") is True
+    assert mock_k8s_client.list_cluster_custom_object.call_count == 3
+
+
+## Test Reloading Many Keys
+
+@pytest.fixture
+def es_results_many_keys():
+    """Mock result for ExternalSecrets referencing several of the changed keys."""
+    return {
+        'items': [
+            # References both changed keys
+            {
+                "metadata": {"name": "es-both", "namespace": "ns-1"},
+                "spec": {
+                    "secretStoreRef": {"name": "aws-secrets-ss-match"},
+                    "data": [
+                        {"remoteRef": {"key": "key-a"}},
+                        {"remoteRef": {"key": "key-b"}},
+                    ],
+                },
+            },
+            # References only one
+            {
+                "metadata": {"name": "es-b", "namespace": "ns-2"},
+                "spec": {
+                    "secretStoreRef": {"name": "aws-secrets-css-match", "kind": "ClusterSecretStore"},
+                    "data": [
+                        {"remoteRef": {"key": "key-b"}},
+                    ],
+                },
+            },
+        ]
+    }
+
+def test_reload_many_patches_each_external_secret_once(reloader_instance, mock_k8s_client, ss_results, css_results, es_results_many_keys):
+    """Test all keys are resolved from one listing, and an ExternalSecret referencing several keys is patched once."""
+    mock_k8s_client.list_cluster_custom_object.side_effect = [ss_results, css_results, es_results_many_keys]
+
+    result = reloader_instance.reload_many(["key-a", "key-b", "key-c"])
+
+    assert result == {"key-a": True, "key-b": True, "key-c": True}
+    assert mock_k8s_client.list_cluster_custom_object.call_count == 3
+    patched = [ c[1]['name'] for c in mock_k8s_client.patch_namespaced_custom_object.call_args_list ]
+    assert sorted(patched) == ["es-b", "es-both"]
+
+def test_reload_many_reports_failures_per_key(reloader_instance, mock_k8s_client, ss_results, css_results, es_results_many_keys):
+    """Test a failed patch only fails the keys the ExternalSecret references."""
+    mock_k8s_client.list_cluster_custom_object.side_effect = [ss_results, css_results, es_results_many_keys]
+
+    def patch(**kwargs):
+        if kwargs['name'] == 'es-b':
+            raise ApiException(status=500, reason="Internal Server Error")
+
+    mock_k8s_client.patch_namespaced_custom_object.side_effect = patch
+
+    result = reloader_instance.reload_many(["key-a", "key-b"])
+
+    assert result == {"key-a": True, "key-b": False}
+
+def test_reload_many_listing_failure_fails_every_key(reloader_instance, mock_k8s_client, ss_results):
+    """Test every key fails when the stores or ExternalSecrets can't be listed."""
+    mock_k8s_client.list_cluster_custom_object.side_effect = [ss_results, Exception("List failed")]
+
+    assert reloader_instance.reload_many(["key-a", "key-b"]) == {"key-a": False, "key-b": False}
+
+def test_reload_many_skips_only_when_synced_after_latest_change(reloader_instance, mock_k8s_client, ss_results, css_results, es_results_many_keys):
+    """Test an ExternalSecret referencing several keys is only skipped if it synced after the latest of their changes."""
+    es_results_many_keys['items'][0]['status'] = {"refreshTime": "2023-11-23T18:00:05Z"}
+    es_results_many_keys['items'][1]['status'] = {"refreshTime": "2023-11-23T18:00:05Z"}
+    mock_k8s_client.list_cluster_custom_object.side_effect = [ss_results, css_results, es_results_many_keys]
+
+    result = reloader_instance.reload_many(["key-a", "key-b"], {
+        "key-a": EVENT_TIME,
+        "key-b": datetime(2023, 11, 23, 18, 0, 10, tzinfo=timezone.utc),
+    })
+
+    assert result == {"key-a": True, "key-b": True}
+    patched = [ c[1]['name'] for c in mock_k8s_client.patch_namespaced_custom_object.call_args_list ]
+    assert sorted(patched) == ["es-b", "es-both"]
+
+def test_reload_patches_every_matching_external_secret(reloader_instance, mock_k8s_client, ss_results, css_results, es_results_many_keys):
+    """Test a single key reload patches every ExternalSecret referencing it, not just the first."""
+    mock_k8s_client.list_cluster_custom_object.side_effect = [ss_results, css_results, es_results_many_keys]
+
+    assert reloader_instance.reload("key-b") is True
+    assert mock_k8s_client.patch_namespaced_custom_object.call_count == 2
+
+def test_default_reload_many_reloads_each_key():
+    """Test the Reloader default reload_many falls back to reloading keys one at a time."""
+    from external_secrets_reloader.reloader.reloader import Reloader
+
+    class OneAtATimeReloader(Reloader):
+        def reload(self, key, event_time=None, region=None, account=None, operation=None):
+            return key != "bad"
+
+    assert OneAtATimeReloader().reload_many(["good", "bad"], {"good": EVENT_TIME}) == {"good": True, "bad": False}
+
+def test_reload_many_coalesces_patches(mock_k8s_client, ss_results, css_results, es_results_many_keys):
+    """Test patches are handed to the coalescer and sent once it flushes."""
+    mock_k8s_client.list_cluster_custom_object.side_effect = [ss_results, css_results, es_results_many_keys]
+    reloader = ESOAWSProviderReloader(provider_type=ProviderType.SECRETS_MANAGER, k8s_client=mock_k8s_client, coalesce_interval_seconds=60)
+    on_result = MagicMock()
+    assert reloader.report_patch_results(on_result) is True
+
+    assert reloader.reload_many(["key-a", "key-b"]) == {"key-a": True, "key-b": True}
+    mock_k8s_client.patch_namespaced_custom_object.assert_not_called()
+    assert reloader.coalescer.pending_count() == 2
+
+    reloader.stop()
+
+    assert mock_k8s_client.patch_namespaced_custom_object.call_count == 2
+    # The patches' own results are reported once they are sent
+    assert on_result.call_args_list == [call(True, None), call(True, None)]
+
+def test_reload_without_coalescing_has_no_patch_results_to_report(reloader_instance):
+    """Test patches sent before reload returns aren't reported separately, as reload's result covers them."""
+    assert reloader_instance.report_patch_results(MagicMock()) is False
+
+
+## Test Store Resolution
+
+def test_reload_ignores_same_named_store_in_other_namespace(reloader_instance, mock_k8s_client, ss_results, css_results):
+    """Test a SecretStore only matches ExternalSecrets in its own namespace."""
+    mock_k8s_client.list_cluster_custom_object.side_effect = [ss_results, css_results, {'items': [
+        {
+            "metadata": {"name": "es-other-ns", "namespace": "ns-other"},
+            "spec": {
+                "secretStoreRef": {"name": "aws-secrets-ss-match"},
+                "data": [{"remoteRef": {"key": "/aws/secretsmanager/my_secret_key"}}],
+            },
+        },
+    ]}]
+
+    assert reloader_instance.reload("/aws/secretsmanager/my_secret_key") is True
+    mock_k8s_client.patch_namespaced_custom_object.assert_not_called()
+
+def test_reload_matches_data_from_source_store_ref(reloader_instance, mock_k8s_client, ss_results, css_results):
+    """Test keys fetched through dataFrom with their own storeRef are matched against that store."""
+    mock_k8s_client.list_cluster_custom_object.side_effect = [ss_results, css_results, {'items': [
+        {
+            "metadata": {"name": "es-data-from", "namespace": "ns-9"},
+            "spec": {
+                "secretStoreRef": {"name": "aws-ssm-ss-no-match"},
+                "dataFrom": [{
+                    "extract": {"key": "/aws/secretsmanager/my_secret_key"},
+                    "sourceRef": {"storeRef": {"name": "aws-secrets-css-match", "kind": "ClusterSecretStore"}},
+                }],
+            },
+        },
+    ]}]
+
+    assert reloader_instance.reload("/aws/secretsmanager/my_secret_key") is True
+    assert mock_k8s_client.patch_namespaced_custom_object.call_args[1]['name'] == 'es-data-from'
+
+def test_reload_follows_store_changes_in_index(mocker, mock_k8s_client, ss_results, css_results, es_results_matching_key):
+    """Test the store resolver is kept up to date as the index changes, without relisting."""
+    index = ESOIndex(ESOAWSProviderReloader.PLURALS)
+    index.replace("secretstores", ss_results["items"], "1")
+    index.replace("clustersecretstores", css_results["items"], "1")
+    index.replace("externalsecrets", es_results_matching_key["items"], "1")
+    reloader = ESOAWSProviderReloader(provider_type=ProviderType.SECRETS_MANAGER, index=index, k8s_client=mock_k8s_client)
+
+    # es-1's store switches provider, so it no longer matches
+    index.upsert("secretstores", {"metadata": {"name": "aws-secrets-ss-match", "namespace": "ns-1"}, "spec": {"provider": {"aws": {"service": "ParameterStore"}}}})
+
+    assert reloader.reload("/aws/secretsmanager/my_secret_key") is True
+    mock_k8s_client.list_cluster_custom_object.assert_not_called()
+    mock_k8s_client.patch_namespaced_custom_object.assert_not_called()
+
+
+## Test Region And Account Routing
+
+@pytest.fixture
+def regional_stores():
+    """ClusterSecretStores for the same service in different regions and accounts."""
+    return {
+        'items': [
+            {"metadata": {"name": "us"}, "spec": {"provider": {"aws": {"service": "SecretsManager", "region": "us-east-1", "role": "arn:aws:iam::111111111111:role/eso"}}}},
+            {"metadata": {"name": "eu"}, "spec": {"provider": {"aws": {"service": "SecretsManager", "region": "eu-west-1"}}}},
+        ]
+    }
+
+@pytest.fixture
+def regional_external_secrets():
+    return {
+        'items': [
+            {
+                "metadata": {"name": f"es-{store}", "namespace": "ns-1"},
+                "spec": {
+                    "secretStoreRef": {"name": store, "kind": "ClusterSecretStore"},
+                    "data": [{"remoteRef": {"key": "shared/key"}}],
+                },
+            }
+            for store in ("us", "eu")
+        ]
+    }
+
+@pytest.mark.parametrize("region, account, expected_patched", [
+    ("us-east-1", "111111111111", ["es-us"]),
+    ("eu-west-1", "222222222222", ["es-eu"]),   # No role, so the eu store could be in any account
+    ("us-east-1", "222222222222", []),          # Right region, but the us store assumes a role in another account
+    (None, None, ["es-eu", "es-us"]),           # Unknown location can't rule anything out
+])
+def test_reload_routes_by_region_and_account(reloader_instance, mock_k8s_client, regional_stores, regional_external_secrets, region, account, expected_patched):
+    """Test only ExternalSecrets whose store can see the changed resource are reloaded."""
+    mock_k8s_client.list_cluster_custom_object.side_effect = [{'items': []}, regional_stores, regional_external_secrets]
+
+    assert reloader_instance.reload("shared/key", region=region, account=account) is True
+
+    patched = [ c[1]['name'] for c in mock_k8s_client.patch_namespaced_custom_object.call_args_list ]
+    assert sorted(patched) == expected_patched
+
+
+## Test Pinned Versions
+
+@pytest.mark.parametrize("provider_type, version, expect_patch", [
+    (ProviderType.SECRETS_MANAGER, None, True),
+    (ProviderType.SECRETS_MANAGER, "AWSCURRENT", True),
+    (ProviderType.SECRETS_MANAGER, "AWSPREVIOUS", True),
+    (ProviderType.SECRETS_MANAGER, "uuid/0d5d0f3e-1f2d-4b7a-9d7b-8a9c1e2f3a4b", False),
+    (ProviderType.PARAMETER_STORE, None, True),
+    (ProviderType.PARAMETER_STORE, "3", False),
+    (ProviderType.PARAMETER_STORE, "prod", True),
+])
+def test_reload_skips_pinned_versions(mock_k8s_client, provider_type, version, expect_patch):
+    """Test references pinned to a version a change can't affect are not reloaded."""
+    remote_ref = {"key": "my/key"}
+    if version is not None:
+        remote_ref["version"] = version
+    mock_k8s_client.list_cluster_custom_object.side_effect = [
+        {'items': [{"metadata": {"name": "store", "namespace": "ns-1"}, "spec": {"provider": {"aws": {"service": provider_type.value}}}}]},
+        {'items': []},
+        {'items': [{"metadata": {"name": "es-1", "namespace": "ns-1"}, "spec": {"secretStoreRef": {"name": "store"}, "data": [{"remoteRef": remote_ref}]}}]},
+    ]
+    pinned_before = ESOAWSProviderReloader.REFERENCES_PINNED.get()
+    reloader = ESOAWSProviderReloader(provider_type=provider_type, k8s_client=mock_k8s_client)
+
+    assert reloader.reload("my/key") is True
+    assert mock_k8s_client.patch_namespaced_custom_object.called is expect_patch
+    assert ESOAWSProviderReloader.REFERENCES_PINNED.get() == pinned_before + (0 if expect_patch else 1)
+
+@pytest.mark.parametrize("version, expect_patch", [
+    (None, False),
+    ("3", False),
+    ("prod", True),
+])
+def test_label_change_only_reloads_label_references(mock_k8s_client, version, expect_patch):
+    """Test moving a Parameter Store label only reloads references to a label, as nothing else reads a different value."""
+    remote_ref = {"key": "my/key"}
+    if version is not None:
+        remote_ref["version"] = version
+    mock_k8s_client.list_cluster_custom_object.side_effect = [
+        {'items': [{"metadata": {"name": "store", "namespace": "ns-1"}, "spec": {"provider": {"aws": {"service": ProviderType.PARAMETER_STORE.value}}}}]},
+        {'items': []},
+        {'items': [{"metadata": {"name": "es-1", "namespace": "ns-1"}, "spec": {"secretStoreRef": {"name": "store"}, "data": [{"remoteRef": remote_ref}]}}]},
+    ]
+    reloader = ESOAWSProviderReloader(provider_type=ProviderType.PARAMETER_STORE, k8s_client=mock_k8s_client)
+
+    assert reloader.reload("my/key", operation="LabelParameterVersion") is True
+    assert mock_k8s_client.patch_namespaced_custom_object.called is expect_patch
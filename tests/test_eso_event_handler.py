@@ -1,14 +1,22 @@
 import pytest
 import logging
 import time
+from datetime import datetime, timezone
 from unittest.mock import MagicMock, call, patch
 
 # Import the class under test
+from external_secrets_reloader.event_handler import eso_event_handler as eso_event_handler_module
 from external_secrets_reloader.event_handler.eso_event_handler import ESOEventHandler
+from external_secrets_reloader.filters.operation_filter import OperationFilter
+from external_secrets_reloader.filters.rotation_tracker import RotationTracker
 # Import the ABCs/Types for typing hints
 from external_secrets_reloader.parsers.eso_key_parser import ESOKeyParser
+from external_secrets_reloader.processors.http_push_processor import HTTPPushProcessor
 from external_secrets_reloader.processors.processor import Processor
+from external_secrets_reloader.reloader.circuit_breaker import CircuitBreaker
 from external_secrets_reloader.reloader.reloader import Reloader
+from external_secrets_reloader.scaling.lane_scheduler import LaneScheduler
+from external_secrets_reloader.status.pipeline_status import PIPELINE_STATUS
 
 # --- Fixtures ---
 
@@ -19,11 +27,16 @@ def mock_processor():
     # Configure the mock ESOKeyParser that the processor will return
     mock_entry = MagicMock(spec=ESOKeyParser)
     mock_entry.get_key.return_value = "test-secret-key"
+    mock_entry.get_event_time.return_value = None
+    mock_entry.get_region.return_value = None
+    mock_entry.get_account.return_value = None
+    mock_entry.get_event_operation.return_value = None
     
     # Configure the processor's methods
     processor.get_entry.return_value = mock_entry
     processor.load_next_entry.return_value = True # Default to having an event
     processor.mark_entry_resolved.return_value = None
+    processor.received_count.return_value = 0 # Received one at a time
     
     return processor
 
@@ -32,6 +45,7 @@ def mock_reloader():
     """Provides a mock Reloader instance."""
     reloader = MagicMock(spec=Reloader)
     reloader.reload.return_value = True # Default to successful reload
+    reloader.report_patch_results.return_value = False # Patches are sent before reload returns
     return reloader
 
 @pytest.fixture
@@ -84,13 +98,13 @@ def test_poll_for_events_success_on_first_attempt(mock_log_error, mock_log_info,
     mock_processor.get_entry.assert_called_once()
     
     # Assert reloader was called once and succeeded
-    mock_reloader.reload.assert_called_once_with("test-secret-key")
+    mock_reloader.reload.assert_called_once_with("test-secret-key", event_time=None, region=None, account=None, operation=None)
     
     # Assert entry was marked resolved
     mock_processor.mark_entry_resolved.assert_called_once()
     
     # Assert logging of success
-    mock_log_info.assert_any_call("test-secret-key Key Changed. Searching For Matching ExternalSecrets")
+    mock_log_info.assert_any_call("%s Key Changed. Searching For Matching ExternalSecrets", "test-secret-key")
     mock_log_error.assert_not_called()
 
 @patch('time.sleep', return_value=None) # Prevent actual sleep during tests
@@ -108,14 +122,14 @@ def test_poll_for_events_success_on_second_attempt(mock_log_error, mock_log_info
     # Assert reloader was called twice
     assert mock_reloader.reload.call_count == 2
     mock_reloader.reload.assert_has_calls([
-        call("test-secret-key"),
-        call("test-secret-key")
+        call("test-secret-key", event_time=None, region=None, account=None, operation=None),
+        call("test-secret-key", event_time=None, region=None, account=None, operation=None)
     ])
     
     # Assert sleep and error log occurred once
     mock_time_sleep.assert_called_once()
     mock_log_error.assert_called_once()
-    mock_log_error.assert_any_call("Reloading Appears To Have Failed. This Is BackOff Attempt 1/3. We Will Abort After 3 Attempts")
+    mock_log_error.assert_any_call("Reloading Appears To Have Failed. This Is BackOff Attempt %d/%d. We Will Abort After %d Attempts", 1, 3, 3)
     
     # Assert entry was marked resolved (since it eventually succeeded)
     mock_processor.mark_entry_resolved.assert_called_once()
@@ -140,8 +154,408 @@ def test_poll_for_events_failure_and_max_attempts_reached(mock_log_error, mock_l
     assert mock_time_sleep.call_count == 3
     
     # Assert the final error log occurred
-    mock_log_error.assert_called_with("Reloading Key test-secret-key Failed. Aborting And Moving On")
+    mock_log_error.assert_called_with("Reloading Key %s Failed. Aborting And Moving On", "test-secret-key")
     
     # Assert mark_entry_resolved is STILL called, as per the logic:
     # "If successful OR backoff retries runout, mark the entry resolved"
-    mock_processor.mark_entry_resolved.assert_called_once()
\ No newline at end of file
+    mock_processor.mark_entry_resolved.assert_called_once()
+
+def test_poll_for_events_records_status(eso_event_handler, mock_processor, mock_reloader):
+    """Tests the reload outcome is added to the pipeline status, and the event is no longer in flight afterwards."""
+    eso_event_handler.poll_for_events()
+
+    status = PIPELINE_STATUS.snapshot()
+    assert status["recent_reloads"][0]["key"] == "test-secret-key"
+    assert status["recent_reloads"][0]["outcome"] == "succeeded"
+    assert status["recent_reloads"][0]["attempts"] == 1
+    assert status["in_flight"] == []
+
+def test_poll_for_events_passes_event_time(eso_event_handler, mock_processor, mock_reloader):
+    """Tests poll_for_events forwards the time of the change to the reloader."""
+    event_time = datetime(2023, 11, 23, 18, 0, 0, tzinfo=timezone.utc)
+    mock_processor.get_entry.return_value.get_event_time.return_value = event_time
+
+    eso_event_handler.poll_for_events()
+
+    mock_reloader.reload.assert_called_once_with("test-secret-key", event_time=event_time, region=None, account=None, operation=None)
+
+def test_poll_for_events_records_freshness_lag(mocker, mock_processor, mock_reloader):
+    """Tests the lag from the change to receiving and to reloading it is observed, and fed to the freshness monitor."""
+    event_time = datetime(2023, 11, 23, 18, 0, 0, tzinfo=timezone.utc)
+    mock_processor.get_entry.return_value.get_event_time.return_value = event_time
+    mocker.patch.object(eso_event_handler_module.time, "time", return_value=event_time.timestamp() + 42)
+    freshness_monitor = MagicMock()
+    handler = ESOEventHandler(mock_processor, mock_reloader, freshness_monitor=freshness_monitor)
+    receive_sum_before = ESOEventHandler.RECEIVE_LAG.get_sum()
+    reload_count_before = ESOEventHandler.RELOAD_LAG.get_count()
+
+    handler.poll_for_events()
+
+    assert ESOEventHandler.RECEIVE_LAG.get_sum() == pytest.approx(receive_sum_before + 42)
+    assert ESOEventHandler.RELOAD_LAG.get_count() == reload_count_before + 1
+    freshness_monitor.observe.assert_called_once_with(pytest.approx(42))
+
+def test_failed_reload_is_not_fed_to_freshness_monitor(mocker, mock_processor, mock_reloader):
+    """Tests only reloads that completed count towards the freshness SLO."""
+    mock_processor.get_entry.return_value.get_event_time.return_value = datetime(2023, 11, 23, 18, 0, 0, tzinfo=timezone.utc)
+    mock_reloader.reload.return_value = False
+    mocker.patch.object(eso_event_handler_module.time, "sleep")
+    freshness_monitor = MagicMock()
+    handler = ESOEventHandler(mock_processor, mock_reloader, freshness_monitor=freshness_monitor)
+
+    handler.poll_for_events()
+
+    freshness_monitor.observe.assert_not_called()
+
+def test_deferred_patches_feed_breaker_and_lag_when_sent(mocker, mock_processor, mock_reloader):
+    """Tests with coalescing, a reload only schedules patches, so the breaker and lag follow the patches themselves."""
+    event_time = datetime(2023, 11, 23, 18, 0, 0, tzinfo=timezone.utc)
+    mock_processor.get_entry.return_value.get_event_time.return_value = event_time
+    mocker.patch.object(eso_event_handler_module.time, "time", return_value=event_time.timestamp() + 42)
+    mock_reloader.report_patch_results.return_value = True
+    circuit_breaker = MagicMock(spec=CircuitBreaker)
+    circuit_breaker.allow_request.return_value = True
+    freshness_monitor = MagicMock()
+    handler = ESOEventHandler(mock_processor, mock_reloader, circuit_breaker=circuit_breaker, freshness_monitor=freshness_monitor)
+    on_result = mock_reloader.report_patch_results.call_args.args[0]
+
+    handler.poll_for_events()
+
+    mock_processor.mark_entry_resolved.assert_called_once()
+    circuit_breaker.record_success.assert_not_called()
+    freshness_monitor.observe.assert_not_called()
+
+    on_result(False, event_time)
+    circuit_breaker.record_failure.assert_called_once()
+    freshness_monitor.observe.assert_not_called()
+
+    on_result(True, event_time)
+    circuit_breaker.record_success.assert_called_once()
+    freshness_monitor.observe.assert_called_once_with(pytest.approx(42))
+
+@patch('external_secrets_reloader.event_handler.eso_event_handler.TRACER')
+def test_poll_for_events_ends_trace(mock_tracer, eso_event_handler, mock_processor, mock_reloader):
+    """Tests the trace started for an entry is ended once handled, even if handling raises."""
+    eso_event_handler.poll_for_events()
+    mock_tracer.end_trace.assert_called_once()
+
+    mock_tracer.reset_mock()
+    mock_reloader.reload.side_effect = RuntimeError("boom")
+    with pytest.raises(RuntimeError):
+        eso_event_handler.poll_for_events()
+    mock_tracer.end_trace.assert_called_once()
+
+def test_poll_for_events_drops_entry_without_key(eso_event_handler, mock_processor, mock_reloader):
+    """Tests events with no key (ie. unknown event types) are acknowledged without reloading anything."""
+    mock_processor.get_entry.return_value.get_key.return_value = None
+
+    eso_event_handler.poll_for_events()
+
+    mock_reloader.reload.assert_not_called()
+    mock_processor.mark_entry_resolved.assert_called_once()
+
+def test_poll_for_events_passes_location(eso_event_handler, mock_processor, mock_reloader):
+    """Tests poll_for_events forwards the region and account of the change to the reloader."""
+    mock_processor.get_entry.return_value.get_region.return_value = "eu-west-1"
+    mock_processor.get_entry.return_value.get_account.return_value = "123456789012"
+
+    eso_event_handler.poll_for_events()
+
+    mock_reloader.reload.assert_called_once_with("test-secret-key", event_time=None, region="eu-west-1", account="123456789012", operation=None)
+
+def test_poll_for_events_drops_filtered_operation(mock_processor, mock_reloader):
+    """Tests events for operations the filter doesn't allow are acknowledged without reloading anything."""
+    mock_processor.get_entry.return_value.get_event_operation.return_value = "Delete"
+    handler = ESOEventHandler(mock_processor, mock_reloader, OperationFilter(["Update"]))
+
+    handler.poll_for_events()
+
+    mock_reloader.reload.assert_not_called()
+    mock_processor.mark_entry_resolved.assert_called_once()
+
+def test_poll_for_events_collapses_rotation(mock_processor, mock_reloader):
+    """Tests a rotation's events are held unresolved, and reloaded once when AWSCURRENT moves, which resolves them."""
+    entry = mock_processor.get_entry.return_value
+    resolvers = [MagicMock(), MagicMock()]
+    mock_processor.hold_entry.side_effect = resolvers
+    handler = ESOEventHandler(mock_processor, mock_reloader, rotation_tracker=RotationTracker(60))
+
+    for operation, stages in [("RotateSecret", []), ("PutSecretValue", ["AWSPENDING"])]:
+        entry.get_event_operation.return_value = operation
+        entry.get_version_stages.return_value = stages
+        handler.poll_for_events()
+
+    mock_reloader.reload.assert_not_called()
+    mock_processor.mark_entry_resolved.assert_not_called()
+    mock_processor.hold_entry.assert_called_with(60 + ESOEventHandler.HOLD_VISIBILITY_MARGIN_SECONDS)
+    for resolve in resolvers:
+        resolve.assert_not_called()
+
+    entry.get_event_operation.return_value = "UpdateSecretVersionStage"
+    entry.get_version_stages.return_value = ["AWSCURRENT"]
+    handler.poll_for_events()
+
+    mock_reloader.reload.assert_called_once_with("test-secret-key", event_time=None, region=None, account=None, operation="UpdateSecretVersionStage")
+    mock_processor.mark_entry_resolved.assert_called_once()
+    for resolve in resolvers:
+        resolve.assert_called_once()
+
+def test_poll_for_events_passes_operation_to_reloader(eso_event_handler, mock_processor, mock_reloader):
+    """Tests the operation that changed the key is passed on, so the reloader can skip references it can't affect."""
+    mock_processor.get_entry.return_value.get_event_operation.return_value = "LabelParameterVersion"
+
+    eso_event_handler.poll_for_events()
+
+    mock_reloader.reload.assert_called_once_with("test-secret-key", event_time=None, region=None, account=None, operation="LabelParameterVersion")
+
+def test_held_rotation_resolved_straight_away_when_processor_cant_hold(mock_processor, mock_reloader):
+    """Tests a held event is resolved straight away when the processor can't keep it unresolved (ie. FIFO queues)."""
+    entry = mock_processor.get_entry.return_value
+    entry.get_event_operation.return_value = "RotateSecret"
+    entry.get_version_stages.return_value = []
+    mock_processor.hold_entry.return_value = None
+    handler = ESOEventHandler(mock_processor, mock_reloader, rotation_tracker=RotationTracker(60))
+
+    handler.poll_for_events()
+
+    mock_reloader.reload.assert_not_called()
+    mock_processor.mark_entry_resolved.assert_called_once()
+
+def test_held_rotation_left_unresolved_when_reload_fails(mock_processor, mock_reloader):
+    """Tests events held for a rotation whose reload fails are left to be redelivered rather than resolved."""
+    entry = mock_processor.get_entry.return_value
+    entry.get_event_operation.return_value = "RotateSecret"
+    entry.get_version_stages.return_value = []
+    resolve = MagicMock()
+    mock_processor.hold_entry.return_value = resolve
+    mock_reloader.reload.return_value = False
+    handler = ESOEventHandler(mock_processor, mock_reloader, rotation_tracker=RotationTracker(0), circuit_breaker=CircuitBreaker(1, mock_reloader.is_available, 60))
+
+    handler.poll_for_events()
+
+    mock_reloader.reload.assert_called_once()
+    resolve.assert_not_called()
+
+def test_stop_reloads_held_rotations(mock_processor, mock_reloader):
+    """Tests rotations still held on shutdown are reloaded rather than lost."""
+    entry = mock_processor.get_entry.return_value
+    entry.get_event_operation.return_value = "RotateSecret"
+    entry.get_version_stages.return_value = []
+    resolve = MagicMock()
+    mock_processor.hold_entry.return_value = resolve
+    handler = ESOEventHandler(mock_processor, mock_reloader, rotation_tracker=RotationTracker(60))
+
+    handler.poll_for_events()
+    mock_reloader.reload.assert_not_called()
+
+    mock_processor.load_next_entry.return_value = False
+    handler.stop()
+    mock_reloader.reload.assert_called_once_with("test-secret-key", event_time=None, region=None, account=None, operation=None)
+    resolve.assert_called_once()
+
+def test_poll_for_events_reloads_timed_out_rotation(mock_processor, mock_reloader):
+    """Tests a rotation where AWSCURRENT never moves is reloaded once its timeout passes."""
+    entry = mock_processor.get_entry.return_value
+    entry.get_event_operation.return_value = "RotateSecret"
+    entry.get_version_stages.return_value = []
+    handler = ESOEventHandler(mock_processor, mock_reloader, rotation_tracker=RotationTracker(0))
+
+    # Held when seen, then expired straight away at the end of the same poll
+    handler.poll_for_events()
+
+    mock_reloader.reload.assert_called_once_with("test-secret-key", event_time=None, region=None, account=None, operation=None)
+
+def test_poll_for_events_hands_reload_to_lane(mock_processor, mock_reloader):
+    """Tests with lanes the reload runs on the lane for the message group, which then resolves the message."""
+    mock_processor.get_entry_group.return_value = "group-a"
+    resolve = MagicMock()
+    mock_processor.detach_entry_resolver.return_value = resolve
+    lane_scheduler = MagicMock(spec=LaneScheduler)
+    handler = ESOEventHandler(mock_processor, mock_reloader, lane_scheduler=lane_scheduler)
+
+    handler.poll_for_events()
+
+    # Nothing happens on the consumer other than handing the work over
+    mock_reloader.reload.assert_not_called()
+    mock_processor.mark_entry_resolved.assert_not_called()
+    lane_key, work = lane_scheduler.submit.call_args.args
+    assert lane_key == "group-a"
+
+    work()
+    mock_reloader.reload.assert_called_once_with("test-secret-key", event_time=None, region=None, account=None, operation=None)
+    resolve.assert_called_once()
+
+def test_poll_for_events_lane_defaults_to_key(mock_processor, mock_reloader):
+    """Tests events without a message group are laned by their key."""
+    mock_processor.get_entry_group.return_value = None
+    lane_scheduler = MagicMock(spec=LaneScheduler)
+    handler = ESOEventHandler(mock_processor, mock_reloader, lane_scheduler=lane_scheduler)
+
+    handler.poll_for_events()
+
+    assert lane_scheduler.submit.call_args.args[0] == "test-secret-key"
+
+def test_stop_finishes_lanes(mock_processor, mock_reloader):
+    """Tests stopping the handler lets the lanes finish their queued work."""
+    lane_scheduler = MagicMock(spec=LaneScheduler)
+    handler = ESOEventHandler(mock_processor, mock_reloader, lane_scheduler=lane_scheduler)
+    mock_processor.load_next_entry.return_value = False
+
+    handler.stop()
+
+    lane_scheduler.stop.assert_called_once()
+
+def test_stop_handles_already_received_events(eso_event_handler, mock_processor, mock_reloader):
+    """Tests stopping stops the processor receiving, then handles what it had already received."""
+    mock_processor.load_next_entry.side_effect = [True, True, False]
+
+    eso_event_handler.stop()
+
+    mock_processor.stop.assert_called_once()
+    assert mock_reloader.reload.call_count == 2
+    assert mock_processor.mark_entry_resolved.call_count == 2
+
+@patch('time.sleep', return_value=None)
+def test_poll_for_events_defers_entry_when_circuit_opens(mock_time_sleep, mock_processor, mock_reloader):
+    """Tests a reload failing as the circuit breaker opens stops retrying and leaves the entry to be redelivered."""
+    mock_reloader.reload.return_value = False
+    circuit_breaker = CircuitBreaker(2, mock_reloader.is_available, 60)
+    handler = ESOEventHandler(mock_processor, mock_reloader, circuit_breaker=circuit_breaker)
+
+    handler.poll_for_events()
+
+    # Opens on the second failed attempt, without waiting out the third
+    assert mock_reloader.reload.call_count == 2
+    assert circuit_breaker.is_open()
+    mock_processor.mark_entry_resolved.assert_not_called()
+
+@patch('time.sleep', return_value=None)
+def test_poll_for_events_does_not_receive_while_circuit_open(mock_time_sleep, mock_processor, mock_reloader):
+    """Tests nothing is received while the circuit breaker is open and its probe fails."""
+    circuit_breaker = MagicMock(spec=CircuitBreaker)
+    circuit_breaker.allow_request.return_value = False
+    handler = ESOEventHandler(mock_processor, mock_reloader, circuit_breaker=circuit_breaker)
+
+    handler.poll_for_events()
+
+    mock_processor.load_next_entry.assert_not_called()
+    mock_time_sleep.assert_called_once_with(ESOEventHandler.CIRCUIT_OPEN_WAIT_SECONDS)
+
+def test_poll_for_events_records_success_with_circuit_breaker(mock_processor, mock_reloader):
+    """Tests a successful reload resets the circuit breaker's failure count and resolves the entry."""
+    circuit_breaker = MagicMock(spec=CircuitBreaker)
+    circuit_breaker.allow_request.return_value = True
+    handler = ESOEventHandler(mock_processor, mock_reloader, circuit_breaker=circuit_breaker)
+
+    handler.poll_for_events()
+
+    circuit_breaker.record_success.assert_called_once()
+    mock_processor.mark_entry_resolved.assert_called_once()
+
+@patch('time.sleep', return_value=None)
+def test_lane_defers_entry_when_circuit_opens(mock_time_sleep, mock_processor, mock_reloader):
+    """Tests a lane leaves its entry unresolved when the circuit breaker opens during its reload."""
+    mock_reloader.reload.return_value = False
+    resolve = MagicMock()
+    mock_processor.detach_entry_resolver.return_value = resolve
+    lane_scheduler = MagicMock(spec=LaneScheduler)
+    handler = ESOEventHandler(mock_processor, mock_reloader, lane_scheduler=lane_scheduler, circuit_breaker=CircuitBreaker(1, mock_reloader.is_available, 60))
+
+    handler.poll_for_events()
+    lane_scheduler.submit.call_args.args[1]()
+
+    resolve.assert_not_called()
+
+def test_push_event_deferred_while_circuit_open_is_delivered_again(mock_reloader):
+    """Tests a pushed event, which nothing else would redeliver, is queued again when deferred, and reloaded once the breaker closes."""
+    processor = HTTPPushProcessor("s3cret", queue_size=3)
+    processor.enqueue([{
+        "id": "00000000-0000-0000-0000-000000000000",
+        "source": "aws.ssm",
+        "detail-type": "Parameter Store Change",
+        "time": "2024-01-01T00:00:00Z",
+        "resources": ["arn:aws:ssm:us-east-1:123456789012:parameter/app/key"],
+        "detail": { "name": "/app/key", "operation": "Update" },
+    }])
+    mock_reloader.reload.return_value = False
+    mock_reloader.is_available.return_value = False
+    handler = ESOEventHandler(processor, mock_reloader, circuit_breaker=CircuitBreaker(1, mock_reloader.is_available, 0))
+    deferred_before = ESOEventHandler.RELOADS_DEFERRED.get()
+
+    handler.poll_for_events()
+
+    assert ESOEventHandler.RELOADS_DEFERRED.get() == deferred_before + 1
+    assert processor.queued_count() == 1
+
+    mock_reloader.reload.return_value = True
+    mock_reloader.is_available.return_value = True
+    handler.poll_for_events()
+
+    assert processor.queued_count() == 0
+    assert mock_reloader.reload.call_args_list[-1].args == ("/app/key",)
+
+
+## Test Batches
+
+def _batch_processor(entries):
+    """A processor that received all of the entries together, and resolves them by key."""
+    processor = MagicMock(spec=Processor)
+    remaining = list(entries)
+    current = []
+    def load_next_entry():
+        if not remaining:
+            return False
+        current[:] = [remaining.pop(0)]
+        return True
+    processor.load_next_entry.side_effect = load_next_entry
+    processor.received_count.side_effect = lambda: len(remaining)
+    processor.get_entry.side_effect = lambda: current[0]
+    processor.get_entry_group.return_value = None
+    processor.resolved = []
+    processor.detach_entry_resolver.side_effect = lambda: (lambda key=current[0].get_key(): processor.resolved.append(key))
+    processor.detach_entry_redeliverer.return_value = MagicMock()
+    return processor
+
+def _entry(key, region=None):
+    entry = MagicMock(spec=ESOKeyParser)
+    entry.get_key.return_value = key
+    entry.get_event_time.return_value = None
+    entry.get_region.return_value = region
+    entry.get_account.return_value = None
+    entry.get_event_operation.return_value = "Update"
+    return entry
+
+def test_entries_received_together_are_reloaded_together(mock_reloader):
+    """Tests entries received together are reloaded with one reload_many, and each is resolved."""
+    processor = _batch_processor([_entry("a"), _entry("b"), _entry("a")])
+    mock_reloader.reload_many.return_value = {"a": True, "b": True}
+    handler = ESOEventHandler(processor, mock_reloader)
+
+    handler.poll_for_events()
+
+    mock_reloader.reload_many.assert_called_once_with(["a", "b"], {"a": None, "b": None}, {"a": (None, None), "b": (None, None)}, {"a": "Update", "b": "Update"})
+    mock_reloader.reload.assert_not_called()
+    assert processor.resolved == ["a", "b", "a"]
+
+def test_failed_keys_in_batch_are_retried_on_their_own(mock_reloader):
+    """Tests only entries whose key failed in the batch are reloaded again, and resolved once that succeeds."""
+    processor = _batch_processor([_entry("a"), _entry("b")])
+    mock_reloader.reload_many.return_value = {"a": True, "b": False}
+    handler = ESOEventHandler(processor, mock_reloader)
+
+    handler.poll_for_events()
+
+    mock_reloader.reload.assert_called_once_with("b", event_time=None, region=None, account=None, operation="Update")
+    assert processor.resolved == ["a", "b"]
+
+def test_same_key_in_another_region_in_batch_is_reloaded_on_its_own(mock_reloader):
+    """Tests an entry for the same key in another region isn't merged into the first's reload."""
+    processor = _batch_processor([_entry("a", "us-east-1"), _entry("a", "eu-west-1")])
+    mock_reloader.reload_many.return_value = {"a": True}
+    handler = ESOEventHandler(processor, mock_reloader)
+
+    handler.poll_for_events()
+
+    assert mock_reloader.reload_many.call_args.args[2] == {"a": ("us-east-1", None)}
+    mock_reloader.reload.assert_called_once_with("a", event_time=None, region="eu-west-1", account=None, operation="Update")
+    assert processor.resolved == ["a", "a"]
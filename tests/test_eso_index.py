@@ -0,0 +1,156 @@
+import pytest
+import marshal
+
+from external_secrets_reloader.cache.eso_index import ESOIndex, compact_object
+
+PLURALS = ["secretstores", "clustersecretstores", "externalsecrets"]
+
+# --- Mock Data ---
+
+FULL_EXTERNAL_SECRET = {
+    "apiVersion": "external-secrets.io/v1",
+    "kind": "ExternalSecret",
+    "metadata": {
+        "name": "es-1",
+        "namespace": "ns-1",
+        "resourceVersion": "100",
+        "labels": {"app": "test"},
+        "annotations": {
+            "reconcile.external-secrets.io/force-sync": "1700000000",
+            "kubectl.kubernetes.io/last-applied-configuration": "{...}",
+        },
+        "managedFields": [{"manager": "kubectl"}],
+    },
+    "spec": {
+        "refreshInterval": "1h",
+        "secretStoreRef": {"name": "aws-ss", "kind": "SecretStore"},
+        "target": {"name": "my-secret"},
+        "data": [{"secretKey": "password", "remoteRef": {"key": "/my/key"}}],
+    },
+    "status": {
+        "refreshTime": "2023-11-23T18:00:00Z",
+        "conditions": [{"type": "Ready", "status": "True"}],
+    },
+}
+
+SECRET_STORE = {
+    "metadata": {"name": "aws-ss", "namespace": "ns-1", "resourceVersion": "50"},
+    "spec": {"provider": {"aws": {"service": "ParameterStore", "region": "us-east-1"}}},
+}
+
+# --- Fixtures ---
+
+@pytest.fixture
+def index():
+    return ESOIndex(PLURALS)
+
+# --- Tests ---
+
+def test_compact_object_keeps_only_needed_fields():
+    """Tests compaction drops everything except what the reloader matches and compares on."""
+    compacted = compact_object(FULL_EXTERNAL_SECRET)
+
+    assert compacted == {
+        "metadata": {
+            "name": "es-1",
+            "namespace": "ns-1",
+            "resourceVersion": "100",
+            "annotations": {"reconcile.external-secrets.io/force-sync": "1700000000"},
+        },
+        "spec": {
+            "secretStoreRef": {"name": "aws-ss", "kind": "SecretStore"},
+            "data": [{"secretKey": "password", "remoteRef": {"key": "/my/key"}}],
+        },
+        "status": {"refreshTime": "2023-11-23T18:00:00Z"},
+    }
+
+def test_compact_object_store_keeps_provider():
+    """Tests stores keep their provider configuration."""
+    assert compact_object(SECRET_STORE)["spec"] == SECRET_STORE["spec"]
+
+def test_index_not_synced_until_all_plurals_listed(index):
+    """Tests has_synced only becomes true once every plural has a resourceVersion."""
+    assert index.has_synced() is False
+
+    index.replace("secretstores", [SECRET_STORE], "10")
+    index.replace("clustersecretstores", [], "10")
+    assert index.has_synced() is False
+
+    index.replace("externalsecrets", [FULL_EXTERNAL_SECRET], "10")
+    assert index.has_synced() is True
+
+def test_index_upsert_and_delete(index):
+    """Tests watch style updates add, replace and remove objects and advance the resourceVersion."""
+    index.replace("externalsecrets", [], "10")
+
+    index.upsert("externalsecrets", FULL_EXTERNAL_SECRET)
+    assert index.size("externalsecrets") == 1
+    assert index.get_resource_version("externalsecrets") == "100"
+
+    modified = {**FULL_EXTERNAL_SECRET, "metadata": {**FULL_EXTERNAL_SECRET["metadata"], "resourceVersion": "101"}}
+    index.upsert("externalsecrets", modified)
+    assert index.size("externalsecrets") == 1
+    assert index.list("externalsecrets")[0].resource_version == "101"
+
+    deleted = {**FULL_EXTERNAL_SECRET, "metadata": {**FULL_EXTERNAL_SECRET["metadata"], "resourceVersion": "102"}}
+    index.delete("externalsecrets", deleted)
+    assert index.size("externalsecrets") == 0
+    assert index.get_resource_version("externalsecrets") == "102"
+
+def test_index_status(index):
+    """Tests the status shows each plural's size and resourceVersion, and when it was last listed and changed."""
+    assert index.status()["externalsecrets"]["last_listed_at"] is None
+
+    index.replace("externalsecrets", [], "10")
+    listed = index.status()["externalsecrets"]
+    assert listed["size"] == 0
+    assert listed["resource_version"] == "10"
+    assert listed["last_listed_at"] is not None
+    assert listed["last_changed_at"] is None
+
+    index.upsert("externalsecrets", FULL_EXTERNAL_SECRET)
+    changed = index.status()["externalsecrets"]
+    assert changed["size"] == 1
+    assert changed["resource_version"] == "100"
+    assert changed["last_changed_at"] is not None
+
+def test_index_generation_changes(index):
+    """Tests every change bumps the generation so snapshots know when to write."""
+    generation = index.generation
+    index.replace("secretstores", [SECRET_STORE], "10")
+    assert index.generation > generation
+
+def test_snapshot_round_trip(index, tmp_path):
+    """Tests a saved snapshot restores the same objects and resourceVersions."""
+    index.replace("secretstores", [SECRET_STORE], "10")
+    index.replace("clustersecretstores", [], "11")
+    index.replace("externalsecrets", [FULL_EXTERNAL_SECRET], "12")
+
+    path = str(tmp_path / "index.snapshot")
+    index.save_snapshot(path)
+
+    restored = ESOIndex(PLURALS)
+    assert restored.load_snapshot(path) is True
+    assert restored.has_synced() is True
+    assert restored.get_resource_version("externalsecrets") == "12"
+    assert restored.list("externalsecrets") == index.list("externalsecrets")
+    assert restored.list("secretstores") == index.list("secretstores")
+
+def test_load_snapshot_missing_file(index, tmp_path):
+    """Tests a missing snapshot is not an error and leaves the index unsynced."""
+    assert index.load_snapshot(str(tmp_path / "missing")) is False
+    assert index.has_synced() is False
+
+@pytest.mark.parametrize("contents", [
+    b"",                                                      # Empty file
+    b"not marshal data",                                      # Corrupt file
+    marshal.dumps({"format_version": 999, "plurals": {}}),    # Incompatible format
+    marshal.dumps(["not", "a", "dict"]),                      # Unexpected structure
+])
+def test_load_snapshot_invalid_is_ignored(index, tmp_path, contents):
+    """Tests unusable snapshots are ignored rather than crashing startup."""
+    path = tmp_path / "index.snapshot"
+    path.write_bytes(contents)
+
+    assert index.load_snapshot(str(path)) is False
+    assert index.has_synced() is False
@@ -0,0 +1,145 @@
+import json
+import pytest
+import threading
+from unittest.mock import MagicMock
+
+from external_secrets_reloader.cache.external_secret_record import ExternalSecretRecord
+
+from external_secrets_reloader.cache.eso_index import ESOIndex
+from external_secrets_reloader.cache.eso_informer import ESOInformer
+from kubernetes.client.rest import ApiException
+
+PLURALS = ["secretstores", "clustersecretstores", "externalsecrets"]
+
+def _es(name, resource_version):
+    return {"metadata": {"name": name, "namespace": "ns-1", "resourceVersion": resource_version}, "spec": {}}
+
+# --- Fixtures ---
+
+@pytest.fixture
+def mock_k8s_client():
+    k8s_client = MagicMock()
+    k8s_client.list_cluster_custom_object.return_value = {"metadata": {"resourceVersion": "10"}, "items": [_es("es-1", "9")]}
+    return k8s_client
+
+@pytest.fixture
+def index():
+    return ESOIndex(PLURALS)
+
+@pytest.fixture
+def informer(mock_k8s_client, index):
+    return ESOInformer(mock_k8s_client, index, "external-secrets.io", "v1")
+
+# --- Tests ---
+
+def test_sync_lists_every_plural(informer, mock_k8s_client, index):
+    """Tests an empty index is populated by listing each plural."""
+    informer.sync()
+
+    assert mock_k8s_client.list_cluster_custom_object.call_count == 3
+    assert index.has_synced() is True
+    assert index.get_resource_version("externalsecrets") == "10"
+
+def test_sync_lists_plurals_concurrently(informer, mock_k8s_client, index):
+    """Tests every plural is listed at the same time, so the sync takes as long as the slowest list rather than all of them."""
+    # Only passes if all three lists are waiting on it at once
+    barrier = threading.Barrier(3, timeout=5)
+    def list_cluster_custom_object(**kwargs):
+        barrier.wait()
+        return {"metadata": {"resourceVersion": "10"}, "items": []}
+    mock_k8s_client.list_cluster_custom_object.side_effect = list_cluster_custom_object
+
+    informer.sync()
+
+    assert index.has_synced() is True
+    assert ESOInformer.SYNC_DURATION.get() > 0
+
+def test_sync_raises_when_a_list_fails(informer, mock_k8s_client, index):
+    """Tests a failed list fails the sync, leaving that plural unsynced."""
+    def list_cluster_custom_object(plural, **kwargs):
+        if plural == "clustersecretstores":
+            raise ApiException(status=403)
+        return {"metadata": {"resourceVersion": "10"}, "items": []}
+    mock_k8s_client.list_cluster_custom_object.side_effect = list_cluster_custom_object
+
+    with pytest.raises(ApiException):
+        informer.sync()
+
+    assert index.has_synced() is False
+    assert index.get_resource_version("secretstores") == "10"
+
+def test_list_plural_streams_and_compacts_response(mock_k8s_client, index):
+    """Tests streaming lists read the raw response and index each object as it is decoded."""
+    response = MagicMock()
+    response.stream.return_value = iter([json.dumps({"items": [_es("es-1", "9")], "metadata": {"resourceVersion": "10"}}).encode()])
+    mock_k8s_client.list_cluster_custom_object.return_value = response
+    informer = ESOInformer(mock_k8s_client, index, "external-secrets.io", "v1", streaming_lists=True)
+
+    informer.list_plural("externalsecrets")
+
+    assert mock_k8s_client.list_cluster_custom_object.call_args.kwargs["_preload_content"] is False
+    assert index.get_resource_version("externalsecrets") == "10"
+    records = index.list("externalsecrets")
+    assert len(records) == 1
+    assert isinstance(records[0], ExternalSecretRecord)
+    assert records[0].name == "es-1"
+    response.release_conn.assert_called_once()
+
+def test_sync_skips_plurals_restored_from_snapshot(informer, mock_k8s_client, index):
+    """Tests plurals that already have a resourceVersion (ie. from a snapshot) are not relisted."""
+    index.replace("secretstores", [], "5")
+    index.replace("clustersecretstores", [], "5")
+    index.replace("externalsecrets", [], "5")
+
+    informer.sync()
+
+    mock_k8s_client.list_cluster_custom_object.assert_not_called()
+
+def test_apply_event_types(informer, index):
+    """Tests watch events are applied to the index."""
+    index.replace("externalsecrets", [], "1")
+
+    informer._apply_event("externalsecrets", {"type": "ADDED", "object": _es("es-1", "2")})
+    informer._apply_event("externalsecrets", {"type": "MODIFIED", "object": _es("es-1", "3")})
+    assert index.size("externalsecrets") == 1
+    assert index.get_resource_version("externalsecrets") == "3"
+
+    informer._apply_event("externalsecrets", {"type": "BOOKMARK", "object": {"metadata": {"resourceVersion": "7"}}})
+    assert index.get_resource_version("externalsecrets") == "7"
+
+    informer._apply_event("externalsecrets", {"type": "DELETED", "object": _es("es-1", "8")})
+    assert index.size("externalsecrets") == 0
+    assert index.get_resource_version("externalsecrets") == "8"
+
+def test_watch_resumes_from_index_resource_version(informer, index, mocker):
+    """Tests the watch is started from the resourceVersion held by the index."""
+    index.replace("externalsecrets", [], "42")
+
+    mock_watch = MagicMock()
+    def stream(*args, **kwargs):
+        informer._stop_event.set()
+        yield {"type": "ADDED", "object": _es("es-1", "43")}
+    mock_watch.stream.side_effect = stream
+    mocker.patch('external_secrets_reloader.cache.eso_informer.watch.Watch', return_value=mock_watch)
+
+    informer._watch_loop("externalsecrets")
+
+    assert mock_watch.stream.call_args.kwargs["resource_version"] == "42"
+    assert index.get_resource_version("externalsecrets") == "43"
+
+def test_watch_relists_when_resource_version_expired(informer, mock_k8s_client, index, mocker):
+    """Tests a 410 Gone from the watch triggers a relist of that plural."""
+    index.replace("externalsecrets", [], "1")
+
+    mock_watch = MagicMock()
+    def stream(*args, **kwargs):
+        informer._stop_event.set()
+        raise ApiException(status=410, reason="Gone")
+        yield
+    mock_watch.stream.side_effect = stream
+    mocker.patch('external_secrets_reloader.cache.eso_informer.watch.Watch', return_value=mock_watch)
+
+    informer._watch_loop("externalsecrets")
+
+    mock_k8s_client.list_cluster_custom_object.assert_called_once_with(group="external-secrets.io", version="v1", plural="externalsecrets")
+    assert index.get_resource_version("externalsecrets") == "10"
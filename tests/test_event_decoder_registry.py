@@ -0,0 +1,76 @@
+import pytest
+
+from external_secrets_reloader.decoders.event_decoder import EventDecoder
+from external_secrets_reloader.decoders.event_decoder_registry import EventDecoderRegistry, create_default_registry, secrets_manager_arn_to_name, secrets_manager_full_arn_to_name
+
+# --- Fixtures ---
+
+@pytest.fixture
+def registry():
+    return create_default_registry()
+
+def _cloudtrail_event(request_parameters, response_elements=None):
+    return {
+        "source": "aws.secretsmanager",
+        "detail-type": "AWS API Call via CloudTrail",
+        "detail": {"eventName": "PutSecretValue", "requestParameters": request_parameters, "responseElements": response_elements},
+    }
+
+# --- Tests ---
+
+def test_decode_parameter_store_change(registry):
+    """Tests Parameter Store change events are keyed by detail.name."""
+    event = {"source": "aws.ssm", "detail-type": "Parameter Store Change", "detail": {"name": "/my/param", "operation": "Update"}}
+
+    assert registry.decode(event) == "/my/param"
+
+@pytest.mark.parametrize("request_parameters, response_elements, expected_key", [
+    ({"secretId": "my/secret"}, None, "my/secret"),
+    ({"secretId": "db-backup"}, None, "db-backup"),
+    # A partial ARN, whose name only looks like it ends in a random suffix
+    ({"secretId": "arn:aws:secretsmanager:us-east-1:123456789012:secret:db-backup"}, None, "db-backup"),
+    ({"secretId": "arn:aws:secretsmanager:us-east-1:123456789012:secret:db-backup"}, {"arn": "arn:aws:secretsmanager:us-east-1:123456789012:secret:db-backup-AbCdEf"}, "db-backup"),
+    ({"secretId": "arn:aws:secretsmanager:us-east-1:123456789012:secret:my/secret-AbCdEf"}, {"arn": "arn:aws:secretsmanager:us-east-1:123456789012:secret:my/secret-AbCdEf"}, "my/secret"),
+    ({"secretId": "prod-db"}, {"arn": "arn:aws-us-gov:secretsmanager:us-gov-west-1:123456789012:secret:prod-db-Xy12Z9"}, "prod-db"),
+    ({"name": "new/secret"}, None, "new/secret"),
+])
+def test_decode_secrets_manager_cloudtrail(registry, request_parameters, response_elements, expected_key):
+    """Tests Secrets Manager CloudTrail events are keyed by the secret name, whether given a name, a partial ARN or a full ARN."""
+    assert registry.decode(_cloudtrail_event(request_parameters, response_elements)) == expected_key
+
+def test_decode_unknown_event_type_is_dropped(registry):
+    """Tests events with no registered decoder have no key and are counted as dropped."""
+    before = EventDecoderRegistry.EVENTS_DROPPED.get(reason="unknown_event_type")
+
+    assert registry.decode({"source": "aws.s3", "detail-type": "Object Created", "detail": {}}) is None
+    assert EventDecoderRegistry.EVENTS_DROPPED.get(reason="unknown_event_type") == before + 1
+
+def test_decode_missing_key_is_dropped(registry):
+    """Tests a known event type without any of its key fields has no key and is counted as dropped."""
+    before = EventDecoderRegistry.EVENTS_DROPPED.get(reason="missing_key")
+
+    assert registry.decode(_cloudtrail_event({"unrelated": "value"})) is None
+    assert registry.decode({"source": "aws.ssm", "detail-type": "Parameter Store Change", "detail": "not-a-dict"}) is None
+    assert EventDecoderRegistry.EVENTS_DROPPED.get(reason="missing_key") == before + 2
+
+def test_register_custom_decoder():
+    """Tests additional event types can be registered."""
+    registry = EventDecoderRegistry()
+    registry.register(EventDecoder("custom.source", "Custom Change", ["detail.key"], str.upper))
+
+    assert registry.get_decoder("custom.source", "Custom Change") is not None
+    assert registry.decode({"source": "custom.source", "detail-type": "Custom Change", "detail": {"key": "abc"}}) == "ABC"
+
+def test_secrets_manager_arn_to_name_leaves_names_alone():
+    """Tests plain secret names are returned unchanged, even when they end like a random suffix."""
+    assert secrets_manager_arn_to_name("plain-name") == "plain-name"
+    assert secrets_manager_full_arn_to_name("plain-name") == "plain-name"
+
+def test_decode_operation(registry):
+    """Tests the operation is read from detail.operation for Parameter Store and detail.eventName for CloudTrail."""
+    ssm_event = {"source": "aws.ssm", "detail-type": "Parameter Store Change", "detail": {"name": "/my/param", "operation": "Delete"}}
+    cloudtrail_event = _cloudtrail_event({"secretId": "my/secret"})
+
+    assert registry.decode_operation(ssm_event) == "Delete"
+    assert registry.decode_operation(cloudtrail_event) == "PutSecretValue"
+    assert registry.decode_operation({"source": "aws.s3", "detail-type": "Object Created"}) is None
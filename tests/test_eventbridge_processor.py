@@ -142,4 +142,12 @@ def test_get_entry_returns_eventbridge_entry(processor_instance, mocker):
     
     # ASSERT 2: Verify the return value is the result of the mocked constructor call
     # The 'entry' variable should be the mock object returned by the mocked constructor
-    assert entry == mock_eb_entry_cls.return_value
\ No newline at end of file
+    assert entry == mock_eb_entry_cls.return_value
+
+
+def test_entry_group_and_resolver_come_from_source(processor_instance, mock_source_processor):
+    """Test ordering groups and detached resolvers are those of the underlying SQS message."""
+    mock_source_processor.get_entry_group.return_value = "group-a"
+
+    assert processor_instance.get_entry_group() == "group-a"
+    assert processor_instance.detach_entry_resolver() == mock_source_processor.detach_entry_resolver.return_value
@@ -1,6 +1,7 @@
 import pytest
 import json
 import logging
+from datetime import datetime, timezone
 from unittest.mock import patch, MagicMock
 
 # Assuming the path structure: tests/ -> src/external_secrets_reloader/entries/eventbridgeentry.py
@@ -8,13 +9,13 @@ from external_secrets_reloader.entries.eventbridgeentry import EventBridgeEntry
 
 # --- Test Data ---
 
-# Example EventBridge entry for a secret
+# Example EventBridge entry for a Parameter Store change
 MOCK_EVENTBRIDGE_ENTRY_STR = """
 {
     "version": "0",
     "id": "12345678-abcd-1234-abcd-1234567890ab",
-    "detail-type": "External Secrets Secret Synchronization",
-    "source": "external-secrets.io",
+    "detail-type": "Parameter Store Change",
+    "source": "aws.ssm",
     "account": "123456789012",
     "time": "2023-11-23T18:00:00Z",
     "region": "us-east-1",
@@ -58,6 +59,13 @@ def test_eventbridgeentry_initialization(mock_eventbridge_entry_instance):
         EventBridgeEntry(MOCK_EVENTBRIDGE_ENTRY_STR)
         mock_get_logger.assert_called_once_with('EventBridgeEntry')
 
+def test_eventbridgeentry_from_parsed_event():
+    """Tests an already parsed event is used as is, without being serialized and parsed again."""
+    entry = EventBridgeEntry(MOCK_EVENTBRIDGE_ENTRY_DICT)
+
+    assert entry.entry is MOCK_EVENTBRIDGE_ENTRY_DICT
+    assert entry.get_name() == MOCK_EVENTBRIDGE_ENTRY_DICT["detail"]["name"]
+
 def test_eventbridgeentry_get_resources(mock_eventbridge_entry_instance):
     """Tests the get_resources method."""
     expected_resources = MOCK_EVENTBRIDGE_ENTRY_DICT["resources"]
@@ -74,10 +82,34 @@ def test_eventbridgeentry_get_operation(mock_eventbridge_entry_instance):
     assert mock_eventbridge_entry_instance.get_operation() == expected_operation
 
 def test_eventbridgeentry_get_key(mock_eventbridge_entry_instance):
-    """Tests the get_key method (which should return the same as get_name)."""
+    """Tests the get_key method (which for Parameter Store changes should return the same as get_name)."""
     expected_key = MOCK_EVENTBRIDGE_ENTRY_DICT["detail"]["name"]
     assert mock_eventbridge_entry_instance.get_key() == expected_key
 
+def test_eventbridgeentry_get_key_secrets_manager_cloudtrail():
+    """Tests the key of a Secrets Manager CloudTrail event is the secret name, not its ARN."""
+    entry = EventBridgeEntry(json.dumps({
+        "source": "aws.secretsmanager",
+        "detail-type": "AWS API Call via CloudTrail",
+        "time": "2023-11-23T18:00:00Z",
+        "detail": {
+            "eventName": "PutSecretValue",
+            "requestParameters": {"secretId": "arn:aws:secretsmanager:us-east-1:123456789012:secret:my/secret-AbCdEf"},
+            "responseElements": {"arn": "arn:aws:secretsmanager:us-east-1:123456789012:secret:my/secret-AbCdEf"}
+        }
+    }))
+
+    assert entry.get_source() == "aws.secretsmanager"
+    assert entry.get_detail_type() == "AWS API Call via CloudTrail"
+    assert entry.get_key() == "my/secret"
+
+def test_eventbridgeentry_get_key_unknown_event_type():
+    """Tests unknown event types have no key, rather than raising."""
+    broken_dict = json.loads(MOCK_EVENTBRIDGE_ENTRY_STR)
+    broken_dict["source"] = "external-secrets.io"
+
+    assert EventBridgeEntry(json.dumps(broken_dict)).get_key() is None
+
 @pytest.mark.parametrize("missing_key", ["resources", "detail", "detail.name", "detail.operation"])
 def test_eventbridgeentry_handle_missing_keys(missing_key):
     """Tests that methods raise KeyError when expected keys are missing."""
@@ -112,4 +144,66 @@ def test_eventbridgeentry_invalid_json():
     invalid_json_str = "{'key': 'value'"
     
     with pytest.raises(json.JSONDecodeError):
-        EventBridgeEntry(invalid_json_str)
\ No newline at end of file
+        EventBridgeEntry(invalid_json_str)
+
+def test_eventbridgeentry_get_time(mock_eventbridge_entry_instance):
+    """Tests the get_time method parses the EventBridge time into a timezone aware datetime."""
+    assert mock_eventbridge_entry_instance.get_time() == datetime(2023, 11, 23, 18, 0, 0, tzinfo=timezone.utc)
+    assert mock_eventbridge_entry_instance.get_event_time() == mock_eventbridge_entry_instance.get_time()
+
+def test_eventbridgeentry_get_event_time_missing():
+    """Tests get_event_time returns None rather than raising when the time field is missing or invalid."""
+    broken_dict = json.loads(MOCK_EVENTBRIDGE_ENTRY_STR)
+    del broken_dict["time"]
+    assert EventBridgeEntry(json.dumps(broken_dict)).get_event_time() is None
+
+    broken_dict["time"] = "not-a-time"
+    assert EventBridgeEntry(json.dumps(broken_dict)).get_event_time() is None
+
+def test_eventbridgeentry_get_region_and_account_from_resource_arn():
+    """Tests the region and account come from the changed resource's ARN when there is one."""
+    event = json.loads(MOCK_EVENTBRIDGE_ENTRY_STR)
+    event["resources"] = ["arn:aws:ssm:eu-west-1:210987654321:parameter/my/param"]
+    entry = EventBridgeEntry(json.dumps(event))
+
+    assert entry.get_region() == "eu-west-1"
+    assert entry.get_account() == "210987654321"
+
+def test_eventbridgeentry_get_region_and_account_fallback():
+    """Tests the event's own region and account are used when there is no resource ARN, ie. CloudTrail events."""
+    event = json.loads(MOCK_EVENTBRIDGE_ENTRY_STR)
+    event["resources"] = []
+    entry = EventBridgeEntry(json.dumps(event))
+
+    assert entry.get_region() == "us-east-1"
+    assert entry.get_account() == "123456789012"
+
+    del event["region"], event["account"]
+    entry = EventBridgeEntry(json.dumps(event))
+    assert entry.get_region() is None
+    assert entry.get_account() is None
+
+def test_eventbridgeentry_get_event_operation(mock_eventbridge_entry_instance):
+    """Tests the operation is decoded for known event types."""
+    assert mock_eventbridge_entry_instance.get_event_operation() == "update"
+
+@pytest.mark.parametrize("request_parameters, stages", [
+    ({"secretId": "my/secret", "versionStages": ["AWSPENDING"]}, ["AWSPENDING"]),
+    ({"secretId": "my/secret", "versionStage": "AWSCURRENT", "moveToVersionId": "abc"}, ["AWSCURRENT"]),
+    ({"secretId": "my/secret", "versionStage": "AWSPENDING", "removeFromVersionId": "abc"}, []),
+    ({"secretId": "my/secret"}, []),
+])
+def test_eventbridgeentry_get_version_stages(request_parameters, stages):
+    """Tests the stages a Secrets Manager change applies to are read from its request parameters."""
+    entry = EventBridgeEntry(json.dumps({
+        "source": "aws.secretsmanager",
+        "detail-type": "AWS API Call via CloudTrail",
+        "time": "2023-11-23T18:00:00Z",
+        "detail": { "eventName": "UpdateSecretVersionStage", "requestParameters": request_parameters }
+    }))
+
+    assert entry.get_version_stages() == stages
+
+def test_eventbridgeentry_get_version_stages_parameter_store(mock_eventbridge_entry_instance):
+    """Tests Parameter Store events have no stages."""
+    assert mock_eventbridge_entry_instance.get_version_stages() == []
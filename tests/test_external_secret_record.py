@@ -0,0 +1,80 @@
+import pytest
+import sys
+from datetime import datetime, timezone
+
+from external_secrets_reloader.cache.external_secret_record import ExternalSecretRecord, last_sync_timestamp
+
+EXTERNAL_SECRET = {
+    "metadata": {
+        "name": "es-1",
+        "namespace": "ns-1",
+        "resourceVersion": "100",
+        "annotations": {"reconcile.external-secrets.io/force-sync": "1700000000"},
+        "managedFields": [{"manager": "kubectl"}],
+    },
+    "spec": {
+        "secretStoreRef": {"name": "aws-ss"},
+        "data": [
+            {"secretKey": "password", "remoteRef": {"key": "/my/key"}},
+            {"secretKey": "other", "remoteRef": {"key": "/other/key", "version": "3"}, "sourceRef": {"storeRef": {"name": "aws-css", "kind": "ClusterSecretStore"}}},
+        ],
+        "dataFrom": [{"extract": {"key": "/my/json"}}],
+    },
+    "status": {"refreshTime": "2023-11-23T18:00:00Z", "conditions": [{"type": "Ready"}]},
+}
+
+# --- Tests ---
+
+def test_record_keeps_only_what_matching_needs():
+    """Tests a record holds the name, namespace and each reference with its store kind resolved."""
+    record = ExternalSecretRecord.from_object(EXTERNAL_SECRET)
+
+    assert (record.namespace, record.name, record.resource_version) == ("ns-1", "es-1", "100")
+    assert record.references == (
+        ("/my/key", "SecretStore", "aws-ss", None),
+        ("/other/key", "ClusterSecretStore", "aws-css", "3"),
+        ("/my/json", "SecretStore", "aws-ss", None),
+    )
+    assert not hasattr(record, "__dict__")
+
+def test_record_strings_are_interned():
+    """Tests repeated strings are shared between records rather than copied into each one."""
+    first = ExternalSecretRecord.from_object(EXTERNAL_SECRET)
+    # Built from new string objects, as they would be when decoded from a separate API response
+    copy = {
+        "metadata": {"name": "".join(["es-", "2"]), "namespace": "".join(["ns-", "1"])},
+        "spec": {"secretStoreRef": {"name": "".join(["aws-", "ss"])}, "data": [{"remoteRef": {"key": "".join(["/my/", "key"])}}]},
+    }
+    second = ExternalSecretRecord.from_object(copy)
+
+    assert second.namespace is first.namespace
+    assert second.references[0][0] is first.references[0][0]
+    assert second.references[0][2] is first.references[0][2]
+
+@pytest.mark.parametrize("annotations, status, expected", [
+    ({"reconcile.external-secrets.io/force-sync": "1700000000"}, {"refreshTime": "2023-11-23T18:00:00Z"}, 1700762400.0),
+    ({"reconcile.external-secrets.io/force-sync": "1800000000"}, {"refreshTime": "2023-11-23T18:00:00Z"}, 1800000000.0),
+    ({"reconcile.external-secrets.io/force-sync": "by-hand"}, {}, None),
+    ({}, {"refreshTime": "not-a-time"}, None),
+    ({}, {}, None),
+])
+def test_last_sync_timestamp_is_newest_of_annotation_and_refresh_time(annotations, status, expected):
+    """Tests the last sync is the newer of the force-sync annotation and refreshTime, ignoring unparseable values."""
+    assert last_sync_timestamp({"metadata": {"annotations": annotations}, "status": status}) == expected
+
+def test_is_synced_since_is_strictly_after():
+    """Tests a sync in the same second as a change isn't proof it was picked up."""
+    record = ExternalSecretRecord.from_object(EXTERNAL_SECRET)
+    refresh_time = datetime(2023, 11, 23, 18, 0, 0, tzinfo=timezone.utc)
+
+    assert record.is_synced_since(datetime(2023, 11, 23, 17, 59, 59, tzinfo=timezone.utc)) is True
+    assert record.is_synced_since(refresh_time) is False
+
+def test_tuple_round_trip():
+    """Tests records survive being written to and read from their snapshot form."""
+    record = ExternalSecretRecord.from_object(EXTERNAL_SECRET)
+
+    restored = ExternalSecretRecord.from_tuple(record.to_tuple())
+
+    assert restored == record
+    assert restored.namespace is sys.intern("ns-1")
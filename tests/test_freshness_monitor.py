@@ -0,0 +1,96 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+
+from external_secrets_reloader.health_check import freshness_monitor as freshness_monitor_module
+from external_secrets_reloader.health_check.freshness_monitor import FreshnessMonitor
+from external_secrets_reloader.health_check.health_status import HealthStatus
+from external_secrets_reloader.metrics.metrics import MetricsRegistry
+from external_secrets_reloader.status.pipeline_status import PipelineStatus
+
+# --- Fixtures ---
+
+@pytest.fixture
+def health_status():
+    return HealthStatus()
+
+@pytest.fixture
+def pipeline_status():
+    return PipelineStatus()
+
+@pytest.fixture
+def monitor(health_status, pipeline_status):
+    return FreshnessMonitor(30, health_status, pipeline_status)
+
+# --- Tests ---
+
+def test_degraded_once_median_lag_is_over_slo(monitor, health_status):
+    """Tests the health status is degraded while the median lag of recent reloads is over the SLO."""
+    for lag in (5, 10, 60):
+        monitor.observe(lag)
+    assert health_status.get_degraded_reason() is None
+
+    monitor.observe(90)
+
+    assert "over the 30s freshness SLO" in health_status.get_degraded_reason()
+    assert FreshnessMonitor.SLO_BREACHED.get() == 1
+    assert monitor.status() == { "slo_seconds": 30, "median_lag_seconds": 35, "oldest_in_flight_seconds": None, "breached": True }
+
+def test_single_slow_reload_does_not_degrade(monitor, health_status):
+    """Tests one slow reload among fast ones doesn't move the median over the SLO."""
+    for lag in (2, 3, 600, 2):
+        monitor.observe(lag)
+
+    assert health_status.get_degraded_reason() is None
+    assert monitor.status()["breached"] is False
+
+def test_recovers_once_recent_reloads_are_within_slo(monitor, health_status):
+    """Tests the degraded status clears once enough recent reloads are back within the SLO."""
+    for _ in range(FreshnessMonitor.WINDOW):
+        monitor.observe(120)
+    assert health_status.get_degraded_reason() is not None
+
+    for _ in range(FreshnessMonitor.WINDOW // 2 + 1):
+        monitor.observe(1)
+
+    assert health_status.get_degraded_reason() is None
+    assert FreshnessMonitor.SLO_BREACHED.get() == 0
+
+def test_status_without_reloads(monitor):
+    """Tests the status has no median before anything has been reloaded."""
+    assert monitor.status() == { "slo_seconds": 30, "median_lag_seconds": None, "oldest_in_flight_seconds": None, "breached": False }
+
+def test_degraded_while_change_in_flight_is_older_than_slo(monitor, health_status, pipeline_status):
+    """Tests a stalled reload degrades health as soon as it is read, without waiting for any reload to complete."""
+    token = pipeline_status.begin("my/key", datetime.now(timezone.utc) - timedelta(seconds=90))
+
+    assert "Oldest change still being reloaded" in health_status.get_degraded_reason()
+    assert FreshnessMonitor.SLO_BREACHED.get() == 1
+
+    pipeline_status.end(token)
+
+    assert health_status.get_degraded_reason() is None
+    assert FreshnessMonitor.SLO_BREACHED.get() == 0
+
+def test_breach_clears_once_reloads_age_out_of_window(monitor, health_status, mocker):
+    """Tests a breach clears once the slow reloads are older than the window, without any further reloads."""
+    now = [1000.0]
+    mocker.patch.object(freshness_monitor_module.time, "monotonic", side_effect=lambda: now[0])
+    for _ in range(3):
+        monitor.observe(120)
+    assert health_status.get_degraded_reason() is not None
+
+    now[0] += FreshnessMonitor.WINDOW_SECONDS + 1
+
+    assert health_status.get_degraded_reason() is None
+    assert monitor.status()["median_lag_seconds"] is None
+
+def test_breach_is_evaluated_when_metrics_are_read(monitor, pipeline_status):
+    """Tests the breached gauge is brought up to date whenever metrics are collected."""
+    registry = MetricsRegistry()
+    registry.add_collector(monitor.evaluate)
+    FreshnessMonitor.SLO_BREACHED.set(0)
+    pipeline_status.begin("my/key", datetime.now(timezone.utc) - timedelta(seconds=90))
+
+    registry.render()
+
+    assert FreshnessMonitor.SLO_BREACHED.get() == 1
@@ -0,0 +1,92 @@
+import pytest
+
+from external_secrets_reloader.health_check.health_status_thread import HealthStatusThread
+from external_secrets_reloader.metrics.metrics import METRICS
+
+# --- Fixtures ---
+
+def _client(profiling_enabled=False):
+    hst = HealthStatusThread(profiling_enabled=profiling_enabled)
+    return hst, hst.create_health_app().test_client()
+
+# --- Tests ---
+
+def test_health_and_ready_endpoints():
+    """Tests the probe endpoints reflect the health status."""
+    hst, client = _client()
+
+    assert client.get('/health').status_code == 200
+    assert client.get('/ready').status_code == 200
+
+    hst.get_health_status().set_healthy(False, "broken")
+    hst.get_health_status().set_ready(False)
+
+    assert client.get('/health').get_json() == {"status": "unhealthy", "error": "broken"}
+    assert client.get('/ready').status_code == 503
+
+def test_health_endpoint_reports_degraded():
+    """Tests a degraded but healthy status still passes the liveness probe, with the reason."""
+    hst, client = _client()
+
+    hst.get_health_status().set_degraded("falling behind")
+    response = client.get('/health')
+    assert response.status_code == 200
+    assert response.get_json() == {"status": "degraded", "reason": "falling behind"}
+
+    hst.get_health_status().set_degraded(None)
+    assert client.get('/health').get_json() == {"status": "healthy"}
+
+def test_metrics_endpoint():
+    """Tests the metrics endpoint serves the shared registry in text format."""
+    METRICS.counter("esr_test_endpoint_total", "Test endpoint counter").inc()
+    hst, client = _client()
+
+    response = client.get('/metrics')
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    assert "esr_test_endpoint_total 1" in response.get_data(as_text=True)
+
+def test_status_endpoint():
+    """Tests the status endpoint serves the renderer's JSON, which the supervisor can replace."""
+    hst, client = _client()
+
+    response = client.get('/status')
+    assert response.status_code == 200
+    assert "in_flight" in response.get_json()
+    assert "recent_reloads" in response.get_json()
+
+    hst.status_renderer = lambda: {"workers": {}}
+    assert client.get('/status').get_json() == {"workers": {}}
+
+@pytest.mark.parametrize("path", ["/debug/profile/cpu", "/debug/profile/memory", "/debug/threads"])
+def test_profiling_endpoints_disabled_by_default(path):
+    """Tests the profiling endpoints are not served unless enabled."""
+    hst, client = _client()
+    assert client.get(path).status_code == 404
+
+def test_profiling_endpoints_enabled():
+    """Tests the profiling endpoints are served once enabled."""
+    hst, client = _client(profiling_enabled=True)
+
+    cpu = client.get('/debug/profile/cpu?seconds=0.05&interval=0.01')
+    assert cpu.status_code == 200
+    assert "stacks" in cpu.get_json()
+
+    assert client.get('/debug/threads').status_code == 200
+
+    assert client.get('/debug/profile/memory').status_code == 200
+    assert client.delete('/debug/profile/memory').get_json()["tracing"] is False
+
+@pytest.mark.parametrize("query", ["seconds=abc", "interval=0", "limit=x"])
+def test_cpu_profile_rejects_bad_arguments(query):
+    """Tests invalid profile arguments are rejected."""
+    hst, client = _client(profiling_enabled=True)
+    assert client.get(f'/debug/profile/cpu?{query}').status_code == 400
+
+def test_metrics_endpoint_custom_renderer():
+    """Tests the metrics endpoint can be served from a replacement renderer, ie. the WorkerSupervisor."""
+    hst = HealthStatusThread(metrics_renderer=lambda: "esr_custom 1\n")
+    client = hst.create_health_app().test_client()
+
+    assert client.get('/metrics').get_data(as_text=True) == "esr_custom 1\n"
@@ -0,0 +1,147 @@
+import json
+import pytest
+import urllib.request
+
+from external_secrets_reloader.entries.eventbridgeentry import EventBridgeEntry
+from external_secrets_reloader.processors.http_push_processor import HTTPPushProcessor
+
+SECRET = "s3cret"
+HEADERS = {"x-api-key": SECRET}
+
+def _event(i=0):
+    return {
+        "id": f"00000000-0000-0000-0000-00000000000{i}",
+        "source": "aws.ssm",
+        "detail-type": "Parameter Store Change",
+        "time": "2024-01-01T00:00:00Z",
+        "resources": [f"arn:aws:ssm:us-east-1:123456789012:parameter/app/key-{i}"],
+        "detail": { "name": f"/app/key-{i}", "operation": "Update" },
+    }
+
+# --- Fixtures ---
+
+@pytest.fixture
+def processor():
+    return HTTPPushProcessor(SECRET, queue_size=3)
+
+@pytest.fixture
+def client(processor):
+    return processor.create_app().test_client()
+
+# --- Tests ---
+
+def test_single_event_is_queued_and_decoded(processor, client):
+    """Tests a pushed event is loaded as an EventBridgeEntry the existing decoders understand."""
+    response = client.post('/events', json=_event(), headers=HEADERS)
+
+    assert response.status_code == 202
+    assert response.get_json() == {"accepted": 1}
+
+    assert processor.load_next_entry() is True
+    entry = processor.get_entry()
+    assert isinstance(entry, EventBridgeEntry)
+    assert entry.get_key() == "/app/key-0"
+
+    processor.mark_entry_resolved()
+    processor.stop()
+    assert processor.load_next_entry() is False
+
+def test_batch_is_queued_in_order(processor, client):
+    """Tests a batch of events are all queued, and loaded in the order they were sent."""
+    response = client.post('/events', json=[_event(0), _event(1)], headers=HEADERS)
+
+    assert response.status_code == 202
+    keys = []
+    processor.stop()
+    while processor.load_next_entry():
+        keys.append(processor.get_entry().get_key())
+    assert keys == ["/app/key-0", "/app/key-1"]
+
+def test_queued_events_are_not_parsed_again(processor, mocker):
+    """Tests events are queued as parsed from the request, so loading them never parses JSON."""
+    event = _event()
+    assert processor.enqueue([event]) is True
+    loads = mocker.patch("external_secrets_reloader.entries.eventbridgeentry.json.loads")
+
+    assert processor.load_next_entry() is True
+    entry = processor.get_entry()
+
+    assert entry.entry is event
+    assert entry.get_key() == "/app/key-0"
+    loads.assert_not_called()
+
+@pytest.mark.parametrize("headers", [{}, {"x-api-key": "wrong"}])
+def test_requests_without_the_secret_are_rejected(processor, client, headers):
+    """Tests requests without the right shared secret are rejected before anything is queued."""
+    rejected_before = HTTPPushProcessor.REQUESTS_REJECTED.get(reason="unauthorized")
+
+    response = client.post('/events', json=_event(), headers=headers)
+
+    assert response.status_code == 401
+    assert HTTPPushProcessor.REQUESTS_REJECTED.get(reason="unauthorized") - rejected_before == 1
+    processor.stop()
+    assert processor.load_next_entry() is False
+
+@pytest.mark.parametrize("body", ['not json', '[]', '[1, 2]', '"event"'])
+def test_invalid_bodies_are_rejected(client, body):
+    """Tests bodies that aren't an event or a list of events are rejected."""
+    response = client.post('/events', data=body, content_type="application/json", headers=HEADERS)
+    assert response.status_code == 400
+
+def test_full_queue_applies_back_pressure(processor, client):
+    """Tests a request that doesn't fit is rejected whole with a 429, and accepted again once there is room."""
+    assert client.post('/events', json=[_event(0), _event(1)], headers=HEADERS).status_code == 202
+
+    response = client.post('/events', json=[_event(2), _event(3)], headers=HEADERS)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+
+    processor.load_next_entry()
+    assert client.post('/events', json=[_event(2), _event(3)], headers=HEADERS).status_code == 202
+
+def test_oversized_batch_is_rejected(client):
+    """Tests a batch that could never fit the queue is rejected rather than retried forever."""
+    response = client.post('/events', json=[_event(i) for i in range(4)], headers=HEADERS)
+    assert response.status_code == 413
+
+def test_stopped_processor_rejects_pushes(processor, client):
+    """Tests nothing more is accepted once stopping, so shutdown only has to drain what is already queued."""
+    processor.stop()
+    assert client.post('/events', json=_event(), headers=HEADERS).status_code == 503
+
+def test_server_accepts_pushes(processor):
+    """Tests the server started by start() accepts pushes, and stops on stop()."""
+    processor.start(host="127.0.0.1", port=0)
+    port = processor._server.server_port
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{port}/events", data=json.dumps(_event()).encode(), headers={**HEADERS, "Content-Type": "application/json"}, method="POST"
+    )
+    with urllib.request.urlopen(request, timeout=5) as response:
+        assert response.status == 202
+
+    processor.stop()
+    assert processor.load_next_entry() is True
+
+def test_redelivered_event_is_loaded_again_first(processor, client):
+    """Tests an event handed back to be redelivered is loaded again ahead of newer events, and counts towards the queue."""
+    client.post('/events', json=[_event(0), _event(1)], headers=HEADERS)
+    processor.load_next_entry()
+    redeliver = processor.detach_entry_redeliverer()
+    processor.mark_entry_resolved()
+
+    redeliver()
+    assert processor.queued_count() == 2
+    assert client.post('/events', json=[_event(2), _event(3)], headers=HEADERS).status_code == 429
+
+    processor.load_next_entry()
+    assert processor.get_entry().get_key() == "/app/key-0"
+
+def test_redelivery_on_shutdown_is_dropped(processor, client):
+    """Tests events handed back while stopping are dropped, rather than handled over and over before exiting."""
+    client.post('/events', json=_event(), headers=HEADERS)
+    processor.stop()
+    processor.load_next_entry()
+
+    processor.detach_entry_redeliverer()()
+
+    assert processor.load_next_entry() is False
@@ -0,0 +1,70 @@
+import pytest
+
+from external_secrets_reloader.cache.eso_index import ESOIndex
+from external_secrets_reloader.cache.index_snapshot_writer import IndexSnapshotWriter
+
+PLURALS = ["secretstores", "externalsecrets"]
+
+# --- Fixtures ---
+
+@pytest.fixture
+def index():
+    return ESOIndex(PLURALS)
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    return str(tmp_path / "index.snapshot")
+
+# --- Tests ---
+
+def test_write_skipped_until_synced(index, snapshot_path, mocker):
+    """Tests a partially populated index is never snapshotted."""
+    save = mocker.spy(index, "save_snapshot")
+    index.replace("secretstores", [], "1")
+
+    IndexSnapshotWriter(index, snapshot_path, 60).write_if_changed()
+
+    save.assert_not_called()
+
+def test_write_only_when_changed(index, snapshot_path, mocker):
+    """Tests snapshots are only written when the index has changed since the last write."""
+    save = mocker.spy(index, "save_snapshot")
+    index.replace("secretstores", [], "1")
+    index.replace("externalsecrets", [], "1")
+    writer = IndexSnapshotWriter(index, snapshot_path, 60)
+
+    writer.write_if_changed()
+    writer.write_if_changed()
+    assert save.call_count == 1
+
+    index.set_resource_version("externalsecrets", "2")
+    writer.write_if_changed()
+    assert save.call_count == 2
+
+def test_stop_writes_final_snapshot(index, snapshot_path):
+    """Tests stopping the writer flushes the latest state to disk."""
+    index.replace("secretstores", [], "1")
+    index.replace("externalsecrets", [], "1")
+    writer = IndexSnapshotWriter(index, snapshot_path, 60)
+
+    writer.stop()
+
+    restored = ESOIndex(PLURALS)
+    assert restored.load_snapshot(snapshot_path) is True
+
+def test_snapshot_per_arn_context_is_written(index, snapshot_path):
+    """Tests a snapshot path for an EKS context ARN is a single file in the snapshot directory, and can be written."""
+    context = "arn:aws:eks:us-east-1:123456789012:cluster/prod-east"
+    path = IndexSnapshotWriter.path_for(snapshot_path, context)
+    index.replace("secretstores", [], "1")
+    index.replace("externalsecrets", [], "1")
+
+    IndexSnapshotWriter(index, path, 60).stop()
+
+    assert "/" not in path[len(snapshot_path):]
+    assert ESOIndex(PLURALS).load_snapshot(path) is True
+
+def test_snapshot_paths_are_unique_per_context(snapshot_path):
+    """Tests contexts that only differ in unsafe characters still get their own snapshot, and safe ones are kept as is."""
+    assert IndexSnapshotWriter.path_for(snapshot_path, "prod-east") == f"{snapshot_path}.prod-east"
+    assert IndexSnapshotWriter.path_for(snapshot_path, "team/prod") != IndexSnapshotWriter.path_for(snapshot_path, "team:prod")
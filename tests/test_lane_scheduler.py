@@ -0,0 +1,67 @@
+import pytest
+import threading
+import time
+
+from external_secrets_reloader.scaling.lane_scheduler import LaneScheduler
+
+# --- Fixtures ---
+
+@pytest.fixture
+def scheduler():
+    scheduler = LaneScheduler(4)
+    scheduler.start()
+    yield scheduler
+    scheduler.stop(timeout_seconds=5)
+
+# --- Tests ---
+
+def test_same_key_always_gets_same_lane():
+    """Tests lanes are picked deterministically from the key."""
+    scheduler = LaneScheduler(8)
+
+    assert scheduler.lane_for("/app/db-password") == scheduler.lane_for("/app/db-password")
+    assert 0 <= scheduler.lane_for("/app/db-password") < 8
+
+def test_work_for_a_key_runs_in_order(scheduler):
+    """Tests work for the same key runs one at a time in submission order, even when earlier work is slower."""
+    results = []
+
+    for i in range(20):
+        def work(i=i):
+            # Earlier work takes longer, so any overlap would reorder the results
+            time.sleep((20 - i) * 0.001)
+            results.append(i)
+        scheduler.submit("same-key", work)
+
+    scheduler.stop(timeout_seconds=5)
+    assert results == list(range(20))
+
+def test_different_keys_run_in_parallel():
+    """Tests work for keys on different lanes runs at the same time."""
+    scheduler = LaneScheduler(2)
+    first, second = next(
+        (a, b) for a in ["key-0"] for b in (f"key-{i}" for i in range(1, 100)) if scheduler.lane_for(a) != scheduler.lane_for(b)
+    )
+    scheduler.start()
+    barrier = threading.Barrier(2, timeout=5)
+
+    scheduler.submit(first, barrier.wait)
+    scheduler.submit(second, barrier.wait)
+
+    scheduler.stop(timeout_seconds=5)
+    assert not barrier.broken
+
+def test_failed_work_doesnt_stop_lane(scheduler):
+    """Tests an exception in one piece of work doesn't stop the lane or leave it counted as pending."""
+    ran = threading.Event()
+
+    def fail():
+        raise RuntimeError("boom")
+
+    scheduler.submit("key", fail)
+    scheduler.submit("key", ran.set)
+
+    assert ran.wait(5)
+    scheduler.stop(timeout_seconds=5)
+    assert scheduler.pending_count() == 0
+    assert LaneScheduler.EVENTS_PENDING.get() == 0
@@ -0,0 +1,104 @@
+import pytest
+
+from external_secrets_reloader.metrics.metrics import MetricsRegistry, Counter, Gauge, Histogram
+
+# --- Fixtures ---
+
+@pytest.fixture
+def registry():
+    """Provides a fresh registry so tests don't share state with the application wide one."""
+    return MetricsRegistry()
+
+# --- Tests ---
+
+def test_counter_inc_and_labels(registry):
+    """Tests counters accumulate per label set, independent of label order."""
+    counter = registry.counter("esr_test_total", "Test counter")
+
+    counter.inc()
+    counter.inc(2)
+    counter.inc(reason="a", kind="b")
+    counter.inc(kind="b", reason="a")
+
+    assert counter.get() == 3
+    assert counter.get(reason="a", kind="b") == 2
+
+def test_gauge_set_inc_dec(registry):
+    """Tests gauges can be set and moved in both directions."""
+    gauge = registry.gauge("esr_test_gauge", "Test gauge")
+
+    gauge.set(10)
+    gauge.inc(5)
+    gauge.dec(3)
+
+    assert gauge.get() == 12
+
+def test_histogram_observe(registry):
+    """Tests histograms track count, sum and cumulative buckets."""
+    histogram = registry.histogram("esr_test_seconds", "Test histogram", buckets=(1.0, 5.0))
+
+    histogram.observe(0.5)
+    histogram.observe(3)
+    histogram.observe(100)
+
+    assert histogram.get_count() == 3
+    assert histogram.get_sum() == 103.5
+
+    rendered = registry.render()
+    assert 'esr_test_seconds_bucket{le="1"} 1' in rendered
+    assert 'esr_test_seconds_bucket{le="5"} 2' in rendered
+    assert 'esr_test_seconds_bucket{le="+Inf"} 3' in rendered
+    assert 'esr_test_seconds_count 3' in rendered
+
+def test_registry_returns_existing_metric(registry):
+    """Tests the same metric is returned when registered twice, so modules can share metrics by name."""
+    assert registry.counter("esr_shared_total", "Shared") is registry.counter("esr_shared_total", "Shared")
+
+def test_registry_rejects_type_conflict(registry):
+    """Tests a name can't be registered as two different metric types."""
+    registry.counter("esr_conflict", "Conflict")
+
+    with pytest.raises(ValueError):
+        registry.gauge("esr_conflict", "Conflict")
+
+def test_render_prometheus_format(registry):
+    """Tests the text exposition output includes HELP, TYPE and labelled samples."""
+    registry.counter("esr_render_total", "Rendered counter").inc(reason="skip")
+
+    rendered = registry.render()
+
+    assert "# HELP esr_render_total Rendered counter" in rendered
+    assert "# TYPE esr_render_total counter" in rendered
+    assert 'esr_render_total{reason="skip"} 1' in rendered
+
+def test_snapshot_merge_combines_processes(registry):
+    """Tests merging snapshots adds counters and histograms together, and keeps gauges apart by label."""
+    registry.counter("esr_merge_total", "Merged counter").inc(2, reason="a")
+    registry.gauge("esr_merge_gauge", "Merged gauge").set(7)
+    registry.histogram("esr_merge_seconds", "Merged histogram", buckets=(1.0,)).observe(0.5)
+
+    combined = MetricsRegistry()
+    combined.merge(registry.snapshot(), gauge_labels={"worker": "0"})
+    combined.merge(registry.snapshot(), gauge_labels={"worker": "1"})
+
+    assert combined.counter("esr_merge_total", "Merged counter").get(reason="a") == 4
+    assert combined.gauge("esr_merge_gauge", "Merged gauge").get(worker="0") == 7
+    assert combined.gauge("esr_merge_gauge", "Merged gauge").get(worker="1") == 7
+    assert combined.histogram("esr_merge_seconds", "Merged histogram").get_count() == 2
+
+    rendered = combined.render()
+    assert 'esr_merge_seconds_bucket{le="1"} 2' in rendered
+    assert 'esr_merge_seconds_bucket{le="+Inf"} 2' in rendered
+
+def test_snapshot_is_picklable(registry):
+    """Tests snapshots can be sent between processes."""
+    import pickle
+
+    registry.counter("esr_pickle_total", "Pickled counter").inc(reason="a")
+    registry.histogram("esr_pickle_seconds", "Pickled histogram").observe(1)
+
+    snapshot = pickle.loads(pickle.dumps(registry.snapshot()))
+
+    combined = MetricsRegistry()
+    combined.merge(snapshot)
+    assert combined.counter("esr_pickle_total", "Pickled counter").get(reason="a") == 1
@@ -0,0 +1,165 @@
+import pytest
+from threading import Barrier
+from unittest.mock import MagicMock
+
+from external_secrets_reloader.reloader import multi_cluster_reloader as multi_cluster_reloader_module
+from external_secrets_reloader.reloader.multi_cluster_reloader import MultiClusterReloader
+from external_secrets_reloader.reloader.reloader import Reloader
+
+# --- Fixtures ---
+
+def cluster_reloader(outcome=True):
+    reloader = MagicMock(spec=Reloader)
+    reloader.reload_many.side_effect = lambda keys, event_times=None, locations=None, operations=None: { key: outcome for key in keys }
+    reloader.is_available.return_value = True
+    return reloader
+
+@pytest.fixture
+def east():
+    return cluster_reloader()
+
+@pytest.fixture
+def west():
+    return cluster_reloader()
+
+@pytest.fixture
+def multi_reloader(east, west):
+    reloader = MultiClusterReloader({ "east": east, "west": west })
+    yield reloader
+    reloader.stop()
+
+# --- Tests ---
+
+def test_reload_fans_out_to_every_cluster(multi_reloader, east, west):
+    """Tests a reload is passed on to every cluster with its event time and location."""
+    assert multi_reloader.reload("key", event_time=None, region="us-east-1", account="123456789012") is True
+
+    for reloader in (east, west):
+        reloader.reload_many.assert_called_once_with(["key"], { "key": None }, { "key": ("us-east-1", "123456789012") }, { "key": None })
+
+def test_clusters_reload_concurrently(east, west):
+    """Tests each cluster is reloaded on its own thread at the same time."""
+    barrier = Barrier(2, timeout=5)
+    def wait_for_other_cluster(keys, event_times=None, locations=None, operations=None):
+        barrier.wait()
+        return { key: True for key in keys }
+    east.reload_many.side_effect = wait_for_other_cluster
+    west.reload_many.side_effect = wait_for_other_cluster
+
+    multi_reloader = MultiClusterReloader({ "east": east, "west": west })
+    try:
+        assert multi_reloader.reload_many(["a", "b"]) == { "a": True, "b": True }
+    finally:
+        multi_reloader.stop()
+
+def test_failed_cluster_does_not_fail_reload(east):
+    """Tests a key counts as reloaded if any cluster reloaded it, and the failure is counted and kept for its cluster."""
+    west = cluster_reloader(outcome=False)
+    failed_before = MultiClusterReloader.CLUSTER_RELOADS_FAILED.get(cluster="west")
+
+    multi_reloader = MultiClusterReloader({ "east": east, "west": west })
+    assert multi_reloader.reload_many(["a", "b"]) == { "a": True, "b": True }
+
+    assert multi_reloader.pending_retry_count() == 2
+    assert MultiClusterReloader.CLUSTER_RELOADS_PENDING_RETRY.get(cluster="west") == 2
+    assert MultiClusterReloader.CLUSTER_RELOADS_FAILED.get(cluster="west") == failed_before + 2
+    assert MultiClusterReloader.CLUSTER_RELOADS_FAILED.get(cluster="east") == 0
+
+def test_failed_cluster_is_retried_on_its_own(east, mocker):
+    """Tests only the cluster that failed is retried, with its own backoff, until it reloads the key."""
+    now = [1000.0]
+    mocker.patch.object(multi_cluster_reloader_module.time, "monotonic", side_effect=lambda: now[0])
+    west = cluster_reloader(outcome=False)
+    multi_reloader = MultiClusterReloader({ "east": east, "west": west })
+    multi_reloader.reload("key", event_time=None, region="us-east-1", account="123456789012")
+    east.reload_many.reset_mock()
+
+    now[0] += MultiClusterReloader.RETRY_INTERVAL_SECONDS
+    assert multi_reloader.retry_due() is False
+    west.reload_many.assert_called_with(["key"], { "key": None }, { "key": ("us-east-1", "123456789012") }, { "key": None })
+    assert multi_reloader.pending_retry_count() == 1
+
+    # Failed again, so waits twice as long
+    west.reload_many.side_effect = lambda keys, event_times=None, locations=None, operations=None: { key: True for key in keys }
+    now[0] += MultiClusterReloader.RETRY_INTERVAL_SECONDS * 2
+    multi_reloader.retry_due()
+
+    assert multi_reloader.pending_retry_count() == 0
+    east.reload_many.assert_not_called()
+    multi_reloader.stop()
+
+def test_newer_success_clears_pending_retry(east):
+    """Tests a cluster reloading a key again drops the retry still waiting for an older change to it."""
+    west = cluster_reloader(outcome=False)
+    multi_reloader = MultiClusterReloader({ "east": east, "west": west })
+    multi_reloader.reload("key")
+
+    west.reload_many.side_effect = lambda keys, event_times=None, locations=None, operations=None: { key: True for key in keys }
+    multi_reloader.reload("key")
+
+    assert multi_reloader.pending_retry_count() == 0
+    multi_reloader.stop()
+
+def test_stop_retries_pending_clusters_once(east):
+    """Tests retries still waiting on shutdown get a final attempt."""
+    west = cluster_reloader(outcome=False)
+    multi_reloader = MultiClusterReloader({ "east": east, "west": west })
+    multi_reloader.start()
+    multi_reloader.reload("key")
+
+    multi_reloader.stop()
+
+    assert west.reload_many.call_count == 2
+
+def test_exception_in_cluster_is_isolated(east):
+    """Tests an exception reloading one cluster doesn't stop the others from being reloaded."""
+    west = cluster_reloader()
+    west.reload_many.side_effect = Exception("Connection refused")
+    duration_count_before = MultiClusterReloader.CLUSTER_RELOAD_DURATION.get_count(cluster="east")
+
+    multi_reloader = MultiClusterReloader({ "east": east, "west": west })
+    try:
+        assert multi_reloader.reload("key") is True
+    finally:
+        multi_reloader.stop()
+
+    east.reload_many.assert_called_once()
+    assert MultiClusterReloader.CLUSTER_RELOAD_DURATION.get_count(cluster="east") == duration_count_before + 1
+
+def test_reload_fails_when_every_cluster_fails():
+    """Tests a key only fails once no cluster could reload it, which is left to the caller rather than retried here."""
+    multi_reloader = MultiClusterReloader({ "east": cluster_reloader(outcome=False), "west": cluster_reloader(outcome=False) })
+    try:
+        assert multi_reloader.reload("key") is False
+        assert multi_reloader.pending_retry_count() == 0
+    finally:
+        multi_reloader.stop()
+
+def test_is_available_when_any_cluster_is(multi_reloader, east, west):
+    """Tests the reloader is available while any cluster can be reached."""
+    east.is_available.side_effect = Exception("Connection refused")
+    assert multi_reloader.is_available() is True
+
+    west.is_available.return_value = False
+    assert multi_reloader.is_available() is False
+
+def test_patch_results_are_reported_from_every_cluster(multi_reloader, east, west):
+    """Tests every cluster is told where to report patch results, and patches are deferred if any cluster defers them."""
+    on_result = MagicMock()
+    east.report_patch_results.return_value = True
+    west.report_patch_results.return_value = False
+
+    assert multi_reloader.report_patch_results(on_result) is True
+
+    east.report_patch_results.assert_called_once_with(on_result)
+    west.report_patch_results.assert_called_once_with(on_result)
+
+def test_stop_stops_every_cluster(east, west):
+    """Tests stopping carries on to every cluster even if one raises."""
+    east.stop.side_effect = Exception("Flush failed")
+    multi_reloader = MultiClusterReloader({ "east": east, "west": west })
+
+    multi_reloader.stop()
+
+    east.stop.assert_called_once()
+    west.stop.assert_called_once()
@@ -0,0 +1,37 @@
+import pytest
+from unittest.mock import MagicMock
+
+from external_secrets_reloader.filters.operation_filter import OperationFilter
+from external_secrets_reloader.parsers.eso_key_parser import ESOKeyParser
+
+# --- Helpers ---
+
+def _entry(operation):
+    entry = MagicMock(spec=ESOKeyParser)
+    entry.get_event_operation.return_value = operation
+    return entry
+
+# --- Tests ---
+
+@pytest.mark.parametrize("operation, allowed", [
+    ("Update", True),
+    ("Create", True),
+    ("Delete", False),
+    # Moves a label to another version, which changes what references to that label resolve to
+    ("LabelParameterVersion", True),
+    (None, True),   # Events that don't say are never dropped
+])
+def test_parameter_store_defaults(operation, allowed):
+    """Tests the default Parameter Store operations only let through changes to a value or a label."""
+    operation_filter = OperationFilter(OperationFilter.DEFAULT_OPERATIONS["ParameterStore"])
+
+    assert operation_filter.allows(_entry(operation)) is allowed
+
+def test_dropped_events_are_counted_by_reason():
+    """Tests dropped events are counted under the operation_not_allowed reason."""
+    operation_filter = OperationFilter(["PutSecretValue"])
+    before = OperationFilter.EVENTS_DROPPED.get(reason="operation_not_allowed")
+
+    assert operation_filter.allows(_entry("DeleteSecret")) is False
+    assert operation_filter.allows(_entry("PutSecretValue")) is True
+    assert OperationFilter.EVENTS_DROPPED.get(reason="operation_not_allowed") == before + 1
@@ -0,0 +1,101 @@
+import pytest
+import time
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, call
+
+from external_secrets_reloader.reloader.patch_coalescer import PatchCoalescer
+
+# --- Helpers ---
+
+def _wait_for(condition, timeout_seconds=5):
+    deadline = time.monotonic() + timeout_seconds
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+# --- Tests ---
+
+def test_burst_of_changes_is_one_patch():
+    """Tests repeated submits for the same ExternalSecret within the interval become a single trailing patch."""
+    patch = MagicMock(return_value=True)
+    coalescer = PatchCoalescer(0.2, patch)
+    coalesced_before = PatchCoalescer.PATCHES_COALESCED.get()
+    coalescer.start()
+
+    try:
+        for _ in range(30):
+            coalescer.submit("ns-1", "es-1")
+        coalescer.submit("ns-2", "es-2")
+
+        # Nothing is sent until the interval ends
+        patch.assert_not_called()
+        assert _wait_for(lambda: patch.call_count == 2)
+    finally:
+        coalescer.stop()
+
+    assert sorted(c.args for c in patch.call_args_list) == [("ns-1", "es-1"), ("ns-2", "es-2")]
+    assert PatchCoalescer.PATCHES_COALESCED.get() == coalesced_before + 29
+
+def test_changes_after_patch_schedule_another():
+    """Tests a change arriving after the patch went out schedules a new one."""
+    patch = MagicMock(return_value=True)
+    coalescer = PatchCoalescer(0.05, patch)
+    coalescer.start()
+
+    try:
+        coalescer.submit("ns-1", "es-1")
+        assert _wait_for(lambda: patch.call_count == 1)
+        coalescer.submit("ns-1", "es-1")
+        assert _wait_for(lambda: patch.call_count == 2)
+    finally:
+        coalescer.stop()
+
+def test_failed_patch_is_retried_then_dropped(mocker):
+    """Tests failed patches are retried after another interval, up to MAX_ATTEMPTS."""
+    mocker.patch.object(PatchCoalescer, "MAX_ATTEMPTS", 2)
+    patch = MagicMock(side_effect=[False, Exception("boom")])
+    coalescer = PatchCoalescer(0.05, patch)
+    coalescer.start()
+
+    try:
+        coalescer.submit("ns-1", "es-1")
+        assert _wait_for(lambda: patch.call_count == 2)
+        assert _wait_for(lambda: coalescer.pending_count() == 0)
+        time.sleep(0.15)
+        assert patch.call_count == 2
+    finally:
+        coalescer.stop()
+
+def test_stop_flushes_pending_patches():
+    """Tests pending patches are sent straight away on stop rather than lost."""
+    patch = MagicMock(return_value=True)
+    coalescer = PatchCoalescer(60, patch)
+    coalescer.start()
+
+    coalescer.submit("ns-1", "es-1")
+    coalescer.stop()
+
+    patch.assert_called_once_with("ns-1", "es-1")
+    assert coalescer.pending_count() == 0
+
+def test_patch_results_are_reported_with_oldest_change():
+    """Tests each patch attempt's result is reported along with the time of the oldest change folded into it."""
+    first = datetime(2024, 1, 1, 0, 0, 0, tzinfo=timezone.utc)
+    later = datetime(2024, 1, 1, 0, 0, 5, tzinfo=timezone.utc)
+    patch = MagicMock(side_effect=[False, True])
+    on_result = MagicMock()
+    coalescer = PatchCoalescer(0.05, patch, on_result)
+    coalescer.start()
+
+    try:
+        coalescer.submit("ns-1", "es-1", later)
+        coalescer.submit("ns-1", "es-1", first)
+        coalescer.submit("ns-1", "es-1")
+        assert _wait_for(lambda: on_result.call_count == 2)
+    finally:
+        coalescer.stop()
+
+    # The retry still covers the same changes
+    assert on_result.call_args_list == [call(False, first), call(True, first)]
@@ -0,0 +1,69 @@
+import pytest
+
+from external_secrets_reloader.status import pipeline_status
+from external_secrets_reloader.status.pipeline_status import PipelineStatus
+
+# --- Fixtures ---
+
+@pytest.fixture
+def clock(mocker):
+    now = [100.0]
+    mocker.patch.object(pipeline_status.time, "monotonic", side_effect=lambda: now[0])
+    return now
+
+# --- Tests ---
+
+def test_in_flight_events_with_ages(clock):
+    """Tests in flight events are shown oldest first with their age, and drop off once ended."""
+    status = PipelineStatus()
+    first = status.begin("/key/a")
+    clock[0] += 2
+    second = status.begin("/key/b")
+    clock[0] += 1
+
+    assert status.snapshot()["in_flight"] == [
+        {"key": "/key/a", "age_seconds": 3.0},
+        {"key": "/key/b", "age_seconds": 1.0},
+    ]
+
+    status.end(first)
+    status.end(second)
+    assert status.snapshot()["in_flight"] == []
+
+def test_recent_reloads_ring_buffer():
+    """Tests only the most recent reloads are kept, newest first."""
+    status = PipelineStatus(history_size=2)
+    status.record_reload("/key/a", "succeeded", 0.1, 1)
+    status.record_reload("/key/b", "failed", 7.5, 3)
+    status.record_reload("/key/c", "succeeded", 0.2, 2)
+
+    reloads = status.snapshot()["recent_reloads"]
+    assert [ (reload["key"], reload["outcome"], reload["attempts"]) for reload in reloads ] == [("/key/c", "succeeded", 2), ("/key/b", "failed", 3)]
+    assert reloads[1]["duration_seconds"] == 7.5
+    assert "finished_at" in reloads[0]
+
+def test_configure_keeps_most_recent_reloads():
+    """Tests resizing the ring buffer carries over the newest reloads."""
+    status = PipelineStatus(history_size=5)
+    for i in range(5):
+        status.record_reload(f"/key/{i}", "succeeded", 0.1, 1)
+
+    status.configure(2)
+
+    assert [ reload["key"] for reload in status.snapshot()["recent_reloads"] ] == ["/key/4", "/key/3"]
+
+def test_sections_collected_on_snapshot():
+    """Tests registered sections are collected when rendered, and a failing one doesn't break the rest."""
+    status = PipelineStatus()
+    calls = []
+    status.register("sqs", lambda: calls.append(1) or {"wait_time_seconds": 1})
+    status.register("broken", lambda: 1 / 0)
+
+    assert calls == []
+    snapshot = status.snapshot()
+
+    assert snapshot["sqs"] == {"wait_time_seconds": 1}
+    assert "error" in snapshot["broken"]
+
+    status.unregister("broken")
+    assert "broken" not in status.snapshot()
@@ -0,0 +1,84 @@
+import pytest
+import threading
+import time
+import tracemalloc
+
+from external_secrets_reloader.health_check.profiler import Profiler, ProfilerBusyError
+
+# --- Fixtures ---
+
+@pytest.fixture
+def profiler():
+    return Profiler()
+
+@pytest.fixture
+def busy_thread():
+    """Runs a named thread that spins until the test completes, so there is something to sample."""
+    stop = threading.Event()
+
+    def spin():
+        while not stop.is_set():
+            sum(range(1000))
+
+    thread = threading.Thread(target=spin, name="BusyThread", daemon=True)
+    thread.start()
+    yield thread
+    stop.set()
+    thread.join()
+
+# --- Tests ---
+
+def test_cpu_profile_samples_other_threads(profiler, busy_thread):
+    """Tests the CPU profile collects stacks from other threads, but not its own."""
+    result = profiler.cpu_profile(0.1, interval_seconds=0.001)
+
+    assert result["samples"] > 0
+    assert any(entry["stack"].startswith("BusyThread;") for entry in result["stacks"])
+    assert not any("cpu_profile" in entry["stack"] for entry in result["stacks"])
+
+def test_cpu_profile_duration_is_capped(profiler, mocker):
+    """Tests requested durations above the maximum are capped."""
+    mocker.patch.object(Profiler, "MAX_CPU_PROFILE_SECONDS", 0)
+
+    result = profiler.cpu_profile(1000)
+
+    assert result["duration_seconds"] == 0
+
+def test_cpu_profile_rejects_concurrent_profiles(profiler):
+    """Tests only one CPU profile can run at a time."""
+    profiler._cpu_profile_lock.acquire()
+    try:
+        with pytest.raises(ProfilerBusyError):
+            profiler.cpu_profile(0.01)
+    finally:
+        profiler._cpu_profile_lock.release()
+
+def test_memory_snapshot_starts_then_reports(profiler):
+    """Tests the first call starts tracemalloc and later calls report allocators."""
+    was_tracing = tracemalloc.is_tracing()
+    tracemalloc.stop()
+    try:
+        first = profiler.memory_snapshot()
+        assert tracemalloc.is_tracing() is True
+        assert first["allocators"] == []
+
+        allocations = [bytearray(1024) for _ in range(100)]
+        second = profiler.memory_snapshot(limit=5)
+        assert second["current_bytes"] > 0
+        assert 0 < len(second["allocators"]) <= 5
+
+        assert profiler.stop_memory_tracing() == {"tracing": False, "was_tracing": True}
+        assert tracemalloc.is_tracing() is False
+        del allocations
+    finally:
+        if was_tracing:
+            tracemalloc.start()
+
+def test_thread_dump_includes_all_threads(profiler, busy_thread):
+    """Tests the thread dump includes a stack for every thread."""
+    dump = profiler.thread_dump()
+
+    names = [thread["name"] for thread in dump["threads"]]
+    assert "BusyThread" in names
+    assert threading.current_thread().name in names
+    assert all(thread["stack"] for thread in dump["threads"])
@@ -0,0 +1,67 @@
+import pytest
+import logging
+
+from external_secrets_reloader.log_handling.rate_limit_filter import RateLimitFilter
+
+def _record(msg, args=(), level=logging.INFO, name="ESOAWSProviderReloader"):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+# --- Fixtures ---
+
+@pytest.fixture
+def clock(mocker):
+    """Controls time.monotonic as seen by the filter."""
+    current = [1000.0]
+    mocker.patch('external_secrets_reloader.log_handling.rate_limit_filter.time.monotonic', side_effect=lambda: current[0])
+    return current
+
+# --- Tests ---
+
+def test_limits_per_message_template(clock):
+    """Tests the same template is limited regardless of its arguments."""
+    rate_limit = RateLimitFilter(max_records=2, interval_seconds=60)
+
+    results = [rate_limit.filter(_record("Reloading %s/%s", ("ns", f"es-{i}"))) for i in range(5)]
+
+    assert results == [True, True, False, False, False]
+
+def test_different_templates_limited_separately(clock):
+    """Tests each template and logger has its own limit."""
+    rate_limit = RateLimitFilter(max_records=1, interval_seconds=60)
+
+    assert rate_limit.filter(_record("Reloading %s")) is True
+    assert rate_limit.filter(_record("Skipping %s")) is True
+    assert rate_limit.filter(_record("Reloading %s", name="OtherLogger")) is True
+    assert rate_limit.filter(_record("Reloading %s")) is False
+
+def test_warnings_and_errors_never_limited(clock):
+    """Tests warning and above always pass."""
+    rate_limit = RateLimitFilter(max_records=1, interval_seconds=60)
+
+    assert all(rate_limit.filter(_record("Failed %s", level=logging.ERROR)) for _ in range(10))
+    assert all(rate_limit.filter(_record("Careful %s", level=logging.WARNING)) for _ in range(10))
+
+def test_window_resets_and_reports_suppressed(clock):
+    """Tests a new window lets records through again and reports how many were suppressed."""
+    rate_limit = RateLimitFilter(max_records=1, interval_seconds=60)
+    suppressed_before = RateLimitFilter.RECORDS_SUPPRESSED.get()
+
+    rate_limit.filter(_record("Reloading %s"))
+    rate_limit.filter(_record("Reloading %s"))
+    rate_limit.filter(_record("Reloading %s"))
+
+    clock[0] += 60
+    record = _record("Reloading %s")
+    assert rate_limit.filter(record) is True
+    assert record.suppressed == 2
+    assert RateLimitFilter.RECORDS_SUPPRESSED.get() == suppressed_before + 2
+
+def test_groups_are_bounded(clock, mocker):
+    """Tests pre-formatted messages can't grow the tracked groups without bound."""
+    mocker.patch.object(RateLimitFilter, "MAX_GROUPS", 10)
+    rate_limit = RateLimitFilter(max_records=1, interval_seconds=60)
+
+    for i in range(100):
+        rate_limit.filter(_record(f"Key {i} Changed"))
+
+    assert len(rate_limit._windows) <= 10
@@ -0,0 +1,171 @@
+import pytest
+from unittest.mock import MagicMock
+
+from external_secrets_reloader.reloader import reload_confirmer as reload_confirmer_module
+from external_secrets_reloader.reloader.reload_confirmer import ReloadConfirmer
+
+# Unix time of 2024-01-01T00:00:00Z
+PATCHED_AT = 1704067200.4
+
+# --- Fixtures ---
+
+@pytest.fixture
+def clock(mocker):
+    now = [1000.0]
+    mocker.patch.object(reload_confirmer_module.time, "monotonic", side_effect=lambda: now[0])
+    return now
+
+@pytest.fixture
+def fetch():
+    return MagicMock(return_value={ "status": {} })
+
+@pytest.fixture
+def patch():
+    return MagicMock(return_value=True)
+
+@pytest.fixture
+def confirmer(fetch, patch, clock):
+    return ReloadConfirmer(fetch, patch, 60, 5)
+
+def check_all(confirmer):
+    for key, entry in list(confirmer._pending.items()):
+        confirmer._check(key, entry)
+
+def external_secret(refresh_time=None, ready=None, transitioned=None):
+    status = {}
+    if refresh_time is not None:
+        status["refreshTime"] = refresh_time
+    if ready is not None:
+        status["conditions"] = [ { "type": "Ready", "status": ready, "lastTransitionTime": transitioned } ]
+    return { "status": status }
+
+# --- Tests ---
+
+@pytest.mark.parametrize("es, outcome", [
+    (external_secret(refresh_time="2024-01-01T00:00:07Z"), "confirmed"),
+    # Same second as the patch, which can only be told apart to the second
+    (external_secret(refresh_time="2024-01-01T00:00:00Z"), "confirmed"),
+    (external_secret(refresh_time="2023-12-31T23:59:59Z"), None),
+    (external_secret(refresh_time="2023-12-31T23:00:00Z", ready="False", transitioned="2024-01-01T00:00:03Z"), "failed"),
+    # Already failing before the patch, so says nothing about this reconcile yet
+    (external_secret(refresh_time="2023-12-31T23:00:00Z", ready="False", transitioned="2023-12-31T23:30:00Z"), None),
+    (external_secret(), None),
+])
+def test_reconcile_outcome(es, outcome):
+    """Tests an ExternalSecret is only reconciled once refreshTime or a Ready failure reaches the patch."""
+    assert ReloadConfirmer.reconcile_outcome(es, PATCHED_AT)[0] == outcome
+
+def test_confirmed_observes_completion_latency(confirmer, fetch):
+    """Tests a confirmed reload records the time from the patch to refreshTime and stops being tracked."""
+    fetch.return_value = external_secret(refresh_time="2024-01-01T00:00:07Z")
+    count_before = ReloadConfirmer.COMPLETION_DURATION.get_count()
+    sum_before = ReloadConfirmer.COMPLETION_DURATION.get_sum()
+    confirmed_before = ReloadConfirmer.CONFIRMATIONS.get(outcome="confirmed")
+
+    confirmer.track("ns", "es", PATCHED_AT)
+    assert confirmer.unconfirmed_count() == 1
+    check_all(confirmer)
+
+    fetch.assert_called_once_with("ns", "es")
+    assert confirmer.unconfirmed_count() == 0
+    assert ReloadConfirmer.COMPLETION_DURATION.get_count() == count_before + 1
+    assert ReloadConfirmer.COMPLETION_DURATION.get_sum() == pytest.approx(sum_before + 6.6)
+    assert ReloadConfirmer.CONFIRMATIONS.get(outcome="confirmed") == confirmed_before + 1
+
+def test_failed_reconcile_is_flagged_without_repatching(confirmer, fetch, patch):
+    """Tests a Ready condition turning False after the patch is flagged straight away."""
+    fetch.return_value = external_secret(ready="False", transitioned="2024-01-01T00:00:03Z")
+    failed_before = ReloadConfirmer.CONFIRMATIONS.get(outcome="failed")
+
+    confirmer.track("ns", "es", PATCHED_AT)
+    check_all(confirmer)
+
+    patch.assert_not_called()
+    assert confirmer.unconfirmed_count() == 0
+    assert ReloadConfirmer.CONFIRMATIONS.get(outcome="failed") == failed_before + 1
+
+def test_repatches_after_deadline_then_times_out(confirmer, fetch, patch, clock):
+    """Tests an unreconciled ExternalSecret is patched again at each deadline, then flagged as timed out."""
+    repatches_before = ReloadConfirmer.REPATCHES.get()
+    timed_out_before = ReloadConfirmer.CONFIRMATIONS.get(outcome="timed_out")
+    confirmer.track("ns", "es", PATCHED_AT)
+
+    # Still within the deadline
+    clock[0] += 30
+    check_all(confirmer)
+    patch.assert_not_called()
+
+    for repatch in range(ReloadConfirmer.MAX_REPATCHES):
+        clock[0] += 61
+        check_all(confirmer)
+        assert patch.call_count == repatch + 1
+        assert confirmer.unconfirmed_count() == 1
+
+    clock[0] += 61
+    check_all(confirmer)
+
+    assert patch.call_count == ReloadConfirmer.MAX_REPATCHES
+    assert confirmer.unconfirmed_count() == 0
+    assert ReloadConfirmer.REPATCHES.get() == repatches_before + ReloadConfirmer.MAX_REPATCHES
+    assert ReloadConfirmer.CONFIRMATIONS.get(outcome="timed_out") == timed_out_before + 1
+
+def test_repatched_reload_confirms_against_original_patch(confirmer, fetch, clock):
+    """Tests the completion latency covers the time since the first patch, not the re-patch."""
+    confirmer.track("ns", "es", PATCHED_AT)
+    clock[0] += 61
+    check_all(confirmer)
+
+    fetch.return_value = external_secret(refresh_time="2024-01-01T00:01:10Z")
+    sum_before = ReloadConfirmer.COMPLETION_DURATION.get_sum()
+    check_all(confirmer)
+
+    assert confirmer.unconfirmed_count() == 0
+    assert ReloadConfirmer.COMPLETION_DURATION.get_sum() == pytest.approx(sum_before + 69.6)
+
+def test_deleted_external_secret_stops_being_tracked(confirmer, fetch, patch):
+    """Tests an ExternalSecret deleted before reconciling is dropped without an outcome."""
+    fetch.return_value = None
+
+    confirmer.track("ns", "es", PATCHED_AT)
+    check_all(confirmer)
+
+    patch.assert_not_called()
+    assert confirmer.unconfirmed_count() == 0
+
+def test_fetch_failure_waits_for_next_poll(confirmer, fetch, patch):
+    """Tests an ExternalSecret that can't be fetched is checked again rather than flagged."""
+    fetch.side_effect = Exception("Connection refused")
+
+    confirmer.track("ns", "es", PATCHED_AT)
+    check_all(confirmer)
+
+    patch.assert_not_called()
+    assert confirmer.unconfirmed_count() == 1
+
+def test_newer_patch_replaces_entry_being_checked(confirmer, fetch):
+    """Tests a patch made while an older one is being checked isn't resolved by the older one's check."""
+    confirmer.track("ns", "es", PATCHED_AT)
+    stale_entry = confirmer._pending[("ns", "es")]
+    confirmer.track("ns", "es", PATCHED_AT + 30)
+
+    fetch.return_value = external_secret(refresh_time="2024-01-01T00:00:07Z")
+    confirmer._check(("ns", "es"), stale_entry)
+
+    assert confirmer.unconfirmed_count() == 1
+
+def test_background_thread_checks_until_stopped(fetch, patch):
+    """Tests started confirmers check on their own and stop promptly."""
+    fetch.return_value = external_secret(refresh_time="2024-01-01T00:00:07Z")
+    confirmer = ReloadConfirmer(fetch, patch, 60, 0.01)
+    confirmer.start()
+    try:
+        confirmer.track("ns", "es", PATCHED_AT)
+        for _ in range(500):
+            if confirmer.unconfirmed_count() == 0:
+                break
+            reload_confirmer_module.time.sleep(0.01)
+    finally:
+        confirmer.stop(timeout_seconds=5)
+
+    assert confirmer.unconfirmed_count() == 0
+    assert not confirmer._thread.is_alive()
@@ -0,0 +1,99 @@
+import pytest
+from datetime import datetime, timezone
+
+from external_secrets_reloader.filters import rotation_tracker
+from external_secrets_reloader.filters.rotation_tracker import RotationTracker
+
+# --- Fixtures ---
+
+@pytest.fixture
+def tracker():
+    return RotationTracker(timeout_seconds=60)
+
+# --- Tests ---
+
+def test_untracked_events_reload_straight_away(tracker):
+    """Tests events outside of a rotation are never held."""
+    assert tracker.observe("my-secret", "PutSecretValue", ["AWSCURRENT"]) is True
+    assert tracker.observe("my-secret", "UpdateSecret", []) is True
+    assert tracker.observe("my-secret", None, []) is True
+
+def test_rotation_is_collapsed_into_one_reload(tracker):
+    """Tests every event of a rotation is held until AWSCURRENT moves, which reloads once."""
+    collapsed_before = RotationTracker.EVENTS_COLLAPSED.get()
+
+    assert tracker.observe("my-secret", "RotateSecret", []) is False
+    assert tracker.observe("my-secret", "PutSecretValue", ["AWSPENDING"]) is False
+    assert tracker.observe("my-secret", "UpdateSecretVersionStage", ["AWSPENDING"]) is False
+    assert RotationTracker.ROTATIONS_PENDING.get() == 1
+
+    assert tracker.observe("my-secret", "UpdateSecretVersionStage", ["AWSCURRENT"]) is True
+    assert RotationTracker.ROTATIONS_PENDING.get() == 0
+    assert RotationTracker.EVENTS_COLLAPSED.get() - collapsed_before == 3
+
+    # The rotation is over, so the next change reloads straight away
+    assert tracker.observe("my-secret", "PutSecretValue", ["AWSCURRENT"]) is True
+
+def test_pending_put_starts_a_rotation(tracker):
+    """Tests a value put under AWSPENDING is held, as it's the start of a rotation ExternalSecrets can't see yet."""
+    assert tracker.observe("my-secret", "PutSecretValue", ["AWSPENDING"]) is False
+    assert tracker.observe("other-secret", "PutSecretValue", ["AWSCURRENT"]) is True
+
+def test_expired_rotations_are_popped_with_latest_event(tracker, mocker):
+    """Tests rotations where AWSCURRENT never moves are handed back once the timeout passes."""
+    monotonic = mocker.patch.object(rotation_tracker.time, "monotonic", return_value=1000)
+    timed_out_before = RotationTracker.ROTATIONS_TIMED_OUT.get()
+    first = datetime(2024, 1, 1, 0, 0, 0, tzinfo=timezone.utc)
+    latest = datetime(2024, 1, 1, 0, 0, 5, tzinfo=timezone.utc)
+
+    tracker.observe("my-secret", "RotateSecret", [], first, "us-east-1", "123456789012")
+    tracker.observe("my-secret", "PutSecretValue", ["AWSPENDING"], latest, "us-east-1", "123456789012")
+    assert tracker.pop_expired() == []
+
+    monotonic.return_value = 1060
+    expired = tracker.pop_expired()
+
+    assert [ (pending.key, pending.event_time, pending.region, pending.account) for pending in expired ] == [
+        ("my-secret", latest, "us-east-1", "123456789012")
+    ]
+    assert RotationTracker.ROTATIONS_TIMED_OUT.get() - timed_out_before == 1
+    assert tracker.pop_expired() == []
+
+def test_pop_all_hands_back_every_held_rotation(tracker):
+    """Tests everything held is handed back on shutdown."""
+    tracker.observe("first", "RotateSecret", [])
+    tracker.observe("second", "RotateSecret", [])
+
+    assert sorted(pending.key for pending in tracker.pop_all()) == ["first", "second"]
+    assert tracker.pop_all() == []
+    assert RotationTracker.ROTATIONS_PENDING.get() == 0
+
+def test_held_events_are_handed_back_with_their_rotation(tracker):
+    """Tests events held for a rotation are handed back once, and only once the rotation is no longer pending."""
+    first, second = object(), object()
+    tracker.observe("my-secret", "RotateSecret", [])
+    tracker.hold("my-secret", first)
+    tracker.hold("my-secret", second)
+
+    assert tracker.pop_completed() == []
+
+    assert tracker.observe("my-secret", "UpdateSecretVersionStage", ["AWSCURRENT"]) is True
+    assert tracker.pop_completed() == [first, second]
+    assert tracker.pop_completed() == []
+    assert tracker.take_held("my-secret") == []
+
+def test_shared_pending_tracks_rotation_across_trackers():
+    """Tests trackers sharing pending rotations see each other's, and only pop their own on shutdown."""
+    pending = dict()
+    lock = rotation_tracker.Lock()
+    this_worker = RotationTracker(60, pending, lock)
+    other_worker = RotationTracker(60, pending, lock)
+    latest = datetime(2024, 1, 1, 0, 0, 5, tzinfo=timezone.utc)
+
+    assert this_worker.observe("my-secret", "RotateSecret", []) is False
+    assert other_worker.observe("my-secret", "PutSecretValue", ["AWSPENDING"], latest) is False
+    assert pending["my-secret"].event_time == latest
+
+    pending["other-secret"] = rotation_tracker.PendingRotation("other-secret", 0, None, None, None, owner=-1)
+    assert [ rotation.key for rotation in other_worker.pop_all() ] == ["my-secret"]
+    assert list(pending.keys()) == ["other-secret"]
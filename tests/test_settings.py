@@ -22,8 +22,15 @@ def cleanup_env():
     and restore them after, ensuring test isolation.
     """
     keys_to_manage = [
-        "SQS_QUEUE_URL", "SQS_QUEUE_WAIT_TIME", "EVENT_SOURCE", 
-        "EVENT_SERVICE", "HEALTH_CHECK_PORT", "LOG_LEVEL"
+        "SQS_QUEUE_URL", "SQS_QUEUE_WAIT_TIME", "SQS_RECEIVE_BATCH_SIZE", "EVENT_SOURCE", 
+        "EVENT_SERVICE", "HEALTH_CHECK_PORT", "LOG_LEVEL",
+        "CACHE_ENABLED", "CACHE_SNAPSHOT_PATH", "CACHE_SNAPSHOT_INTERVAL", "STREAMING_LIST_ENABLED", "LIST_FROM_WATCH_CACHE", "CIRCUIT_BREAKER_FAILURE_THRESHOLD", "CIRCUIT_BREAKER_PROBE_INTERVAL", "STATUS_RELOAD_HISTORY", "KUBE_CONTEXTS", "RELOAD_CONFIRM_DEADLINE", "RELOAD_CONFIRM_POLL_INTERVAL", "FRESHNESS_SLO",
+        "TRACING_EXPORTER", "TRACING_FILE_PATH", "TRACING_OTLP_ENDPOINT", "TRACING_SAMPLE_RATE",
+        "LOG_QUEUE_SIZE", "LOG_RATE_LIMIT", "LOG_RATE_LIMIT_INTERVAL",
+        "WORKER_PROCESSES", "RELOAD_COALESCE_INTERVAL", "RELOAD_OPERATIONS",
+        "ROTATION_HOLD_TIMEOUT", "SQS_DEPTH_SAMPLE_INTERVAL", "SQS_MIN_CONSUMERS", "SQS_MAX_CONSUMERS",
+        "SQS_MESSAGES_PER_CONSUMER", "EVENT_LANES", "EVENT_TRANSPORT", "PUSH_PORT", "PUSH_SHARED_SECRET",
+        "PUSH_AUTH_HEADER", "PUSH_QUEUE_SIZE"
     ]
     
     # 1. Save the original values of the keys we intend to test/clear
@@ -156,4 +163,172 @@ def test_validator_aws_missing_sqs_queue_url():
     with pytest.raises(ValueError) as exc_info:
         load_settings_with_env(invalid_env)
         
-    assert "SQS_QUEUE_URL is required when EVENT_CLOUD='AWS'." in str(exc_info.value)
\ No newline at end of file
+    assert "SQS_QUEUE_URL is required when EVENT_CLOUD='AWS'." in str(exc_info.value)
+
+def test_validator_cache_snapshot_requires_cache():
+    """Tests a snapshot path can't be configured without enabling the cache."""
+    invalid_env = VALID_ENV.copy()
+    invalid_env["CACHE_SNAPSHOT_PATH"] = "/var/cache/esr/index.snapshot"
+
+    with pytest.raises(ValueError) as exc_info:
+        load_settings_with_env(invalid_env)
+
+    assert "CACHE_SNAPSHOT_PATH requires CACHE_ENABLED" in str(exc_info.value)
+
+def test_validator_kube_contexts_not_empty():
+    """Tests KUBE_CONTEXTS has to name at least one context when set."""
+    invalid_env = VALID_ENV.copy()
+    invalid_env["KUBE_CONTEXTS"] = " , "
+
+    with pytest.raises(ValueError) as exc_info:
+        load_settings_with_env(invalid_env)
+
+    assert "KUBE_CONTEXTS must name at least one kubeconfig context" in str(exc_info.value)
+
+    valid_env = VALID_ENV.copy()
+    valid_env["KUBE_CONTEXTS"] = "prod-east,prod-west"
+    assert load_settings_with_env(valid_env).KUBE_CONTEXTS == "prod-east,prod-west"
+
+def test_settings_cache_defaults_and_overrides():
+    """Tests the cache is off by default and can be enabled with a snapshot."""
+    assert load_settings_with_env(VALID_ENV).CACHE_ENABLED is False
+
+    custom_env = VALID_ENV.copy()
+    custom_env.update({
+        "CACHE_ENABLED": "true",
+        "CACHE_SNAPSHOT_PATH": "/var/cache/esr/index.snapshot",
+        "CACHE_SNAPSHOT_INTERVAL": "30"
+    })
+    settings = load_settings_with_env(custom_env)
+
+    assert settings.CACHE_ENABLED is True
+    assert settings.CACHE_SNAPSHOT_PATH == "/var/cache/esr/index.snapshot"
+    assert settings.CACHE_SNAPSHOT_INTERVAL == 30
+
+
+@pytest.mark.parametrize("exporter, missing_setting", [("file", "TRACING_FILE_PATH"), ("otlp", "TRACING_OTLP_ENDPOINT")])
+def test_validator_tracing_exporter_requires_destination(exporter, missing_setting):
+    """Tests each tracing exporter requires somewhere to export to."""
+    invalid_env = VALID_ENV.copy()
+    invalid_env["TRACING_EXPORTER"] = exporter
+
+    with pytest.raises(ValueError) as exc_info:
+        load_settings_with_env(invalid_env)
+
+    assert f"{missing_setting} is required" in str(exc_info.value)
+
+@pytest.mark.parametrize("invalid_rate", ["-0.1", "1.5"])
+def test_validation_tracing_sample_rate_limits(invalid_rate):
+    """Tests validation for TRACING_SAMPLE_RATE (ge=0, le=1)."""
+    invalid_env = VALID_ENV.copy()
+    invalid_env["TRACING_SAMPLE_RATE"] = invalid_rate
+
+    with pytest.raises(ValidationError) as exc_info:
+        load_settings_with_env(invalid_env)
+
+    assert "TRACING_SAMPLE_RATE" in str(exc_info.value)
+
+
+def test_settings_queue_depth_sampling_is_opt_in():
+    """Tests queue depth sampling, which needs sqs:GetQueueAttributes, is off unless an interval is set."""
+    assert load_settings_with_env(VALID_ENV).SQS_DEPTH_SAMPLE_INTERVAL == 0
+
+    custom_env = VALID_ENV.copy()
+    custom_env["SQS_DEPTH_SAMPLE_INTERVAL"] = "30"
+    assert load_settings_with_env(custom_env).SQS_DEPTH_SAMPLE_INTERVAL == 30
+
+def test_settings_log_pipeline_defaults():
+    """Tests the log queue has a bounded default size and rate limiting is off by default."""
+    settings = load_settings_with_env(VALID_ENV)
+
+    assert settings.LOG_QUEUE_SIZE == 10000
+    assert settings.LOG_RATE_LIMIT == 0
+    assert settings.LOG_RATE_LIMIT_INTERVAL == 60
+
+def test_settings_worker_processes():
+    """Tests WORKER_PROCESSES defaults to unset (the CPU count) and must be at least 1."""
+    assert load_settings_with_env(VALID_ENV).WORKER_PROCESSES is None
+
+    env = VALID_ENV.copy()
+    env["WORKER_PROCESSES"] = "4"
+    assert load_settings_with_env(env).WORKER_PROCESSES == 4
+
+    env["WORKER_PROCESSES"] = "0"
+    with pytest.raises(ValidationError) as exc_info:
+        load_settings_with_env(env)
+
+    assert "WORKER_PROCESSES" in str(exc_info.value)
+
+def test_settings_reload_coalesce_interval():
+    """Tests coalescing is off by default and can't be negative."""
+    assert load_settings_with_env(VALID_ENV).RELOAD_COALESCE_INTERVAL == 0
+
+    env = VALID_ENV.copy()
+    env["RELOAD_COALESCE_INTERVAL"] = "-1"
+    with pytest.raises(ValidationError) as exc_info:
+        load_settings_with_env(env)
+
+    assert "RELOAD_COALESCE_INTERVAL" in str(exc_info.value)
+
+def test_settings_reload_operations_default():
+    """Tests RELOAD_OPERATIONS is unset by default, so the service's defaults are used."""
+    assert load_settings_with_env(VALID_ENV).RELOAD_OPERATIONS is None
+
+    env = VALID_ENV.copy()
+    env["RELOAD_OPERATIONS"] = "Create,Update,Delete"
+    assert load_settings_with_env(env).RELOAD_OPERATIONS == "Create,Update,Delete"
+
+def test_settings_rotation_hold_timeout():
+    """Tests rotations are held for 5 minutes by default and the timeout can't be negative."""
+    assert load_settings_with_env(VALID_ENV).ROTATION_HOLD_TIMEOUT == 300
+
+    env = VALID_ENV.copy()
+    env["ROTATION_HOLD_TIMEOUT"] = "-1"
+    with pytest.raises(ValidationError) as exc_info:
+        load_settings_with_env(env)
+
+    assert "ROTATION_HOLD_TIMEOUT" in str(exc_info.value)
+
+def test_settings_sqs_consumer_bounds():
+    """Tests consumer scaling is off by default and the max can't be below the min."""
+    settings = load_settings_with_env(VALID_ENV)
+    assert settings.SQS_MIN_CONSUMERS == 1
+    assert settings.SQS_MAX_CONSUMERS == 1
+
+    env = VALID_ENV.copy()
+    env["SQS_MIN_CONSUMERS"] = "4"
+    env["SQS_MAX_CONSUMERS"] = "2"
+    with pytest.raises(ValidationError) as exc_info:
+        load_settings_with_env(env)
+
+    assert "SQS_MAX_CONSUMERS must be greater than or equal to SQS_MIN_CONSUMERS" in str(exc_info.value)
+
+def test_settings_event_lanes_default():
+    """Tests lanes are off by default."""
+    assert load_settings_with_env(VALID_ENV).EVENT_LANES == 0
+
+def test_settings_http_transport_requires_shared_secret():
+    """Tests pushed events don't need an SQS queue, but do need a shared secret."""
+    env = VALID_ENV.copy()
+    del env["SQS_QUEUE_URL"]
+    env["EVENT_TRANSPORT"] = "HTTP"
+    with pytest.raises(ValidationError) as exc_info:
+        load_settings_with_env(env)
+
+    assert "PUSH_SHARED_SECRET is required when EVENT_TRANSPORT='HTTP'." in str(exc_info.value)
+
+    env["PUSH_SHARED_SECRET"] = "s3cret"
+    settings = load_settings_with_env(env)
+    assert settings.EVENT_TRANSPORT == "HTTP"
+    assert settings.PUSH_PORT == 8081
+
+def test_settings_http_transport_single_worker():
+    """Tests pushed events can't be spread over multiple worker processes, as they all arrive on one port."""
+    env = VALID_ENV.copy()
+    env["EVENT_TRANSPORT"] = "HTTP"
+    env["PUSH_SHARED_SECRET"] = "s3cret"
+    env["WORKER_PROCESSES"] = "2"
+    with pytest.raises(ValidationError) as exc_info:
+        load_settings_with_env(env)
+
+    assert "WORKER_PROCESSES can't be more than 1" in str(exc_info.value)
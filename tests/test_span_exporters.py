@@ -0,0 +1,71 @@
+import pytest
+import json
+from unittest.mock import MagicMock
+
+from external_secrets_reloader.tracing.span_exporters import FileSpanExporter, OTLPHttpSpanExporter, to_otlp_request
+from external_secrets_reloader.tracing.tracer import Span
+
+# --- Fixtures ---
+
+@pytest.fixture
+def spans():
+    root = Span("5fea77560ea4451aa703a558b933e274", "esr.event", None, 1000, {"messaging.message.id": "abc"})
+    root.end_time_ns = 5000
+    child = Span(root.trace_id, "k8s.patch_namespaced_custom_object", root.span_id, 2000, {"attempt": 1, "sampled": True})
+    child.end_time_ns = 3000
+    child.error = "ApiException: (500)"
+    return [root, child]
+
+# --- Tests ---
+
+def test_to_otlp_request(spans):
+    """Tests spans are converted into an OTLP/JSON export request."""
+    request = to_otlp_request(spans)
+
+    otlp_spans = request["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    root, child = otlp_spans
+
+    assert request["resourceSpans"][0]["resource"]["attributes"] == [{"key": "service.name", "value": {"stringValue": "external-secrets-reloader"}}]
+    assert root["traceId"] == "5fea77560ea4451aa703a558b933e274"
+    assert "parentSpanId" not in root
+    assert root["startTimeUnixNano"] == "1000"
+    assert root["status"] == {"code": 1}
+
+    assert child["parentSpanId"] == root["spanId"]
+    assert child["status"] == {"code": 2, "message": "ApiException: (500)"}
+    assert {"key": "attempt", "value": {"intValue": "1"}} in child["attributes"]
+    assert {"key": "sampled", "value": {"boolValue": True}} in child["attributes"]
+
+def test_file_exporter_appends_json_lines(spans, tmp_path):
+    """Tests each trace is appended to the file as one line of OTLP/JSON."""
+    path = tmp_path / "traces.jsonl"
+    exporter = FileSpanExporter(str(path))
+
+    exporter.export(spans)
+    exporter.export(spans)
+
+    lines = path.read_text().splitlines()
+    assert len(lines) == 2
+    assert json.loads(lines[0]) == to_otlp_request(spans)
+
+@pytest.mark.parametrize("endpoint, expected_url", [
+    ("http://collector:4318", "http://collector:4318/v1/traces"),
+    ("http://collector:4318/", "http://collector:4318/v1/traces"),
+    ("http://collector:4318/v1/traces", "http://collector:4318/v1/traces"),
+])
+def test_otlp_exporter_url(endpoint, expected_url):
+    """Tests the traces path is added to the collector endpoint when missing."""
+    assert OTLPHttpSpanExporter(endpoint).url == expected_url
+
+def test_otlp_exporter_posts_json(spans, mocker):
+    """Tests traces are POSTed as JSON to the collector."""
+    mock_urlopen = mocker.patch('external_secrets_reloader.tracing.span_exporters.urllib.request.urlopen')
+    mock_urlopen.return_value.__enter__.return_value = MagicMock(status=200)
+
+    OTLPHttpSpanExporter("http://collector:4318").export(spans)
+
+    request = mock_urlopen.call_args[0][0]
+    assert request.full_url == "http://collector:4318/v1/traces"
+    assert request.get_method() == "POST"
+    assert request.get_header("Content-type") == "application/json"
+    assert json.loads(request.data) == to_otlp_request(spans)
@@ -1,9 +1,12 @@
 import pytest
 from unittest.mock import MagicMock
+from botocore.exceptions import ClientError
 
 # --- Correct Imports based on your file structure ---
 # Import the class under test
+from external_secrets_reloader.processors import sqs_processor as sqs_processor_module
 from external_secrets_reloader.processors.sqs_processor import SQSProcessor
+from external_secrets_reloader.tracing.tracer import Tracer
 
 # Import dependent classes for patching
 from external_secrets_reloader.entries.sqsentry import SQSEntry
@@ -121,7 +124,8 @@ def test_load_next_entry_success(processor_instance, mock_boto3_client_setup, mo
     mock_sqs_client_instance.receive_message.assert_called_once_with(
         QueueUrl=processor_instance.queue_url,
         MaxNumberOfMessages=1,
-        WaitTimeSeconds=5 # min_wait_time
+        WaitTimeSeconds=5, # min_wait_time
+        AttributeNames=['SentTimestamp', 'ApproximateReceiveCount']
     )
     
     # Assert backoff reset
@@ -129,6 +133,29 @@ def test_load_next_entry_success(processor_instance, mock_boto3_client_setup, mo
     assert processor_instance.current_wait_time == 5
 
 
+def test_load_next_entry_batch(mock_boto3_client_setup, mock_sqs_message):
+    """Test messages received together are loaded one at a time, without receiving again until they all have been."""
+    mock_client_function, mock_sqs_client_instance = mock_boto3_client_setup
+    second_message = dict(mock_sqs_message, MessageId='message-id-789', ReceiptHandle='receipt-handle-789')
+    mock_sqs_client_instance.receive_message.return_value = {'Messages': [mock_sqs_message, second_message]}
+    processor = SQSProcessor(queue_url="https://sqs.us-east-1.amazonaws.com/123456789012/test-queue", min_wait_time=5, batch_size=10)
+
+    assert processor.load_next_entry() is True
+    assert processor.message_id == 'message-id-123'
+    assert processor.received_count() == 1
+    assert mock_sqs_client_instance.receive_message.call_args.kwargs['MaxNumberOfMessages'] == 10
+
+    processor.mark_entry_resolved()
+    processor.stop()
+    # Already received, so still loaded once stopped
+    assert processor.load_next_entry() is True
+    assert processor.message_id == 'message-id-789'
+    processor.mark_entry_resolved()
+
+    assert processor.load_next_entry() is False
+    assert mock_sqs_client_instance.receive_message.call_count == 1
+    assert [ c.kwargs['ReceiptHandle'] for c in mock_sqs_client_instance.delete_message.call_args_list ] == ['receipt-handle-456', 'receipt-handle-789']
+
 ## Test load_next_entry (Failure and Backoff Cases)
 
 def test_load_next_entry_no_message(processor_instance, mock_boto3_client_setup):
@@ -156,9 +183,20 @@ def test_load_next_entry_no_message(processor_instance, mock_boto3_client_setup)
     mock_sqs_client_instance.receive_message.assert_called_once_with(
         QueueUrl=processor_instance.queue_url,
         MaxNumberOfMessages=1,
-        WaitTimeSeconds=5
+        WaitTimeSeconds=5,
+        AttributeNames=['SentTimestamp', 'ApproximateReceiveCount']
     )
 
+def test_status_shows_wait_time_and_empty_poll_streak(processor_instance, mock_boto3_client_setup):
+    """Test the status reflects the current receive wait time and how many receives in a row were empty."""
+    mock_client_function, mock_sqs_client_instance = mock_boto3_client_setup
+    mock_sqs_client_instance.receive_message.return_value = {'Messages': []}
+
+    processor_instance.load_next_entry()
+    processor_instance.load_next_entry()
+
+    assert processor_instance.status() == {"fifo": False, "wait_time_seconds": 20, "empty_poll_streak": 2}
+
 def test_load_next_entry_backoff_increase(processor_instance, mock_boto3_client_setup):
     """Test that the wait time increases exponentially after consecutive empty polls."""
     
@@ -294,4 +332,191 @@ def test_get_entry_returns_sqs_entry(processor_instance, mocker, mock_sqs_messag
     mock_sqs_entry_cls.assert_called_once_with(mock_sqs_message)
     
     # ASSERT 2: Verify the return value is the result of the mocked constructor call
-    assert entry == mock_sqs_entry_cls.return_value
\ No newline at end of file
+    assert entry == mock_sqs_entry_cls.return_value
+
+## Test Tracing
+
+def test_load_next_entry_starts_trace_from_message_id(processor_instance, mocker):
+    """Test that a received message starts a trace keyed by its MessageId and records the receive."""
+    mock_tracer = mocker.patch('external_secrets_reloader.processors.sqs_processor.TRACER')
+    mock_tracer.start_trace.return_value = True
+
+    processor_instance.load_next_entry()
+
+    assert mock_tracer.start_trace.call_args[0][0] == 'message-id-123'
+    assert mock_tracer.record_span.call_args[0][0] == 'sqs.receive_message'
+
+def test_trace_root_span_starts_before_receive(processor_instance, mocker):
+    """Test the message's root span starts when the receive began, so it covers its sqs.receive_message child."""
+    exporter = MagicMock()
+    tracer = Tracer()
+    tracer.configure(exporter, sample_rate=1.0)
+    mocker.patch('external_secrets_reloader.processors.sqs_processor.TRACER', tracer)
+
+    try:
+        processor_instance.load_next_entry()
+        tracer.end_trace()
+    finally:
+        tracer.shutdown()
+
+    root, receive = exporter.export.call_args[0][0]
+    assert root.start_time_ns == receive.start_time_ns
+    assert "start_time_ns" not in root.attributes
+
+def test_load_next_entry_no_message_starts_no_trace(processor_instance, mock_boto3_client_setup, mocker):
+    """Test that empty polls are not traced."""
+    mock_client_function, mock_sqs_client_instance = mock_boto3_client_setup
+    mock_sqs_client_instance.receive_message.return_value = {'Messages': []}
+    mock_tracer = mocker.patch('external_secrets_reloader.processors.sqs_processor.TRACER')
+
+    processor_instance.load_next_entry()
+
+    mock_tracer.start_trace.assert_not_called()
+
+## Test sample_queue_depth
+
+def test_sample_queue_depth_publishes_metrics(processor_instance, mock_boto3_client_setup):
+    """Test the queue depth is read from the queue attributes and published as gauges."""
+    mock_client_function, mock_sqs_client_instance = mock_boto3_client_setup
+    mock_sqs_client_instance.get_queue_attributes.return_value = {
+        'Attributes': {'ApproximateNumberOfMessages': '42', 'ApproximateNumberOfMessagesNotVisible': '3'}
+    }
+
+    assert processor_instance.sample_queue_depth() == (42, 3)
+
+    mock_sqs_client_instance.get_queue_attributes.assert_called_once_with(
+        QueueUrl=processor_instance.queue_url,
+        AttributeNames=['ApproximateNumberOfMessages', 'ApproximateNumberOfMessagesNotVisible']
+    )
+    assert SQSProcessor.QUEUE_MESSAGES_VISIBLE.get() == 42
+    assert SQSProcessor.QUEUE_MESSAGES_IN_FLIGHT.get() == 3
+
+def test_sample_queue_depth_failure(processor_instance, mock_boto3_client_setup):
+    """Test a failed sample returns None rather than raising."""
+    mock_client_function, mock_sqs_client_instance = mock_boto3_client_setup
+    mock_sqs_client_instance.get_queue_attributes.side_effect = ClientError(
+        {'Error': {'Code': 'AccessDenied', 'Message': 'Denied'}}, 'GetQueueAttributes'
+    )
+
+    assert processor_instance.sample_queue_depth() is None
+
+def test_shared_sqs_client(mock_boto3_client_setup):
+    """Test a processor given an existing client doesn't create its own."""
+    mock_client_function, mock_sqs_client_instance = mock_boto3_client_setup
+    shared_client = object()
+
+    processor = SQSProcessor(queue_url="https://sqs.us-east-1.amazonaws.com/123456789012/test-queue", min_wait_time=5, sqs_client=shared_client)
+
+    assert processor.sqs_client is shared_client
+    mock_client_function.assert_not_called()
+
+## Test FIFO queues
+
+@pytest.fixture
+def fifo_processor(mock_boto3_client_setup):
+    return SQSProcessor(queue_url="https://sqs.us-east-1.amazonaws.com/123456789012/test-queue.fifo", min_wait_time=5)
+
+def test_receive_records_queue_lag_and_redeliveries(processor_instance, mock_boto3_client_setup, mock_sqs_message, mocker):
+    """Test the time a message sat in the queue is observed, and redelivered messages are counted."""
+    mock_client_function, mock_sqs_client_instance = mock_boto3_client_setup
+    mocker.patch.object(sqs_processor_module.time, "time", return_value=1700000012.5)
+    mock_sqs_message['Attributes'] = {'SentTimestamp': '1700000010000', 'ApproximateReceiveCount': '3'}
+    lag_count_before = SQSProcessor.QUEUE_LAG.get_count()
+    lag_sum_before = SQSProcessor.QUEUE_LAG.get_sum()
+    redelivered_before = SQSProcessor.MESSAGES_REDELIVERED.get()
+
+    assert processor_instance.load_next_entry() is True
+
+    assert SQSProcessor.QUEUE_LAG.get_count() == lag_count_before + 1
+    assert SQSProcessor.QUEUE_LAG.get_sum() == pytest.approx(lag_sum_before + 2.5)
+    assert SQSProcessor.MESSAGES_REDELIVERED.get() == redelivered_before + 1
+
+def test_fifo_receive_requests_group_and_attempt_id(fifo_processor, mock_boto3_client_setup, mock_sqs_message):
+    """Test FIFO receives ask for the message group and use a new attempt ID once a receive succeeds."""
+    mock_client_function, mock_sqs_client_instance = mock_boto3_client_setup
+    mock_sqs_message['Attributes'] = {'MessageGroupId': 'group-a'}
+    first_attempt_id = fifo_processor.receive_request_attempt_id
+
+    assert fifo_processor.is_fifo is True
+    assert fifo_processor.load_next_entry() is True
+
+    mock_sqs_client_instance.receive_message.assert_called_once_with(
+        QueueUrl=fifo_processor.queue_url,
+        MaxNumberOfMessages=1,
+        WaitTimeSeconds=5,
+        AttributeNames=['SentTimestamp', 'ApproximateReceiveCount', 'MessageGroupId'],
+        ReceiveRequestAttemptId=first_attempt_id
+    )
+    assert fifo_processor.get_entry_group() == 'group-a'
+    assert fifo_processor.receive_request_attempt_id != first_attempt_id
+
+def test_fifo_failed_receive_reuses_attempt_id(fifo_processor, mock_boto3_client_setup):
+    """Test a receive that fails is retried with the same attempt ID, so SQS returns the same messages."""
+    mock_client_function, mock_sqs_client_instance = mock_boto3_client_setup
+    mock_sqs_client_instance.receive_message.side_effect = [ConnectionError("reset"), {'Messages': []}]
+    attempt_id = fifo_processor.receive_request_attempt_id
+
+    with pytest.raises(ConnectionError):
+        fifo_processor.load_next_entry()
+    fifo_processor.load_next_entry()
+
+    attempt_ids = [ c.kwargs['ReceiveRequestAttemptId'] for c in mock_sqs_client_instance.receive_message.call_args_list ]
+    assert attempt_ids == [attempt_id, attempt_id]
+
+def test_standard_queue_has_no_entry_group(processor_instance):
+    """Test messages from standard queues have no ordering group."""
+    processor_instance.load_next_entry()
+
+    assert processor_instance.is_fifo is False
+    assert processor_instance.receive_request_attempt_id is None
+    assert processor_instance.get_entry_group() is None
+
+def test_detached_resolver_deletes_its_own_message(processor_instance, mock_boto3_client_setup):
+    """Test a detached resolver deletes the message current when it was detached, even after the next one loads."""
+    mock_client_function, mock_sqs_client_instance = mock_boto3_client_setup
+    processor_instance.load_next_entry()
+    resolve = processor_instance.detach_entry_resolver()
+
+    mock_sqs_client_instance.receive_message.return_value = {
+        'Messages': [{'MessageId': 'next-message', 'ReceiptHandle': 'next-receipt', 'Body': '{}'}]
+    }
+    processor_instance.load_next_entry()
+    resolve()
+
+    mock_sqs_client_instance.delete_message.assert_called_once_with(
+        QueueUrl=processor_instance.queue_url,
+        ReceiptHandle='receipt-handle-456'
+    )
+
+def test_hold_entry_extends_visibility(processor_instance, mock_boto3_client_setup):
+    """Test holding a message hides it for longer rather than deleting it, and hands back a resolver that deletes it."""
+    mock_client_function, mock_sqs_client_instance = mock_boto3_client_setup
+    processor_instance.load_next_entry()
+
+    resolve = processor_instance.hold_entry(360.5)
+
+    mock_sqs_client_instance.change_message_visibility.assert_called_once_with(
+        QueueUrl=processor_instance.queue_url,
+        ReceiptHandle='receipt-handle-456',
+        VisibilityTimeout=360
+    )
+    mock_sqs_client_instance.delete_message.assert_not_called()
+    resolve()
+    mock_sqs_client_instance.delete_message.assert_called_once()
+
+def test_hold_entry_caps_visibility(processor_instance, mock_boto3_client_setup):
+    """Test a hold longer than SQS allows hides the message for as long as it can."""
+    mock_client_function, mock_sqs_client_instance = mock_boto3_client_setup
+    processor_instance.load_next_entry()
+
+    processor_instance.hold_entry(100000)
+
+    assert mock_sqs_client_instance.change_message_visibility.call_args.kwargs['VisibilityTimeout'] == SQSProcessor.MAX_VISIBILITY_TIMEOUT
+
+def test_fifo_hold_entry_is_not_supported(fifo_processor, mock_boto3_client_setup):
+    """Test FIFO messages aren't held, as that would hold back their whole message group."""
+    mock_client_function, mock_sqs_client_instance = mock_boto3_client_setup
+    fifo_processor.load_next_entry()
+
+    assert fifo_processor.hold_entry(360) is None
+    mock_sqs_client_instance.change_message_visibility.assert_not_called()
@@ -0,0 +1,128 @@
+import pytest
+
+from external_secrets_reloader.cache.eso_index import ESOIndex
+from external_secrets_reloader.cache.store_resolver import StoreResolver, external_secret_references, reference_keys
+
+# --- Helpers ---
+
+def _store(name, namespace=None, service="ParameterStore"):
+    metadata = {"name": name, "resourceVersion": "1"}
+    if namespace is not None:
+        metadata["namespace"] = namespace
+    return {"metadata": metadata, "spec": {"provider": {"aws": {"service": service, "region": "us-east-1"}}}}
+
+# --- Fixtures ---
+
+@pytest.fixture
+def resolver():
+    resolver = StoreResolver("ParameterStore")
+    resolver.on_replace("secretstores", [
+        _store("ssm", "team-a"),
+        _store("secrets", "team-a", service="SecretsManager"),
+    ])
+    resolver.on_replace("clustersecretstores", [_store("ssm-cluster")])
+    return resolver
+
+# --- Tests ---
+
+def test_resolve_defaults_to_secret_store_in_same_namespace(resolver):
+    """Tests refs without a kind are SecretStores, which only resolve within the ExternalSecret's namespace."""
+    assert resolver.resolve({"name": "ssm"}, "team-a") == {"service": "ParameterStore", "region": "us-east-1"}
+    assert resolver.resolve({"name": "ssm"}, "team-b") is None
+
+def test_resolve_cluster_secret_store_from_any_namespace(resolver):
+    """Tests ClusterSecretStores resolve from any namespace, but only when referenced by that kind."""
+    assert resolver.resolve({"name": "ssm-cluster", "kind": "ClusterSecretStore"}, "team-b") is not None
+    assert resolver.resolve({"name": "ssm-cluster"}, "team-b") is None
+    assert resolver.resolve({"name": "ssm", "kind": "ClusterSecretStore"}, "team-a") is None
+
+def test_resolve_ignores_other_providers(resolver):
+    """Tests stores using a different provider service never resolve."""
+    assert resolver.resolve({"name": "secrets"}, "team-a") is None
+
+def test_incremental_updates_from_index():
+    """Tests the resolver follows store changes made to an index it listens to."""
+    index = ESOIndex(["secretstores", "clustersecretstores", "externalsecrets"])
+    index.replace("secretstores", [_store("ssm", "team-a")], "1")
+
+    resolver = StoreResolver("ParameterStore")
+    index.add_listener(resolver)
+    assert resolver.resolve({"name": "ssm"}, "team-a") is not None
+
+    index.upsert("secretstores", _store("new", "team-b"))
+    assert resolver.resolve({"name": "new"}, "team-b") is not None
+
+    # Switching provider removes it
+    index.upsert("secretstores", _store("ssm", "team-a", service="SecretsManager"))
+    assert resolver.resolve({"name": "ssm"}, "team-a") is None
+
+    index.delete("secretstores", _store("new", "team-b"))
+    assert resolver.resolve({"name": "new"}, "team-b") is None
+
+    # Other plurals are ignored
+    index.upsert("externalsecrets", {"metadata": {"name": "es", "namespace": "team-a"}, "spec": {}})
+    assert resolver.size() == 0
+
+def test_external_secret_references_follow_source_refs():
+    """Tests data and dataFrom entries use their own sourceRef.storeRef when set, otherwise the secretStoreRef, along with any pinned version."""
+    es = {
+        "metadata": {"name": "es", "namespace": "team-a"},
+        "spec": {
+            "secretStoreRef": {"name": "ssm"},
+            "data": [
+                {"remoteRef": {"key": "/a", "version": "3"}},
+                {"remoteRef": {"key": "/b"}, "sourceRef": {"storeRef": {"name": "ssm-cluster", "kind": "ClusterSecretStore"}}},
+            ],
+            "dataFrom": [
+                {"extract": {"key": "/c"}, "sourceRef": {"storeRef": {"name": "other"}}},
+                {"extract": {"key": "/d"}},
+                {"find": {"path": "/e"}},
+                {"sourceRef": {"generatorRef": {"kind": "Password", "name": "gen"}}},
+            ],
+        },
+    }
+
+    assert list(external_secret_references(es)) == [
+        ("/a", {"name": "ssm"}, "3"),
+        ("/b", {"name": "ssm-cluster", "kind": "ClusterSecretStore"}, None),
+        ("/c", {"name": "other"}, None),
+        ("/d", {"name": "ssm"}, None),
+    ]
+
+def test_reference_keys_convert_secrets_manager_arns_to_names():
+    """Tests Secrets Manager ARNs are matched by the names they could be, and other keys as is."""
+    assert reference_keys("arn:aws:secretsmanager:us-east-1:123456789012:secret:my/secret-AbCdEf") == ("my/secret", "my/secret-AbCdEf")
+    assert reference_keys("arn:aws:secretsmanager:us-east-1:123456789012:secret:my/secret") == ("my/secret",)
+    assert reference_keys("my/secret-AbCdEf") == ("my/secret-AbCdEf",)
+    assert reference_keys("arn:aws:ssm:us-east-1:123456789012:parameter/a") == ("arn:aws:ssm:us-east-1:123456789012:parameter/a",)
+
+def test_external_secret_references_convert_arns():
+    """Tests data and dataFrom keys given as Secrets Manager ARNs are referenced by name."""
+    es = {
+        "metadata": {"name": "es", "namespace": "team-a"},
+        "spec": {
+            "secretStoreRef": {"name": "sm"},
+            "data": [{"remoteRef": {"key": "arn:aws:secretsmanager:us-east-1:123456789012:secret:my/secret-AbCdEf", "version": "v1"}}],
+            "dataFrom": [{"extract": {"key": "arn:aws:secretsmanager:us-east-1:123456789012:secret:other"}}],
+        },
+    }
+
+    assert list(external_secret_references(es)) == [
+        ("my/secret", {"name": "sm"}, "v1"),
+        ("my/secret-AbCdEf", {"name": "sm"}, "v1"),
+        ("other", {"name": "sm"}, None),
+    ]
+
+def test_can_see_checks_region_and_role_account():
+    """Tests stores are ruled out by a different region, or a role in a different account."""
+    resolver = StoreResolver("ParameterStore")
+    store = _store("ssm-cluster")
+    store["spec"]["provider"]["aws"]["role"] = "arn:aws:iam::111111111111:role/eso"
+    resolver.on_replace("clustersecretstores", [store])
+    ref = {"name": "ssm-cluster", "kind": "ClusterSecretStore"}
+
+    assert resolver.can_see(ref, "any", "us-east-1", "111111111111")
+    assert resolver.can_see(ref, "any")
+    assert not resolver.can_see(ref, "any", "eu-west-1", "111111111111")
+    assert not resolver.can_see(ref, "any", "us-east-1", "222222222222")
+    assert not resolver.can_see({"name": "missing", "kind": "ClusterSecretStore"}, "any")
@@ -0,0 +1,107 @@
+import json
+import pytest
+from unittest.mock import MagicMock
+
+from external_secrets_reloader.cache.eso_index import compact_object
+from external_secrets_reloader.cache.streaming_list_decoder import StreamingListDecoder, stream_list
+
+def _es(name):
+    return {
+        "metadata": {"name": name, "namespace": "ns-1", "resourceVersion": "5", "managedFields": [{"manager": "eso"}]},
+        "spec": {"secretStoreRef": {"name": "store"}, "data": [{"remoteRef": {"key": f"/key/{name}"}}]},
+        "status": {"refreshTime": "2024-01-01T00:00:00Z", "conditions": [{"type": "Ready"}]},
+    }
+
+def _chunks(body: str, size: int):
+    encoded = body.encode()
+    return [ encoded[i:i + size] for i in range(0, len(encoded), size) ]
+
+# --- Tests ---
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 100000])
+def test_decode_items_split_across_chunks(chunk_size):
+    """Tests items are decoded and transformed however the body is split into chunks."""
+    body = json.dumps({"apiVersion": "external-secrets.io/v1", "items": [_es("es-1"), _es("es-2")], "kind": "ExternalSecretList", "metadata": {"resourceVersion": "42"}})
+    decoder = StreamingListDecoder(compact_object)
+
+    items = list(decoder.decode(_chunks(body, chunk_size)))
+
+    assert items == [compact_object(_es("es-1")), compact_object(_es("es-2"))]
+    assert decoder.resource_version == "42"
+
+def test_decode_metadata_before_items_and_whitespace():
+    """Tests the list's metadata can come before its items, and whitespace between tokens is allowed."""
+    body = json.dumps({"metadata": {"resourceVersion": "7", "continue": ""}, "count": 12, "items": [_es("es-1")]}, indent=2)
+    decoder = StreamingListDecoder(lambda item: item["metadata"]["name"])
+
+    assert list(decoder.decode(_chunks(body, 3))) == ["es-1"]
+    assert decoder.resource_version == "7"
+
+def test_decode_multi_byte_characters_split_across_chunks():
+    """Tests a UTF-8 character split between two chunks is decoded intact."""
+    body = json.dumps({"items": [{"metadata": {"name": "sécret"}}], "metadata": {"resourceVersion": "1"}}, ensure_ascii=False)
+    decoder = StreamingListDecoder(lambda item: item["metadata"]["name"])
+
+    assert list(decoder.decode(_chunks(body, 1))) == ["sécret"]
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 5])
+def test_decode_strings_with_structure_split_across_chunks(chunk_size):
+    """Tests brackets, quotes and escapes inside strings don't confuse finding where an item ends, wherever chunks split."""
+    item = {"metadata": {"name": 'es-"1"'}, "data": {"value": "{[}]\\\" ok", "tail": "\\"}, "count": 12}
+    body = json.dumps({"items": [item, "plain", 3], "metadata": {"resourceVersion": "9"}})
+    decoder = StreamingListDecoder(lambda item: item)
+
+    assert list(decoder.decode(_chunks(body, chunk_size))) == [item, "plain", 3]
+    assert decoder.resource_version == "9"
+
+def test_large_item_is_decoded_once(mocker):
+    """Tests an item spread over many chunks is decoded once it has all been read, not from its start after every chunk."""
+    item = {"metadata": {"name": "es-1"}, "data": [{"remoteRef": {"key": f"/key/{i}"}} for i in range(500)]}
+    body = json.dumps({"items": [item], "metadata": {"resourceVersion": "1"}})
+    decoder = StreamingListDecoder(lambda item: item)
+    raw_decode = mocker.spy(decoder._decoder, "raw_decode")
+
+    assert list(decoder.decode(_chunks(body, 64))) == [item]
+    # The items key, the item and its one failed attempt before it had all been read, then the metadata key and value
+    assert raw_decode.call_count == 5
+
+def test_decode_empty_and_null_items():
+    """Tests a list with no items, or null items, decodes to nothing."""
+    for body in ('{"items": [], "metadata": {"resourceVersion": "3"}}', '{"items": null, "metadata": {"resourceVersion": "3"}}'):
+        decoder = StreamingListDecoder(compact_object)
+        assert list(decoder.decode(_chunks(body, 4))) == []
+        assert decoder.resource_version == "3"
+
+@pytest.mark.parametrize("body", ['{"items": [{"metadata": {"name": "es-1"}}, {"metadata"', '["not", "a", "list"]', '{"items": [1 2]}', ''])
+def test_decode_invalid_body_raises(body):
+    """Tests a truncated or malformed body raises a ValueError rather than returning partial results silently."""
+    decoder = StreamingListDecoder(lambda item: item)
+
+    with pytest.raises(ValueError):
+        list(decoder.decode(_chunks(body, 5)))
+
+def test_stream_list_reads_raw_response_and_releases_connection():
+    """Tests stream_list asks for the undecoded response, streams it and always releases the connection."""
+    body = json.dumps({"items": [_es("es-1")], "metadata": {"resourceVersion": "9"}})
+    response = MagicMock()
+    response.stream.return_value = iter(_chunks(body, 16))
+    k8s_client = MagicMock()
+    k8s_client.list_cluster_custom_object.return_value = response
+
+    items, resource_version = stream_list(k8s_client, "external-secrets.io", "v1", "externalsecrets", compact_object)
+
+    assert items == [compact_object(_es("es-1"))]
+    assert resource_version == "9"
+    assert k8s_client.list_cluster_custom_object.call_args.kwargs["_preload_content"] is False
+    response.release_conn.assert_called_once()
+
+def test_stream_list_releases_connection_on_error():
+    """Tests the connection is released even when the body can't be decoded."""
+    response = MagicMock()
+    response.stream.return_value = iter([b'{"items": ['])
+    k8s_client = MagicMock()
+    k8s_client.list_cluster_custom_object.return_value = response
+
+    with pytest.raises(ValueError):
+        stream_list(k8s_client, "external-secrets.io", "v1", "externalsecrets", compact_object)
+    response.release_conn.assert_called_once()
@@ -0,0 +1,177 @@
+import pytest
+import threading
+import time
+from contextvars import copy_context
+from queue import Full
+from unittest.mock import MagicMock
+
+from external_secrets_reloader.tracing.tracer import Tracer
+
+MESSAGE_ID = "5fea7756-0ea4-451a-a703-a558b933e274"
+
+# --- Fixtures ---
+
+@pytest.fixture
+def exporter():
+    return MagicMock()
+
+@pytest.fixture
+def tracer(exporter):
+    tracer = Tracer()
+    tracer.configure(exporter, sample_rate=1.0)
+    yield tracer
+    tracer.shutdown()
+
+def _exported_spans(tracer, exporter):
+    """Flush the export thread and return the spans of the first exported trace."""
+    tracer.shutdown()
+    exporter.export.assert_called_once()
+    return exporter.export.call_args[0][0]
+
+# --- Tests ---
+
+def test_trace_id_from_sqs_message_id():
+    """Tests UUID message IDs map directly onto trace IDs and anything else is hashed to the same length."""
+    assert Tracer.to_trace_id(MESSAGE_ID) == "5fea77560ea4451aa703a558b933e274"
+
+    hashed = Tracer.to_trace_id("not-a-uuid")
+    assert len(hashed) == 32
+    assert hashed == Tracer.to_trace_id("not-a-uuid")
+
+def test_spans_are_noop_without_a_trace(tracer, exporter):
+    """Tests spans outside of a trace are not recorded."""
+    with tracer.span("orphan") as span:
+        assert span is None
+
+    tracer.end_trace()
+    tracer.shutdown()
+    exporter.export.assert_not_called()
+
+def test_unconfigured_tracer_never_samples():
+    """Tests a tracer without an exporter never starts traces."""
+    tracer = Tracer()
+    assert tracer.start_trace(MESSAGE_ID) is False
+    assert tracer.get_trace_id() is None
+
+def test_trace_records_nested_spans(tracer, exporter):
+    """Tests spans nest under the span that was open when they started and are exported when the trace ends."""
+    start = time.time_ns()
+    assert tracer.start_trace(MESSAGE_ID, start) is True
+    tracer.record_span("sqs.receive_message", start, time.time_ns())
+
+    with tracer.span("reloader.reload", key="/my/key") as reload_span:
+        with tracer.span("k8s.patch_namespaced_custom_object", name="es-1", namespace="ns-1"):
+            pass
+
+    tracer.end_trace()
+    spans = _exported_spans(tracer, exporter)
+
+    names = [span.name for span in spans]
+    assert names == ["esr.event", "sqs.receive_message", "reloader.reload", "k8s.patch_namespaced_custom_object"]
+
+    root, receive, reload, patch = spans
+    assert all(span.trace_id == "5fea77560ea4451aa703a558b933e274" for span in spans)
+    assert root.parent_span_id is None
+    assert receive.parent_span_id == root.span_id
+    assert reload.parent_span_id == root.span_id
+    assert patch.parent_span_id == reload.span_id
+    assert patch.attributes == {"name": "es-1", "namespace": "ns-1"}
+    assert all(span.end_time_ns is not None for span in spans)
+
+def test_span_records_errors(tracer, exporter):
+    """Tests exceptions raised within a span are recorded on it and still propagate."""
+    tracer.start_trace(MESSAGE_ID)
+
+    with pytest.raises(ValueError):
+        with tracer.span("failing"):
+            raise ValueError("boom")
+
+    tracer.end_trace()
+    spans = _exported_spans(tracer, exporter)
+    assert spans[1].error == "ValueError: boom"
+
+@pytest.mark.parametrize("sample_rate, expected", [(0.0, False), (1.0, True)])
+def test_sample_rate_bounds(exporter, sample_rate, expected):
+    """Tests sample rates of 0 and 1 never and always sample."""
+    tracer = Tracer()
+    tracer.configure(exporter, sample_rate=sample_rate)
+    try:
+        assert tracer.start_trace(MESSAGE_ID) is expected
+    finally:
+        tracer.end_trace()
+        tracer.shutdown()
+
+def test_sample_rate_is_deterministic(exporter):
+    """Tests partial sampling keeps roughly the configured fraction, and always decides the same way per ID."""
+    tracer = Tracer()
+    tracer.exporter = exporter
+    tracer.sample_rate = 0.25
+
+    trace_ids = [Tracer.to_trace_id(f"message-{i}") for i in range(2000)]
+    sampled = [tracer._is_sampled(trace_id) for trace_id in trace_ids]
+
+    assert 0.2 < sum(sampled) / len(sampled) < 0.3
+    assert sampled == [tracer._is_sampled(trace_id) for trace_id in trace_ids]
+
+def test_full_export_queue_drops_traces(exporter, mocker):
+    """Tests traces are dropped rather than blocking when the export queue is full."""
+    tracer = Tracer()
+    tracer.exporter = exporter
+    tracer.sample_rate = 1.0
+    mocker.patch.object(tracer, "_queue", MagicMock(put_nowait=MagicMock(side_effect=Full)))
+
+    tracer.start_trace(MESSAGE_ID)
+    tracer.end_trace()
+
+    assert tracer.get_trace_id() is None
+
+def test_detached_trace_continues_in_its_context(tracer, exporter):
+    """Tests a detached trace is no longer current, but spans and end_trace run in its context continue it."""
+    tracer.start_trace(MESSAGE_ID)
+    context = tracer.detach_trace()
+
+    assert tracer.get_trace_id() is None
+    # Starting the next trace must not end the detached one
+    tracer.end_trace()
+    exporter.export.assert_not_called()
+
+    def continue_trace():
+        with tracer.span("reloader.reload"):
+            pass
+        tracer.end_trace()
+
+    thread = threading.Thread(target=context.run, args=(continue_trace,))
+    thread.start()
+    thread.join()
+
+    spans = _exported_spans(tracer, exporter)
+    assert [ span.name for span in spans ] == [Tracer.ROOT_SPAN_NAME, "reloader.reload"]
+
+def test_spans_on_concurrent_threads_nest_independently(tracer, exporter):
+    """Tests spans opened at the same time on threads sharing a trace each nest under their own parent, and closing them
+    in any order leaves the caller's span current."""
+    tracer.start_trace(MESSAGE_ID)
+    barrier = threading.Barrier(2, timeout=5)
+
+    def reload_cluster(cluster):
+        with tracer.span("cluster", cluster=cluster):
+            barrier.wait()
+            with tracer.span("patch", cluster=cluster):
+                barrier.wait()
+
+    with tracer.span("reloader.reload"):
+        threads = [ threading.Thread(target=copy_context().run, args=(reload_cluster, cluster)) for cluster in ("east", "west") ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        with tracer.span("after"):
+            pass
+    tracer.end_trace()
+
+    spans = { (span.name, span.attributes.get("cluster")): span for span in _exported_spans(tracer, exporter) }
+    reload_span = spans[("reloader.reload", None)]
+    for cluster in ("east", "west"):
+        assert spans[("cluster", cluster)].parent_span_id == reload_span.span_id
+        assert spans[("patch", cluster)].parent_span_id == spans[("cluster", cluster)].span_id
+    assert spans[("after", None)].parent_span_id == reload_span.span_id
@@ -0,0 +1,182 @@
+import os
+import pytest
+import sys
+import time
+
+from external_secrets_reloader.health_check.health_status import HealthStatus
+from external_secrets_reloader.metrics.metrics import METRICS
+from external_secrets_reloader.supervisor import worker_supervisor
+from external_secrets_reloader.supervisor.worker_status_reporter import WorkerStatusReporter
+from external_secrets_reloader.supervisor.worker_supervisor import WorkerSupervisor, available_cpu_count
+
+# --- Worker Targets ---
+# Spawned workers import these by name, so they have to live at the module level
+
+def counting_worker(worker_id, status_queue, stop_event):
+    health_status = HealthStatus()
+    reporter = WorkerStatusReporter(worker_id, health_status, status_queue, interval_seconds=0.1)
+    reporter.start()
+
+    METRICS.counter("esr_test_worker_events_total", "Test worker events").inc(worker_id + 1)
+    METRICS.gauge("esr_test_worker_gauge", "Test worker gauge").set(worker_id)
+
+    stop_event.wait(30)
+    reporter.stop()
+
+def exiting_worker(worker_id, status_queue, stop_event):
+    health_status = HealthStatus()
+    METRICS.counter("esr_test_exited_events_total", "Test exited worker events").inc()
+    WorkerStatusReporter(worker_id, health_status, status_queue).report()
+
+def unhealthy_worker(worker_id, status_queue, stop_event):
+    health_status = HealthStatus()
+    health_status.set_healthy(False, "init failed")
+    WorkerStatusReporter(worker_id, health_status, status_queue).report()
+    stop_event.wait(30)
+
+def degraded_worker(worker_id, status_queue, stop_event):
+    health_status = HealthStatus()
+    health_status.set_degraded("falling behind")
+    WorkerStatusReporter(worker_id, health_status, status_queue).report()
+    stop_event.wait(30)
+
+def failing_init_worker(worker_id, status_queue, stop_event):
+    health_status = HealthStatus()
+    health_status.set_healthy(False, "init failed")
+    WorkerStatusReporter(worker_id, health_status, status_queue).report()
+    sys.exit(1)
+
+def recovering_worker(worker_id, status_queue, stop_event, marker_path):
+    # Fails to start the first time only, leaving a marker for the worker restarted in its place
+    health_status = HealthStatus()
+    if not os.path.exists(marker_path):
+        open(marker_path, "w").close()
+        sys.exit(1)
+
+    health_status.set_ready(True)
+    WorkerStatusReporter(worker_id, health_status, status_queue).report()
+    stop_event.wait(30)
+
+# --- Helpers ---
+
+def _poll_until(supervisor, condition, timeout_seconds=30):
+    deadline = time.monotonic() + timeout_seconds
+    while time.monotonic() < deadline:
+        supervisor.poll(0.1)
+        if condition():
+            return True
+    return False
+
+# --- Tests ---
+
+def test_supervisor_aggregates_worker_metrics_and_readiness():
+    """Tests the supervisor is only ready once all workers are, sums counters and labels gauges by worker."""
+    health_status = HealthStatus()
+    health_status.set_ready(False)
+    supervisor = WorkerSupervisor(2, counting_worker, health_status)
+
+    supervisor.start()
+    try:
+        assert _poll_until(supervisor, health_status.is_ready)
+        assert _poll_until(supervisor, lambda: "esr_test_worker_events_total 3" in supervisor.render_metrics())
+
+        rendered = supervisor.render_metrics()
+        assert 'esr_test_worker_gauge{worker="0"} 0' in rendered
+        assert 'esr_test_worker_gauge{worker="1"} 1' in rendered
+        assert health_status.is_healthy()
+        assert set(supervisor.render_status()["workers"]) == {"0", "1"}
+    finally:
+        supervisor.stop(timeout_seconds=10)
+
+def test_supervisor_reports_unhealthy_worker():
+    """Tests a single unhealthy worker makes the whole pod unhealthy, with the worker's error."""
+    health_status = HealthStatus()
+    supervisor = WorkerSupervisor(1, unhealthy_worker, health_status)
+
+    supervisor.start()
+    try:
+        assert _poll_until(supervisor, lambda: not health_status.is_healthy())
+        assert "Worker 0: init failed" in health_status.get_error_message()
+    finally:
+        supervisor.stop(timeout_seconds=10)
+
+def test_supervisor_reports_degraded_worker():
+    """Tests a degraded worker makes the pod degraded, but still healthy."""
+    health_status = HealthStatus()
+    supervisor = WorkerSupervisor(1, degraded_worker, health_status)
+
+    supervisor.start()
+    try:
+        assert _poll_until(supervisor, lambda: health_status.get_degraded_reason() is not None)
+        assert health_status.get_degraded_reason() == "Worker 0: falling behind"
+        assert health_status.is_healthy()
+    finally:
+        supervisor.stop(timeout_seconds=10)
+
+def test_supervisor_restarts_exited_worker_and_keeps_totals(mocker):
+    """Tests exited workers are restarted, and counters from before the restart are not lost."""
+    mocker.patch.object(WorkerSupervisor, "RESTART_DELAY_SECONDS", 0)
+    health_status = HealthStatus()
+    supervisor = WorkerSupervisor(1, exiting_worker, health_status)
+    restarts_before = WorkerSupervisor.WORKER_RESTARTS.get()
+
+    supervisor.start()
+    try:
+        assert _poll_until(supervisor, lambda: WorkerSupervisor.WORKER_RESTARTS.get() - restarts_before >= 1)
+        # Stop restarting so exactly two runs are counted, once the restarted worker has also exited
+        mocker.patch.object(WorkerSupervisor, "RESTART_DELAY_SECONDS", 3600)
+        assert _poll_until(supervisor, lambda: "esr_test_exited_events_total 2" in supervisor.render_metrics())
+    finally:
+        supervisor.stop(timeout_seconds=10)
+
+def test_available_cpu_count_respects_cgroup_limit(mocker):
+    """Tests the cgroup v2 CPU limit caps the number of CPUs."""
+    mocker.patch.object(worker_supervisor.os, "sched_getaffinity", return_value=set(range(8)), create=True)
+    mocker.patch("builtins.open", mocker.mock_open(read_data="200000 100000\n"))
+
+    assert available_cpu_count() == 2
+
+def test_available_cpu_count_without_limit(mocker):
+    """Tests the CPU affinity is used when there is no cgroup limit."""
+    mocker.patch.object(worker_supervisor.os, "sched_getaffinity", return_value=set(range(8)), create=True)
+    mocker.patch("builtins.open", mocker.mock_open(read_data="max 100000\n"))
+
+    assert available_cpu_count() == 8
+
+def test_available_cpu_count_fractional_limit_is_at_least_one(mocker):
+    """Tests a limit below 1 CPU still gives 1 worker."""
+    mocker.patch.object(worker_supervisor.os, "sched_getaffinity", return_value=set(range(8)), create=True)
+    mocker.patch("builtins.open", mocker.mock_open(read_data="50000 100000\n"))
+
+    assert available_cpu_count() == 1
+
+def test_supervisor_stays_unhealthy_while_worker_keeps_failing_to_start(mocker):
+    """Tests a worker that exits unhealthy keeps the pod unhealthy through its restarts, rather than its report being dropped."""
+    mocker.patch.object(WorkerSupervisor, "RESTART_DELAY_SECONDS", 0)
+    health_status = HealthStatus()
+    supervisor = WorkerSupervisor(1, failing_init_worker, health_status)
+    restarts_before = WorkerSupervisor.WORKER_RESTARTS.get()
+
+    supervisor.start()
+    try:
+        assert _poll_until(supervisor, lambda: WorkerSupervisor.WORKER_RESTARTS.get() - restarts_before >= 2)
+        assert not health_status.is_healthy()
+        assert "Worker 0: init failed" in health_status.get_error_message()
+    finally:
+        supervisor.stop(timeout_seconds=10)
+
+def test_supervisor_recovers_once_restarted_worker_is_healthy(mocker, tmp_path):
+    """Tests a worker that crashed keeps the pod unhealthy only until the worker restarted in its place is healthy and ready."""
+    mocker.patch.object(WorkerSupervisor, "RESTART_DELAY_SECONDS", 0)
+    health_status = HealthStatus()
+    supervisor = WorkerSupervisor(1, recovering_worker, health_status, (str(tmp_path / "started"),))
+
+    supervisor.start()
+    try:
+        assert _poll_until(supervisor, lambda: not health_status.is_healthy())
+        assert "Worker 0: Exited With Code 1" in health_status.get_error_message()
+
+        assert _poll_until(supervisor, health_status.is_healthy)
+        assert health_status.is_ready()
+    finally:
+        supervisor.stop(timeout_seconds=10)